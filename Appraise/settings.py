@@ -72,6 +72,49 @@ else:
         }
     }
 
+# Cache settings: APPRAISE_CACHE_BACKEND selects one of the backends below.
+# The locmem backend keeps a separate cache in each process, so cache
+# invalidation is not seen by other processes and cached dashboards and
+# trusted users may be stale for up to their timeouts. It is the default for
+# the development server only; otherwise, the shared file backend is used by
+# default and locmem is refused. The database backend requires running
+# "manage.py createcachetable" first.
+CACHE_BACKENDS = {
+    'locmem': 'django.core.cache.backends.locmem.LocMemCache',
+    'file': 'django.core.cache.backends.filebased.FileBasedCache',
+    'db': 'django.core.cache.backends.db.DatabaseCache',
+}
+CACHE_LOCATIONS = {
+    'locmem': 'appraise',
+    'file': os.path.join(BASE_DIR, 'cache'),
+    'db': 'appraise_cache',
+}
+
+CACHE_BACKEND = os.environ.get('APPRAISE_CACHE_BACKEND', 'locmem' if DEBUG else 'file')
+if CACHE_BACKEND not in CACHE_BACKENDS:
+    raise ImproperlyConfigured(
+        'APPRAISE_CACHE_BACKEND needs to be one of {0}!'.format(
+            ', '.join(CACHE_BACKENDS)
+        )
+    )
+
+if CACHE_BACKEND == 'locmem' and not DEBUG:
+    raise ImproperlyConfigured(
+        'APPRAISE_CACHE_BACKEND locmem is local to each process and needs DEBUG!'
+    )
+
+CACHES = {
+    'default': {
+        'BACKEND': CACHE_BACKENDS[CACHE_BACKEND],
+        'LOCATION': os.environ.get(
+            'APPRAISE_CACHE_LOCATION', CACHE_LOCATIONS[CACHE_BACKEND]
+        ),
+    }
+}
+
+# Maximum age of cached dashboard contexts, in seconds
+DASHBOARD_CACHE_TIMEOUT = int(os.environ.get('APPRAISE_DASHBOARD_CACHE_TIMEOUT', 300))
+
 FILE_UPLOAD_PERMISSIONS = 0o644
 
 # Logging settings for this Django project.
@@ -128,6 +171,7 @@ if DEBUG:
 
 MIDDLEWARE.extend(
     [
+        'Appraise.timing.ServerTimingMiddleware',
         'django.middleware.security.SecurityMiddleware',
         'whitenoise.middleware.WhiteNoiseMiddleware',
         'django.contrib.sessions.middleware.SessionMiddleware',
@@ -136,6 +180,7 @@ MIDDLEWARE.extend(
         'django.contrib.auth.middleware.AuthenticationMiddleware',
         'django.contrib.messages.middleware.MessageMiddleware',
         'django.middleware.clickjacking.XFrameOptionsMiddleware',
+        'EvalData.middleware.ObjectIdentityMapMiddleware',
     ]
 )
 
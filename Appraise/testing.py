@@ -0,0 +1,38 @@
+"""
+Appraise evaluation framework
+
+See LICENSE for usage details
+"""
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+
+# pylint: disable=invalid-name,too-few-public-methods
+class QueryBudgetMixin:
+    """
+    Test case mixin for asserting SQL query budgets of views.
+
+    Requires a test case with a Django test client, e.g., TestCase.
+    """
+
+    def assertQueryBudget(self, budget, path, data=None, method='get', **extra):
+        """
+        Requests path with the test client and asserts that at most budget
+        SQL queries have been executed. Returns the response.
+        """
+        request = getattr(self.client, method)
+        with CaptureQueriesContext(connection) as context:
+            response = request(path, data or {}, **extra)
+
+        if len(context) > budget:
+            queries = '\n'.join(
+                '{0}. {1}'.format(i, query['sql'])
+                for i, query in enumerate(context.captured_queries, start=1)
+            )
+            self.fail(
+                '{0} {1} executed {2} queries, budget is {3}:\n{4}'.format(
+                    method.upper(), path, len(context), budget, queries
+                )
+            )
+
+        return response
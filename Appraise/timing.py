@@ -0,0 +1,178 @@
+"""
+Appraise evaluation framework
+
+See LICENSE for usage details
+"""
+from bisect import bisect_left
+from contextlib import ExitStack
+from datetime import timedelta
+from threading import Lock
+from time import perf_counter
+from typing import Dict
+
+from django.db import connections
+
+# Upper bounds of latency histogram buckets, in milliseconds
+LATENCY_BUCKETS = (10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+
+class PhaseTimer:
+    """
+    Measures consecutive phases of request processing.
+
+    Each call to mark() ends the current phase and starts the next one.
+    """
+
+    def __init__(self):
+        self.started = perf_counter()
+        self._last_mark = self.started
+        self.phases = []  # list of (name, seconds)
+
+    def mark(self, name):
+        """
+        Ends the current phase with the given name.
+        """
+        now = perf_counter()
+        self.phases.append((name, now - self._last_mark))
+        self._last_mark = now
+
+    def total(self):
+        """
+        Returns seconds since the timer has been started.
+        """
+        return perf_counter() - self.started
+
+    def debug_times(self):
+        """
+        Returns durations of all phases and total duration as timedeltas.
+        """
+        times = [seconds for _, seconds in self.phases] + [self.total()]
+        return tuple(timedelta(seconds=seconds) for seconds in times)
+
+
+def get_phase_timer(request):
+    """
+    Returns phase timer for the given request.
+
+    The timer is started by ServerTimingMiddleware; if the middleware is
+    not enabled, a new timer is started on first access.
+    """
+    if not hasattr(request, 'phase_timer'):
+        request.phase_timer = PhaseTimer()
+    return request.phase_timer
+
+
+class QueryCounter:
+    """
+    Counts SQL queries and their total execution time.
+
+    Instances are installed with connection.execute_wrapper().
+    """
+
+    def __init__(self):
+        self.queries = 0
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries += 1
+            self.seconds += perf_counter() - started
+
+
+class LatencyHistogram:
+    """
+    Keeps request latencies and SQL query counts for a single view.
+    """
+
+    def __init__(self):
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.requests = 0
+        self.seconds = 0.0
+        self.max_seconds = 0.0
+        self.queries = 0
+
+    def record(self, seconds, queries):
+        """
+        Adds request with given latency and number of SQL queries.
+        """
+        self.buckets[bisect_left(LATENCY_BUCKETS, seconds * 1000)] += 1
+        self.requests += 1
+        self.seconds += seconds
+        self.max_seconds = max(self.max_seconds, seconds)
+        self.queries += queries
+
+
+_LATENCY_HISTOGRAMS = {}  # type: Dict[str, LatencyHistogram]
+_LATENCY_HISTOGRAMS_LOCK = Lock()
+
+
+def record_latency(view_name, seconds, queries):
+    """
+    Records request latency for the given view in this process.
+    """
+    with _LATENCY_HISTOGRAMS_LOCK:
+        histogram = _LATENCY_HISTOGRAMS.get(view_name)
+        if histogram is None:
+            histogram = _LATENCY_HISTOGRAMS[view_name] = LatencyHistogram()
+        histogram.record(seconds, queries)
+
+
+def get_latency_histograms():
+    """
+    Returns list of (view name, histogram) pairs, sorted by view name.
+    """
+    with _LATENCY_HISTOGRAMS_LOCK:
+        return sorted(_LATENCY_HISTOGRAMS.items())
+
+
+def reset_latency_histograms():
+    """
+    Drops all latency histograms recorded in this process.
+    """
+    with _LATENCY_HISTOGRAMS_LOCK:
+        _LATENCY_HISTOGRAMS.clear()
+
+
+def _format_server_timing(timer, counter):
+    metrics = [
+        '{0};dur={1:.1f}'.format(name, seconds * 1000) for name, seconds in timer.phases
+    ]
+    metrics.append(
+        'db;dur={0:.1f};desc="{1} queries"'.format(
+            counter.seconds * 1000, counter.queries
+        )
+    )
+    metrics.append('total;dur={0:.1f}'.format(timer.total() * 1000))
+    return ', '.join(metrics)
+
+
+# pylint: disable=too-few-public-methods
+class ServerTimingMiddleware:
+    """
+    Reports phase durations, SQL query count and SQL time of requests.
+
+    Adds a Server-Timing header to each response and records request
+    latency for the resolved view in in-memory histograms.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        timer = get_phase_timer(request)
+        counter = QueryCounter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(counter))
+            response = self.get_response(request)
+
+        response['Server-Timing'] = _format_server_timing(timer, counter)
+
+        resolver_match = getattr(request, 'resolver_match', None)
+        if resolver_match is not None:
+            record_latency(resolver_match.view_name, timer.total(), counter.queries)
+
+        return response
@@ -76,6 +76,11 @@ urlpatterns = [
         name='update-profile',
     ),  # TODO: remove?
     re_path(r'^dashboard/$', dashboard_views.dashboard, name='dashboard'),
+    re_path(
+        r'^dashboard/latency/$',
+        dashboard_views.latency_histograms,
+        name='latency-histograms',
+    ),
     re_path(
         r'^data-assessment/$',
         evalview_views.data_assessment,
@@ -192,6 +197,16 @@ urlpatterns = [
         campaign_views.campaign_status,
         name='campaign_status',
     ),
+    re_path(
+        r'^campaign-status/(?P<campaign_name>[a-zA-Z0-9]+)/(?P<fmt>json|csv)/$',
+        campaign_views.campaign_status_api,
+        name='campaign-status-api',
+    ),
+    re_path(
+        r'^export-results/(?P<result_type>[a-zA-Z]+)/$',
+        campaign_views.export_results,
+        name='export-results',
+    ),
 ]
 
 if DEBUG:
@@ -5,9 +5,17 @@ See LICENSE for usage details
 """
 import logging
 
+import numpy as np
+
 from Appraise.settings import LOG_HANDLER
 from Appraise.settings import LOG_LEVEL
 
+# Annotations taking longer than this are likely due to inactivity
+MAX_ANNOTATION_SECONDS = 10 * 60
+
+# Annotation time counted for annotations exceeding MAX_ANNOTATION_SECONDS
+CLAMPED_ANNOTATION_SECONDS = 5 * 60
+
 
 def _get_logger(name):
     """
@@ -27,31 +35,64 @@ def _compute_user_total_annotation_time(timestamps):
     :param timestamps: list of (start_timestamp, end_timestamp) pairs
     :return: total annotation time in seconds
     """
-    # Sort timestamps by start timestamp
-    timestamps = sorted(timestamps, key=lambda x: x[0])
-
-    def _clamp_time(seconds):
-        # if a segment takes longer than 10 minutes, set it to 5 minutes
-        # it's likely due to inactivity
-        if seconds >= 10*60:
-            return 5*60
-        else:
-            return seconds
-
-    total_annotation_time = 0
-    previous_end_timestamp = None
-    for start_timestamp, end_timestamp in timestamps:
-        # If there is no previous end timestamp or the current start timestamp is after the previous end timestamp
-        if previous_end_timestamp is None or start_timestamp >= previous_end_timestamp:
-            # Add the duration of the current annotation to the total annotation time
-            total_annotation_time += _clamp_time(end_timestamp - start_timestamp)
-
-        # If the current start timestamp is before the previous end timestamp
-        else:
-            # Add the duration of the non-overlapping portion of the current annotation to the total annotation time
-            total_annotation_time += _clamp_time(end_timestamp - previous_end_timestamp)
-
-        # Update the previous end timestamp
-        previous_end_timestamp = end_timestamp
-
-    return total_annotation_time
\ No newline at end of file
+    timestamps = list(timestamps)
+    if not timestamps:
+        return 0
+
+    start_timestamps, end_timestamps = zip(*timestamps)
+    total_annotation_times = _compute_total_annotation_times(
+        [0] * len(timestamps), start_timestamps, end_timestamps
+    )
+    return total_annotation_times[0]
+
+
+def _compute_total_annotation_times(keys, start_timestamps, end_timestamps):
+    """
+    Computes total annotation time for many users in one vectorized pass.
+
+    Timestamps are grouped by key, e.g., user ID, and each group is processed
+    like timestamps of a single user: annotations are sorted by start
+    timestamp, keeping input order for identical start timestamps, and only
+    the portion after the end of the previous annotation is counted. If a
+    segment takes 10 minutes or longer, it is counted as 5 minutes as it is
+    likely due to inactivity.
+
+    :param keys: list of group keys, one for each annotation
+    :param start_timestamps: list of start timestamps
+    :param end_timestamps: list of end timestamps
+    :return: dict mapping group keys to total annotation time in seconds
+    """
+    if len(keys) == 0:
+        return {}
+
+    group_keys, groups = np.unique(np.asarray(keys), return_inverse=True)
+    groups = groups.ravel()
+    start_timestamps = np.asarray(start_timestamps)
+    end_timestamps = np.asarray(end_timestamps)
+
+    # Sort by group and start timestamp; np.lexsort is stable
+    order = np.lexsort((start_timestamps, groups))
+    groups = groups[order]
+    start_timestamps = start_timestamps[order]
+    end_timestamps = end_timestamps[order]
+
+    # Annotations overlap with the previous annotation of the same group if
+    # they start before the previous end timestamp
+    first_in_group = np.ones(len(groups), dtype=bool)
+    first_in_group[1:] = groups[1:] != groups[:-1]
+    previous_end_timestamps = np.roll(end_timestamps, 1)
+    non_overlapping = first_in_group | (start_timestamps >= previous_end_timestamps)
+    durations = end_timestamps - np.where(
+        non_overlapping, start_timestamps, previous_end_timestamps
+    )
+
+    durations = np.where(
+        durations >= MAX_ANNOTATION_SECONDS, CLAMPED_ANNOTATION_SECONDS, durations
+    )
+
+    # np.bincount adds durations in order, just like a sequential sum
+    totals = np.bincount(groups, weights=durations, minlength=len(group_keys))
+    if np.issubdtype(durations.dtype, np.integer):
+        totals = totals.astype(durations.dtype)
+
+    return dict(zip(group_keys.tolist(), totals.tolist()))
@@ -89,10 +89,10 @@ class CampaignAdmin(BaseMetadataAdmin):
     Model admin for Campaign instances.
     """
 
-    list_display = ['campaignName'] + BaseMetadataAdmin.list_display + ['id']  # type: ignore
-    list_filter = [
-        # nothing model specific
-    ] + BaseMetadataAdmin.list_filter  # type: ignore
+    list_display = (
+        ['campaignName', 'campaignType'] + BaseMetadataAdmin.list_display + ['id']
+    )  # type: ignore
+    list_filter = ['campaignType'] + BaseMetadataAdmin.list_filter  # type: ignore
     search_fields = [
         # nothing model specific
     ] + BaseMetadataAdmin.search_fields  # type: ignore
@@ -0,0 +1,37 @@
+"""
+Appraise evaluation framework
+
+See LICENSE for usage details
+"""
+from django.core.management.base import BaseCommand
+from django.core.management.base import CommandError
+
+from Campaign.models import Campaign
+from Campaign.utils import CAMPAIGN_TASK_TYPES
+
+
+# pylint: disable=C0111,C0330,E1101
+class Command(BaseCommand):
+    help = 'Sets market and language codes on tasks which are missing them'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'campaign_name',
+            type=str,
+            nargs='?',
+            default=None,
+            help='Name of the campaign you want to process, defaults to all',
+        )
+
+    def handle(self, *args, **options):
+        campaign = None
+        if options['campaign_name']:
+            # Identify Campaign instance for given name.
+            try:
+                campaign = Campaign.get_campaign_or_raise(options['campaign_name'])
+            except LookupError as error:
+                raise CommandError(error)
+
+        for task_name, task_cls in CAMPAIGN_TASK_TYPES.items():
+            updated = task_cls.backfill_market_fields(campaign)
+            self.stdout.write('{0}: updated {1} task(s)'.format(task_name, updated))
@@ -8,6 +8,7 @@ from django.core.management.base import BaseCommand
 from django.core.management.base import CommandError
 
 from Campaign.models import Campaign
+from Campaign.snapshots import ResultSnapshot
 from EvalData.models import DirectAssessmentResult
 from EvalData.models import DirectAssessmentTask
 
@@ -30,6 +31,11 @@ class Command(BaseCommand):
             type=str,
             help='CSV file containing annotation data',
         )
+        parser.add_argument(
+            '--snapshot',
+            type=str,
+            help='Snapshot folder written by ExportResultSnapshot',
+        )
         parser.add_argument(
             '--exclude-ids',
             type=str,
@@ -68,6 +74,7 @@ class Command(BaseCommand):
     def handle(self, *args, **options):
         campaign_name = options['campaign_name']
         csv_file = options['csv_file']
+        snapshot = options['snapshot']
         exclude_ids = (
             [x.lower() for x in options['exclude_ids'].split(',')]
             if options['exclude_ids']
@@ -113,6 +120,27 @@ class Command(BaseCommand):
 
                     user_scores[_key].append((_segment_id, _system_id, _type, _score))
 
+        elif snapshot:
+            if not export_csv:
+                _msg = 'Processing annotations in snapshot {0}\n\n'.format(snapshot)
+                self.stderr.write(_msg)
+
+            # Same rows as returned by get_system_data() below
+            snapshot = ResultSnapshot.load(snapshot)
+            for row in snapshot.get_system_data(
+                extended_csv=True,
+                expand_multi_sys=False,
+                include_inactive=True,
+                exclude_users=exclude_ids,
+            ):
+                _segment_id = row[2]
+                if options['task_type'] == 'Document':
+                    # segment ID + document ID
+                    _segment_id = '{0}:{1}'.format(row[2], row[7])
+                _key = '{0}-{1}-{2}'.format(row[4], row[5], row[0])
+
+                user_scores[_key].append((_segment_id, row[1], row[3], row[6]))
+
         else:
             # Identify Campaign instance for given name
             campaign = Campaign.objects.filter(campaignName=campaign_name).first()
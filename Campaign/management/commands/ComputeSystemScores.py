@@ -7,6 +7,7 @@ from django.core.management.base import BaseCommand
 from django.core.management.base import CommandError
 
 from Campaign.models import Campaign
+from Campaign.snapshots import ResultSnapshot
 from EvalData.models import DirectAssessmentResult
 from EvalData.models import DirectAssessmentTask
 
@@ -30,6 +31,11 @@ class Command(BaseCommand):
             type=str,
             help='CSV file containing annotation data',
         )
+        parser.add_argument(
+            '--snapshot',
+            type=str,
+            help='Snapshot folder written by ExportResultSnapshot',
+        )
         parser.add_argument(
             '--exclude-ids',
             type=str,
@@ -41,6 +47,7 @@ class Command(BaseCommand):
         campaign_name = options['campaign_name']
         completed_only = options['completed_only']
         csv_file = options['csv_file']
+        snapshot = options['snapshot']
         exclude_ids = (
             (x.lower() for x in options['exclude_ids'].split(','))
             if options['exclude_ids']
@@ -98,6 +105,18 @@ class Command(BaseCommand):
                         (csv_data.segment_id, int(csv_data.score))
                     )
 
+        elif snapshot:
+            _msg = 'Processing annotations in snapshot {0}\n\n'.format(snapshot)
+            self.stdout.write(_msg)
+
+            # Same rows as used by get_system_scores() below
+            snapshot = ResultSnapshot.load(snapshot)
+            system_scores = defaultdict(list)
+            for row in snapshot.get_system_data(
+                include_inactive=True, exclude_users=exclude_ids
+            ):
+                system_scores[row[1]].append((row[2], row[6]))
+
         else:
             # Identify Campaign instance for given name
             campaign = Campaign.objects.filter(campaignName=campaign_name).first()
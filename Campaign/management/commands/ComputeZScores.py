@@ -10,6 +10,7 @@ from django.core.management.base import BaseCommand
 from django.core.management.base import CommandError
 
 from Campaign.models import Campaign
+from Campaign.snapshots import ResultSnapshot
 from EvalData.models import DirectAssessmentResult
 from EvalData.models import DirectAssessmentTask
 
@@ -111,6 +112,11 @@ class Command(BaseCommand):
             type=str,
             help='CSV file containing annotation data',
         )
+        parser.add_argument(
+            '--snapshot',
+            type=str,
+            help='Snapshot folder written by ExportResultSnapshot',
+        )
         parser.add_argument(
             '--exclude-ids',
             type=str,
@@ -148,6 +154,7 @@ class Command(BaseCommand):
         campaign_name = options['campaign_name']
         completed_only = options['completed_only']
         csv_file = options['csv_file']
+        snapshot = options['snapshot']
         exclude_ids = (
             [x.lower() for x in options['exclude_ids'].split(',')]
             if options['exclude_ids']
@@ -211,6 +218,14 @@ class Command(BaseCommand):
                     _data = tuple(csv_line[:6]) + (_score,) + tuple(_rest)
                     system_data.append(_data)
 
+        elif snapshot:
+            _msg = 'Processing annotations in snapshot {0}\n\n'.format(snapshot)
+            self.stdout.write(_msg)
+
+            # Snapshot rows match rows returned by get_system_data() below
+            snapshot = ResultSnapshot.load(snapshot)
+            system_data = snapshot.get_system_data(exclude_users=exclude_ids)
+
         else:
             # Identify Campaign instance for given name
             campaign = Campaign.objects.filter(campaignName=campaign_name).first()
@@ -0,0 +1,41 @@
+# pylint: disable=C0103,C0111,C0330,E1101
+from django.core.management.base import BaseCommand
+from django.core.management.base import CommandError
+
+from Campaign.models import Campaign
+from Campaign.snapshots import ResultSnapshot
+
+
+class Command(BaseCommand):
+    help = 'Exports system data of a campaign as columnar NumPy snapshot'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'campaign_name',
+            type=str,
+            help='Name of the campaign you want to process data for',
+        )
+        parser.add_argument(
+            'snapshot_path',
+            type=str,
+            help='Folder to write snapshot files to',
+        )
+
+    def handle(self, *args, **options):
+        # Identify Campaign instance for given name.
+        try:
+            campaign = Campaign.get_campaign_or_raise(options['campaign_name'])
+
+        except LookupError as error:
+            raise CommandError(error)
+
+        try:
+            snapshot = ResultSnapshot.create(campaign, options['snapshot_path'])
+
+        except ValueError as error:
+            raise CommandError(error)
+
+        _msg = 'Exported {0} rows to {1}\n'.format(
+            len(snapshot), options['snapshot_path']
+        )
+        self.stdout.write(_msg)
@@ -6,6 +6,7 @@ from django.core.management.base import BaseCommand
 from django.core.management.base import CommandError
 
 from Campaign.models import Campaign
+from EvalData.exports import DeltaExport
 from EvalData.models import TASK_DEFINITIONS
 
 CAMPAIGN_TASK_PAIRS = {(tup[1], tup[2]) for tup in TASK_DEFINITIONS}
@@ -30,6 +31,12 @@ class Command(BaseCommand):
             action='store_true',
             help='Export batch and item IDs to help matching the scores to items in the JSON batches',
         )
+        parser.add_argument(
+            '--delta-folder',
+            type=str,
+            help='Folder for incremental exports of results changed since last '
+            'run, with result IDs appended after start and end times',
+        )
         # TODO: add argument to specify batch user
 
     def handle(self, *args, **options):
@@ -40,7 +47,10 @@ class Command(BaseCommand):
         except LookupError as error:
             raise CommandError(error)
 
-        csv_writer = csv.writer(sys.stdout, quoting=csv.QUOTE_MINIMAL)
+        delta = None
+        if options['delta_folder']:
+            delta = DeltaExport(options['delta_folder'], campaign.campaignName)
+
         system_scores = []
         for task_cls, result_cls in CAMPAIGN_TASK_PAIRS:
             qs_name = task_cls.__name__.lower()
@@ -52,12 +62,36 @@ class Command(BaseCommand):
                 qs_obj = qs_obj.filter(completed=True)
 
             if qs_obj and qs_obj.exists():
+                # Constrain to results changed since last run, if requested.
+                # Results of inactive users are not exported, so these are
+                # reported as removed.
+                subset = None
+                if delta is not None:
+                    subset = delta.get_changed_results(
+                        result_cls.objects.filter(task__campaign=campaign),
+                        include_inactive=False,
+                    )
+
                 _scores = result_cls.get_system_data(
                     campaign.id,
                     extended_csv=True,
                     add_batch_info=options['batch_info'],
+                    add_result_id=delta is not None,
+                    subset=subset,
                 )
                 system_scores.extend(_scores)
 
-        for system_score in system_scores:
-            csv_writer.writerow([str(x) for x in system_score])
+        if delta is None:
+            csv_writer = csv.writer(sys.stdout, quoting=csv.QUOTE_MINIMAL)
+            for system_score in system_scores:
+                csv_writer.writerow([str(x) for x in system_score])
+            return
+
+        delta_path = delta.get_delta_path('.csv')
+        with open(delta_path, 'w', newline='') as delta_file:
+            csv_writer = csv.writer(delta_file, quoting=csv.QUOTE_MINIMAL)
+            for system_score in system_scores:
+                csv_writer.writerow([str(x) for x in system_score])
+
+        delta.commit(delta_path, len(system_scores))
+        self.stdout.write('{0}: {1} rows\n'.format(delta_path, len(system_scores)))
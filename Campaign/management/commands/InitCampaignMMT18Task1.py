@@ -354,19 +354,17 @@ class Command(BaseCommand):
                 else:
                     a = a[0]
 
-                serialized_t = ObjectID.objects.get_or_create(
-                    typeName='MultiModalAssessmentTask', primaryID=t.id
-                )
+                serialized_t = ObjectID.get_or_create_for_instance(t)
 
                 _task_done_for_user = t.next_item_for_user(u) is None
                 if _task_done_for_user:
-                    if serialized_t[0] not in a._completed_tasks.all():
-                        a._completed_tasks.add(serialized_t[0])
-                    if serialized_t[0] in a._open_tasks.all():
-                        a._open_tasks.remove(serialized_t[0])
+                    if serialized_t not in a._completed_tasks.all():
+                        a._completed_tasks.add(serialized_t)
+                    if serialized_t in a._open_tasks.all():
+                        a._open_tasks.remove(serialized_t)
 
                 else:
-                    if serialized_t[0] in a._completed_tasks.all():
-                        a._completed_tasks.remove(serialized_t[0])
-                    if serialized_t[0] not in a._open_tasks.all():
-                        a._open_tasks.add(serialized_t[0])
+                    if serialized_t in a._completed_tasks.all():
+                        a._completed_tasks.remove(serialized_t)
+                    if serialized_t not in a._open_tasks.all():
+                        a._open_tasks.add(serialized_t)
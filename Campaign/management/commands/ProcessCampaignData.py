@@ -5,6 +5,7 @@ from django.core.management.base import CommandError
 from Campaign.models import Campaign
 from Campaign.utils import _identify_super_users
 from Campaign.utils import CAMPAIGN_TASK_TYPES
+from EvalData.models import deferred_capacity
 
 
 class Command(BaseCommand):
@@ -57,21 +58,24 @@ def _process_campaign_data(campaign, batch_user, campaign_type, max_count):
     print('Campign type validated')
 
     # TODO: add rollback in case of errors
-    for batch_data in campaign.batches.filter(dataValid=True):
-        # We have already verified that campaign_type is valid
-        task_cls = CAMPAIGN_TASK_TYPES.get(campaign_type)
+    # Task capacity is rebuilt once after importing all batches
+    with deferred_capacity():
+        for batch_data in campaign.batches.filter(dataValid=True):
+            # We have already verified that campaign_type is valid
+            task_cls = CAMPAIGN_TASK_TYPES.get(campaign_type)
 
-        print(f'Processing task {task_cls.__name__}')
-        try:
-            task_cls.import_from_json(campaign, batch_user, batch_data, max_count)
-        except Exception as e:
-            raise CommandError(e)
-        finally:
-            batch_data.dataReady = True
-            batch_data.activate()
-            batch_data.save()
+            print(f'Processing task {task_cls.__name__}')
+            try:
+                task_cls.import_from_json(campaign, batch_user, batch_data, max_count)
+            except Exception as e:
+                raise CommandError(e)
+            finally:
+                batch_data.dataReady = True
+                batch_data.activate()
+                batch_data.save()
 
     print('Campaign activated')
 
+    campaign.campaignType = CAMPAIGN_TASK_TYPES[campaign_type].__name__
     campaign.activate()
     campaign.save()
@@ -0,0 +1,36 @@
+"""
+Appraise evaluation framework
+
+See LICENSE for usage details
+"""
+from django.core.management.base import BaseCommand
+from django.core.management.base import CommandError
+
+from Campaign.models import Campaign
+from EvalData.models import TaskProgress
+
+
+# pylint: disable=C0111,C0330,E1101
+class Command(BaseCommand):
+    help = 'Rebuilds task progress cursors for all tasks in a campaign'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'campaign_name',
+            type=str,
+            help='Name of the campaign you want to rebuild progress for',
+        )
+
+    def handle(self, *args, **options):
+        # Identify Campaign instance for given name.
+        try:
+            campaign = Campaign.get_campaign_or_raise(options['campaign_name'])
+        except LookupError as error:
+            raise CommandError(error)
+
+        rebuilt = TaskProgress.rebuild_for_campaign(campaign)
+        self.stdout.write(
+            'Rebuilt {0} task progress cursor(s) for campaign {1!r}'.format(
+                rebuilt, campaign.campaignName
+            )
+        )
@@ -20,6 +20,7 @@ from Campaign.models import CampaignData
 from Campaign.models import CampaignTeam
 from Campaign.models import Market
 from Campaign.models import Metadata
+from Campaign.utils import CAMPAIGN_TASK_TYPES
 from Campaign.utils import _identify_super_users
 from Campaign.utils import _load_campaign_manifest
 from Campaign.utils import _process_market_and_metadata
@@ -199,6 +200,9 @@ class Command(BaseCommand):
         _max_count = options['max_count']
         if not _campaign.activated:
             _process_campaign_data(_campaign, owner, _campaign_type, _max_count)
+        elif not _campaign.campaignType and _campaign_type in CAMPAIGN_TASK_TYPES:
+            _campaign.campaignType = CAMPAIGN_TASK_TYPES[_campaign_type].__name__
+            _campaign.save()
 
         #############################################################
         self.stdout.write('### Running UpdateEvalDataModels')
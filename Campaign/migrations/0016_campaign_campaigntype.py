@@ -0,0 +1,56 @@
+# Generated by Django 4.1 on 2026-10-18 05:57
+
+from django.db import migrations, models
+
+# Task model names in registry order, used to identify campaign types
+TASK_MODEL_NAMES = (
+    'DataAssessmentTask',
+    'DirectAssessmentTask',
+    'DirectAssessmentContextTask',
+    'DirectAssessmentDocumentTask',
+    'MultiModalAssessmentTask',
+    'PairwiseAssessmentTask',
+    'PairwiseAssessmentDocumentTask',
+)
+
+
+def backfill_campaign_type(apps, schema_editor):
+    """Stores task type of existing campaigns, based on their tasks."""
+    campaign_cls = apps.get_model('Campaign', 'Campaign')
+    untyped_ids = set(
+        campaign_cls.objects.filter(campaignType='').values_list('id', flat=True)
+    )
+    for task_name in TASK_MODEL_NAMES:
+        task_cls = apps.get_model('EvalData', task_name)
+        campaign_ids = set(
+            task_cls.objects.filter(campaign_id__in=untyped_ids)
+            .values_list('campaign_id', flat=True)
+            .distinct()
+        )
+        campaign_cls.objects.filter(id__in=campaign_ids).update(
+            campaignType=task_name
+        )
+        untyped_ids -= campaign_ids
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Campaign', '0015_alter_campaign_activatedby_alter_campaign_batches_and_more'),
+        ('EvalData', '0060_taskcapacity'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='campaign',
+            name='campaignType',
+            field=models.CharField(
+                blank=True,
+                default='',
+                editable=False,
+                max_length=100,
+                verbose_name='Campaign task type',
+            ),
+        ),
+        migrations.RunPython(backfill_campaign_type, migrations.RunPython.noop),
+    ]
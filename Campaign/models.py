@@ -9,14 +9,18 @@ from zipfile import is_zipfile
 from zipfile import ZipFile
 
 from django.contrib.auth.models import User
+from django.core.cache import cache
 from django.core.exceptions import ValidationError
 from django.db import models
+from django.db.models.signals import post_delete
 from django.utils.text import format_lazy as f
 from django.utils.translation import gettext_lazy as _
 
+from Dashboard.cache import invalidate_all_dashboards
 from Dashboard.models import validate_language_code
 from EvalData.models import AnnotationTaskRegistry
 from EvalData.models import BaseMetadata
+from EvalData.models import MAX_TYPENAME_LENGTH
 from EvalData.models import Market
 from EvalData.models import Metadata
 from EvalData.models import RESULT_TYPES
@@ -25,6 +29,8 @@ MAX_TEAMNAME_LENGTH = 250
 MAX_SMALLINTEGER_VALUE = 32767
 MAX_FILEFILED_SIZE = 10  # TODO: this does not get enforced currently; remove?
 MAX_CAMPAIGNNAME_LENGTH = 250
+TRUSTED_USERS_CACHE_KEY = 'trusted-users:{0}'
+TRUSTED_USERS_CACHE_TIMEOUT = 300  # seconds; bounds staleness across processes
 
 # TODO: _validate_task_json(task_json)
 
@@ -447,6 +453,15 @@ class Campaign(BaseMetadata):
         verbose_name=_('Campaign task-specific options'),
     )
 
+    # Task type of this campaign, set when batches are processed
+    campaignType = models.CharField(
+        blank=True,
+        default='',
+        editable=False,
+        max_length=MAX_TYPENAME_LENGTH,
+        verbose_name=_('Campaign task type'),
+    )
+
     teams = models.ManyToManyField(
         CampaignTeam,
         blank=True,
@@ -474,6 +489,23 @@ class Campaign(BaseMetadata):
     def _generate_str_name(self):
         return self.campaignName
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super(Campaign, cls).from_db(db, field_names, values)
+        instance._loaded_activated = instance.__dict__.get('activated')
+        return instance
+
+    def save(self, *args, **kwargs):
+        """
+        Drops cached dashboards of all users when the campaign has been
+        (de)activated, as this changes which tasks can be offered.
+        """
+        super(Campaign, self).save(*args, **kwargs)
+
+        if self.activated != getattr(self, '_loaded_activated', False):
+            invalidate_all_dashboards()
+        self._loaded_activated = self.activated
+
     @classmethod
     def get_campaign_or_raise(cls, campaign_name):
         """
@@ -490,20 +522,28 @@ class Campaign(BaseMetadata):
 
     def get_campaign_type(self) -> str:
         """
-        Get campaign type based on evaldata_{cls_name}_campaign QuerySet.
+        Get campaign type, i.e., the name of the campaign's task class.
 
         For now, we assume that campaigns can only have a single type.
 
-        We use the following check to identify the campaign's type:
+        The type is stored when campaign batches are processed. For older
+        campaigns without a stored type, we identify it based on the
+        evaldata_{cls_name}_campaign QuerySet and store it:
         c.evaldata_directassessmentcontexttask_campaign.exists()
 
-        Returns class object, which is a sub class of BaseAnnotationTask.
+        Returns class name of a sub class of BaseAnnotationTask.
         """
+        if self.campaignType:
+            return self.campaignType
+
         for cls_name in AnnotationTaskRegistry.get_types():
             qs_name = cls_name.lower()
             qs_attr = 'evaldata_{0}_campaign'.format(qs_name)
             qs_obj = getattr(self, qs_attr, None)
             if qs_obj and qs_obj.exists():
+                self.campaignType = cls_name
+                if self.id:
+                    Campaign.objects.filter(id=self.id).update(campaignType=cls_name)
                 return cls_name
 
         _msg = 'Unknown type for campaign {0}'.format(self.campaignName)
@@ -519,6 +559,82 @@ class TrustedUser(models.Model):
 
     campaign = models.ForeignKey(Campaign, models.PROTECT, verbose_name=_('Campaign'))
 
+    @staticmethod
+    def _cache_key(campaign_id):
+        return TRUSTED_USERS_CACHE_KEY.format(campaign_id)
+
+    @classmethod
+    def get_trusted_user_ids(cls, campaign_ids):
+        """
+        Returns dict mapping given campaign IDs to sets of trusted user IDs.
+
+        Trusted users are cached per campaign; campaigns missing from the
+        cache are loaded with a single query.
+        """
+        keys = {cls._cache_key(x): x for x in set(campaign_ids)}
+        cached = cache.get_many(keys.keys())
+
+        trusted_user_ids = {keys[key]: value for key, value in cached.items()}
+        missing = [x for key, x in keys.items() if key not in cached]
+        if missing:
+            loaded = {campaign_id: set() for campaign_id in missing}
+            trusted_users = cls.objects.filter(campaign_id__in=missing)
+            for campaign_id, user_id in trusted_users.values_list(
+                'campaign_id', 'user_id'
+            ):
+                loaded[campaign_id].add(user_id)
+
+            cache.set_many(
+                {cls._cache_key(x): frozenset(y) for x, y in loaded.items()},
+                TRUSTED_USERS_CACHE_TIMEOUT,
+            )
+            trusted_user_ids.update(loaded)
+
+        return trusted_user_ids
+
+    @classmethod
+    def get_trusted_campaign_ids(cls, user, campaign_ids):
+        """
+        Returns the subset of campaign IDs for which the user is trusted.
+        """
+        trusted_user_ids = cls.get_trusted_user_ids(campaign_ids)
+        return {x for x, y in trusted_user_ids.items() if user.id in y}
+
+    @classmethod
+    def invalidate_cache(cls, campaign_ids):
+        """
+        Removes cached trusted users for the given campaign IDs.
+        """
+        cache.delete_many([cls._cache_key(x) for x in set(campaign_ids) if x])
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super(TrustedUser, cls).from_db(db, field_names, values)
+        instance._loaded_campaign_id = instance.campaign_id
+        return instance
+
+    def save(self, *args, **kwargs):
+        super(TrustedUser, self).save(*args, **kwargs)
+
+        loaded_campaign_id = getattr(self, '_loaded_campaign_id', None)
+        self.invalidate_cache([self.campaign_id, loaded_campaign_id])
+        self._loaded_campaign_id = self.campaign_id
+
     # TODO: decide whether this needs to be optimized.
     def __str__(self):
         return 'trusted:{0}/{1}'.format(self.user.username, self.campaign.campaignName)
+
+
+def _invalidate_trusted_users(sender, instance, **kwargs):
+    """
+    Invalidates cached trusted users after a TrustedUser is deleted. The
+    signal is sent for queryset deletions as well.
+    """
+    TrustedUser.invalidate_cache([instance.campaign_id])
+
+
+post_delete.connect(
+    _invalidate_trusted_users,
+    sender=TrustedUser,
+    dispatch_uid='invalidate_trusted_users',
+)
@@ -0,0 +1,261 @@
+"""
+Appraise evaluation framework
+
+See LICENSE for usage details
+"""
+import json
+from os import makedirs
+from os.path import join
+
+import numpy as np
+
+from EvalData.models import DirectAssessmentContextResult
+from EvalData.models import DirectAssessmentDocumentResult
+from EvalData.models import DirectAssessmentResult
+from EvalData.models import TASK_DEFINITIONS
+
+# Result types with system data rows starting with the SNAPSHOT_COLUMNS
+SNAPSHOT_RESULT_TYPES = {
+    x.__name__: x
+    for x in (
+        DirectAssessmentContextResult,
+        DirectAssessmentDocumentResult,
+        DirectAssessmentResult,
+    )
+}
+
+# Leading columns of system data rows
+SNAPSHOT_COLUMNS = (
+    'user',
+    'system',
+    'segment',
+    'itemType',
+    'sourceLanguage',
+    'targetLanguage',
+    'score',
+)
+
+# Options of get_system_data() used to build snapshots. These return all
+# rows, from which rows for other options are selected by get_system_data().
+SNAPSHOT_OPTIONS = {
+    'extended_csv': True,
+    'expand_multi_sys': False,
+    'include_inactive': True,
+}
+
+# Trailing columns added by extended_csv, i.e., start and end time
+EXTENDED_CSV_COLUMNS = 2
+
+SNAPSHOT_METADATA_FILE = 'snapshot.json'
+
+
+def _encode_column(values):
+    """
+    Returns (codes, vocabulary) for the given values, mapping values to
+    their string representation and those to int32 vocabulary indices.
+    """
+    vocabulary = {}
+    codes = np.fromiter(
+        (vocabulary.setdefault(str(x), len(vocabulary)) for x in values),
+        dtype=np.int32,
+        count=len(values),
+    )
+    return codes, np.array(list(vocabulary), dtype=str)
+
+
+def _get_plain_dtype(values):
+    """
+    Returns NumPy dtype able to store all values, or None if values need
+    to be dictionary-encoded.
+    """
+    for dtype in (bool, int, float):
+        if all(type(x) is dtype for x in values):
+            return {bool: np.bool_, int: np.int64, float: np.float64}[dtype]
+
+    if all(type(x) in (int, float) for x in values):
+        return np.float64
+
+    return None
+
+
+class ResultSnapshot:
+    """
+    Columnar snapshot of system data rows for a campaign.
+
+    Each column is stored as .npy file in the snapshot folder, so that
+    columns can be memory-mapped instead of loaded from the database.
+    User, system IDs and other string values are dictionary-encoded as
+    int32 codes into a vocabulary array of unique values.
+
+    Snapshots are built with SNAPSHOT_OPTIONS, which are recorded in the
+    snapshot metadata together with users inactive at that time, so that
+    get_system_data() can apply other options when loading.
+    """
+
+    def __init__(self, path, metadata):
+        self.path = path
+        self.metadata = metadata
+        self._columns = {}
+
+    @classmethod
+    def create(cls, campaign, path):
+        """
+        Writes snapshot of system data of the given campaign to path.
+
+        Raises ValueError for result types not supported by snapshots, or
+        if system data rows have differing numbers of columns.
+        """
+        task_type = campaign.get_campaign_type()
+        result_cls = {x[1].__name__: x[2] for x in TASK_DEFINITIONS}.get(task_type)
+        if result_cls is None or result_cls.__name__ not in SNAPSHOT_RESULT_TYPES:
+            raise ValueError(
+                'Snapshots are not supported for {0} campaigns'.format(task_type)
+            )
+
+        rows = result_cls.get_system_data(campaign.id, **SNAPSHOT_OPTIONS)
+        widths = sorted({len(x) for x in rows})
+        if len(widths) > 1:
+            raise ValueError(
+                'System data rows have differing numbers of columns {0}'.format(
+                    widths
+                )
+            )
+
+        width = widths[0] if widths else len(SNAPSHOT_COLUMNS)
+        names = list(SNAPSHOT_COLUMNS)
+        names += ['column{0}'.format(x) for x in range(len(names), width)]
+
+        makedirs(path, exist_ok=True)
+        columns = []
+        for index, name in enumerate(names):
+            values = [row[index] for row in rows]
+            dtype = _get_plain_dtype(values)
+            if dtype is None:
+                codes, vocabulary = _encode_column(values)
+                np.save(join(path, name + '.npy'), codes)
+                np.save(join(path, name + '.vocab.npy'), vocabulary)
+            else:
+                np.save(join(path, name + '.npy'), np.array(values, dtype=dtype))
+            columns.append({'name': name, 'encoded': dtype is None})
+
+        inactive_users = (
+            result_cls.objects.filter(
+                task__campaign=campaign, createdBy__is_active=False
+            )
+            .order_by('createdBy__username')
+            .values_list('createdBy__username', flat=True)
+            .distinct()
+        )
+
+        metadata = {
+            'campaign': campaign.campaignName,
+            'resultType': result_cls.__name__,
+            'options': SNAPSHOT_OPTIONS,
+            'inactiveUsers': list(inactive_users),
+            'rows': len(rows),
+            'columns': columns,
+        }
+        with open(join(path, SNAPSHOT_METADATA_FILE), 'w') as metadata_file:
+            json.dump(metadata, metadata_file, indent=2)
+
+        return cls(path, metadata)
+
+    @classmethod
+    def load(cls, path):
+        """
+        Returns snapshot stored in path. Columns are memory-mapped on access.
+        """
+        with open(join(path, SNAPSHOT_METADATA_FILE)) as metadata_file:
+            return cls(path, json.load(metadata_file))
+
+    def __len__(self):
+        return self.metadata['rows']
+
+    def get_column(self, name):
+        """
+        Returns (values, vocabulary) arrays for the named column. Values of
+        dictionary-encoded columns are vocabulary codes, otherwise
+        vocabulary is None.
+        """
+        if name not in self._columns:
+            column = next(x for x in self.metadata['columns'] if x['name'] == name)
+            values = np.load(join(self.path, name + '.npy'), mmap_mode='r')
+            vocabulary = None
+            if column['encoded']:
+                vocabulary = np.load(join(self.path, name + '.vocab.npy'))
+            self._columns[name] = (values, vocabulary)
+
+        return self._columns[name]
+
+    def get_mask(self, exclude_users=(), item_types=None, include_inactive=True):
+        """
+        Returns boolean mask selecting rows of users not in exclude_users,
+        compared lower-case, and of item types in item_types, if given.
+        Rows of users inactive when building the snapshot are only
+        selected if include_inactive is True.
+        """
+        mask = np.ones(len(self), dtype=bool)
+
+        exclude_users = set(exclude_users)
+        inactive_users = set()
+        if not include_inactive:
+            inactive_users = set(self.metadata['inactiveUsers'])
+
+        if exclude_users or inactive_users:
+            codes, vocabulary = self.get_column('user')
+            excluded = [
+                x.lower() in exclude_users or x in inactive_users
+                for x in vocabulary.tolist()
+            ]
+            mask &= ~np.array(excluded, dtype=bool)[codes]
+
+        if item_types is not None:
+            codes, vocabulary = self.get_column('itemType')
+            mask &= np.isin(vocabulary, list(item_types))[codes]
+
+        return mask
+
+    def get_rows(self, mask=None):
+        """
+        Returns rows selected by the given mask as tuples of Python values.
+        Rows match those returned by get_system_data() with SNAPSHOT_OPTIONS,
+        except that values of dictionary-encoded columns are strings.
+        """
+        columns = []
+        for column in self.metadata['columns']:
+            values, vocabulary = self.get_column(column['name'])
+            if mask is not None:
+                values = values[mask]
+            if vocabulary is not None:
+                values = vocabulary[values]
+            columns.append(values.tolist())
+
+        return list(zip(*columns))
+
+    def get_system_data(
+        self,
+        extended_csv=False,
+        expand_multi_sys=True,
+        include_inactive=False,
+        exclude_users=(),
+    ):
+        """
+        Returns rows matching those returned by get_system_data() of the
+        snapshot result type with the given options, excluding rows of users
+        in exclude_users, compared lower-case.
+        """
+        item_types = None if extended_csv else ('TGT', 'CHK')
+        mask = self.get_mask(exclude_users, item_types, include_inactive)
+        rows = self.get_rows(mask)
+
+        if not extended_csv:
+            rows = [row[:-EXTENDED_CSV_COLUMNS] for row in rows]
+
+        if expand_multi_sys:
+            rows = [
+                (row[0], system_id) + row[2:]
+                for row in rows
+                for system_id in row[1].split('+')
+            ]
+
+        return rows
@@ -3,17 +3,90 @@ Appraise evaluation framework
 
 See LICENSE for usage details
 """
+from contextlib import redirect_stdout
+import gzip
+from io import StringIO
+from os.path import join
 from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest.mock import patch
 
 from django.contrib.auth.models import User
+from django.core.cache import cache
 from django.core.exceptions import ValidationError
 from django.core.files.base import File
+from django.core.management import call_command
 from django.core.management.base import CommandError
 from django.test import TestCase
+from django.urls import reverse
 
+from Appraise.testing import QueryBudgetMixin
 from Campaign.models import _validate_package_file
 from Campaign.models import Campaign
+from Campaign.models import CampaignTeam
+from Campaign.models import TrustedUser
+from Campaign.snapshots import ResultSnapshot
+from Campaign.snapshots import SNAPSHOT_OPTIONS
+from Appraise.utils import _compute_total_annotation_times
 from Appraise.utils import _compute_user_total_annotation_time
+from EvalData.models import DirectAssessmentResult
+from EvalData.models import DirectAssessmentTask
+from EvalData.models import Market
+from EvalData.models import Metadata
+from EvalData.models import TextPair
+
+
+def _create_direct_assessment_task(campaign, owner):
+    '''Creates a DirectAssessmentTask with items of mixed types.'''
+    market = Market.objects.create(
+        sourceLanguageCode='eng',
+        targetLanguageCode='deu',
+        domainName='TEST',
+        createdBy=owner,
+    )
+    metadata = Metadata.objects.create(
+        market=market,
+        corpusName='TEST',
+        versionInfo='1.0',
+        source='MANUAL',
+        createdBy=owner,
+    )
+    task = DirectAssessmentTask.objects.create(
+        campaign=campaign,
+        requiredAnnotations=1,
+        batchNo=1,
+        market=market,
+        createdBy=owner,
+    )
+    items = []
+    for item_id, item_type in enumerate(('TGT', 'BAD', 'TGT', 'REF'), 1):
+        item = TextPair.objects.create(
+            itemID=item_id,
+            itemType=item_type,
+            metadata=metadata,
+            sourceID='doc1',
+            sourceText='Source {0}'.format(item_id),
+            targetID='sys1',
+            targetText='Target {0}'.format(item_id),
+            createdBy=owner,
+        )
+        task.items.add(item)
+        items.append(item)
+    return task, items
+
+
+def _annotate(task, user, item, start_time=0, end_time=1, score=50):
+    '''Creates a completed DirectAssessmentResult for the given item.'''
+    return DirectAssessmentResult.objects.create(
+        score=score,
+        start_time=start_time,
+        end_time=end_time,
+        item=item,
+        task=task,
+        createdBy=user,
+        activated=False,
+        completed=True,
+    )
 
 
 class TestInitCampaign(TestCase):
@@ -188,3 +261,358 @@ class TestCampaignUtils(TestCase):
         # Same start and end timestamps
         timestamps = [(100, 100), (100, 100), (100, 100), (100, 100), (150, 150)]
         self.assertEqual(_compute_user_total_annotation_time(timestamps), 0)
+
+        # Segments of 10 minutes or longer are clamped to 5 minutes
+        timestamps = [(100, 700), (700, 1000), (1000, 1599.5)]
+        self.assertEqual(_compute_user_total_annotation_time(timestamps), 1199.5)
+
+        # Annotations ending before the previous one add negative time
+        timestamps = [(100, 150), (110, 120), (120, 130)]
+        self.assertEqual(_compute_user_total_annotation_time(timestamps), 30)
+
+    def test_computing_total_annotation_times(self):
+        '''Verifies that grouped annotation times match per user times.'''
+        timestamps = {
+            'gaps': [(100, 110), (120, 130), (140, 150)],
+            'overlaps': [(120, 130), (115, 125), (110, 120), (105, 115)],
+            'same-start': [(100, 120), (100, 110), (100, 150), (100, 140)],
+            'clamped': [(0.5, 600.5), (600.5, 900.25), (950, 2000)],
+            'negative': [(100, 150), (110, 120), (120, 130)],
+        }
+
+        # Interleave annotations of all users
+        keys, start_times, end_times = [], [], []
+        for index in range(4):
+            for key, user_timestamps in timestamps.items():
+                if index < len(user_timestamps):
+                    keys.append(key)
+                    start_times.append(user_timestamps[index][0])
+                    end_times.append(user_timestamps[index][1])
+
+        expected = {
+            key: _compute_user_total_annotation_time(user_timestamps)
+            for key, user_timestamps in timestamps.items()
+        }
+        self.assertEqual(
+            _compute_total_annotation_times(keys, start_times, end_times), expected
+        )
+        self.assertEqual(_compute_total_annotation_times([], [], []), {})
+
+
+class TestTrustedUser(TestCase):
+    '''Tests campaign-scoped trusted user cache.'''
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.owner = User.objects.create(username='owner')
+        self.user = User.objects.create(username='trusted')
+        self.campaign = Campaign.objects.create(
+            campaignName='trusted', createdBy=self.owner
+        )
+
+    def test_trusted_users_are_cached_and_invalidated(self):
+        '''Verifies trusted users are cached until TrustedUser changes.'''
+        campaign_ids = [self.campaign.id]
+        self.assertEqual(
+            TrustedUser.get_trusted_campaign_ids(self.user, campaign_ids), set()
+        )
+
+        with self.assertNumQueries(0):
+            TrustedUser.get_trusted_campaign_ids(self.user, campaign_ids)
+
+        trusted_user = TrustedUser.objects.create(
+            user=self.user, campaign=self.campaign
+        )
+        self.assertEqual(
+            TrustedUser.get_trusted_campaign_ids(self.user, campaign_ids),
+            {self.campaign.id},
+        )
+
+        trusted_user.delete()
+        self.assertEqual(
+            TrustedUser.get_trusted_campaign_ids(self.user, campaign_ids), set()
+        )
+
+    def test_trusted_users_invalidated_by_queryset_delete(self):
+        '''Verifies queryset deletions invalidate cached trusted users.'''
+        campaign_ids = [self.campaign.id]
+        TrustedUser.objects.create(user=self.user, campaign=self.campaign)
+        self.assertEqual(
+            TrustedUser.get_trusted_campaign_ids(self.user, campaign_ids),
+            {self.campaign.id},
+        )
+
+        TrustedUser.objects.filter(campaign=self.campaign).delete()
+        self.assertEqual(
+            TrustedUser.get_trusted_campaign_ids(self.user, campaign_ids), set()
+        )
+
+
+class TestCampaignStatus(QueryBudgetMixin, TestCase):
+    '''Tests campaign status views.'''
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create(username='status', is_staff=True)
+        cls.campaign = Campaign.objects.create(
+            campaignName='status',
+            campaignType='DirectAssessmentTask',
+            createdBy=cls.staff,
+        )
+        cls.team = CampaignTeam.objects.create(
+            teamName='status',
+            owner=cls.staff,
+            requiredAnnotations=1,
+            requiredHours=1,
+            createdBy=cls.staff,
+        )
+        cls.campaign.teams.add(cls.team)
+        cls.task, cls.task_items = _create_direct_assessment_task(
+            cls.campaign, cls.staff
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.client.force_login(self.staff)
+
+    def test_campaign_status(self):
+        '''Verifies campaign status is computed within query budget.'''
+        url = reverse('campaign_status', args=['status'])
+
+        annotator = User.objects.create(username='annotator')
+        self.team.members.add(annotator)
+        _annotate(self.task, annotator, self.task_items[0], 10, 30)
+        _annotate(self.task, annotator, self.task_items[2], 60, 3600)
+
+        self.client.get(url)
+        response = self.assertQueryBudget(8, url)
+        self.assertEqual(
+            response.content.decode().splitlines(),
+            [
+                '|       username|active|annotations|      first_modified|'
+                '       last_modified|annotation_time|    random|',
+                '|      annotator|     1|          2| 1970-01-01 00:00:10|'
+                ' 1970-01-01 01:00:00|         00h05m|       n/a|',
+            ],
+        )
+
+        self.team.members.add(*(User.objects.create(username=x) for x in 'abc'))
+        self.client.get(url)
+        response = self.assertQueryBudget(8, url)
+        self.assertContains(response, 'Never', count=6)
+
+    def test_campaign_status_api(self):
+        '''Verifies sorting, pagination and ETags of the campaign status API.'''
+        url = reverse('campaign-status-api', args=['status', 'json'])
+
+        for username in 'abc':
+            user = User.objects.create(username=username)
+            self.team.members.add(user)
+            _annotate(self.task, user, self.task_items[0], 10, 20)
+        _annotate(self.task, user, self.task_items[2], 30, 40)
+
+        response = self.client.get(url, {'sort': '-username', 'page_size': 2})
+        data = response.json()
+        self.assertEqual((data['count'], data['page'], data['pages']), (3, 1, 2))
+        self.assertEqual([x['username'] for x in data['results']], ['c', 'b'])
+        self.assertEqual(data['results'][0]['annotations'], 2)
+        self.assertEqual(data['results'][0]['random'], 'n/a')
+
+        response = self.client.get(url, {'sort': 'unknown'})
+        self.assertEqual(response.status_code, 400)
+
+        csv_url = reverse('campaign-status-api', args=['status', 'csv'])
+        response = self.client.get(csv_url, {'sort': 'username'})
+        self.assertEqual(
+            response.content.decode().splitlines()[:2],
+            [
+                'username,active,annotations,first_modified,last_modified,'
+                'annotation_time,random',
+                'a,True,1,1970-01-01 00:00:10,1970-01-01 00:00:20,00h00m,n/a',
+            ],
+        )
+
+        etag = self.client.get(url)['ETag']
+        response = self.assertQueryBudget(4, url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        _annotate(self.task, user, self.task_items[3], 50, 60)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+        # Team membership and active flags of members change the ETag, too
+        etag = response['ETag']
+        self.team.members.remove(user)
+        self.team.members.add(User.objects.create(username='d'))
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['count'], 3)
+
+        etag = self.client.get(url, {'sort': 'username'})['ETag']
+        User.objects.filter(username='a').update(is_active=False)
+        response = self.client.get(
+            url, {'sort': 'username'}, HTTP_IF_NONE_MATCH=etag
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.json()['results'][0]['active'])
+
+
+class TestExportResults(TestCase):
+    '''Tests streamed results exports.'''
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create(username='owner')
+        cls.campaign = Campaign.objects.create(
+            campaignName='export', createdBy=cls.owner
+        )
+        cls.task, cls.task_items = _create_direct_assessment_task(
+            cls.campaign, cls.owner
+        )
+
+    def test_export_results(self):
+        '''Verifies results export rows and gzip-compressed CSV downloads.'''
+        user = User.objects.create(username='exporter', email='e@example.com')
+        _annotate(self.task, user, self.task_items[0], 1, 11.5, score=70)
+
+        with self.assertNumQueries(3):
+            rows = list(DirectAssessmentResult.iter_export_rows())
+        self.assertEqual(rows[0][:3], ['taskID', 'systemID', 'username'])
+        self.assertEqual(
+            rows[1][2:],
+            [
+                'exporter',
+                'e@example.com',
+                'NoGroupInfo',
+                str(self.task_items[0].itemID),
+                '70',
+                '1.0',
+                '11.5',
+                '10.5',
+                self.task_items[0].itemType,
+                self.campaign.campaignName,
+            ],
+        )
+
+        path = reverse('export-results', args=['DirectAssessmentResult'])
+        self.client.force_login(user)
+        self.assertEqual(self.client.get(path).status_code, 302)
+
+        user.is_staff = True
+        user.save()
+        response = self.client.get(path, {'gzip': 1})
+        self.assertEqual(response.status_code, 200)
+        content = gzip.decompress(b''.join(response.streaming_content))
+        self.assertEqual(content.decode('utf-8').splitlines()[1], ','.join(rows[1]))
+
+
+class TestResultSnapshot(TestCase):
+    '''Tests columnar result snapshots.'''
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create(username='owner')
+        cls.campaign = Campaign.objects.create(
+            campaignName='snapshot', createdBy=cls.owner
+        )
+        cls.task, cls.task_items = _create_direct_assessment_task(
+            cls.campaign, cls.owner
+        )
+
+    def test_result_snapshot(self):
+        '''Verifies snapshots can be used instead of the database.'''
+        user = User.objects.create(username='snapshot')
+        for item, score in zip(self.task_items[:3], (40, 60, 80)):
+            _annotate(self.task, user, item, 1.5, 4, score=score)
+
+        system_data = DirectAssessmentResult.get_system_data(
+            self.campaign.id, **SNAPSHOT_OPTIONS
+        )
+        with TemporaryDirectory() as path:
+            ResultSnapshot.create(self.campaign, join(path, 'snapshot'))
+            snapshot = ResultSnapshot.load(join(path, 'snapshot'))
+            self.assertEqual(len(snapshot), 3)
+
+            encoded = [x['encoded'] for x in snapshot.metadata['columns']]
+            rows = [
+                tuple(str(x) if y else x for x, y in zip(row, encoded))
+                for row in system_data
+            ]
+            self.assertEqual(snapshot.get_rows(), rows)
+
+            mask = snapshot.get_mask(item_types=('TGT',))
+            self.assertEqual(mask.tolist(), [True, False, True])
+            self.assertEqual(snapshot.get_rows(mask), [rows[0], rows[2]])
+            self.assertFalse(snapshot.get_mask(['snapshot']).any())
+
+            codes, vocabulary = snapshot.get_column('user')
+            self.assertEqual(codes.dtype.name, 'int32')
+            self.assertEqual(vocabulary.tolist(), ['snapshot'])
+            scores, vocabulary = snapshot.get_column('score')
+            self.assertEqual(scores.tolist(), [40, 60, 80])
+            self.assertIsNone(vocabulary)
+
+    def _call_command(self, name, *args, **options):
+        output = StringIO()
+        with redirect_stdout(output):
+            call_command(name, *args, stdout=output, stderr=StringIO(), **options)
+        return output.getvalue()
+
+    def test_result_snapshot_matches_database(self):
+        '''Verifies commands report the same for snapshot and database.'''
+        TextPair.objects.filter(id=self.task_items[2].id).update(
+            targetID='sys2+sys3'
+        )
+        user = User.objects.create(username='snapshot')
+        inactive_user = User.objects.create(username='inactive', is_active=False)
+        for item, score in zip(self.task_items, (40, 10, 80, 90)):
+            _annotate(self.task, user, item, 1.5, 4, score=score)
+            _annotate(self.task, inactive_user, item, 2, 3, score=score // 2)
+
+        with TemporaryDirectory() as path:
+            ResultSnapshot.create(self.campaign, path)
+            snapshot = ResultSnapshot.load(path)
+            self.assertEqual(snapshot.metadata['inactiveUsers'], ['inactive'])
+
+            for options in (
+                {},
+                {'include_inactive': True},
+                {'extended_csv': True, 'expand_multi_sys': False},
+            ):
+                self.assertEqual(
+                    snapshot.get_system_data(**options),
+                    DirectAssessmentResult.get_system_data(
+                        self.campaign.id, **options
+                    ),
+                )
+
+            for name in (
+                'ComputeZScores',
+                'ComputeSystemScores',
+                'ComputeAnnotatorMetrics',
+            ):
+                expected = self._call_command(name, 'snapshot')
+                with self.assertNumQueries(0):
+                    output = self._call_command(name, 'unused', snapshot=path)
+                _header = 'Processing annotations in snapshot {0}\n\n'.format(path)
+                self.assertEqual(output.replace(_header, ''), expected)
+
+    def test_result_snapshot_rejects_ragged_rows(self):
+        '''Verifies rows of differing widths are not truncated.'''
+        Campaign.objects.filter(id=self.campaign.id).update(
+            campaignType='DirectAssessmentTask'
+        )
+        self.campaign.refresh_from_db()
+        rows = [
+            ('user', 'sys1', 1, 'TGT', 'eng', 'deu', 50),
+            ('user', 'sys1', 2, 'TGT', 'eng', 'deu', 50, 'doc1'),
+        ]
+        expected_msg = 'System data rows have differing numbers of columns [7, 8]'
+        with TemporaryDirectory() as path, patch.object(
+            DirectAssessmentResult, 'get_system_data', return_value=rows
+        ):
+            with self.assertRaisesMessage(ValueError, expected_msg):
+                ResultSnapshot.create(self.campaign, path)
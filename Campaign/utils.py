@@ -398,32 +398,46 @@ def _process_campaign_agendas(usernames, context, only_activated=True):
     # Map tasks to users, by market, and considering TASKS_TO_ANNOTATORS
     tasks_to_users_map = _map_tasks_to_users_by_market(tasks, usernames, context)
 
+    agendas = {}
+    tasks_for_agenda = defaultdict(list)
     for key in tasks_to_users_map:
         print('[{0}]'.format(key))
         for task, user in tasks_to_users_map[key]:
             print(user, '-->', task.id)
 
-            agenda = TaskAgenda.objects.filter(user=user, campaign=_campaign)
+            if user not in agendas:
+                agenda = TaskAgenda.objects.filter(user=user, campaign=_campaign)
 
-            if not agenda.exists():
-                agenda = TaskAgenda.objects.create(user=user, campaign=_campaign)
-            else:
-                agenda = agenda[0]
+                if not agenda.exists():
+                    agenda = TaskAgenda.objects.create(user=user, campaign=_campaign)
+                else:
+                    agenda = agenda[0]
+                agendas[user] = agenda
 
-            serialized_t = ObjectID.objects.get_or_create(
-                typeName=_task_type.__name__, primaryID=task.id
-            )
+            serialized_t = ObjectID.get_or_create_for_instance(task)
+            tasks_for_agenda[user].append((task, serialized_t))
+
+    for user, tasks in tasks_for_agenda.items():
+        agenda = agendas[user]
 
-            # Only process current task if it is new
-            if agenda.contains_task(serialized_t[0]):
+        # Only process tasks which are new
+        known_tasks = agenda.contains_tasks(x[1] for x in tasks)
+
+        tasks_to_complete = set()
+        tasks_to_activate = set()
+        for task, serialized_t in tasks:
+            if serialized_t.id in known_tasks:
                 continue
 
             _task_done_for_user = task.next_item_for_user(user) is None
             if _task_done_for_user:
-                agenda.complete_task(serialized_t[0])
+                tasks_to_complete.add(serialized_t.id)
 
             else:
-                agenda.activate_task(serialized_t[0])
+                tasks_to_activate.add(serialized_t.id)
+
+        agenda.complete_tasks(tasks_to_complete)
+        agenda.activate_tasks(tasks_to_activate)
 
 
 def _process_campaign_teams(language_pairs, owner, context):
@@ -6,21 +6,39 @@ See LICENSE for usage details
 
 # pylint: disable=E1101
 from collections import defaultdict
+import csv
 from datetime import datetime
+from hashlib import sha1
 import json
 from math import floor
-from math import sqrt
+import zlib
 
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth.decorators import login_required
 from django.core.management.base import CommandError
+from django.core.paginator import Paginator
+from django.db.models import Count
+from django.db.models import Max
+from django.db.models import OuterRef
+from django.db.models import Q
+from django.db.models import Subquery
+from django.http import Http404
 from django.http import HttpResponse
-
-from Appraise.utils import _get_logger, _compute_user_total_annotation_time
+from django.http import HttpResponseBadRequest
+from django.http import JsonResponse
+from django.http import StreamingHttpResponse
+from django.views.decorators.http import condition
+
+from Appraise.utils import _compute_total_annotation_times
+from Appraise.utils import _get_logger
+from Campaign.models import Campaign
+from Campaign.models import CampaignTeam
 from Campaign.utils import _get_campaign_instance
-from EvalData.models import DataAssessmentResult
+from EvalData.models import AnnotatorReliability
 from EvalData.models import DirectAssessmentDocumentResult
 from EvalData.models import PairwiseAssessmentDocumentResult
 from EvalData.models import PairwiseAssessmentResult
+from EvalData.models import RESULT_TYPES
 from EvalData.models import seconds_to_timedelta
 from EvalData.models import TASK_DEFINITIONS
 
@@ -28,6 +46,12 @@ from EvalData.models import TASK_DEFINITIONS
 
 RESULT_TYPE_BY_CLASS_NAME = {tup[1].__name__: tup[2] for tup in TASK_DEFINITIONS}
 
+STATUS_API_PAGE_SIZE = 100
+STATUS_API_MAX_PAGE_SIZE = 1000
+
+# Number of CSV rows sent per chunk of streamed results exports
+EXPORT_ROWS_PER_CHUNK = 1000
+
 LOGGER = _get_logger(name=__name__)
 
 
@@ -51,176 +75,314 @@ def campaign_status(request, campaign_name, sort_key=2):
         _msg = 'Failure to identify campaign {0}'.format(campaign_name)
         return HttpResponse(_msg, content_type='text/plain')
 
-    _out = []
-    for team in campaign.teams.all():
-        for user in team.members.all():
-            try:
-                campaign_opts = campaign.campaignOptions.lower().split(";")
-                # may raise KeyError
-                result_type = RESULT_TYPE_BY_CLASS_NAME[campaign.get_campaign_type()]
-            except KeyError as exc:
-                LOGGER.debug(
-                    f'Invalid campaign type {campaign.get_campaign_type()} for campaign {campaign.campaignName}'
-                )
-                LOGGER.error(exc)
-                continue
+    _header, _out = _get_campaign_status(campaign, request.user.is_staff)
+    _out.sort(key=lambda x: x[int(sort_key)])
 
-            _data = result_type.objects.filter(
-                createdBy=user, completed=True, task__campaign=campaign.id
-            )
-            is_mqm_or_esa = False
-
-
-            # Exclude document scores in document-level tasks, because we want to keep
-            # the numbers reported on the campaign status page consistent across
-            # accounts, which usually include different numbers of document
-            if (
-                result_type is DirectAssessmentDocumentResult
-                or result_type is PairwiseAssessmentDocumentResult
-            ):
-                _data = _data.exclude(item__isCompleteDocument=True)
-            # Contrastive tasks use different field names for target segments/scores
-            if (
-                result_type is PairwiseAssessmentResult
-                or result_type is PairwiseAssessmentDocumentResult
-            ):
-                _data = _data.values_list(
-                    'start_time',
-                    'end_time',
-                    'score1',
-                    'item__itemID',
-                    'item__target1ID',
-                    'item__itemType',
-                    'item__id',
-                )
-            elif "mqm" in campaign_opts:
-                is_mqm_or_esa = True
-                _data = _data.values_list(
-                    'start_time',
-                    'end_time',
-                    'mqm',
-                    'item__itemID',
-                    'item__targetID',
-                    'item__itemType',
-                    'item__id',
-                    'item__documentID',
-                )
-                # compute time override based on document times
-                import collections
-                _time_pairs = collections.defaultdict(list)
-                for x in _data:
-                    _time_pairs[x[7]+ " ||| " +x[4]].append((x[0], x[1]))
-                _time_pairs = [
-                    (min([x[0] for x in doc_v]), max([x[1] for x in doc_v]))
-                    for doc, doc_v in _time_pairs.items()
-                ]
-                _data = [
-                    (x[0], x[1], -len(json.loads(x[2])), x[3], x[4], x[5], x[6])
-                    for x in _data
-                ]
-            elif "esa" in campaign_opts:
-                is_mqm_or_esa = True
-                _data = _data.values_list(
-                    'start_time',
-                    'end_time',
-                    'score',
-                    'item__itemID',
-                    'item__targetID',
-                    'item__itemType',
-                    'item__id',
-                    'item__documentID',
-                )
-                # compute time override based on document times
-                import collections
-                _time_pairs = collections.defaultdict(list)
-                for x in _data:
-                    _time_pairs[x[7]+ " ||| " +x[4]].append((x[0], x[1]))
-                _time_pairs = [
-                    (min([x[0] for x in doc_v]), max([x[1] for x in doc_v]))
-                    for doc, doc_v in _time_pairs.items()
-                ]
-                _data = [
-                    (x[0], x[1], x[2], x[3], x[4], x[5], x[6])
-                    for x in _data
-                ]
-            else:
-                _data = _data.values_list(
-                    'start_time',
-                    'end_time',
-                    'score',
-                    'item__itemID',
-                    'item__targetID',
-                    'item__itemType',
-                    'item__id',
-                )
+    _txt = []
+    # align everything with the same formatting
+    for _row in [_header] + _out:
+        _local_fmt = '|{0:>15}|{1:>6}|{2:>11}|{3:>20}|{4:>20}|{5:>15}|'
+        if request.user.is_staff:
+            _local_fmt += '{6:>10}|'
 
-            _reliable = stat_reliable_testing(_data, campaign_opts, result_type)
+        _local_out = _local_fmt.format(*_row)
+        _txt.append(_local_out)
 
-            # Compute number of annotations
-            _annotations = len(set([x[6] for x in _data]))
+    return HttpResponse(u'\n'.join(_txt), content_type='text/plain')
 
-            _start_times = [x[0] for x in _data]
-            _end_times = [x[1] for x in _data]
 
-            # Compute first modified time
-            _first_modified_raw = (
-                seconds_to_timedelta(min(_start_times)) if _start_times else None
-            )
-            if _first_modified_raw:
-                _date_modified = datetime(1970, 1, 1) + _first_modified_raw
-                _first_modified = str(_date_modified).split('.')[0]
-            else:
-                _first_modified = 'Never'
-                
-            # Compute last modified time
-            _last_modified_raw = (
-                seconds_to_timedelta(max(_end_times)) if _end_times else None
-            )
-            if _last_modified_raw:
-                _date_modified = datetime(1970, 1, 1) + _last_modified_raw
-                _last_modified = str(_date_modified).split('.')[0]
-            else:
-                _last_modified = 'Never'
-
-            # Compute total annotation time
-            if is_mqm_or_esa and _first_modified_raw and _last_modified_raw:
-                # for MQM and ESA compute the lower and upper annotation times
-                # use only the end times 
-                _annotation_time_upper = (_last_modified_raw-_first_modified_raw).seconds
-                _hours = int(floor(_annotation_time_upper / 3600))
-                _minutes = int(floor((_annotation_time_upper % 3600) / 60))
-                _annotation_time_upper = f'{_hours:0>2d}h{_minutes:0>2d}m'
-            else:
-                _time_pairs = list(zip(_start_times, _end_times))
-                _annotation_time_upper = None
-            _annotation_time = _compute_user_total_annotation_time(_time_pairs)
-
-            # Format total annotation time
-            if _annotation_time:
-                _hours = int(floor(_annotation_time / 3600))
-                _minutes = int(floor((_annotation_time % 3600) / 60))
-                _annotation_time = f'{_hours:0>2d}h{_minutes:0>2d}m'
-                # for MQM and ESA join it together
-                if is_mqm_or_esa and _annotation_time_upper:
-                    _annotation_time = f'{_annotation_time}--{_annotation_time_upper}'
-            else:
-                _annotation_time = 'n/a'
+# pylint: disable=too-few-public-methods
+class _Echo:
+    """
+    File-like object returning written values, used to stream CSV rows.
+    """
+
+    def write(self, value):
+        return value
+
+
+def _iter_csv_chunks(rows):
+    """
+    Yields CSV lines for the given rows, encoded in chunks of rows.
+    """
+    writer = csv.writer(_Echo(), lineterminator='\n')
+    lines = []
+    for row in rows:
+        lines.append(writer.writerow(row))
+        if len(lines) >= EXPORT_ROWS_PER_CHUNK:
+            yield ''.join(lines).encode('utf-8')
+            lines = []
+
+    if lines:
+        yield ''.join(lines).encode('utf-8')
+
+
+def _iter_gzip_chunks(chunks):
+    """
+    Yields gzip-compressed data for the given chunks.
+    """
+    compressor = zlib.compressobj(wbits=16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
 
+    yield compressor.flush()
 
-            _item = (
-                user.username,
-                user.is_active,
-                _annotations,
-                _first_modified,
-                _last_modified,
-                _annotation_time,
+
+@staff_member_required
+def export_results(request, result_type):
+    """
+    Streams completed results of the given type as CSV download.
+
+    Results can be restricted to a campaign using the campaign query
+    parameter, and gzip-compressed by passing gzip=1.
+    """
+    result_cls = {x.__name__: x for x in RESULT_TYPES}.get(result_type)
+    if result_cls is None:
+        raise Http404('Unknown result type {0}'.format(result_type))
+
+    results = result_cls.objects.filter(completed=True)
+    campaign_name = request.GET.get('campaign')
+    if campaign_name:
+        results = results.filter(task__campaign__campaignName=campaign_name)
+
+    LOGGER.info(
+        'Exporting %s instances for user "%s".', result_type, request.user.username
+    )
+    chunks = _iter_csv_chunks(result_cls.iter_export_rows(results))
+    filename = '{0}.csv'.format(campaign_name or result_type)
+    content_type = 'text/csv'
+    if request.GET.get('gzip'):
+        chunks = _iter_gzip_chunks(chunks)
+        filename += '.gz'
+        content_type = 'application/gzip'
+
+    response = StreamingHttpResponse(chunks, content_type=content_type)
+    response['Content-Disposition'] = 'attachment; filename="{0}"'.format(filename)
+    return response
+
+
+def _get_campaign_status_etag(request, campaign_name, fmt='json'):
+    """
+    Returns ETag for the campaign status API.
+
+    The ETag is derived from the team memberships of the campaign, which
+    are read together with the campaign, and the latest modification time
+    of its results, which is an indexed lookup.
+    """
+    members = CampaignTeam.members.through.objects.filter(
+        campaignteam__campaign_campaigns=OuterRef('id')
+    ).order_by()
+    _members = {
+        '_members': Count('id'),
+        '_last_member': Max('id'),
+        '_active_members': Count('id', filter=Q(user__is_active=True)),
+    }
+    _subqueries = {
+        x: Subquery(
+            members.values('campaignteam__campaign_campaigns')
+            .annotate(**{x: y})
+            .values(x)
+        )
+        for x, y in _members.items()
+    }
+    campaign = (
+        Campaign.objects.filter(campaignName=campaign_name)
+        .annotate(**_subqueries)
+        .values('id', 'campaignOptions', 'campaignType', *_subqueries)
+        .first()
+    )
+    result_type = RESULT_TYPE_BY_CLASS_NAME.get((campaign or {}).get('campaignType'))
+    if result_type is None:
+        return None
+
+    _modified = result_type.objects.filter(task__campaign=campaign['id']).aggregate(
+        Max('dateModified')
+    )
+
+    _key = [campaign[x] for x in sorted(campaign)]
+    _key += [request.user.is_staff, fmt, request.GET.urlencode()]
+    _key += [_modified['dateModified__max']]
+    return sha1(repr(_key).encode('utf-8')).hexdigest()
+
+
+@login_required
+@condition(etag_func=_get_campaign_status_etag)
+def campaign_status_api(request, campaign_name, fmt='json'):
+    """
+    Campaign status API returning completion details as JSON or CSV.
+
+    Supports query parameters sort (column name, prefixed with - for
+    descending order), page and page_size. Responses carry an ETag, so
+    that unchanged campaigns are answered with 304 Not Modified.
+    """
+    try:
+        campaign = _get_campaign_instance(campaign_name)
+    except CommandError:
+        raise Http404('Failure to identify campaign {0}'.format(campaign_name))
+
+    _header, _out = _get_campaign_status(campaign, request.user.is_staff)
+
+    _sort = request.GET.get('sort', 'annotations')
+    _column = _sort.lstrip('-')
+    if _column not in _header:
+        _msg = 'Invalid sort column {0}, choose from: {1}'.format(
+            _column, ', '.join(_header)
+        )
+        return HttpResponseBadRequest(_msg, content_type='text/plain')
+
+    _index = _header.index(_column)
+    _out.sort(key=lambda x: x[_index], reverse=_sort.startswith('-'))
+
+    try:
+        _page_size = int(request.GET.get('page_size', STATUS_API_PAGE_SIZE))
+    except ValueError:
+        _page_size = STATUS_API_PAGE_SIZE
+    _page_size = min(max(_page_size, 1), STATUS_API_MAX_PAGE_SIZE)
+
+    paginator = Paginator(_out, _page_size)
+    page = paginator.get_page(request.GET.get('page'))
+
+    if fmt == 'csv':
+        response = HttpResponse(content_type='text/csv')
+        writer = csv.writer(response)
+        writer.writerow(_header)
+        writer.writerows(page.object_list)
+        return response
+
+    return JsonResponse(
+        {
+            'campaign': campaign.campaignName,
+            'count': paginator.count,
+            'page': page.number,
+            'pages': paginator.num_pages,
+            'results': [dict(zip(_header, x)) for x in page.object_list],
+        }
+    )
+
+
+def _get_campaign_status(campaign, is_staff):
+    """
+    Returns header and unsorted rows with completion details for all team
+    members of the campaign. Reliability is only included for staff.
+    """
+    _out = []
+    _time_keys, _time_starts, _time_ends = [], [], []
+
+    members = [
+        user
+        for team in campaign.teams.prefetch_related('members')
+        for user in team.members.all()
+    ]
+    if members:
+        campaign_opts = (campaign.campaignOptions or '').lower().split(";")
+        campaign_type = campaign.get_campaign_type()
+        result_type = RESULT_TYPE_BY_CLASS_NAME.get(campaign_type)
+        if result_type is None:
+            LOGGER.debug(
+                'Invalid campaign type %s for campaign %s',
+                campaign_type,
+                campaign.campaignName,
             )
-            if request.user.is_staff:
-                _item += (_reliable,)
+            LOGGER.error(KeyError(campaign_type))
+            members = []
+        else:
+            _data_by_user, is_mqm_or_esa = _get_status_data_by_user(
+                campaign, result_type, campaign_opts, {x.id for x in members}
+            )
+            if is_staff:
+                reliabilities = AnnotatorReliability.get_reliabilities(
+                    result_type, {x.id for x in members}, [campaign]
+                )
 
-            _out.append(_item)
+    for user in members:
+        _data = _data_by_user.get(user.id, [])
+        _time_pairs = None
+
+        if is_mqm_or_esa:
+            # compute time override based on document times
+            _time_pairs = defaultdict(list)
+            for x in _data:
+                _time_pairs[x[7] + " ||| " + x[4]].append((x[0], x[1]))
+            _time_pairs = [
+                (min([x[0] for x in doc_v]), max([x[1] for x in doc_v]))
+                for doc, doc_v in _time_pairs.items()
+            ]
+            if "mqm" in campaign_opts:
+                _data = [
+                    (x[0], x[1], -len(json.loads(x[2])), x[3], x[4], x[5], x[6])
+                    for x in _data
+                ]
+            else:
+                _data = [x[:7] for x in _data]
+
+        # Compute number of annotations, first and last modified time
+        _annotations = len(set([x[6] for x in _data]))
+        _start_times = [x[0] for x in _data]
+        _end_times = [x[1] for x in _data]
+
+        _first_modified_raw = (
+            seconds_to_timedelta(min(_start_times)) if _start_times else None
+        )
+        _first_modified = _format_status_time(_first_modified_raw)
+
+        _last_modified_raw = (
+            seconds_to_timedelta(max(_end_times)) if _end_times else None
+        )
+        _last_modified = _format_status_time(_last_modified_raw)
+
+        # Compute total annotation time
+        if is_mqm_or_esa and _first_modified_raw and _last_modified_raw:
+            # for MQM and ESA compute the lower and upper annotation times
+            # use only the end times
+            _annotation_time_upper = (_last_modified_raw - _first_modified_raw).seconds
+            _hours = int(floor(_annotation_time_upper / 3600))
+            _minutes = int(floor((_annotation_time_upper % 3600) / 60))
+            _annotation_time_upper = f'{_hours:0>2d}h{_minutes:0>2d}m'
+        else:
+            _time_pairs = list(zip(_start_times, _end_times))
+            _annotation_time_upper = None
+
+        # Annotation times for all users are computed in one pass below
+        for _start_time, _end_time in _time_pairs:
+            _time_keys.append(len(_out))
+            _time_starts.append(_start_time)
+            _time_ends.append(_end_time)
+
+        _item = (
+            user.username,
+            user.is_active,
+            _annotations,
+            _first_modified,
+            _last_modified,
+            _annotation_time_upper,
+        )
+        if is_staff:
+            _reliability = reliabilities[(user.id, campaign.id)]
+            _item += (_format_pvalue(_reliability.get_pvalue()),)
+
+        _out.append(_item)
+
+    _annotation_times = _compute_total_annotation_times(
+        _time_keys, _time_starts, _time_ends
+    )
+    for _index, _item in enumerate(_out):
+        _annotation_time = _annotation_times.get(_index, 0)
+        _annotation_time_upper = _item[5]
+
+        # Format total annotation time
+        if _annotation_time:
+            _hours = int(floor(_annotation_time / 3600))
+            _minutes = int(floor((_annotation_time % 3600) / 60))
+            _annotation_time = f'{_hours:0>2d}h{_minutes:0>2d}m'
+            # for MQM and ESA join it together
+            if _annotation_time_upper:
+                _annotation_time = f'{_annotation_time}--{_annotation_time_upper}'
+        else:
+            _annotation_time = 'n/a'
 
-    _out.sort(key=lambda x: x[int(sort_key)])
+        _out[_index] = _item[:5] + (_annotation_time,) + _item[6:]
 
     _header = (
         'username',
@@ -230,77 +392,74 @@ def campaign_status(request, campaign_name, sort_key=2):
         'last_modified',
         'annotation_time',
     )
-    if request.user.is_staff:
+    if is_staff:
         _header += ('random',)
 
-    _txt = []
-    # align everything with the same formatting
-    for _row in [_header] + _out:
-        _local_fmt = '|{0:>15}|{1:>6}|{2:>11}|{3:>20}|{4:>20}|{5:>15}|'
-        if request.user.is_staff:
-            _local_fmt += '{6:>10}|'
-
-        _local_out = _local_fmt.format(*_row)
-        _txt.append(_local_out)
+    return _header, _out
 
-    return HttpResponse(u'\n'.join(_txt), content_type='text/plain')
 
+def _get_status_data_by_user(campaign, result_type, campaign_opts, user_ids):
+    """
+    Returns dict mapping user IDs to completed result rows for the campaign
+    status view, fetched with a single query, and whether the campaign is
+    an MQM or ESA campaign.
 
-def stat_reliable_testing(_data, campaign_opts, result_type):
-    _annotations = len(set([x[6] for x in _data]))
-    _user_mean = sum([x[2] for x in _data]) / (_annotations or 1)
-    _cs = _annotations - 1  # Corrected sample size for stdev.
-    _user_stdev = 1
-    if _cs > 0:
-        _user_stdev = sqrt(sum(((x[2] - _user_mean) ** 2 / _cs) for x in _data))
-
-    if int(_user_stdev) == 0:
-        _user_stdev = 1
-
-    _tgt = defaultdict(list)
-    _bad = defaultdict(list)
-    for _x in _data:
-        if _x[5] == 'TGT':
-            _dst = _tgt
-        elif _x[5] == "BAD" or _x[5].startswith('BAD.'):
-            # ESA/MQM have extra payload in itemType
-            _dst = _bad
-        else:
-            continue
-
-        _z_score = (_x[2] - _user_mean) / _user_stdev
-        # Script generating batches for data assessment task does not
-        # keep equal itemIDs for respective TGT and BAD items, so it
-        # cannot be used as a key.
-        if result_type is DataAssessmentResult:
-            _key = f"{_x[4]}"
-        else:
-            _key = f'{_x[3]}-{_x[4]}'
-        # Hotfix: remove #bad from key for ESA campaigns
-        if "esa" in campaign_opts and "#bad" in _key:
-            _key = _key.replace("#bad", "")
-        _dst[_key].append(_z_score)
-
-    _x = []
-    _y = []
-    for _key in set.intersection(set(_tgt.keys()), set(_bad.keys())):
-        _x.append(sum(_bad[_key]) / float(len(_bad[_key] or 1)))
-        _y.append(sum(_tgt[_key]) / float(len(_tgt[_key] or 1)))
-
-    _reliable = None
-    if _x and _y:
-        try:
-            from scipy.stats import mannwhitneyu  # type: ignore
-
-            _t, pvalue = mannwhitneyu(_x, _y, alternative='less')
-            _reliable = pvalue
-
-        # Possible for mannwhitneyu() to throw in some scenarios
-        except ValueError:
-            pass
-
-    if _reliable:
-        _reliable = f'{_reliable:1.6f}'
+    Rows keep the default result ordering. MQM and ESA rows end with the
+    document ID, used to compute annotation time from document times.
+    """
+    _data = result_type.objects.filter(
+        createdBy__in=user_ids, completed=True, task__campaign=campaign.id
+    )
+    is_mqm_or_esa = False
+
+    # Exclude document scores in document-level tasks, because we want to keep
+    # the numbers reported on the campaign status page consistent across
+    # accounts, which usually include different numbers of document
+    if (
+        result_type is DirectAssessmentDocumentResult
+        or result_type is PairwiseAssessmentDocumentResult
+    ):
+        _data = _data.exclude(item__isCompleteDocument=True)
+
+    # Contrastive tasks use different field names for target segments/scores
+    if (
+        result_type is PairwiseAssessmentResult
+        or result_type is PairwiseAssessmentDocumentResult
+    ):
+        _fields = ('score1', 'item__itemID', 'item__target1ID')
+    elif "mqm" in campaign_opts:
+        is_mqm_or_esa = True
+        _fields = ('mqm', 'item__itemID', 'item__targetID')
     else:
-        _reliable = 'n/a'
-    return _reliable
+        is_mqm_or_esa = "esa" in campaign_opts
+        _fields = ('score', 'item__itemID', 'item__targetID')
+
+    _fields = ('start_time', 'end_time') + _fields + ('item__itemType', 'item__id')
+    if is_mqm_or_esa:
+        _fields += ('item__documentID',)
+
+    data_by_user = defaultdict(list)
+    for row in _data.values_list('createdBy', *_fields).iterator():
+        data_by_user[row[0]].append(row[1:])
+
+    return data_by_user, is_mqm_or_esa
+
+
+def _format_status_time(time_raw):
+    """
+    Formats timedelta since epoch for the campaign status view.
+    """
+    if not time_raw:
+        return 'Never'
+
+    _date_modified = datetime(1970, 1, 1) + time_raw
+    return str(_date_modified).split('.')[0]
+
+
+def _format_pvalue(pvalue):
+    """
+    Formats p-value of the reliability test for the campaign status view.
+    """
+    if pvalue:
+        return f'{pvalue:1.6f}'
+    return 'n/a'
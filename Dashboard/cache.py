@@ -0,0 +1,91 @@
+"""
+Appraise evaluation framework
+
+See LICENSE for usage details
+"""
+from time import time
+
+from django.core.cache import cache
+
+from Appraise.settings import DASHBOARD_CACHE_TIMEOUT
+
+# Cached dashboard context for a generation and user ID
+DASHBOARD_CACHE_KEY = 'dashboard:{0}:{1}'
+
+# Generation of cached dashboard contexts, increased to invalidate all
+DASHBOARD_GENERATION_KEY = 'dashboard-generation'
+
+# Hit/miss counters for cached dashboard contexts
+DASHBOARD_STATS_KEY = 'dashboard-stats:{0}'
+
+
+def _get_generation():
+    """
+    Returns current generation of cached dashboard contexts.
+
+    If the generation has been evicted from the cache, a new one based on
+    the current time is started, so that older contexts are not reused.
+    """
+    generation = cache.get(DASHBOARD_GENERATION_KEY)
+    if generation is None:
+        cache.add(DASHBOARD_GENERATION_KEY, int(time() * 1000), None)
+        generation = cache.get(DASHBOARD_GENERATION_KEY, 0)
+    return generation
+
+
+def _increment(key):
+    """
+    Increments integer cache value for key, creating it if needed.
+    """
+    try:
+        cache.incr(key)
+    except ValueError:
+        if not cache.add(key, 1, None):
+            cache.incr(key)
+
+
+def _get_cache_key(user_id):
+    return DASHBOARD_CACHE_KEY.format(_get_generation(), user_id)
+
+
+def get_dashboard_context(user_id):
+    """
+    Returns cached dashboard context for the given user ID, or None.
+    """
+    context = cache.get(_get_cache_key(user_id))
+    _increment(DASHBOARD_STATS_KEY.format('misses' if context is None else 'hits'))
+    return context
+
+
+def set_dashboard_context(user_id, context):
+    """
+    Caches dashboard context for the given user ID.
+    """
+    cache.set(_get_cache_key(user_id), context, DASHBOARD_CACHE_TIMEOUT)
+
+
+def invalidate_dashboards(user_ids):
+    """
+    Drops cached dashboard contexts for the given user IDs.
+    """
+    generation = _get_generation()
+    cache.delete_many(
+        [DASHBOARD_CACHE_KEY.format(generation, x) for x in set(user_ids) if x]
+    )
+
+
+def invalidate_all_dashboards():
+    """
+    Drops cached dashboard contexts for all users.
+    """
+    _get_generation()
+    _increment(DASHBOARD_GENERATION_KEY)
+
+
+def get_dashboard_cache_stats():
+    """
+    Returns dict with dashboard cache hits and misses.
+    """
+    keys = {DASHBOARD_STATS_KEY.format(x): x for x in ('hits', 'misses')}
+    stats = cache.get_many(keys.keys())
+    return {name: stats.get(key, 0) for key, name in keys.items()}
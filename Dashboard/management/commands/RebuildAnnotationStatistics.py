@@ -0,0 +1,27 @@
+"""
+Appraise evaluation framework
+
+See LICENSE for usage details
+"""
+from django.core.management.base import BaseCommand
+
+from EvalData.models import AnnotationStatistics
+from EvalData.models import AnnotatorReliability
+
+
+# pylint: disable=C0111,C0330
+class Command(BaseCommand):
+    help = (
+        'Recomputes per-user annotation statistics from results and resets '
+        'annotator reliability statistics'
+    )
+
+    def handle(self, *args, **options):
+        rebuilt = AnnotationStatistics.rebuild()
+        self.stdout.write('Rebuilt {0} annotation statistics row(s)'.format(rebuilt))
+
+        dropped = AnnotatorReliability.rebuild()
+        self.stdout.write(
+            'Reset {0} annotator reliability row(s), these are rebuilt on '
+            'next access'.format(dropped)
+        )
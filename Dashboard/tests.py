@@ -3,7 +3,183 @@ Appraise evaluation framework
 
 See LICENSE for usage details
 """
-# pylint: disable=unused-import
-from django.db import models
+from django.contrib.auth.models import Group
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
 
-# Deliberately left empty.
+from Appraise.timing import get_latency_histograms
+from Appraise.timing import reset_latency_histograms
+from Campaign.models import Campaign
+from Dashboard.cache import get_dashboard_context
+from Dashboard.cache import set_dashboard_context
+from EvalData.models import DirectAssessmentResult
+from EvalData.models import DirectAssessmentTask
+from EvalData.models import Market
+from EvalData.models import Metadata
+from EvalData.models import ObjectID
+from EvalData.models import TaskAgenda
+from EvalData.models import TextPair
+
+
+class DashboardCacheTests(TestCase):
+    """
+    Tests caching of computed dashboard context.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create(username='owner')
+        cls.campaign = Campaign.objects.create(
+            campaignName='dashboard', createdBy=cls.owner
+        )
+        market = Market.objects.create(
+            sourceLanguageCode='eng',
+            targetLanguageCode='deu',
+            domainName='TEST',
+            createdBy=cls.owner,
+        )
+        metadata = Metadata.objects.create(
+            market=market,
+            corpusName='TEST',
+            versionInfo='1.0',
+            source='MANUAL',
+            createdBy=cls.owner,
+        )
+        cls.task = DirectAssessmentTask.objects.create(
+            campaign=cls.campaign,
+            requiredAnnotations=1,
+            batchNo=1,
+            market=market,
+            createdBy=cls.owner,
+        )
+        cls.item = TextPair.objects.create(
+            itemID=1,
+            itemType='TGT',
+            metadata=metadata,
+            sourceID='doc1',
+            sourceText='Source',
+            targetID='sys1',
+            targetText='Target',
+            createdBy=cls.owner,
+        )
+        cls.task.items.add(cls.item)
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.user = User.objects.create(username='dashboard', is_staff=True)
+        self.client.force_login(self.user)
+
+    def test_dashboard_cache(self):
+        """
+        Cached dashboards are invalidated by results, agendas and campaigns.
+        """
+        user = self.user
+        response = self.client.get(reverse('dashboard'))
+        self.assertEqual(response.context['dashboard_cache'], {'hits': 0, 'misses': 1})
+        response = self.client.get(reverse('dashboard'))
+        self.assertEqual(response.context['dashboard_cache'], {'hits': 1, 'misses': 1})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            DirectAssessmentResult.objects.create(
+                score=50,
+                start_time=0,
+                end_time=1,
+                item=self.item,
+                task=self.task,
+                createdBy=user,
+                activated=False,
+                completed=True,
+            )
+        self.assertIsNone(get_dashboard_context(user.id))
+
+        set_dashboard_context(user.id, {})
+        agenda = TaskAgenda.objects.create(user=user, campaign=self.campaign)
+        self.assertIsNone(get_dashboard_context(user.id))
+
+        set_dashboard_context(user.id, {})
+        agenda.activate_tasks([ObjectID.get_or_create_for_instance(self.task)])
+        self.assertIsNone(get_dashboard_context(user.id))
+
+        set_dashboard_context(user.id, {})
+        campaign = Campaign.objects.get(id=self.campaign.id)
+        campaign.save()
+        self.assertEqual(get_dashboard_context(user.id), {})
+        campaign.activate()
+        self.assertIsNone(get_dashboard_context(user.id))
+
+    def test_dashboard_side_effects_on_cache_hit(self):
+        """
+        Tasks are given up and agendas completed for cached dashboards, too.
+        """
+        self.client.get(reverse('dashboard'))
+
+        # The user does not speak the task language, so the task is given up
+        self.task.activate()
+        self.task.assignedTo.add(self.user)
+        response = self.client.get(reverse('dashboard'))
+        self.assertEqual(response.context['dashboard_cache'], {'hits': 1, 'misses': 1})
+        self.assertIsNone(response.context['current_task'])
+        self.assertFalse(self.task.assignedTo.filter(id=self.user.id).exists())
+
+        # Confirmation tokens are generated once all agendas are completed
+        TaskAgenda.objects.create(user=self.user, campaign=self.campaign)
+        self.client.get(reverse('dashboard'))
+        response = self.client.get(reverse('dashboard'))
+        self.assertEqual(response.context['dashboard_cache'], {'hits': 2, 'misses': 2})
+        self.assertTrue(response.context['work_completed'])
+
+    def test_dashboard_languages_on_cache_hit(self):
+        """
+        Languages are no longer offered once other users take all tasks.
+        """
+        self.user.groups.add(Group.objects.get_or_create(name='deu')[0])
+        self.task.activate()
+        response = self.client.get(reverse('dashboard'))
+        self.assertEqual(
+            [x[0] for x in response.context['all_languages']['direct']], ['deu']
+        )
+
+        other = User.objects.create(username='other')
+        self.task.assignedTo.add(other)
+        response = self.client.get(reverse('dashboard'))
+        self.assertEqual(response.context['dashboard_cache'], {'hits': 1, 'misses': 1})
+        self.assertEqual(response.context['all_languages'], {})
+
+
+class ServerTimingTests(TestCase):
+    """
+    Tests Server-Timing headers and per-view latency histograms.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        reset_latency_histograms()
+        self.addCleanup(reset_latency_histograms)
+
+    def test_server_timing(self):
+        """
+        Responses report phase timings and latency is recorded per view.
+        """
+        user = User.objects.create(username='timing')
+        self.client.force_login(user)
+
+        response = self.client.get(reverse('dashboard'))
+        self.assertIn('cache;dur=', response['Server-Timing'])
+        self.assertIn('queries"', response['Server-Timing'])
+        self.assertIn('total;dur=', response['Server-Timing'])
+
+        histograms = dict(get_latency_histograms())
+        self.assertEqual(histograms['dashboard'].requests, 1)
+        self.assertGreater(histograms['dashboard'].queries, 0)
+
+        response = self.client.get(reverse('latency-histograms'))
+        self.assertEqual(response.status_code, 302)
+
+        user.is_staff = True
+        user.save()
+        response = self.client.get(reverse('latency-histograms'))
+        self.assertContains(response, 'dashboard')
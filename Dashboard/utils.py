@@ -3,23 +3,21 @@ Appraise evaluation framework
 
 See LICENSE for usage details
 """
-from collections import defaultdict
 from datetime import datetime
 from hashlib import md5
 from math import floor
-from math import sqrt
 from uuid import UUID
 
-from scipy.stats import mannwhitneyu  # type: ignore
+from django.contrib.auth.models import User
 
 from Appraise.settings import SECRET_KEY
+from Campaign.models import Campaign
+from EvalData.models import AnnotatorReliability
 from EvalData.models import DataAssessmentResult
 from EvalData.models import DirectAssessmentContextResult
 from EvalData.models import DirectAssessmentDocumentResult
 from EvalData.models import DirectAssessmentResult
 from EvalData.models import MultiModalAssessmentResult
-from EvalData.models import PairwiseAssessmentDocumentResult
-from EvalData.models import PairwiseAssessmentResult
 from EvalData.models import RESULT_TYPES
 
 # Maximum allowed p-value for the Wilcoxon rank-sum test
@@ -57,101 +55,44 @@ def run_quality_control(username):
     It is passed if p-value of the Wilcoxon test on annotated (TGT, BAD) pairs,
     and the total annotation times are in pre-defined thresholds.
 
-    Code extracted from Campaign/views.py:campaign_status()
+    Code extracted from Campaign/views.py:campaign_status(). Reliability
+    statistics are maintained in AnnotatorReliability, so that results do
+    not need to be scanned on each call.
     """
-    _data = None
+    user = User.objects.filter(username=username).first()
+    if user is None:
+        return None
+
     result_type = None
+    campaigns = []
     for _type in RESULT_TYPES:
-        _data = _type.objects.filter(createdBy__username=username, completed=True)
+        _data = _type.objects.filter(createdBy=user, completed=True)
+        campaigns = list(
+            Campaign.objects.filter(id__in=_data.values('task__campaign'))
+        )
         # Get the first result task type available: might not work in all scenarios
-        if _data:
-            campaign_opts = set((_data[0].task.campaign.campaignOptions or "").lower().split(";"))
+        if campaigns:
             result_type = _type
             break
 
     if result_type is None:  # No items are completed yet
         return None
 
-    if (
-        result_type is PairwiseAssessmentResult
-        or result_type is PairwiseAssessmentDocumentResult
-    ):
-        _data = _data.values_list(
-            'start_time',
-            'end_time',
-            'score1',
-            'item__itemID',
-            'item__target1ID',
-            'item__itemType',
-            'item__id',
-        )
-    else:
-        _data = _data.values_list(
-            'start_time',
-            'end_time',
-            'score',
-            'item__itemID',
-            'item__targetID',
-            'item__itemType',
-            'item__id',
-        )
-
-    _annotations = len(set([x[6] for x in _data]))
-
-    _user_mean = sum([x[2] for x in _data]) / (_annotations or 1)
-
-    _cs = _annotations - 1  # Corrected sample size for stdev.
-    _user_stdev = 1
-    if _cs > 0:
-        _user_stdev = sqrt(sum(((x[2] - _user_mean) ** 2 / _cs) for x in _data))
-
-    if int(_user_stdev) == 0:
-        _user_stdev = 1
-
-    # Extract pairs for the Wilcoxon test
-    _tgt = defaultdict(list)
-    _bad = defaultdict(list)
-    for _x in _data:
-        if _x[5] == 'TGT':
-            _dst = _tgt
-        elif _x[5] == 'BAD' or _x[5].startswith("BAD."):
-            # ESA/MQM have extra payload in itemType
-            _dst = _bad
-        else:
-            continue
-
-        _z_score = (_x[2] - _user_mean) / _user_stdev
-
-        _key = f'{_x[3]}-{_x[4]}'
-
-        _dst[_key].append(_z_score)
-
-    _x = []
-    _y = []
-    for _key in set.intersection(set(_tgt.keys()), set(_bad.keys())):
-        _x.append(sum(_bad[_key]) / float(len(_bad[_key] or 1)))
-        _y.append(sum(_tgt[_key]) / float(len(_tgt[_key] or 1)))
+    reliabilities = list(
+        AnnotatorReliability.get_reliabilities(
+            result_type, [user.id], campaigns
+        ).values()
+    )
 
     # Run the Wilcoxon rank-sum test
-    pvalue = None
-    if _x and _y:
-        try:
-            _t, _pvalue = mannwhitneyu(_x, _y, alternative='less')
-            pvalue = _pvalue
-        # Possible for mannwhitneyu() to throw in some scenarios:
-        #
-        # File "scipy/stats/stats.py", line 4865, in mannwhitneyu
-        #   raise ValueError(
-        #     'All numbers are identical in mannwhitneyu')
-        except ValueError:
-            pass
+    pvalue, _items = AnnotatorReliability.get_quality_control_pvalue(reliabilities)
 
     # Compute the total annotation time
-    _durations = [x[1] - x[0] for x in _data]
-    annotation_time = sum(_durations) if _durations else None
+    annotation_time = sum(x.annotationSeconds for x in reliabilities)
 
     print(
-        f"User '{username}', items= {len(_x)}, p-value= {pvalue}, time= {annotation_time}"
+        f"User '{username}', items= {_items}, p-value= {pvalue}, "
+        f"time= {annotation_time}"
     )
 
     return (
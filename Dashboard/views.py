@@ -3,28 +3,38 @@ Appraise evaluation framework
 
 See LICENSE for usage details
 """
-from datetime import datetime
 from hashlib import md5
 from inspect import currentframe
 from inspect import getframeinfo
 
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth import authenticate
 from django.contrib.auth import login
 from django.contrib.auth import logout
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.models import Group
 from django.contrib.auth.models import User
+from django.http import HttpResponse
 from django.shortcuts import redirect
 from django.shortcuts import render
 
 from Appraise.settings import BASE_CONTEXT
+from Appraise.timing import get_latency_histograms
+from Appraise.timing import get_phase_timer
+from Appraise.timing import LATENCY_BUCKETS
 from Appraise.utils import _get_logger
+from Dashboard.cache import get_dashboard_cache_stats
+from Dashboard.cache import get_dashboard_context
+from Dashboard.cache import invalidate_dashboards
+from Dashboard.cache import set_dashboard_context
 from Dashboard.models import LANGUAGE_CODES_AND_NAMES
 from Dashboard.models import UserInviteToken
 from Dashboard.utils import generate_confirmation_token
-from EvalData.models import DirectAssessmentTask
+from EvalData.models import AnnotationStatistics
+from EvalData.models import seconds_to_timedelta
 from EvalData.models import TASK_DEFINITIONS
 from EvalData.models import TaskAgenda
+from EvalData.models import TaskCapacity
 
 TASK_TYPES = tuple([tup[1] for tup in TASK_DEFINITIONS])
 TASK_RESULTS = tuple([tup[2] for tup in TASK_DEFINITIONS])
@@ -264,6 +274,9 @@ def update_profile(request):
                             language_group.user_set.remove(request.user)
                         language_group.save()
 
+                # Languages eligible for next task may have changed.
+                invalidate_dashboards([request.user.id])
+
                 # Redirect to dashboard.
                 return redirect('dashboard')
 
@@ -303,154 +316,157 @@ def dashboard(request):
     """
     Appraise dashboard page.
     """
-    _t1 = datetime.now()
+    timer = get_phase_timer(request)
 
     template_context = {'active_page': 'dashboard'}
     template_context.update(BASE_CONTEXT)
 
-    annotations = 0  # Completed items
-    hits = 0  # Completed HITs
-    total_hits = 0  # Total number of HITs expected from the user
-    for result_cls in TASK_RESULTS:
-        annotations += result_cls.get_completed_for_user(request.user)
-        _hits, _total = result_cls.get_hit_status_for_user(request.user)
-        hits, total_hits = hits + _hits, total_hits + _total
+    # Resolving the current task may give up or complete tasks and agendas,
+    # so this happens on every request and before reading cached context.
+    current_task, work_completed = _get_current_task(request.user, timer)
+
+    # Aggregates only change when the user submits results, agendas change
+    # or campaigns are activated, all of which invalidate the cache.
+    dashboard_context = get_dashboard_context(request.user.id)
+    timer.mark('cache')
+    if dashboard_context is None:
+        dashboard_context = _get_dashboard_context(request.user, timer)
+        set_dashboard_context(request.user.id, dashboard_context)
+
+    template_context.update(dashboard_context)
+
+    # Languages eligible for next task are only offered without a task. Free
+    # capacity changes whenever other users take tasks, so it is not cached.
+    all_languages = {}
+    if not current_task and not work_completed:
+        all_languages = _get_all_languages(
+            request.user, dashboard_context['hits'], timer
+        )
+    template_context['all_languages'] = all_languages
+
+    # Note that the default task type is 'direct'
+    current_type = TASK_NAMES.get(current_task.__class__, 'direct')
+
+    current_url = TASK_URLS[current_type]
+    LOGGER.debug('Current task type: %s, URL: %s', current_type, current_url)
+
+    # Provide UUID for the completed task
+    if work_completed:
+        work_completed = generate_confirmation_token(
+            request.user.username, run_qc=True
+        )
+
+    template_context.update(
+        {
+            'current_task': current_task,
+            'current_type': current_type,
+            'current_url': current_url,
+            'work_completed': work_completed,
+        }
+    )
+    template_context['debug_times'] = timer.debug_times()
+    template_context['template_debug'] = 'debug' in request.GET
+    if request.user.is_staff:
+        template_context['dashboard_cache'] = get_dashboard_cache_stats()
+
+    return render(request, 'Dashboard/dashboard.html', template_context)
+
+
+@staff_member_required
+def latency_histograms(request):
+    """
+    Renders per-view request latency histograms recorded in this process.
+    """
+    _buckets = ['<={0}ms'.format(x) for x in LATENCY_BUCKETS]
+    _buckets.append('>{0}ms'.format(LATENCY_BUCKETS[-1]))
+
+    _header = ('view', 'requests', 'mean_ms', 'max_ms', 'queries') + tuple(_buckets)
+    _rows = [_header]
+    for view_name, histogram in get_latency_histograms():
+        _rows.append(
+            (
+                view_name,
+                histogram.requests,
+                '{0:.1f}'.format(histogram.seconds * 1000 / histogram.requests),
+                '{0:.1f}'.format(histogram.max_seconds * 1000),
+                '{0:.1f}'.format(histogram.queries / histogram.requests),
+            )
+            + tuple(histogram.buckets)
+        )
+
+    _local_fmt = '|{0:>30}|' + ''.join(
+        '{{{0}:>10}}|'.format(x) for x in range(1, len(_header))
+    )
+    _txt = [_local_fmt.format(*_row) for _row in _rows]
 
+    return HttpResponse(u'\n'.join(_txt), content_type='text/plain')
+
+
+def _get_current_task(user, timer):
+    """
+    Returns the current task of the given user and whether the user has
+    completed all work agendas.
+
+    Gives up assigned tasks in languages which the user no longer speaks.
+    Marks phases of the computation using the given phase timer.
+    """
     # If user still has an assigned task, only offer link to this task.
     current_task = None
     for task_cls in TASK_TYPES:
         if not current_task:
-            current_task = task_cls.get_task_for_user(request.user)
+            current_task = task_cls.get_task_for_user(user)
 
         # Check if marketTargetLanguage for current_task matches user languages.
         if current_task:
             code = current_task.marketTargetLanguageCode()
-            print('  User groups:', request.user.groups.all())
-            if code not in request.user.groups.values_list('name', flat=True):
+            if code not in user.groups.values_list('name', flat=True):
                 _msg = 'Language %s not specified for user %s. Giving up task %s'
-                LOGGER.info(_msg, code, request.user.username, current_task)
+                LOGGER.info(_msg, code, user.username, current_task)
 
-                current_task.assignedTo.remove(request.user)
+                current_task.assignedTo.remove(user)
                 current_task = None
 
-    print('  Current task: {0}'.format(current_task))
-
-    _t2 = datetime.now()
+    LOGGER.debug('Current task: %s', current_task)
 
     # If there is no current task, check if user is done with work agenda.
     work_completed = False
     if not current_task:
-        agendas = TaskAgenda.objects.filter(user=request.user)
-
-        for agenda in agendas:
-            LOGGER.info('Identified work agenda %s', agenda)
-            print('Identified work agenda', agenda)
-
-            tasks_to_complete = []
-            for serialized_open_task in agenda.serialized_open_tasks():
-                open_task = serialized_open_task.get_object_instance()
-
-                # Skip tasks which are not available anymore
-                if open_task is None:
-                    continue
-
-                if open_task.next_item_for_user(request.user) is not None:
-                    current_task = open_task
-                    campaign = agenda.campaign
-                    LOGGER.info(
-                        'Current task type: %s',
-                        open_task.__class__.__name__,
-                    )
-                else:
-                    tasks_to_complete.append(serialized_open_task)
+        agendas = TaskAgenda.objects.filter(user=user)
 
-            modified = False
-            for task in tasks_to_complete:
-                modified = agenda.complete_open_task(task) or modified
-
-            if modified:
-                agenda.save()
+        current_task, _ = TaskAgenda.resolve_open_tasks(agendas, user)
 
         if not current_task and agendas.count() > 0:
             LOGGER.info('Work agendas completed, no more tasks for user')
             work_completed = True
 
-    # Otherwise, compute set of language codes eligible for next task.
-
-    # Mapping: task type => campaign name => list of languages
-    languages_map = {task_cls: {} for task_cls in TASK_TYPES}
-
-    if not current_task and not work_completed:
-        languages = []
-        for code in LANGUAGE_CODES_AND_NAMES:
-            if request.user.groups.filter(name=code).exists():
-                if not code in languages:
-                    languages.append(code)
-
-        if hits < HITS_REQUIRED_BEFORE_ENGLISH_ALLOWED:
-            if len(languages) > 1 and 'eng' in languages:
-                languages.remove('eng')
-
-        # Remove any language for which no free task is available.
-        from Campaign.models import Campaign
-
-        # Mapping: task type => campaigns as QuerySet
-        campaign_map = {task_cls: None for task_cls in TASK_TYPES}
-
-        for campaign in Campaign.objects.all():
-            print('Campaign: {0}'.format(campaign.campaignName))
+    timer.mark('task')
+    return current_task, work_completed
 
-            for task_cls in campaign_map:
-                campaign_map[task_cls] = task_cls.objects.filter(
-                    campaign__campaignName=campaign.campaignName
-                )
-
-            for task_cls in campaign_map:
-                if campaign_map[task_cls].exists():
-                    languages_map[task_cls][campaign.campaignName] = []
-                    languages_map[task_cls][campaign.campaignName].extend(languages)
-
-            for code in languages:
-                next_task_available = None
-
-                _cls = DirectAssessmentTask
-                for task_cls in campaign_map:
-                    if campaign_map[task_cls].exists():
-                        _cls = task_cls
-                        break
 
-                next_task_available = _cls.get_next_free_task_for_language(
-                    code, campaign, request.user
-                )
+def _get_dashboard_context(user, timer):
+    """
+    Computes cacheable dashboard aggregates for the given user: annotation
+    totals and annotation time.
 
-                if not next_task_available:
-                    for task_cls in campaign_map:
-                        if campaign_map[task_cls].exists():
-                            languages_map[task_cls][campaign.campaignName].remove(code)
-
-            # _type and _languages variables are only for debug
-            _type = None
-            _languages = {}
-            for task_cls in campaign_map:
-                if campaign_map[task_cls].exists():
-                    _type = TASK_NAMES[task_cls]
-                    _languages = languages_map[task_cls]
-                    break
-
-            print(
-                "campaign = {0}, type = {1}, languages = {2}".format(
-                    campaign.campaignName,
-                    _type,
-                    _languages.get(campaign.campaignName, 'none'),
-                )
-            )
+    Marks phases of the computation using the given phase timer.
+    """
+    # Materialized statistics for each result type, read with one query
+    statistics = AnnotationStatistics.get_for_user(user)
 
-    _t3 = datetime.now()
+    annotations = 0  # Completed items
+    hits = 0  # Completed HITs
+    total_hits = 0  # Total number of HITs expected from the user
+    for result_cls in TASK_RESULTS:
+        _stats = statistics[result_cls.__name__]
+        annotations += _stats.completedItems
+        hits, total_hits = hits + _stats.hits, total_hits + _stats.totalHits
 
     # Collect total annotation time
     times = {'days': 0, 'hours': 0, 'minutes': 0, 'seconds': 0}
-    for task_cls in TASK_RESULTS:
-        duration = task_cls.get_time_for_user(request.user)
+    for result_cls in TASK_RESULTS:
+        duration = seconds_to_timedelta(
+            statistics[result_cls.__name__].annotationSeconds
+        )
         secs = duration.total_seconds()
         days = duration.days
         times['days'] += days
@@ -458,12 +474,44 @@ def dashboard(request):
         times['minutes'] += int(((secs - (days * 86400)) % 3600) / 60)
         times['seconds'] += int((secs - (days * 86400)) % 60)
 
-    _t4 = datetime.now()
+    timer.mark('times')
+
+    dashboard_context = dict(times)
+    dashboard_context.update(
+        {
+            'annotations': annotations,
+            'hits': hits,
+            'total_hits': total_hits,
+        }
+    )
+    return dashboard_context
+
+
+def _get_all_languages(user, hits, timer):
+    """
+    Returns dict mapping task names to lists of (code, language, campaign,
+    task_url) tuples for languages eligible for the next task of the given
+    user, who has completed the given number of HITs.
+
+    Marks phases of the computation using the given phase timer.
+    """
+    # Compute set of language codes eligible for next task.
+    group_names = set(user.groups.values_list('name', flat=True))
+    languages = [code for code in LANGUAGE_CODES_AND_NAMES if code in group_names]
+
+    if hits < HITS_REQUIRED_BEFORE_ENGLISH_ALLOWED:
+        if len(languages) > 1 and 'eng' in languages:
+            languages.remove('eng')
+
+    # Remove any language for which no free task is available.
+    # Mapping: task type => campaign name => list of languages
+    languages_map = TaskCapacity.get_languages_for_user(user, languages)
 
     # All languages per task type
     # Mapping: task name => list of (code, language, campaign, task_url)
     all_languages = {}
-    for task_cls, campaign_languages in languages_map.items():
+    for task_cls in TASK_TYPES:
+        campaign_languages = languages_map.get(task_cls, {})
         task_name = TASK_NAMES[task_cls]
         task_url = TASK_URLS[task_name]
 
@@ -476,38 +524,5 @@ def dashboard(request):
                     (lang_code, lang_name, camp_name, task_url)
                 )
 
-        print(
-            '    Languages "{}": {}'.format(
-                task_name,
-                str(all_languages.get(task_name, 'none')).encode('utf-8'),
-            )
-        )
-
-    # Note that the default task type is 'direct'
-    current_type = TASK_NAMES.get(current_task.__class__, 'direct')
-    print('  Final task type: {0}'.format(current_type))
-
-    current_url = TASK_URLS[current_type]
-    print('  URL: {0}'.format(current_url))
-
-    # Provide UUID for the completed task
-    if work_completed:
-        work_completed = generate_confirmation_token(request.user.username, run_qc=True)
-
-    template_context.update(times)
-    template_context.update(
-        {
-            'annotations': annotations,
-            'hits': hits,
-            'total_hits': total_hits,
-            'current_task': current_task,
-            'current_type': current_type,
-            'current_url': current_url,
-            'all_languages': all_languages,
-            'debug_times': (_t2 - _t1, _t3 - _t2, _t4 - _t3, _t4 - _t1),
-            'template_debug': 'debug' in request.GET,
-            'work_completed': work_completed,
-        }
-    )
-
-    return render(request, 'Dashboard/dashboard.html', template_context)
\ No newline at end of file
+    timer.mark('languages')
+    return all_languages
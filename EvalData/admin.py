@@ -700,6 +700,86 @@ class TaskAgendaAdmin(admin.ModelAdmin):
     reset_taskagenda.short_description = "Reset task agenda"  # type: ignore
 
 
+class TaskProgressAdmin(admin.ModelAdmin):
+    """
+    Model admin for TaskProgress object model.
+    """
+
+    list_display = [
+        'user',
+        'campaign',
+        'taskType',
+        'taskID',
+        'nextItemID',
+        'completedItems',
+        'trusted',
+    ]
+    list_filter = ['campaign', 'taskType']
+    search_fields = [
+        'user__username',
+        'campaign__campaignName',
+    ]
+
+
+class AnnotationStatisticsAdmin(admin.ModelAdmin):
+    """
+    Model admin for AnnotationStatistics object model.
+    """
+
+    list_display = [
+        'user',
+        'resultType',
+        'completedItems',
+        'hits',
+        'totalHits',
+        'annotationSeconds',
+        'stale',
+    ]
+    list_filter = ['resultType', 'stale']
+    search_fields = [
+        'user__username',
+    ]
+
+
+class AnnotatorReliabilityAdmin(admin.ModelAdmin):
+    """
+    Model admin for AnnotatorReliability object model.
+    """
+
+    list_display = [
+        'user',
+        'campaign',
+        'resultType',
+        'results',
+        'pValue',
+        'dirty',
+        'stale',
+    ]
+    list_filter = ['resultType', 'dirty', 'stale']
+    search_fields = [
+        'user__username',
+        'campaign__campaignName',
+    ]
+
+
+class TaskCapacityAdmin(admin.ModelAdmin):
+    """
+    Model admin for TaskCapacity object model.
+    """
+
+    list_display = [
+        'campaign',
+        'taskType',
+        'targetLanguageCode',
+        'openTasks',
+        'openSlots',
+    ]
+    list_filter = ['taskType', 'targetLanguageCode']
+    search_fields = [
+        'campaign__campaignName',
+    ]
+
+
 class PairwiseAssessmentTaskAdmin(BaseMetadataAdmin):
     """
     Model admin for PairwiseAssessmentTask instances.
@@ -944,3 +1024,7 @@ admin.site.register(
 )
 admin.site.register(WorkAgenda, WorkAgendaAdmin)
 admin.site.register(TaskAgenda, TaskAgendaAdmin)
+admin.site.register(TaskProgress, TaskProgressAdmin)
+admin.site.register(AnnotationStatistics, AnnotationStatisticsAdmin)
+admin.site.register(AnnotatorReliability, AnnotatorReliabilityAdmin)
+admin.site.register(TaskCapacity, TaskCapacityAdmin)
@@ -0,0 +1,147 @@
+"""
+Appraise evaluation framework
+
+See LICENSE for usage details
+"""
+from datetime import datetime
+from datetime import timedelta
+import json
+from os import makedirs
+from os import replace
+from os.path import basename
+from os.path import exists
+from os.path import join
+
+from django.db.models import Max
+from django.db.models import Q
+
+# Manifest of delta exports written to a delta folder
+DELTA_MANIFEST_FILE = 'manifest.json'
+
+# Result timestamps set when results are created, completed, modified or retired
+RESULT_CHANGE_FIELDS = (
+    'dateCreated',
+    'dateCompleted',
+    'dateModified',
+    'dateRetired',
+)
+
+# Changes made up to this long before the watermark are exported again, so
+# that results saved in transactions which committed after the previous
+# export are not missed. Consumers drop the resulting duplicate rows.
+WATERMARK_MARGIN = timedelta(minutes=1)
+
+
+class DeltaExport:
+    """
+    Incremental export of results for a target in a delta folder.
+
+    The manifest in the delta folder keeps a watermark for each target,
+    consisting of the latest change time and the highest result ID read
+    per result type. Each export writes results created, completed,
+    modified or retired since the watermark, less WATERMARK_MARGIN, to a
+    new delta file and records the file, the number of rows and the IDs of
+    results which are no longer exported in the manifest. Consumers compact
+    deltas by keeping the last row for each result ID and dropping removed
+    IDs.
+    """
+
+    def __init__(self, folder, target):
+        self.folder = folder
+        self.target = target
+        self.manifest = {'targets': {}}
+        if exists(join(folder, DELTA_MANIFEST_FILE)):
+            with open(join(folder, DELTA_MANIFEST_FILE)) as manifest_file:
+                self.manifest = json.load(manifest_file)
+
+        self._state = self.manifest['targets'].setdefault(
+            target, {'watermark': None, 'deltas': []}
+        )
+        # Result types not exported this time keep their previous watermark
+        watermark = self._state['watermark'] or {'dateModified': {}, 'ids': {}}
+        self._watermark = {
+            'dateModified': dict(watermark['dateModified']),
+            'ids': dict(watermark['ids']),
+        }
+        self._removed_ids = {}
+
+    def get_changed_results(self, results, include_inactive=True):
+        """
+        Returns results changed since the watermark, or all results for the
+        first export of the target, and advances the watermark to the
+        latest change and highest ID of these results.
+
+        Results which are no longer completed are recorded as removed. If
+        include_inactive is False, results of inactive users are recorded
+        as removed, too, as these are not exported.
+        """
+        result_type = results.model.__name__
+        watermark = self._state['watermark']
+        if watermark is not None:
+            all_results = results
+            changed = Q(id__gt=watermark['ids'].get(result_type, 0))
+            since = watermark['dateModified'].get(result_type)
+            if since is not None:
+                since = datetime.fromisoformat(since) - WATERMARK_MARGIN
+                for field in RESULT_CHANGE_FIELDS:
+                    changed |= Q(**{field + '__gte': since})
+            results = results.filter(changed)
+
+            removed_ids = set(
+                results.filter(completed=False).values_list('id', flat=True)
+            )
+            if not include_inactive:
+                removed_ids.update(
+                    all_results.filter(createdBy__is_active=False).values_list(
+                        'id', flat=True
+                    )
+                )
+            self._removed_ids[result_type] = sorted(removed_ids)
+
+        latest = results.aggregate(
+            Max('id'), *(Max(field) for field in RESULT_CHANGE_FIELDS)
+        )
+        max_id = latest.pop('id__max')
+        if max_id is not None:
+            ids = self._watermark['ids']
+            ids[result_type] = max(ids.get(result_type, 0), max_id)
+
+            dates = [x for x in latest.values() if x is not None]
+            date_modified = self._watermark['dateModified'].get(result_type)
+            if date_modified is not None:
+                dates.append(datetime.fromisoformat(date_modified))
+            if dates:
+                self._watermark['dateModified'][result_type] = max(dates).isoformat()
+
+        return results
+
+    def get_delta_path(self, extension):
+        """
+        Returns path of the next delta file with the given extension.
+        """
+        makedirs(self.folder, exist_ok=True)
+        delta_file = '{0}.{1:05d}{2}'.format(
+            self.target, len(self._state['deltas']) + 1, extension
+        )
+        return join(self.folder, delta_file)
+
+    def commit(self, delta_path, rows):
+        """
+        Records the delta file and advances the watermark of the target.
+        """
+        self._state['deltas'].append(
+            {
+                'file': basename(delta_path),
+                'rows': rows,
+                'removedIds': self._removed_ids,
+                'since': self._state['watermark'],
+                'until': self._watermark,
+            }
+        )
+        self._state['watermark'] = self._watermark
+
+        # Replace manifest atomically, so that consumers never see partial data
+        manifest_path = join(self.folder, DELTA_MANIFEST_FILE)
+        with open(manifest_path + '.tmp', 'w') as manifest_file:
+            json.dump(self.manifest, manifest_file, indent=2)
+        replace(manifest_path + '.tmp', manifest_path)
@@ -8,6 +8,7 @@ from os.path import basename
 from django.core.management.base import BaseCommand
 from django.core.management.base import CommandError
 
+from EvalData.exports import DeltaExport
 from EvalData.models import DirectAssessmentResult
 from EvalData.models import MultiModalAssessmentResult
 
@@ -22,21 +23,43 @@ class Command(BaseCommand):
     help = 'Dumps all DirectAssessmentResult and MultiModalAssessmentResult instances'
 
     def add_arguments(self, parser):
-        pass
+        parser.add_argument(
+            '--gzip',
+            action='store_true',
+            help='Write gzip-compressed CSV files',
+        )
+        parser.add_argument(
+            '--delta-folder',
+            type=str,
+            help='Folder for incremental exports of results changed since last run',
+        )
 
     def handle(self, *args, **options):
         del args  # Unused.
-        del options  # Unused.
+        compress = options['gzip']
+        suffix = '.csv.gz' if compress else '.csv'
 
         _msg = '\n[{0}]\n\n'.format(basename(__file__))
         self.stdout.write(_msg)
         self.stdout.write('\n[INIT]\n\n')
 
-        DirectAssessmentResult.dump_all_results_to_csv_file(
-            'DirectAssessmentResults.csv'
-        )
-        MultiModalAssessmentResult.dump_all_results_to_csv_file(
-            'MultiModalAssessmentResults.csv'
+        targets = (
+            (DirectAssessmentResult, 'DirectAssessmentResults'),
+            (MultiModalAssessmentResult, 'MultiModalAssessmentResults'),
         )
+        for result_cls, target in targets:
+            if not options['delta_folder']:
+                result_cls.dump_all_results_to_csv_file(target + suffix, compress)
+                continue
+
+            # Export results changed since last run, with result IDs
+            delta = DeltaExport(options['delta_folder'], target)
+            results = delta.get_changed_results(result_cls.objects.all())
+            delta_path = delta.get_delta_path(suffix)
+            rows = result_cls.write_results_to_csv_file(
+                delta_path, results.filter(completed=True), compress, True
+            )
+            delta.commit(delta_path, rows)
+            self.stdout.write('{0}: {1} rows\n'.format(delta_path, rows))
 
         self.stdout.write('\n[DONE]\n\n')
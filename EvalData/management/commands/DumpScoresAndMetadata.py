@@ -9,6 +9,7 @@ from os.path import basename
 from django.core.management.base import BaseCommand
 from django.core.management.base import CommandError
 
+from EvalData.exports import DeltaExport
 from EvalData.models import DirectAssessmentResult
 
 # pylint: disable=E0401,W0611
@@ -23,6 +24,11 @@ class Command(BaseCommand):
 
     def add_arguments(self, parser):
         parser.add_argument('target_file', type=str, help='Path to target text file')
+        parser.add_argument(
+            '--delta-folder',
+            type=str,
+            help='Folder for incremental exports of results changed since last run',
+        )
 
     def handle(self, *args, **options):
         _msg = '\n[{0}]\n\n'.format(basename(__file__))
@@ -35,15 +41,26 @@ class Command(BaseCommand):
 
         labels = DirectAssessmentResult.objects.filter(completed=True)
 
+        # Export results changed since last run to next delta file instead
+        delta = None
+        if options['delta_folder']:
+            target_name, _, extension = basename(target_file).partition('.')
+            delta = DeltaExport(options['delta_folder'], target_name)
+            labels = delta.get_changed_results(DirectAssessmentResult.objects.all())
+            labels = labels.filter(completed=True)
+            target_file = delta.get_delta_path('.' + extension if extension else '')
+            self.stdout.write('delta_file: {0}'.format(target_file))
+
         blocks = 0
-        total_blocks = labels.count() // 1000 + 1
+        total_labels = labels.count()
+        total_blocks = total_labels // 1000 + 1
         output = []
         batch_size = 1000
 
         _open = open
         if target_file.lower().endswith('.gz'):
             _open = gz_open
-        out_file = _open(target_file, 'a', encoding='utf-8')
+        out_file = _open(target_file, 'at', encoding='utf-8')
 
         label_values = (
             'id',
@@ -143,5 +160,9 @@ class Command(BaseCommand):
                 100.0 * float(blocks) / float(total_blocks),
             )
         )
+        out_file.close()
+
+        if delta is not None:
+            delta.commit(target_file, total_labels)
 
         self.stdout.write('\n[DONE]\n\n')
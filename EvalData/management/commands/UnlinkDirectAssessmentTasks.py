@@ -93,7 +93,7 @@ class Command(BaseCommand):
                 print(
                     "\nactive task ID:",
                     active_task.id,
-                    active_task.items.first().metadata.market,
+                    active_task.market,
                 )
                 print(assigned_user.username)
                 print(completed_annotations)
@@ -5,6 +5,7 @@ See LICENSE for usage details
 """
 # pylint: disable=W0611
 from datetime import datetime
+from datetime import timezone
 from os import path
 
 from django.contrib.auth.models import User
@@ -20,6 +21,8 @@ from EvalData.models import Metadata
 from EvalData.models import MultiModalAssessmentResult
 from EvalData.models import MultiModalAssessmentTask
 from EvalData.models import TASK_DEFINITIONS
+from EvalData.models import TaskCapacity
+from EvalData.models import TaskProgress
 from EvalData.models import TextPairWithImage
 
 
@@ -124,7 +127,15 @@ def _update_eval_data_models(stdout):
 
         t1 = datetime.now()
         results = result_cls.objects.filter(completed=False)
-        results.update(activated=False, completed=True)
+        user_ids = set(results.values_list('createdBy', flat=True))
+        task_ids = set(results.values_list('task', flat=True))
+        results.update(
+            activated=False,
+            completed=True,
+            dateModified=datetime.now(timezone.utc),
+        )
+        TaskProgress.invalidate(task_cls, user_ids, task_ids)
+        task_cls.reconcile_unique_annotations()
         t2 = datetime.now()
         print('  Processed', result_name, 'instances', t2 - t1)
 
@@ -318,4 +329,7 @@ def _update_eval_data_models(stdout):
     t4 = datetime.now()
     print('Processed related MultiModalAssessmentTask instances', t4 - t3)
 
+    # Tasks have been (de)activated using bulk updates
+    TaskCapacity.rebuild()
+
     stdout.write('\n[DONE]\n\n')
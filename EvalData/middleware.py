@@ -0,0 +1,22 @@
+"""
+Appraise evaluation framework
+
+See LICENSE for usage details
+"""
+from EvalData.models.base_models import object_identity_map
+
+
+# pylint: disable=too-few-public-methods
+class ObjectIdentityMapMiddleware:
+    """
+    Shares resolved ObjectID instances for the duration of a request.
+
+    Ensures that the same task is fetched at most once per request.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with object_identity_map():
+            return self.get_response(request)
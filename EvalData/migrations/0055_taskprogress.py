@@ -0,0 +1,35 @@
+# Generated by Django 4.1 on 2026-10-18 03:44
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Campaign', '0015_alter_campaign_activatedby_alter_campaign_batches_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('EvalData', '0054_alter_dataassessmentresult_activatedby_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TaskProgress',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('taskType', models.CharField(max_length=100, verbose_name='Task type')),
+                ('taskID', models.PositiveIntegerField(verbose_name='Task ID')),
+                ('nextItemID', models.PositiveIntegerField(blank=True, null=True, verbose_name='Next item ID')),
+                ('completedItems', models.PositiveIntegerField(default=0, verbose_name='Completed items')),
+                ('trusted', models.BooleanField(default=False, verbose_name='Trusted user?')),
+                ('dateModified', models.DateTimeField(auto_now=True, verbose_name='Date modified')),
+                ('campaign', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='Campaign.campaign', verbose_name='Campaign')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL, verbose_name='User')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='taskprogress',
+            constraint=models.UniqueConstraint(fields=('user', 'taskType', 'taskID'), name='unique_task_progress_for_user'),
+        ),
+    ]
@@ -0,0 +1,158 @@
+# Generated by Django 4.1 on 2026-10-18 03:55
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+TASK_MODEL_NAMES = (
+    'DataAssessmentTask',
+    'DirectAssessmentContextTask',
+    'DirectAssessmentDocumentTask',
+    'DirectAssessmentTask',
+    'MultiModalAssessmentTask',
+    'PairwiseAssessmentDocumentTask',
+    'PairwiseAssessmentTask',
+)
+
+
+def backfill_task_market_fields(apps, schema_editor):
+    """Copies market and language codes from task items onto tasks."""
+    Market = apps.get_model('EvalData', 'Market')
+    for model_name in TASK_MODEL_NAMES:
+        task_cls = apps.get_model('EvalData', model_name)
+        items_field = task_cls._meta.get_field('items')
+        first_item_market = (
+            items_field.related_model.objects.filter(
+                **{items_field.related_query_name(): models.OuterRef('pk')}
+            )
+            .order_by('id')
+            .values('metadata__market')[:1]
+        )
+        task_cls.objects.update(market=models.Subquery(first_item_market))
+
+        market_codes = Market.objects.filter(pk=models.OuterRef('market'))
+        task_cls.objects.filter(market__isnull=False).update(
+            sourceLanguageCode=models.Subquery(
+                market_codes.values('sourceLanguageCode')[:1]
+            ),
+            targetLanguageCode=models.Subquery(
+                market_codes.values('targetLanguageCode')[:1]
+            ),
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('EvalData', '0055_taskprogress'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dataassessmenttask',
+            name='market',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='%(app_label)s_%(class)s_market', related_query_name='%(app_label)s_%(class)ss', to='EvalData.market', verbose_name='Market'),
+        ),
+        migrations.AddField(
+            model_name='dataassessmenttask',
+            name='sourceLanguageCode',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=10, verbose_name='Source language'),
+        ),
+        migrations.AddField(
+            model_name='dataassessmenttask',
+            name='targetLanguageCode',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=10, verbose_name='Target language'),
+        ),
+        migrations.AddField(
+            model_name='directassessmentcontexttask',
+            name='market',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='%(app_label)s_%(class)s_market', related_query_name='%(app_label)s_%(class)ss', to='EvalData.market', verbose_name='Market'),
+        ),
+        migrations.AddField(
+            model_name='directassessmentcontexttask',
+            name='sourceLanguageCode',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=10, verbose_name='Source language'),
+        ),
+        migrations.AddField(
+            model_name='directassessmentcontexttask',
+            name='targetLanguageCode',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=10, verbose_name='Target language'),
+        ),
+        migrations.AddField(
+            model_name='directassessmentdocumenttask',
+            name='market',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='%(app_label)s_%(class)s_market', related_query_name='%(app_label)s_%(class)ss', to='EvalData.market', verbose_name='Market'),
+        ),
+        migrations.AddField(
+            model_name='directassessmentdocumenttask',
+            name='sourceLanguageCode',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=10, verbose_name='Source language'),
+        ),
+        migrations.AddField(
+            model_name='directassessmentdocumenttask',
+            name='targetLanguageCode',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=10, verbose_name='Target language'),
+        ),
+        migrations.AddField(
+            model_name='directassessmenttask',
+            name='market',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='%(app_label)s_%(class)s_market', related_query_name='%(app_label)s_%(class)ss', to='EvalData.market', verbose_name='Market'),
+        ),
+        migrations.AddField(
+            model_name='directassessmenttask',
+            name='sourceLanguageCode',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=10, verbose_name='Source language'),
+        ),
+        migrations.AddField(
+            model_name='directassessmenttask',
+            name='targetLanguageCode',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=10, verbose_name='Target language'),
+        ),
+        migrations.AddField(
+            model_name='multimodalassessmenttask',
+            name='market',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='%(app_label)s_%(class)s_market', related_query_name='%(app_label)s_%(class)ss', to='EvalData.market', verbose_name='Market'),
+        ),
+        migrations.AddField(
+            model_name='multimodalassessmenttask',
+            name='sourceLanguageCode',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=10, verbose_name='Source language'),
+        ),
+        migrations.AddField(
+            model_name='multimodalassessmenttask',
+            name='targetLanguageCode',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=10, verbose_name='Target language'),
+        ),
+        migrations.AddField(
+            model_name='pairwiseassessmentdocumenttask',
+            name='market',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='%(app_label)s_%(class)s_market', related_query_name='%(app_label)s_%(class)ss', to='EvalData.market', verbose_name='Market'),
+        ),
+        migrations.AddField(
+            model_name='pairwiseassessmentdocumenttask',
+            name='sourceLanguageCode',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=10, verbose_name='Source language'),
+        ),
+        migrations.AddField(
+            model_name='pairwiseassessmentdocumenttask',
+            name='targetLanguageCode',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=10, verbose_name='Target language'),
+        ),
+        migrations.AddField(
+            model_name='pairwiseassessmenttask',
+            name='market',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='%(app_label)s_%(class)s_market', related_query_name='%(app_label)s_%(class)ss', to='EvalData.market', verbose_name='Market'),
+        ),
+        migrations.AddField(
+            model_name='pairwiseassessmenttask',
+            name='sourceLanguageCode',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=10, verbose_name='Source language'),
+        ),
+        migrations.AddField(
+            model_name='pairwiseassessmenttask',
+            name='targetLanguageCode',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=10, verbose_name='Target language'),
+        ),
+        migrations.RunPython(
+            backfill_task_market_fields, migrations.RunPython.noop
+        ),
+    ]
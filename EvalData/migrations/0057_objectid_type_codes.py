@@ -0,0 +1,71 @@
+# Generated by Django 4.1 on 2026-10-18 04:17
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+BACKFILL_BATCH_SIZE = 10000
+
+
+def backfill_objectid_type_codes(apps, schema_editor):
+    """Sets integer object type and ID for existing ObjectID rows."""
+    ContentType = apps.get_model('contenttypes', 'ContentType')
+    ObjectID = apps.get_model('EvalData', 'ObjectID')
+
+    # Map type names to content types, preferring EvalData models
+    content_types = {}
+    for app_label in ('Campaign', 'EvalData'):
+        for model in apps.get_app_config(app_label).get_models():
+            content_types[model.__name__], _ = ContentType.objects.get_or_create(
+                app_label=app_label, model=model._meta.model_name
+            )
+
+    # Duplicate rows keep string values only, as keys must be unique
+    seen = set()
+    batch = []
+    for serialized in ObjectID.objects.order_by('id').iterator():
+        content_type = content_types.get(serialized.typeName)
+        if content_type is None or not serialized.primaryID.isdigit():
+            continue
+
+        key = (content_type.id, int(serialized.primaryID))
+        if key in seen:
+            continue
+        seen.add(key)
+
+        serialized.objectType = content_type
+        serialized.objectID = key[1]
+        batch.append(serialized)
+        if len(batch) >= BACKFILL_BATCH_SIZE:
+            ObjectID.objects.bulk_update(batch, ['objectType', 'objectID'])
+            batch = []
+
+    ObjectID.objects.bulk_update(batch, ['objectType', 'objectID'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('Campaign', '0015_alter_campaign_activatedby_alter_campaign_batches_and_more'),
+        ('EvalData', '0056_task_market_fields'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='objectid',
+            name='objectID',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True, verbose_name='Object ID'),
+        ),
+        migrations.AddField(
+            model_name='objectid',
+            name='objectType',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.PROTECT, to='contenttypes.contenttype', verbose_name='Object type'),
+        ),
+        migrations.RunPython(
+            backfill_objectid_type_codes, migrations.RunPython.noop
+        ),
+        migrations.AddConstraint(
+            model_name='objectid',
+            constraint=models.UniqueConstraint(fields=('objectType', 'objectID'), name='unique_object_type_and_id'),
+        ),
+    ]
@@ -0,0 +1,80 @@
+# Generated by Django 4.1 on 2026-10-18 04:31
+
+from django.db import migrations, models
+from django.db.models.functions import Coalesce
+
+TASK_RESULT_MODEL_NAMES = (
+    ('DataAssessmentTask', 'DataAssessmentResult'),
+    ('DirectAssessmentContextTask', 'DirectAssessmentContextResult'),
+    ('DirectAssessmentDocumentTask', 'DirectAssessmentDocumentResult'),
+    ('DirectAssessmentTask', 'DirectAssessmentResult'),
+    ('MultiModalAssessmentTask', 'MultiModalAssessmentResult'),
+    ('PairwiseAssessmentDocumentTask', 'PairwiseAssessmentDocumentResult'),
+    ('PairwiseAssessmentTask', 'PairwiseAssessmentResult'),
+)
+
+
+def backfill_unique_annotations(apps, schema_editor):
+    """Counts unique annotated items for each existing task."""
+    for task_name, result_name in TASK_RESULT_MODEL_NAMES:
+        task_cls = apps.get_model('EvalData', task_name)
+        result_cls = apps.get_model('EvalData', result_name)
+        unique_annotations = (
+            result_cls.objects.filter(
+                task=models.OuterRef('pk'), activated=False, completed=True
+            )
+            .values('task')
+            .annotate(_count=models.Count('item', distinct=True))
+            .values('_count')
+        )
+        task_cls.objects.update(
+            uniqueAnnotations=Coalesce(models.Subquery(unique_annotations), 0)
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('EvalData', '0057_objectid_type_codes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dataassessmenttask',
+            name='uniqueAnnotations',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Unique annotations'),
+        ),
+        migrations.AddField(
+            model_name='directassessmentcontexttask',
+            name='uniqueAnnotations',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Unique annotations'),
+        ),
+        migrations.AddField(
+            model_name='directassessmentdocumenttask',
+            name='uniqueAnnotations',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Unique annotations'),
+        ),
+        migrations.AddField(
+            model_name='directassessmenttask',
+            name='uniqueAnnotations',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Unique annotations'),
+        ),
+        migrations.AddField(
+            model_name='multimodalassessmenttask',
+            name='uniqueAnnotations',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Unique annotations'),
+        ),
+        migrations.AddField(
+            model_name='pairwiseassessmentdocumenttask',
+            name='uniqueAnnotations',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Unique annotations'),
+        ),
+        migrations.AddField(
+            model_name='pairwiseassessmenttask',
+            name='uniqueAnnotations',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Unique annotations'),
+        ),
+        migrations.RunPython(
+            backfill_unique_annotations, migrations.RunPython.noop
+        ),
+    ]
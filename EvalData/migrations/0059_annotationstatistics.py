@@ -0,0 +1,36 @@
+# Generated by Django 4.1 on 2026-10-18 05:00
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('EvalData', '0058_task_unique_annotations'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AnnotationStatistics',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('resultType', models.CharField(max_length=100, verbose_name='Result type')),
+                ('completedItems', models.PositiveIntegerField(default=0, verbose_name='Completed items')),
+                ('hits', models.PositiveIntegerField(default=0, verbose_name='Completed HITs')),
+                ('totalHits', models.PositiveIntegerField(default=0, verbose_name='Total HITs')),
+                ('annotationSeconds', models.FloatField(default=0, verbose_name='Annotation time (seconds)')),
+                ('lastStartTime', models.FloatField(blank=True, null=True, verbose_name='Last start time')),
+                ('lastEndTime', models.FloatField(blank=True, null=True, verbose_name='Last end time')),
+                ('stale', models.BooleanField(default=False, verbose_name='Stale?')),
+                ('dateModified', models.DateTimeField(auto_now=True, verbose_name='Date modified')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL, verbose_name='User')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='annotationstatistics',
+            constraint=models.UniqueConstraint(fields=('user', 'resultType'), name='unique_annotation_statistics_for_user'),
+        ),
+    ]
@@ -0,0 +1,75 @@
+# Generated by Django 4.1 on 2026-10-18 05:08
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+TASK_MODEL_NAMES = (
+    'DataAssessmentTask',
+    'DirectAssessmentContextTask',
+    'DirectAssessmentDocumentTask',
+    'DirectAssessmentTask',
+    'MultiModalAssessmentTask',
+    'PairwiseAssessmentDocumentTask',
+    'PairwiseAssessmentTask',
+)
+
+
+def backfill_task_capacity(apps, schema_editor):
+    """Computes open capacity for existing active tasks."""
+    capacity_cls = apps.get_model('EvalData', 'TaskCapacity')
+    for task_name in TASK_MODEL_NAMES:
+        task_cls = apps.get_model('EvalData', task_name)
+        open_tasks = (
+            task_cls.objects.filter(activated=True, completed=False)
+            .annotate(_assigned=models.Count('assignedTo', distinct=True))
+            .filter(_assigned__lt=models.F('requiredAnnotations'))
+            .values_list(
+                'campaign_id', 'targetLanguageCode', 'requiredAnnotations', '_assigned'
+            )
+        )
+
+        capacities = {}
+        for campaign_id, code, required, assigned in open_tasks:
+            capacity = capacities.setdefault(
+                (campaign_id, code),
+                capacity_cls(
+                    campaign_id=campaign_id,
+                    taskType=task_name,
+                    targetLanguageCode=code,
+                ),
+            )
+            capacity.openTasks += 1
+            capacity.openSlots += required - assigned
+
+        capacity_cls.objects.bulk_create(capacities.values())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Campaign', '0015_alter_campaign_activatedby_alter_campaign_batches_and_more'),
+        ('EvalData', '0059_annotationstatistics'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TaskCapacity',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('taskType', models.CharField(max_length=100, verbose_name='Task type')),
+                ('targetLanguageCode', models.CharField(db_index=True, max_length=10, verbose_name='Target language')),
+                ('openTasks', models.PositiveIntegerField(default=0, verbose_name='Open tasks')),
+                ('openSlots', models.PositiveIntegerField(default=0, verbose_name='Open slots')),
+                ('dateModified', models.DateTimeField(auto_now=True, verbose_name='Date modified')),
+                ('campaign', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='Campaign.campaign', verbose_name='Campaign')),
+            ],
+            options={
+                'verbose_name_plural': 'Task capacities',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='taskcapacity',
+            constraint=models.UniqueConstraint(fields=('campaign', 'taskType', 'targetLanguageCode'), name='unique_task_capacity'),
+        ),
+        migrations.RunPython(backfill_task_capacity, migrations.RunPython.noop),
+    ]
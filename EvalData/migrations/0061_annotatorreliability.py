@@ -0,0 +1,42 @@
+# Generated by Django 4.1 on 2026-10-18 06:23
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('Campaign', '0016_campaign_campaigntype'),
+        ('EvalData', '0060_taskcapacity'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AnnotatorReliability',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('resultType', models.CharField(max_length=100, verbose_name='Result type')),
+                ('results', models.PositiveIntegerField(default=0, verbose_name='Results')),
+                ('scoreSum', models.FloatField(default=0, verbose_name='Sum of scores')),
+                ('scoreSquaresSum', models.FloatField(default=0, verbose_name='Sum of squared scores')),
+                ('annotationSeconds', models.FloatField(default=0, verbose_name='Annotation time (seconds)')),
+                ('keyScores', models.TextField(default='{}', verbose_name='Scores per key')),
+                ('pValue', models.FloatField(blank=True, null=True, verbose_name='p-value')),
+                ('dirty', models.BooleanField(default=True, verbose_name='Dirty?')),
+                ('stale', models.BooleanField(default=False, verbose_name='Stale?')),
+                ('dateModified', models.DateTimeField(auto_now=True, verbose_name='Date modified')),
+                ('campaign', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='Campaign.campaign', verbose_name='Campaign')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL, verbose_name='User')),
+            ],
+            options={
+                'verbose_name_plural': 'Annotator reliabilities',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='annotatorreliability',
+            constraint=models.UniqueConstraint(fields=('user', 'campaign'), name='unique_annotator_reliability'),
+        ),
+    ]
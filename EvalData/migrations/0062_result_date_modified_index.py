@@ -0,0 +1,48 @@
+# Generated by Django 4.1 on 2026-10-18 07:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('EvalData', '0061_annotatorreliability'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='dataassessmentresult',
+            name='dateModified',
+            field=models.DateTimeField(blank=True, db_index=True, null=True, verbose_name='Date modified'),
+        ),
+        migrations.AlterField(
+            model_name='directassessmentcontextresult',
+            name='dateModified',
+            field=models.DateTimeField(blank=True, db_index=True, null=True, verbose_name='Date modified'),
+        ),
+        migrations.AlterField(
+            model_name='directassessmentdocumentresult',
+            name='dateModified',
+            field=models.DateTimeField(blank=True, db_index=True, null=True, verbose_name='Date modified'),
+        ),
+        migrations.AlterField(
+            model_name='directassessmentresult',
+            name='dateModified',
+            field=models.DateTimeField(blank=True, db_index=True, null=True, verbose_name='Date modified'),
+        ),
+        migrations.AlterField(
+            model_name='multimodalassessmentresult',
+            name='dateModified',
+            field=models.DateTimeField(blank=True, db_index=True, null=True, verbose_name='Date modified'),
+        ),
+        migrations.AlterField(
+            model_name='pairwiseassessmentdocumentresult',
+            name='dateModified',
+            field=models.DateTimeField(blank=True, db_index=True, null=True, verbose_name='Date modified'),
+        ),
+        migrations.AlterField(
+            model_name='pairwiseassessmentresult',
+            name='dateModified',
+            field=models.DateTimeField(blank=True, db_index=True, null=True, verbose_name='Date modified'),
+        ),
+    ]
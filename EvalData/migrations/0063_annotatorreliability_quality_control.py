@@ -0,0 +1,50 @@
+# Generated by Django 4.1 on 2026-10-18 08:03
+
+from django.db import migrations, models
+
+
+def mark_reliabilities_stale(apps, schema_editor):
+    """Marks existing statistics as stale, so they are rebuilt on access."""
+    AnnotatorReliability = apps.get_model('EvalData', 'AnnotatorReliability')
+    AnnotatorReliability.objects.update(stale=True, dirty=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('EvalData', '0062_result_date_modified_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='annotatorreliability',
+            name='items',
+            field=models.PositiveIntegerField(default=0, verbose_name='Items'),
+        ),
+        migrations.AddField(
+            model_name='annotatorreliability',
+            name='qcItems',
+            field=models.PositiveIntegerField(default=0, verbose_name='Quality control items'),
+        ),
+        migrations.AddField(
+            model_name='annotatorreliability',
+            name='qcKeyScores',
+            field=models.TextField(default='{}', verbose_name='Quality control scores per key'),
+        ),
+        migrations.AddField(
+            model_name='annotatorreliability',
+            name='qcResults',
+            field=models.PositiveIntegerField(default=0, verbose_name='Quality control results'),
+        ),
+        migrations.AddField(
+            model_name='annotatorreliability',
+            name='qcScoreSquaresSum',
+            field=models.FloatField(default=0, verbose_name='Quality control sum of squared scores'),
+        ),
+        migrations.AddField(
+            model_name='annotatorreliability',
+            name='qcScoreSum',
+            field=models.FloatField(default=0, verbose_name='Quality control sum of scores'),
+        ),
+        migrations.RunPython(mark_reliabilities_stale, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,76 @@
+# Generated by Django 4.1 on 2026-10-18 09:10
+
+from django.db import migrations
+
+
+def merge_duplicate_objectids(apps, schema_editor):
+    """
+    Merges legacy ObjectID rows which 0057_objectid_type_codes left without
+    integer object type and ID, as another row already used these values.
+    Agenda tasks referencing a duplicate are repointed to the surviving row,
+    then duplicates are deleted.
+    """
+    ContentType = apps.get_model('contenttypes', 'ContentType')
+    ObjectID = apps.get_model('EvalData', 'ObjectID')
+    TaskAgenda = apps.get_model('EvalData', 'TaskAgenda')
+
+    content_types = {}
+    for app_label in ('Campaign', 'EvalData'):
+        for model in apps.get_app_config(app_label).get_models():
+            content_type = ContentType.objects.filter(
+                app_label=app_label, model=model._meta.model_name
+            ).first()
+            if content_type is not None:
+                content_types[model.__name__] = content_type
+
+    # Maps duplicate ObjectID ids to ids of surviving rows
+    duplicates = {}
+    legacy_rows = ObjectID.objects.filter(objectType__isnull=True).order_by('id')
+    for serialized in legacy_rows.iterator():
+        content_type = content_types.get(serialized.typeName)
+        if content_type is None or not serialized.primaryID.isdigit():
+            continue
+
+        survivor = (
+            ObjectID.objects.filter(
+                objectType=content_type, objectID=int(serialized.primaryID)
+            )
+            .values_list('id', flat=True)
+            .first()
+        )
+        if survivor is None:
+            serialized.objectType = content_type
+            serialized.objectID = int(serialized.primaryID)
+            serialized.save(update_fields=['objectType', 'objectID'])
+        else:
+            duplicates[serialized.id] = survivor
+
+    if not duplicates:
+        return
+
+    for field_name in ('_open_tasks', '_completed_tasks'):
+        through = TaskAgenda._meta.get_field(field_name).remote_field.through
+        references = through.objects.filter(objectid_id__in=list(duplicates))
+        for reference in references.order_by('id'):
+            survivor = duplicates[reference.objectid_id]
+            exists = through.objects.filter(
+                taskagenda_id=reference.taskagenda_id, objectid_id=survivor
+            ).exists()
+            if exists:
+                reference.delete()
+            else:
+                reference.objectid_id = survivor
+                reference.save()
+
+    ObjectID.objects.filter(id__in=list(duplicates)).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('EvalData', '0063_annotatorreliability_quality_control'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_objectids, migrations.RunPython.noop),
+    ]
@@ -3,6 +3,8 @@ Appraise evaluation framework
 
 See LICENSE for usage details
 """
+from .annotation_statistics import *
+from .annotator_reliability import *
 from .base_models import *
 from .data_assessment import *
 from .direct_assessment import *
@@ -12,6 +14,8 @@ from .multi_modal_assessment import *
 from .pairwise_assessment import *
 from .pairwise_assessment_document import *
 from .task_agenda import *
+from .task_capacity import *
+from .task_progress import *
 
 # Task definitions: user-friendly name, task class, task result class, URL name
 TASK_DEFINITIONS = (
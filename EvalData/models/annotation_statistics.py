@@ -0,0 +1,254 @@
+"""
+Appraise evaluation framework
+
+See LICENSE for usage details
+"""
+# pylint: disable=C0103,C0330,no-member
+from django.contrib.auth.models import User
+from django.db import models
+from django.db import transaction
+from django.utils.translation import gettext_lazy as _
+
+from Appraise.utils import _compute_user_total_annotation_time
+from EvalData.models.base_models import MAX_TYPENAME_LENGTH
+
+# Number of TGT items which need to be annotated to complete a HIT
+HIT_COMPLETION_THRESHOLD = 70
+
+
+class AnnotationStatistics(models.Model):
+    """
+    Materialized annotation statistics for a user and result type.
+
+    Statistics are updated incrementally whenever a result starts or stops
+    counting as completed annotation. Annotation time can only be extended
+    for results appended in chronological order; otherwise, the row is
+    marked as stale and recomputed from results on next access.
+    """
+
+    user = models.ForeignKey(User, models.CASCADE, verbose_name=_('User'))
+
+    resultType = models.CharField(
+        max_length=MAX_TYPENAME_LENGTH, verbose_name=_('Result type')
+    )
+
+    completedItems = models.PositiveIntegerField(
+        default=0, verbose_name=_('Completed items')
+    )
+
+    hits = models.PositiveIntegerField(default=0, verbose_name=_('Completed HITs'))
+
+    totalHits = models.PositiveIntegerField(default=0, verbose_name=_('Total HITs'))
+
+    annotationSeconds = models.FloatField(
+        default=0, verbose_name=_('Annotation time (seconds)')
+    )
+
+    lastStartTime = models.FloatField(
+        blank=True, null=True, verbose_name=_('Last start time')
+    )
+
+    lastEndTime = models.FloatField(
+        blank=True, null=True, verbose_name=_('Last end time')
+    )
+
+    stale = models.BooleanField(default=False, verbose_name=_('Stale?'))
+
+    dateModified = models.DateTimeField(auto_now=True, verbose_name=_('Date modified'))
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'resultType'],
+                name='unique_annotation_statistics_for_user',
+            )
+        ]
+
+    @staticmethod
+    def _get_result_types():
+        from EvalData.models import RESULT_TYPES
+
+        return RESULT_TYPES
+
+    @classmethod
+    def get_for_user(cls, user):
+        """
+        Returns dict mapping result type names to statistics for the user.
+
+        Missing or stale statistics are rebuilt from results, so that up-
+        to-date statistics are read with a single query.
+        """
+        statistics = {x.resultType: x for x in cls.objects.filter(user=user)}
+
+        for result_cls in cls._get_result_types():
+            _stats = statistics.get(result_cls.__name__)
+            if _stats is None or _stats.stale:
+                statistics[result_cls.__name__] = cls.rebuild_for_user(
+                    user, result_cls
+                )
+
+        return statistics
+
+    @classmethod
+    def rebuild_for_user(cls, user, result_cls):
+        """
+        Recomputes statistics for the given user and result type.
+        """
+        results = result_cls.objects.filter(
+            createdBy=user, activated=False, completed=True
+        )
+
+        completed_items = results.values_list('item__id').distinct().count()
+
+        hits = results.filter(item__itemType__iexact='TGT').values('task_id')
+        hits = hits.annotate(_count=models.Count('id')).values_list('_count', flat=True)
+        hits = list(hits)
+        completed_hits = len([x for x in hits if x >= HIT_COMPLETION_THRESHOLD])
+
+        # Timestamps are sorted by start time, keeping query order for ties
+        timestamps = list(results.values_list('start_time', 'end_time'))
+        last_start_time, last_end_time = None, None
+        if timestamps:
+            last_start_time, last_end_time = sorted(timestamps, key=lambda x: x[0])[-1]
+
+        if result_cls.INCREMENTAL_ANNOTATION_TIME:
+            annotation_seconds = _compute_user_total_annotation_time(timestamps)
+        else:
+            annotation_seconds = result_cls.get_time_for_user(user).total_seconds()
+
+        statistics, _ = cls.objects.update_or_create(
+            user=user,
+            resultType=result_cls.__name__,
+            defaults={
+                'completedItems': completed_items,
+                'hits': completed_hits,
+                'totalHits': len(hits),
+                'annotationSeconds': annotation_seconds,
+                'lastStartTime': last_start_time,
+                'lastEndTime': last_end_time,
+                'stale': False,
+            },
+        )
+        return statistics
+
+    @classmethod
+    def rebuild(cls):
+        """
+        Recomputes statistics for all users with results.
+
+        Returns the number of statistics rows rebuilt.
+        """
+        cls.objects.all().delete()
+
+        rebuilt = 0
+        for result_cls in cls._get_result_types():
+            user_ids = result_cls.objects.values_list('createdBy', flat=True)
+            for user in User.objects.filter(id__in=user_ids.distinct()):
+                cls.rebuild_for_user(user, result_cls)
+                rebuilt += 1
+
+        return rebuilt
+
+    @classmethod
+    def invalidate(cls, user_ids, result_cls):
+        """
+        Marks statistics for the given users and result type as stale.
+        """
+        cls.objects.filter(
+            user_id__in=user_ids, resultType=result_cls.__name__
+        ).update(stale=True)
+
+    @classmethod
+    def get_result_delta(cls, result, counted, user_id):
+        """
+        Returns changes of completed items, total HITs and HITs of the given
+        user after the given result started (counted=True) or stopped
+        counting as completed annotation.
+
+        Should be called in the transaction which saves the result, so that
+        other results are counted as of that result. Returns None for users
+        without up-to-date statistics, they are rebuilt on access.
+        """
+        result_cls = result.__class__
+        statistics = cls.objects.filter(
+            user_id=user_id, resultType=result_cls.__name__, stale=False
+        )
+        if not statistics.exists():
+            return None
+
+        delta = 1 if counted else -1
+        completed_items, total_hits, hits = 0, 0, 0
+        results = result_cls.objects.filter(
+            createdBy_id=user_id, activated=False, completed=True
+        ).exclude(id=result.id)
+
+        if not results.filter(item_id=result.item_id).exists():
+            completed_items = delta
+
+        if result.item.itemType.lower() == 'tgt':
+            # Number of TGT results in this HIT, including this result
+            annotated = results.filter(
+                task_id=result.task_id, item__itemType__iexact='TGT'
+            ).count()
+            if counted:
+                annotated += 1
+
+            if annotated == (1 if counted else 0):
+                total_hits = delta
+            if annotated == HIT_COMPLETION_THRESHOLD - (0 if counted else 1):
+                hits = delta
+
+        return (completed_items, total_hits, hits)
+
+    @classmethod
+    def update_for_result(cls, result, counted, user_id, delta):
+        """
+        Applies the delta returned by get_result_delta() to statistics of
+        the given user, and updates annotation time for the given result.
+        """
+        if delta is None:
+            return
+
+        with transaction.atomic():
+            statistics = (
+                cls.objects.select_for_update()
+                .filter(user_id=user_id, resultType=result.__class__.__name__)
+                .first()
+            )
+            if statistics is None or statistics.stale:
+                return
+
+            statistics.completedItems += delta[0]
+            statistics.totalHits += delta[1]
+            statistics.hits += delta[2]
+            statistics._update_annotation_time(result, counted)
+            statistics.save()
+
+    def _update_annotation_time(self, result, counted):
+        """
+        Extends annotation time for results appended in chronological order,
+        marks statistics as stale otherwise.
+        """
+        appended = self.lastStartTime is None or result.start_time > self.lastStartTime
+        if not counted or not appended or not result.INCREMENTAL_ANNOTATION_TIME:
+            self.stale = True
+            return
+
+        start_time = result.start_time
+        if self.lastEndTime is not None and start_time < self.lastEndTime:
+            start_time = self.lastEndTime
+
+        self.annotationSeconds += _compute_user_total_annotation_time(
+            [(start_time, result.end_time)]
+        )
+        self.lastStartTime = result.start_time
+        self.lastEndTime = result.end_time
+
+    def __str__(self):
+        return '{0}/{1}[{2}:{3}/{4}]'.format(
+            self.user.username,
+            self.resultType,
+            self.completedItems,
+            self.hits,
+            self.totalHits,
+        )
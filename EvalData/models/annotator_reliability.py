@@ -0,0 +1,452 @@
+"""
+Appraise evaluation framework
+
+See LICENSE for usage details
+"""
+# pylint: disable=C0103,C0330,no-member
+import json
+from math import sqrt
+
+from django.contrib.auth.models import User
+from django.db import models
+from django.db import transaction
+from django.utils.translation import gettext_lazy as _
+
+from EvalData.models.base_models import MAX_TYPENAME_LENGTH
+
+# Contrastive results use different field names for target segments/scores
+PAIRWISE_RESULT_TYPES = (
+    'PairwiseAssessmentDocumentResult',
+    'PairwiseAssessmentResult',
+)
+
+# Document scores are not used to assess reliability in document-level tasks
+DOCUMENT_RESULT_TYPES = (
+    'DirectAssessmentDocumentResult',
+    'PairwiseAssessmentDocumentResult',
+)
+
+
+def _get_campaign_options(campaign):
+    return (campaign.campaignOptions or '').lower().split(';')
+
+
+def _get_reliability_fields(result_type, campaign_opts):
+    """
+    Returns result fields needed to compute reliability statistics.
+    """
+    _fields = ['start_time', 'end_time', 'item_id', 'item__itemID', 'item__itemType']
+    if result_type in PAIRWISE_RESULT_TYPES:
+        _fields += ['score1', 'item__target1ID']
+    else:
+        _fields += ['score', 'item__targetID']
+        if 'mqm' in campaign_opts:
+            _fields.append('mqm')
+
+    if result_type in DOCUMENT_RESULT_TYPES:
+        _fields.append('item__isCompleteDocument')
+
+    return _fields
+
+
+def _add_key_score(key_scores, key, item_type, score):
+    """
+    Adds score of a TGT or BAD item to the sums and counts for the key.
+    """
+    if item_type == 'TGT':
+        _offset = 0
+    elif item_type == 'BAD' or item_type.startswith('BAD.'):
+        # ESA/MQM have extra payload in itemType
+        _offset = 2
+    else:
+        return
+
+    _sums = key_scores.setdefault(key, [0, 0, 0, 0])
+    _sums[_offset] += score
+    _sums[_offset + 1] += 1
+
+
+def _compute_pvalue(statistics):
+    """
+    Runs the Mann-Whitney U test on average z-scores of BAD and TGT items
+    with matching keys, combining the given statistics. These are tuples
+    of number of results and items, sum of scores and squared scores, and
+    scores per key.
+
+    Returns p-value, or None, and the number of (BAD, TGT) pairs.
+    """
+    results, items, score_sum, squares_sum = 0, 0, 0, 0
+    key_scores = {}
+    for _results, _items, _score_sum, _squares_sum, _key_scores in statistics:
+        results += _results
+        items += _items
+        score_sum += _score_sum
+        squares_sum += _squares_sum
+        for key, sums in _key_scores.items():
+            _sums = key_scores.setdefault(key, [0, 0, 0, 0])
+            for index, value in enumerate(sums):
+                _sums[index] += value
+
+    # Mean and standard deviation are corrected by the number of annotated
+    # items, not results, matching campaign_status and run_quality_control
+    _user_mean = score_sum / (items or 1)
+    _cs = items - 1  # Corrected sample size for stdev.
+    _user_stdev = 1
+    if _cs > 0:
+        _deviations = squares_sum - 2 * _user_mean * score_sum
+        _deviations += results * _user_mean**2
+        _user_stdev = sqrt(max(_deviations, 0) / _cs)
+
+    if int(_user_stdev) == 0:
+        _user_stdev = 1
+
+    # Average z-score of a key is the z-score of its average score
+    _x = []
+    _y = []
+    for tgt_sum, tgt_count, bad_sum, bad_count in key_scores.values():
+        if tgt_count and bad_count:
+            _x.append((bad_sum / bad_count - _user_mean) / _user_stdev)
+            _y.append((tgt_sum / tgt_count - _user_mean) / _user_stdev)
+
+    pvalue = None
+    if _x and _y:
+        try:
+            from scipy.stats import mannwhitneyu  # type: ignore
+
+            _t, pvalue = mannwhitneyu(_x, _y, alternative='less')
+
+        # Possible for mannwhitneyu() to throw in some scenarios
+        except ValueError:
+            pass
+
+    return pvalue, len(_x)
+
+
+class AnnotatorReliability(models.Model):
+    """
+    Sufficient statistics for reliability of a user in a campaign.
+
+    Keeps number of results and items, sum and sum of squares of scores,
+    and sums and counts of TGT and BAD scores per key, so that the
+    Mann-Whitney U test on BAD and TGT z-scores does not need to scan
+    results. Statistics are extended when results are created; the
+    p-value is recomputed lazily once they are dirty. If existing results
+    change, the row is marked as stale and recomputed from results on next
+    access.
+
+    The campaign status page and quality control use different scores and
+    keys, so separate statistics are kept for quality control.
+    """
+
+    user = models.ForeignKey(User, models.CASCADE, verbose_name=_('User'))
+
+    campaign = models.ForeignKey(
+        'Campaign.Campaign', models.CASCADE, verbose_name=_('Campaign')
+    )
+
+    resultType = models.CharField(
+        max_length=MAX_TYPENAME_LENGTH, verbose_name=_('Result type')
+    )
+
+    results = models.PositiveIntegerField(default=0, verbose_name=_('Results'))
+
+    items = models.PositiveIntegerField(default=0, verbose_name=_('Items'))
+
+    scoreSum = models.FloatField(default=0, verbose_name=_('Sum of scores'))
+
+    scoreSquaresSum = models.FloatField(
+        default=0, verbose_name=_('Sum of squared scores')
+    )
+
+    annotationSeconds = models.FloatField(
+        default=0, verbose_name=_('Annotation time (seconds)')
+    )
+
+    # JSON object mapping keys to [TGT sum, TGT count, BAD sum, BAD count]
+    keyScores = models.TextField(default='{}', verbose_name=_('Scores per key'))
+
+    qcResults = models.PositiveIntegerField(
+        default=0, verbose_name=_('Quality control results')
+    )
+
+    qcItems = models.PositiveIntegerField(
+        default=0, verbose_name=_('Quality control items')
+    )
+
+    qcScoreSum = models.FloatField(
+        default=0, verbose_name=_('Quality control sum of scores')
+    )
+
+    qcScoreSquaresSum = models.FloatField(
+        default=0, verbose_name=_('Quality control sum of squared scores')
+    )
+
+    qcKeyScores = models.TextField(
+        default='{}', verbose_name=_('Quality control scores per key')
+    )
+
+    pValue = models.FloatField(blank=True, null=True, verbose_name=_('p-value'))
+
+    dirty = models.BooleanField(default=True, verbose_name=_('Dirty?'))
+
+    stale = models.BooleanField(default=False, verbose_name=_('Stale?'))
+
+    dateModified = models.DateTimeField(auto_now=True, verbose_name=_('Date modified'))
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'campaign'],
+                name='unique_annotator_reliability',
+            )
+        ]
+        verbose_name_plural = 'Annotator reliabilities'
+
+    @classmethod
+    def get_reliabilities(cls, result_cls, user_ids, campaigns):
+        """
+        Returns dict mapping (user ID, campaign ID) pairs to reliability
+        statistics for the given users and campaigns.
+
+        Missing or stale statistics are rebuilt from results.
+        """
+        reliabilities = {
+            (x.user_id, x.campaign_id): x
+            for x in cls.objects.filter(
+                user_id__in=user_ids,
+                campaign__in=campaigns,
+                resultType=result_cls.__name__,
+            )
+        }
+
+        for campaign in campaigns:
+            for user_id in user_ids:
+                _reliability = reliabilities.get((user_id, campaign.id))
+                if _reliability is None or _reliability.stale:
+                    reliabilities[(user_id, campaign.id)] = cls.rebuild_for_user(
+                        user_id, campaign, result_cls
+                    )
+
+        return reliabilities
+
+    @staticmethod
+    def get_quality_control_pvalue(reliabilities):
+        """
+        Returns p-value of the reliability test used for quality control,
+        or None, and the number of (BAD, TGT) pairs, combining statistics
+        of the given reliabilities.
+        """
+        return _compute_pvalue(
+            x._get_quality_control_statistics() for x in reliabilities
+        )
+
+    @classmethod
+    def rebuild_for_user(cls, user_id, campaign, result_cls):
+        """
+        Recomputes statistics for the given user, campaign and result type.
+        """
+        campaign_opts = _get_campaign_options(campaign)
+        _fields = _get_reliability_fields(result_cls.__name__, campaign_opts)
+
+        reliability = cls(
+            user_id=user_id, campaign=campaign, resultType=result_cls.__name__
+        )
+        results = result_cls.objects.filter(
+            createdBy_id=user_id, completed=True, task__campaign=campaign.id
+        )
+        key_scores = {}
+        qc_key_scores = {}
+        item_ids = set()
+        for values in results.order_by().values(*_fields).iterator():
+            new_item = values['item_id'] not in item_ids
+            item_ids.add(values['item_id'])
+            reliability._add_result(
+                key_scores, qc_key_scores, campaign_opts, values, new_item
+            )
+
+        reliability, _ = cls.objects.update_or_create(
+            user_id=user_id,
+            campaign=campaign,
+            defaults={
+                'resultType': result_cls.__name__,
+                'results': reliability.results,
+                'items': reliability.items,
+                'scoreSum': reliability.scoreSum,
+                'scoreSquaresSum': reliability.scoreSquaresSum,
+                'annotationSeconds': reliability.annotationSeconds,
+                'keyScores': json.dumps(key_scores),
+                'qcResults': reliability.qcResults,
+                'qcItems': reliability.qcItems,
+                'qcScoreSum': reliability.qcScoreSum,
+                'qcScoreSquaresSum': reliability.qcScoreSquaresSum,
+                'qcKeyScores': json.dumps(qc_key_scores),
+                'pValue': None,
+                'dirty': True,
+                'stale': False,
+            },
+        )
+        return reliability
+
+    @classmethod
+    def rebuild(cls):
+        """
+        Drops all statistics, they are recomputed on next access.
+
+        Returns the number of statistics rows dropped.
+        """
+        deleted, _ = cls.objects.all().delete()
+        return deleted
+
+    @classmethod
+    def update_for_result(cls, result, created, user_ids):
+        """
+        Updates statistics after the given result has been saved.
+
+        New completed results are added to existing statistics of their
+        user. Otherwise, statistics of the given users are marked as stale.
+        """
+        campaign_id = result.task.campaign_id
+        if not created:
+            cls.objects.filter(
+                user_id__in=[x for x in user_ids if x], campaign_id=campaign_id
+            ).update(stale=True, dirty=True)
+            return
+
+        if not result.completed:
+            return
+
+        with transaction.atomic():
+            reliability = (
+                cls.objects.select_for_update()
+                .select_related('campaign')
+                .filter(user_id=result.createdBy_id, campaign_id=campaign_id)
+                .first()
+            )
+            if reliability is None or reliability.stale:
+                return
+
+            campaign_opts = _get_campaign_options(reliability.campaign)
+            _fields = _get_reliability_fields(reliability.resultType, campaign_opts)
+
+            values = {}
+            for _field in _fields:
+                value = result
+                for _name in _field.split('__'):
+                    value = getattr(value, _name)
+                values[_field] = value
+
+            new_item = not (
+                result.__class__.objects.filter(
+                    createdBy_id=result.createdBy_id,
+                    completed=True,
+                    item_id=result.item_id,
+                    task__campaign=campaign_id,
+                )
+                .exclude(id=result.id)
+                .exists()
+            )
+
+            key_scores = reliability.get_key_scores()
+            qc_key_scores = json.loads(reliability.qcKeyScores)
+            reliability._add_result(
+                key_scores, qc_key_scores, campaign_opts, values, new_item
+            )
+            reliability.keyScores = json.dumps(key_scores)
+            reliability.qcKeyScores = json.dumps(qc_key_scores)
+            reliability.dirty = True
+            reliability.save()
+
+    def _add_result(self, key_scores, qc_key_scores, campaign_opts, values, new_item):
+        """
+        Adds values of a completed result to the statistics. The new_item
+        flag is set for the first result of the user for an item.
+        """
+        self.annotationSeconds += values['end_time'] - values['start_time']
+
+        if self.resultType in PAIRWISE_RESULT_TYPES:
+            score = values['score1']
+            target_id = values['item__target1ID']
+        else:
+            score = values['score']
+            target_id = values['item__targetID']
+        item_id = values['item__itemID']
+        item_type = values['item__itemType']
+
+        # Quality control uses all scores, see run_quality_control
+        self.qcResults += 1
+        self.qcItems += new_item
+        self.qcScoreSum += score
+        self.qcScoreSquaresSum += score**2
+        _add_key_score(qc_key_scores, f'{item_id}-{target_id}', item_type, score)
+
+        # Exclude document scores in document-level tasks, see campaign_status
+        if values.get('item__isCompleteDocument'):
+            return
+
+        if 'mqm' in campaign_opts and self.resultType not in PAIRWISE_RESULT_TYPES:
+            score = -len(json.loads(values['mqm']))
+
+        self.results += 1
+        self.items += new_item
+        self.scoreSum += score
+        self.scoreSquaresSum += score**2
+
+        # Script generating batches for data assessment task does not
+        # keep equal itemIDs for respective TGT and BAD items, so it
+        # cannot be used as a key.
+        if self.resultType == 'DataAssessmentResult':
+            _key = f'{target_id}'
+        else:
+            _key = f'{item_id}-{target_id}'
+        # Hotfix: remove #bad from key for ESA campaigns
+        if 'esa' in campaign_opts and '#bad' in _key:
+            _key = _key.replace('#bad', '')
+
+        _add_key_score(key_scores, _key, item_type, score)
+
+    def _get_statistics(self):
+        """
+        Returns statistics used for the campaign status page.
+        """
+        return (
+            self.results,
+            self.items,
+            self.scoreSum,
+            self.scoreSquaresSum,
+            self.get_key_scores(),
+        )
+
+    def _get_quality_control_statistics(self):
+        """
+        Returns statistics used for quality control.
+        """
+        return (
+            self.qcResults,
+            self.qcItems,
+            self.qcScoreSum,
+            self.qcScoreSquaresSum,
+            json.loads(self.qcKeyScores),
+        )
+
+    def get_key_scores(self):
+        """
+        Returns dict mapping keys to TGT and BAD score sums and counts.
+        """
+        return json.loads(self.keyScores)
+
+    def get_pvalue(self):
+        """
+        Returns p-value of the reliability test, or None if it cannot be
+        computed. The p-value is only recomputed if statistics are dirty.
+        """
+        if self.dirty:
+            self.pValue, _ = _compute_pvalue([self._get_statistics()])
+            self.dirty = False
+            self.save(update_fields=['pValue', 'dirty', 'dateModified'])
+
+        return self.pValue
+
+    def __str__(self):
+        return '{0}/{1}[{2}:{3}]'.format(
+            self.user_id, self.campaign_id, self.results, self.pValue
+        )
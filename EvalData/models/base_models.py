@@ -4,23 +4,35 @@ Appraise evaluation framework
 See LICENSE for usage details
 """
 # pylint: disable=C0103,C0330,no-member
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+import csv
 from datetime import timezone
 
 utc = timezone.utc
 from datetime import datetime
 from datetime import timedelta
 from difflib import SequenceMatcher
-from traceback import format_exc
-from typing import Set
+from functools import partial
+import gzip
+from typing import Dict
+from typing import Type
 
+from django.apps import apps
 from django.contrib.auth.models import User
+from django.contrib.contenttypes.models import ContentType
 from django.core.exceptions import ValidationError
 from django.db import models
+from django.db import transaction
+from django.db.models.functions import Coalesce
 from django.utils.html import escape
 from django.utils.text import format_lazy as f
 from django.utils.translation import gettext_lazy as _
 
+from Appraise.utils import _compute_total_annotation_times
 from Appraise.utils import _get_logger
+from Dashboard.cache import invalidate_dashboards
 
 # TODO: Unclear if these are needed?
 # from Appraise.settings import STATIC_URL, BASE_CONTEXT
@@ -36,6 +48,7 @@ MAX_ITEMTYPE_LENGTH = 5
 MAX_REQUIREDANNOTATIONS_VALUE = 50
 MAX_TYPENAME_LENGTH = 100
 MAX_PRIMARYID_LENGTH = 50
+MAX_FREE_TASK_CANDIDATES = 10  # Free tasks read at a time when assigning
 
 SET_ITEMTYPE_CHOICES = (
     ('SRC', 'Source text'),
@@ -45,8 +58,100 @@ SET_ITEMTYPE_CHOICES = (
     ('CHK', 'Redundant check'),
 )
 
+# Number of result rows fetched per database round trip when exporting
+EXPORT_CHUNK_SIZE = 2000
+
+# Columns exported for annotation results, as (header, field) pairs. Fields
+# are values_list() lookups, or None for annotator and duration columns.
+RESULT_EXPORT_COLUMNS = (
+    ('taskID', 'task__id'),
+    ('systemID', 'item__targetID'),
+    ('username', None),
+    ('email', None),
+    ('groups', None),
+    ('segmentID', 'item__itemID'),
+    ('score', 'score'),
+    ('startTime', 'start_time'),
+    ('endTime', 'end_time'),
+    ('durationInSeconds', None),
+    ('itemType', 'item__itemType'),
+    ('campaignName', 'task__campaign__campaignName'),
+)
+
+# Columns exported for contrastive annotation results
+PAIRWISE_EXPORT_COLUMNS = (
+    ('taskID', 'task__id'),
+    ('segmentID', 'item__itemID'),
+    ('username', None),
+    ('email', None),
+    ('groups', None),
+    ('system1ID', 'item__target1ID'),
+    ('score1', 'score1'),
+    ('system2ID', 'item__target2ID'),
+    ('score2', 'score2'),
+    ('startTime', 'start_time'),
+    ('endTime', 'end_time'),
+    ('durationInSeconds', None),
+    ('itemType', 'item__itemType'),
+    ('campaignName', 'task__campaign__campaignName'),
+)
+
+# Columns exported for results of document-level tasks
+DOCUMENT_EXPORT_COLUMNS = (
+    ('documentID', 'item__documentID'),
+    ('isCompleteDocument', 'item__isCompleteDocument'),
+)
+
+# Fields of get_csv() rows for annotation results, as values_list() lookups,
+# or None for the duration column, and matching write_csv() header
+RESULT_CSV_FIELDS = (
+    'item__targetID',
+    'createdBy__username',
+    'createdBy__email',
+    'item__itemID',
+    'score',
+    None,
+    'item__itemType',
+)
+RESULT_CSV_HEADER = 'username,email,segmentID,score,durationInSeconds,itemType'
+
+# Fields of get_csv() rows for contrastive annotation results
+PAIRWISE_CSV_FIELDS = (
+    'item__itemID',
+    'createdBy__username',
+    'createdBy__email',
+    'item__target1ID',
+    'score1',
+    'item__target2ID',
+    'score2',
+    None,
+    'item__itemType',
+)
+PAIRWISE_CSV_HEADER = (
+    'username,email,segmentID,score1,score2,durationInSeconds,itemType'
+)
+
+# Fields of get_csv() rows for results of document-level tasks
+DOCUMENT_CSV_FIELDS = ('item__documentID', 'item__isCompleteDocument')
+DOCUMENT_CSV_HEADER = ',documentID,isCompleteDocument'
+
 LOGGER = _get_logger(name=__name__)
 
+# Maps (typeName, id) to object instances resolved during current request
+_OBJECT_IDENTITY_MAP = ContextVar('object_identity_map', default=None)
+
+
+@contextmanager
+def object_identity_map():
+    """
+    Context manager sharing resolved ObjectID instances within its scope.
+    """
+    token = _OBJECT_IDENTITY_MAP.set({})
+    try:
+        yield
+    finally:
+        _OBJECT_IDENTITY_MAP.reset(token)
+
 
 def seconds_to_timedelta(value):
     """
@@ -62,6 +167,10 @@ def seconds_to_timedelta(value):
 class ObjectID(models.Model):
     """
     Encodes an object type and ID for retrieval.
+
+    Objects are identified by their content type and integer primary key,
+    using a composite unique index. The typeName and primaryID strings are
+    kept for compatibility with existing code and data.
     """
 
     typeName = models.CharField(
@@ -78,38 +187,148 @@ class ObjectID(models.Model):
         help_text=_(f('(max. {value} characters)', value=MAX_PRIMARYID_LENGTH)),
     )
 
+    objectType = models.ForeignKey(
+        ContentType,
+        models.PROTECT,
+        blank=True,
+        null=True,
+        editable=False,
+        verbose_name=_('Object type'),
+    )
+
+    objectID = models.PositiveIntegerField(
+        blank=True, null=True, editable=False, verbose_name=_('Object ID')
+    )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['objectType', 'objectID'], name='unique_object_type_and_id'
+            )
+        ]
+
+    @staticmethod
+    def _get_model_for_type(type_name):
+        """
+        Returns model class for the given type name, or None if unknown.
+        """
+        model = AnnotationTaskRegistry.get_type(type_name)
+        for app_label in ('EvalData', 'Campaign'):
+            if model is not None:
+                break
+            try:
+                model = apps.get_model(app_label, type_name)
+            except LookupError:
+                model = None
+        return model
+
+    @classmethod
+    def get_or_create_for_instance(cls, instance):
+        """
+        Returns ObjectID instance for the given model instance, creating
+        it if needed. Uses the (objectType, objectID) index for lookup.
+        """
+        content_type = ContentType.objects.get_for_model(instance.__class__)
+        serialized, created = cls.objects.get_or_create(
+            objectType=content_type,
+            objectID=instance.id,
+            defaults={
+                'typeName': instance.__class__.__name__,
+                'primaryID': str(instance.id),
+            },
+        )
+        if created:
+            _msg = 'Created serialized ObjectID:{0}'.format(serialized.id)
+            LOGGER.info(_msg)
+
+        return serialized
+
+    def get_model_and_id(self):
+        """
+        Returns tuple (model, id) for current ObjectID instance, with None
+        values for parts which cannot be resolved.
+        """
+        if self.objectType_id is not None:
+            content_type = ContentType.objects.get_for_id(self.objectType_id)
+            return (content_type.model_class(), self.objectID)
+
+        model = self._get_model_for_type(self.typeName)
+        object_id = None
+        if str(self.primaryID).isdigit():
+            object_id = int(self.primaryID)
+        return (model, object_id)
+
     def get_object_instance(self):
         """
         Returns actual object instance for current ObjectID instance.
         """
-        instance = None
-        try:
-            # TODO: add registry of type names to models.py and ensure only
-            #   those are used for typeName. Furthermore, verify that the
-            #   given primaryID does not contain ')'.
-
-            _code = '{0}.objects.get(id={1})'.format(self.typeName, self.primaryID)
-
-            # TODO: Hack
-            from EvalData.models import (
-                DataAssessmentTask,
-                DirectAssessmentTask,
-                DirectAssessmentContextTask,
-                DirectAssessmentDocumentTask,
-                MultiModalAssessmentTask,
-                PairwiseAssessmentDocumentTask,
-                PairwiseAssessmentTask,
-            )
+        return ObjectID.resolve_many([self])[0]
 
-            instance = eval(_code)
+    @classmethod
+    def resolve_many(cls, object_ids):
+        """
+        Returns object instances for the given ObjectID instances.
+
+        Uses a single query per object type. Results are returned in input
+        order, with None for objects which cannot be resolved. Instances
+        already loaded during the current request are reused.
+        """
+        object_ids = list(object_ids)
+        identity_map = _OBJECT_IDENTITY_MAP.get()
+        if identity_map is None:
+            identity_map = {}
+
+        keys = []
+        missing = defaultdict(set)
+        for object_id in object_ids:
+            key = object_id.get_model_and_id()
+            if None in key:
+                key = None
+            elif key not in identity_map:
+                missing[key[0]].add(key[1])
+            keys.append(key)
+
+        for model, ids in missing.items():
+            instances = model.objects.filter(id__in=ids)
+            if AnnotationTaskRegistry.get_type(model.__name__) is model:
+                instances = instances.select_related('campaign')
+
+            for instance in instances:
+                identity_map[(model, instance.id)] = instance
+
+        results = []
+        for object_id, key in zip(object_ids, keys):
+            instance = identity_map.get(key) if key else None
+            if instance is None:
+                _msg = 'ObjectID {0}.{1} invalid'.format(
+                    object_id.typeName, object_id.primaryID
+                )
+                LOGGER.warning(_msg)
+            results.append(instance)
+
+        return results
+
+    def save(self, *args, **kwargs):
+        """
+        Derives integer object type and ID from typeName and primaryID,
+        and vice versa, so that both encodings stay in sync.
+        """
+        if self.objectType_id is None and self.typeName:
+            model = self._get_model_for_type(self.typeName)
+            if model is not None:
+                self.objectType = ContentType.objects.get_for_model(model)
+
+        if self.objectID is None and str(self.primaryID).isdigit():
+            self.objectID = int(self.primaryID)
 
-        except:
-            _msg = 'ObjectID {0}.{1} invalid'.format(self.typeName, self.primaryID)
-            LOGGER.warn(_msg)
-            LOGGER.warn(format_exc())
+        if not self.typeName and self.objectType_id is not None:
+            model = ContentType.objects.get_for_id(self.objectType_id).model_class()
+            self.typeName = model.__name__
 
-        finally:
-            return instance
+        if not self.primaryID and self.objectID is not None:
+            self.primaryID = str(self.objectID)
+
+        super(ObjectID, self).save(*args, **kwargs)
 
     def __str__(self):
         return str(self.id) + '.' + self.typeName + '.' + self.primaryID
@@ -122,7 +341,7 @@ class AnnotationTaskRegistry:
     Use @AnnotationTaskRegistry.register decorator to register class.
     """
 
-    _ANNOTATION_TASK_REGISTRY = set()  # type: Set[str]
+    _ANNOTATION_TASK_REGISTRY = {}  # type: Dict[str, Type[models.Model]]
 
     @staticmethod
     def register(obj):
@@ -130,7 +349,7 @@ class AnnotationTaskRegistry:
         Add annotation task type to registry.
         """
         _name = obj.__name__
-        AnnotationTaskRegistry._ANNOTATION_TASK_REGISTRY.add(_name)
+        AnnotationTaskRegistry._ANNOTATION_TASK_REGISTRY[_name] = obj
         return obj
 
     @staticmethod
@@ -138,7 +357,14 @@ class AnnotationTaskRegistry:
         """
         Get annotation task types in registry.
         """
-        return AnnotationTaskRegistry._ANNOTATION_TASK_REGISTRY
+        return AnnotationTaskRegistry._ANNOTATION_TASK_REGISTRY.keys()
+
+    @staticmethod
+    def get_type(type_name):
+        """
+        Get annotation task class for the given type name, or None.
+        """
+        return AnnotationTaskRegistry._ANNOTATION_TASK_REGISTRY.get(type_name)
 
 
 # pylint: disable=C0103,R0903
@@ -324,15 +550,7 @@ class BaseMetadata(models.Model):
             if self._str_name != _new_name:
                 self._str_name = _new_name
 
-            qs = ObjectID.objects.filter(
-                typeName=self.__class__.__name__, primaryID=self.id
-            )
-            if not qs.exists():
-                _serialized = ObjectID.objects.create(
-                    typeName=self.__class__.__name__, primaryID=self.id
-                )
-                _msg = 'Created serialized ObjectID:{0}'.format(_serialized.id)
-                LOGGER.info(_msg)
+            ObjectID.get_or_create_for_instance(self)
 
         super(BaseMetadata, self).save(*args, **kwargs)
 
@@ -345,7 +563,314 @@ class BaseMetadata(models.Model):
         return self._str_name
 
 
-class BaseAssessmentResult(BaseMetadata):
+class BaseAnnotationResult(BaseMetadata):
+    """
+    Abstract base class for annotation results.
+
+    Keeps the uniqueAnnotations counter of the related task and annotation
+    statistics of the annotator up-to-date when results are created,
+    completed or retired.
+    """
+
+    # Annotation time can be extended by appending single results
+    INCREMENTAL_ANNOTATION_TIME = True
+
+    # Set on every save, so that the latest change is an indexed lookup
+    dateModified = models.DateTimeField(
+        blank=True, db_index=True, null=True, verbose_name=_('Date modified')
+    )
+
+    # Columns written by dump_all_results_to_csv_file()
+    EXPORT_COLUMNS = RESULT_EXPORT_COLUMNS
+    CSV_FIELDS = RESULT_CSV_FIELDS
+    CSV_HEADER = RESULT_CSV_HEADER
+
+    class Meta:
+        abstract = True
+        ordering = ['_str_name']
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super(BaseAnnotationResult, cls).from_db(db, field_names, values)
+        instance._counted = instance._is_counted()
+        instance._loaded_created_by_id = instance.createdBy_id
+        instance._loaded_completed = instance.completed
+        return instance
+
+    def _is_counted(self):
+        """
+        Returns True if result counts towards task's unique annotations.
+        """
+        return not self.activated and self.completed
+
+    @classmethod
+    def get_times_for_users(cls, users):
+        """
+        Returns dict mapping IDs of the given users to their total
+        annotation time, computed from a single query.
+        """
+        user_ids = [user.id for user in users]
+        results = cls.objects.filter(
+            createdBy__in=user_ids, activated=False, completed=True
+        ).values_list('createdBy', 'start_time', 'end_time')
+
+        times = {}
+        if results:
+            times = _compute_total_annotation_times(*zip(*results))
+
+        return {
+            user_id: seconds_to_timedelta(times.get(user_id, 0)) for user_id in user_ids
+        }
+
+    @classmethod
+    def get_time_for_user(cls, user):
+        return cls.get_times_for_users([user])[user.id]
+
+    @staticmethod
+    def _get_export_users(results):
+        """
+        Returns dict mapping IDs of annotators of the given results to their
+        username, email and non-language groups, using two queries.
+        """
+        from Dashboard.models import LANGUAGE_CODES_AND_NAMES
+
+        users = User.objects.filter(id__in=results.values('createdBy'))
+        export_users = {}
+        for user in users.prefetch_related('groups'):
+            usergroups = ';'.join(
+                [
+                    x.name
+                    for x in user.groups.all()
+                    if not x.name in LANGUAGE_CODES_AND_NAMES.keys()
+                ]
+            )
+            export_users[user.id] = (user.username, user.email, usergroups)
+
+        return export_users
+
+    @classmethod
+    def iter_export_rows(
+        cls, results=None, chunk_size=EXPORT_CHUNK_SIZE, add_result_id=False
+    ):
+        """
+        Yields header and rows of EXPORT_COLUMNS for the given results, or
+        all completed results. Rows are streamed from the database in
+        chunks of chunk_size, so memory use does not grow with results.
+        If add_result_id is True, result IDs are appended as last column.
+        """
+        if results is None:
+            results = cls.objects.filter(completed=True)
+
+        columns = cls.EXPORT_COLUMNS
+        if add_result_id:
+            columns += (('resultID', 'id'),)
+
+        export_users = cls._get_export_users(results)
+        value_names = ['createdBy', 'start_time', 'end_time']
+        value_names += [field for _, field in columns if field]
+
+        yield [header for header, _ in columns]
+
+        results = results.order_by('id').values_list(*value_names)
+        for result in results.iterator(chunk_size=chunk_size):
+            username, useremail, usergroups = export_users[result[0]]
+            computed = {
+                'username': username,
+                'email': useremail,
+                'groups': usergroups or 'NoGroupInfo',
+                'durationInSeconds': round(float(result[2]) - float(result[1]), 1),
+            }
+            values = iter(result[3:])
+            yield [
+                str(next(values) if field else computed[header])
+                for header, field in columns
+            ]
+
+    @classmethod
+    def write_results_to_csv_file(
+        cls, file_path, results=None, compress=False, add_result_id=False
+    ):
+        """
+        Writes the given results, or all completed results, to file_path,
+        optionally gzip-compressed. Rows are written as they are read.
+
+        Returns the number of rows written, excluding the header.
+        """
+        rows = cls.iter_export_rows(results, add_result_id=add_result_id)
+        _open = gzip.open if compress else open
+        with _open(file_path, 'wt', newline='') as outfile:
+            writer = csv.writer(outfile, lineterminator='\n')
+            writer.writerow(next(rows))
+            written = 0
+            for row in rows:
+                writer.writerow(row)
+                written += 1
+
+        return written
+
+    @classmethod
+    def dump_all_results_to_csv_file(cls, csv_file, compress=False):
+        """
+        Writes all completed results to csv_file in the media folder,
+        optionally gzip-compressed.
+        """
+        from os.path import join
+        from Appraise.settings import BASE_DIR
+
+        media_file_path = join(BASE_DIR, 'media', csv_file)
+        cls.write_results_to_csv_file(media_file_path, compress=compress)
+
+    @classmethod
+    def iter_csv_rows(cls, srcCode, tgtCode, domain, chunk_size=EXPORT_CHUNK_SIZE):
+        """
+        Yields rows of CSV_FIELDS for completed results in the given market.
+
+        Market filters are applied in the database and annotator username
+        and email are joined in the same query, so that exports scale with
+        the number of results in the market.
+        """
+        results = cls.objects.filter(
+            completed=True,
+            item__metadata__market__sourceLanguageCode=srcCode,
+            item__metadata__market__targetLanguageCode=tgtCode,
+            item__metadata__market__domainName=domain,
+        )
+        value_names = ['start_time', 'end_time']
+        value_names += [field for field in cls.CSV_FIELDS if field]
+
+        results = results.values_list(*value_names)
+        for result in results.iterator(chunk_size=chunk_size):
+            duration = round(float(result[1]) - float(result[0]), 1)
+            values = iter(result[2:])
+            yield tuple(next(values) if x else duration for x in cls.CSV_FIELDS)
+
+    @classmethod
+    def get_csv(cls, srcCode, tgtCode, domain):
+        system_scores = defaultdict(list)
+        rows = list(cls.iter_csv_rows(srcCode, tgtCode, domain))
+        if rows:
+            market_key = '{0}-{1}-{2}'.format(srcCode, tgtCode, domain)
+            system_scores[market_key] = rows
+
+        return system_scores
+
+    @classmethod
+    def write_csv(cls, srcCode, tgtCode, domain, csvFile, allData=False):
+        header = cls.CSV_HEADER
+        if allData:
+            header = 'systemID,' + header
+
+        from os.path import join
+        from Appraise.settings import BASE_DIR
+
+        media_file_path = join(BASE_DIR, 'media', csvFile)
+        with open(media_file_path, 'w') as outfile:
+            outfile.write(header)
+            outfile.write('\n')
+            for row in cls.iter_csv_rows(srcCode, tgtCode, domain):
+                values = row if allData else row[1:]
+                outfile.write(','.join([str(a) for a in values]))
+                outfile.write('\n')
+
+    def save(self, *args, **kwargs):
+        from EvalData.models.annotation_statistics import AnnotationStatistics
+        from EvalData.models.task_progress import TaskProgress
+
+        counted = self._is_counted()
+        was_counted = getattr(self, '_counted', False)
+        was_completed = getattr(self, '_loaded_completed', False)
+        previous_user_id = getattr(self, '_loaded_created_by_id', None)
+        created = self._state.adding
+        statistics_delta = None
+
+        self.dateModified = datetime.utcnow().replace(tzinfo=utc)
+        if kwargs.get('update_fields') is not None:
+            kwargs['update_fields'] = set(kwargs['update_fields']) | {'dateModified'}
+
+        with transaction.atomic():
+            super(BaseAnnotationResult, self).save(*args, **kwargs)
+
+            if counted != was_counted:
+                self.task.update_unique_annotations(self.item_id, counted, self.id)
+
+                # Results are moved to shadow users before being retired
+                user_id = self.createdBy_id
+                if not counted and previous_user_id:
+                    user_id = previous_user_id
+                statistics_delta = AnnotationStatistics.get_result_delta(
+                    self, counted, user_id
+                )
+
+                # Items of results which no longer count need to be annotated
+                # again, so the cursor is rebuilt on next access
+                if counted:
+                    self.task.update_progress_for_user(user_id, self.item)
+                else:
+                    TaskProgress.invalidate(
+                        type(self.task), [user_id], [self.task_id]
+                    )
+
+            elif counted and previous_user_id not in (None, self.createdBy_id):
+                user_ids = [previous_user_id, self.createdBy_id]
+                TaskProgress.invalidate(type(self.task), user_ids, [self.task_id])
+
+            transaction.on_commit(
+                partial(
+                    self._update_statistics,
+                    created,
+                    counted,
+                    was_counted,
+                    was_completed or self.completed,
+                    previous_user_id,
+                    statistics_delta,
+                )
+            )
+
+        self._counted = counted
+        self._loaded_created_by_id = self.createdBy_id
+        self._loaded_completed = self.completed
+
+    def _update_statistics(
+        self,
+        created,
+        counted,
+        was_counted,
+        completed,
+        previous_user_id,
+        statistics_delta,
+    ):
+        """
+        Updates annotation statistics, annotator reliability and cached
+        dashboards once the result has been committed, so that their rows
+        are not locked by the transaction which saves the result.
+        """
+        from EvalData.models.annotation_statistics import AnnotationStatistics
+        from EvalData.models.annotator_reliability import AnnotatorReliability
+
+        if created or completed:
+            AnnotatorReliability.update_for_result(
+                self, created, [previous_user_id, self.createdBy_id]
+            )
+
+        if counted != was_counted:
+            # Results are moved to shadow users before being retired
+            user_id = self.createdBy_id
+            if not counted and previous_user_id:
+                user_id = previous_user_id
+            AnnotationStatistics.update_for_result(
+                self, counted, user_id, statistics_delta
+            )
+
+        elif counted and previous_user_id not in (None, self.createdBy_id):
+            AnnotationStatistics.invalidate(
+                [previous_user_id, self.createdBy_id], self.__class__
+            )
+
+        if counted != was_counted or previous_user_id != self.createdBy_id:
+            invalidate_dashboards([self.createdBy_id, previous_user_id])
+
+
+class BaseAssessmentResult(BaseAnnotationResult):
     """
     Abstract base class for assessment result.
     """
@@ -370,7 +895,7 @@ class BaseAssessmentResult(BaseMetadata):
         abstract = True
 
 
-class BasePairwiseAssessmentResult(BaseMetadata):
+class BasePairwiseAssessmentResult(BaseAnnotationResult):
     """
     Abstract base class for pairwise assessment result.
     """
@@ -539,6 +1064,748 @@ class Metadata(BaseMetadata):
         )
 
 
+class BaseAnnotationTask(BaseMetadata):
+    """
+    Abstract base class for annotation tasks.
+
+    Provides next item resolution, task allocation and denormalised
+    market information. Task classes set RESULT_MODEL_NAME to the name of
+    their result model. TRUSTED_ITEM_FILTER restricts which items are
+    shown to trusted users.
+    """
+
+    RESULT_MODEL_NAME = None  # type: str
+    TRUSTED_ITEM_FILTER = models.Q(itemType='TGT')
+
+    market = models.ForeignKey(
+        Market,
+        blank=True,
+        db_index=True,
+        null=True,
+        on_delete=models.PROTECT,
+        related_name='%(app_label)s_%(class)s_market',
+        related_query_name="%(app_label)s_%(class)ss",
+        verbose_name=_('Market'),
+    )
+
+    sourceLanguageCode = models.CharField(
+        blank=True,
+        db_index=True,
+        editable=False,
+        max_length=MAX_LANGUAGECODE_LENGTH,
+        verbose_name=_('Source language'),
+    )
+
+    targetLanguageCode = models.CharField(
+        blank=True,
+        db_index=True,
+        editable=False,
+        max_length=MAX_LANGUAGECODE_LENGTH,
+        verbose_name=_('Target language'),
+    )
+
+    uniqueAnnotations = models.PositiveIntegerField(
+        default=0, editable=False, verbose_name=_('Unique annotations')
+    )
+
+    # pylint: disable=C0111,R0903
+    class Meta:
+        abstract = True
+        ordering = ['_str_name']
+
+    def save(self, *args, **kwargs):
+        """
+        Copies language codes from the task market, if available.
+
+        Updates of existing tasks never write uniqueAnnotations, which is
+        maintained by update_unique_annotations() using F() expressions.
+        """
+        if self.market_id and not self.targetLanguageCode:
+            self.sourceLanguageCode = self.market.sourceLanguageCode
+            self.targetLanguageCode = self.market.targetLanguageCode
+
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            if not args and not kwargs.get('force_insert'):
+                kwargs['update_fields'] = [
+                    field.name
+                    for field in self._meta.concrete_fields
+                    if not field.primary_key and field.name != 'uniqueAnnotations'
+                ]
+
+        adding = self._state.adding
+        super(BaseAnnotationTask, self).save(*args, **kwargs)
+
+        self._refresh_capacity(self._get_capacity_state(), adding=adding)
+
+    def delete(self, *args, **kwargs):
+        # Assignments are deleted with the task, so count them beforehand
+        assigned = 0
+        if self._get_open_capacity(getattr(self, '_capacity_state', None), 0):
+            assigned = self.assignedTo.count()
+        result = super(BaseAnnotationTask, self).delete(*args, **kwargs)
+        self._refresh_capacity(None, assigned=assigned)
+        return result
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super(BaseAnnotationTask, cls).from_db(db, field_names, values)
+        instance._capacity_state = instance._get_capacity_state()
+        return instance
+
+    def _get_capacity_state(self):
+        """
+        Returns campaign, language, activated, completed and required
+        annotations, which determine open capacity of the task.
+
+        Deferred fields are reported as None instead of being loaded.
+        """
+        return tuple(
+            self.__dict__.get(name)
+            for name in (
+                'campaign_id',
+                'targetLanguageCode',
+                'activated',
+                'completed',
+                'requiredAnnotations',
+            )
+        )
+
+    @staticmethod
+    def _get_open_capacity(state, assigned):
+        """
+        Returns list with ((campaign ID, language code), open slots) tuple
+        for given capacity state and number of assigned users, if open.
+        """
+        if state is None or not state[2] or state[3] or state[4] <= assigned:
+            return []
+        return [(state[:2], state[4] - assigned)]
+
+    def _refresh_capacity(self, current_state, adding=False, assigned=None):
+        """
+        Updates TaskCapacity if the task was or is activated and its state
+        changed since it has been loaded or last saved.
+
+        Only the difference in open capacity of this task is applied, based
+        on the given number of assigned users, which is counted if None.
+        New tasks being added have no previous state or assigned users.
+        """
+        from EvalData.models.task_capacity import TaskCapacity
+
+        previous_state = getattr(self, '_capacity_state', None)
+        self._capacity_state = current_state
+        if previous_state == current_state:
+            return
+
+        # Capacity is recomputed if the previous state has not been loaded
+        if not adding and (previous_state is None or None in previous_state[2:]):
+            keys = {
+                state[:2]
+                for state in (previous_state, current_state)
+                if state is not None and state[2]
+            }
+            for campaign_id, code in keys:
+                TaskCapacity.refresh(self.__class__, campaign_id, code)
+            return
+
+        if not any(
+            state is not None and state[2] and not state[3]
+            for state in (previous_state, current_state)
+        ):
+            return
+
+        if assigned is None:
+            assigned = 0 if adding else self.assignedTo.count()
+
+        TaskCapacity.apply_changes(
+            self.__class__,
+            self._get_open_capacity(previous_state, assigned),
+            self._get_open_capacity(current_state, assigned),
+        )
+
+    @classmethod
+    def backfill_market_fields(cls, campaign=None):
+        """
+        Sets market and language codes for tasks created before these
+        fields were introduced, based on the market of their items.
+
+        Returns the number of updated tasks.
+        """
+        item_cls = cls._meta.get_field('items').related_model
+        items_query_name = cls._meta.get_field('items').related_query_name()
+        first_item_market = (
+            item_cls.objects.filter(**{items_query_name: models.OuterRef('pk')})
+            .order_by('id')
+            .values('metadata__market')[:1]
+        )
+
+        tasks = cls.objects.filter(market__isnull=True)
+        if campaign:
+            tasks = tasks.filter(campaign=campaign)
+        task_ids = list(tasks.values_list('id', flat=True))
+        tasks = cls.objects.filter(id__in=task_ids)
+        tasks.update(market=models.Subquery(first_item_market))
+
+        market_codes = Market.objects.filter(pk=models.OuterRef('market'))
+        return tasks.filter(market__isnull=False).update(
+            sourceLanguageCode=models.Subquery(
+                market_codes.values('sourceLanguageCode')[:1]
+            ),
+            targetLanguageCode=models.Subquery(
+                market_codes.values('targetLanguageCode')[:1]
+            ),
+        )
+
+    @classmethod
+    def reconcile_unique_annotations(cls, campaign=None):
+        """
+        Recomputes uniqueAnnotations counters from results, fixing tasks
+        with inconsistent counters.
+
+        Returns the number of updated tasks.
+        """
+        unique_annotations = Coalesce(
+            models.Subquery(
+                cls.get_result_model()
+                .objects.filter(
+                    task=models.OuterRef('pk'), activated=False, completed=True
+                )
+                .values('task')
+                .annotate(_count=models.Count('item', distinct=True))
+                .values('_count')
+            ),
+            0,
+        )
+
+        tasks = cls.objects.all()
+        if campaign:
+            tasks = tasks.filter(campaign=campaign)
+        task_ids = list(
+            tasks.annotate(_unique=unique_annotations)
+            .exclude(uniqueAnnotations=models.F('_unique'))
+            .values_list('id', flat=True)
+        )
+        return cls.objects.filter(id__in=task_ids).update(
+            uniqueAnnotations=unique_annotations
+        )
+
+    def update_unique_annotations(self, item_id, counted, result_id):
+        """
+        Updates uniqueAnnotations after the given result for the given item
+        started (counted=True) or stopped counting as annotation.
+
+        The counter only changes if no other counted result exists for the
+        item. Locks the task row, so concurrent updates are serialised.
+        """
+        with transaction.atomic():
+            tasks = self.__class__.objects.filter(id=self.id)
+            list(tasks.select_for_update().values_list('id', flat=True))
+
+            other_results = (
+                self.get_result_model()
+                .objects.filter(
+                    task_id=self.id, item_id=item_id, activated=False, completed=True
+                )
+                .exclude(id=result_id)
+            )
+            if other_results.exists():
+                return
+
+            if counted:
+                tasks.update(uniqueAnnotations=models.F('uniqueAnnotations') + 1)
+            else:
+                tasks.filter(uniqueAnnotations__gt=0).update(
+                    uniqueAnnotations=models.F('uniqueAnnotations') - 1
+                )
+
+    def _market_language_code(self, code):
+        from Dashboard.models import LANGUAGE_CODES_AND_NAMES
+
+        if code in LANGUAGE_CODES_AND_NAMES.keys():
+            return code
+        return None
+
+    def dataName(self):
+        return str(self.batchData)
+
+    def marketName(self):
+        return str(self.market)
+
+    def marketSourceLanguage(self):
+        from Dashboard.models import LANGUAGE_CODES_AND_NAMES
+
+        code = self.marketSourceLanguageCode()
+        return LANGUAGE_CODES_AND_NAMES[code] if code else None
+
+    def marketSourceLanguageCode(self):
+        return self._market_language_code(self.sourceLanguageCode)
+
+    def marketTargetLanguage(self):
+        from Dashboard.models import LANGUAGE_CODES_AND_NAMES
+
+        code = self.marketTargetLanguageCode()
+        return LANGUAGE_CODES_AND_NAMES[code] if code else None
+
+    def marketTargetLanguageCode(self):
+        return self._market_language_code(self.targetLanguageCode)
+
+    @classmethod
+    def get_result_model(cls):
+        """
+        Returns the result model class for this task type.
+        """
+        return apps.get_model('EvalData', cls.RESULT_MODEL_NAME)
+
+    @classmethod
+    def get_trusted_campaign_ids(cls, user, campaign_ids):
+        """
+        Returns the subset of campaign IDs for which the user is trusted.
+        """
+        from Campaign.models import TrustedUser
+
+        return TrustedUser.get_trusted_campaign_ids(user, campaign_ids)
+
+    def is_trusted_user(self, user):
+        trusted_ids = self.get_trusted_campaign_ids(user, [self.campaign_id])
+        return self.campaign_id in trusted_ids
+
+    def _next_item_queryset(self, user, trusted_user):
+        """
+        Returns task items not yet annotated by the given user, ordered by
+        id and annotated with the number of items preceding each of them.
+        """
+        result_cls = self.get_result_model()
+        annotated = result_cls.objects.filter(
+            item=models.OuterRef('pk'),
+            activated=False,
+            completed=True,
+            createdBy=user,
+        )
+        preceding = (
+            self.items.filter(id__lt=models.OuterRef('id'))
+            .order_by()
+            .annotate(_count=models.Func(models.F('id'), function='COUNT'))
+            .values('_count')
+        )
+
+        queryset = self.items.filter(~models.Exists(annotated))
+        if trusted_user:
+            queryset = queryset.filter(self.TRUSTED_ITEM_FILTER)
+
+        return queryset.annotate(_preceding=models.Subquery(preceding)).order_by('id')
+
+    def _get_progress(self, user):
+        from EvalData.models.task_progress import TaskProgress
+
+        return TaskProgress.objects.filter(
+            user=user, taskType=self.__class__.__name__, taskID=self.id
+        )
+
+    def rebuild_progress_for_user(self, user, trusted_user=None):
+        """
+        Rebuilds the progress cursor for the given user from results.
+
+        Returns the next item and the number of completed items.
+        """
+        from EvalData.models.task_progress import TaskProgress
+
+        if trusted_user is None:
+            trusted_user = self.is_trusted_user(user)
+
+        # Items skipped on the way to the next item count as completed
+        next_item = self._next_item_queryset(user, trusted_user).first()
+        if next_item:
+            completed_items = next_item._preceding or 0
+        else:
+            completed_items = self.items.count()
+
+        TaskProgress.objects.update_or_create(
+            user=user,
+            taskType=self.__class__.__name__,
+            taskID=self.id,
+            defaults={
+                'campaign_id': self.campaign_id,
+                'nextItemID': next_item.id if next_item else None,
+                'completedItems': completed_items,
+                'trusted': trusted_user,
+            },
+        )
+        return (next_item, completed_items)
+
+    def update_progress_for_user(self, user, item):
+        """
+        Advances the progress cursor after the user annotated the given item.
+
+        Called by BaseAnnotationResult.save() in the same transaction which
+        makes the result count as annotation.
+        """
+        with transaction.atomic():
+            progress = self._get_progress(user).select_for_update().first()
+
+            # Missing cursors are rebuilt on next access. Annotating any
+            # other item does not change the first unannotated item.
+            if progress is None or progress.nextItemID != item.id:
+                return
+
+            next_item = (
+                self._next_item_queryset(user, progress.trusted)
+                .filter(id__gt=item.id)
+                .first()
+            )
+            if next_item:
+                progress.nextItemID = next_item.id
+                progress.completedItems = next_item._preceding or 0
+            else:
+                progress.nextItemID = None
+                progress.completedItems = self.items.count()
+            progress.save()
+
+    def next_item_for_user(self, user, return_completed_items=False):
+        trusted_user = self.is_trusted_user(user)
+
+        progress = self._get_progress(user).first()
+        if progress is None or progress.trusted != trusted_user:
+            next_item, completed_items = self.rebuild_progress_for_user(
+                user, trusted_user
+            )
+
+        elif progress.nextItemID is None:
+            next_item, completed_items = None, progress.completedItems
+
+        else:
+            # Results may have been added without advancing the cursor
+            next_item = (
+                self._next_item_queryset(user, trusted_user)
+                .filter(id=progress.nextItemID)
+                .first()
+            )
+            completed_items = progress.completedItems
+            if next_item is None:
+                next_item, completed_items = self.rebuild_progress_for_user(
+                    user, trusted_user
+                )
+
+        if next_item:
+            LOGGER.info(
+                'Identified next item: {0}/{1} (itemID={2}) for trusted={3}'.format(
+                    next_item.id, next_item.itemType, next_item.itemID, trusted_user
+                )
+            )
+
+        else:
+            LOGGER.info('No next item found for task {0}'.format(self.id))
+            self.refresh_from_db(fields=['uniqueAnnotations'])
+
+            required_user_results = 100
+            if trusted_user:
+                required_user_results = 70
+
+            _total_required = self.requiredAnnotations * required_user_results
+            LOGGER.info(
+                'Unique annotations={0}/{1}'.format(
+                    self.uniqueAnnotations, _total_required
+                )
+            )
+            if self.uniqueAnnotations >= _total_required:
+                LOGGER.info('Completing task {0}'.format(self.id))
+                self.complete()
+                self.save()
+
+        if return_completed_items:
+            return (next_item, completed_items)
+
+        return next_item
+
+    @classmethod
+    def get_tasks_with_work_for_user(cls, tasks, user):
+        """
+        Returns IDs of the given tasks which still have items for the user.
+
+        Up-to-date progress cursors are read in bulk and their next items
+        checked against the user's results; other tasks fall back to
+        next_item_for_user(), which rebuilds their cursor and completes
+        tasks which have received all required annotations.
+        """
+        from EvalData.models.task_progress import TaskProgress
+
+        trusted_ids = cls.get_trusted_campaign_ids(
+            user, {task.campaign_id for task in tasks}
+        )
+        # Next items may have been annotated without advancing the cursor
+        annotated = cls.get_result_model().objects.filter(
+            task_id=models.OuterRef('taskID'),
+            item_id=models.OuterRef('nextItemID'),
+            activated=False,
+            completed=True,
+            createdBy=user,
+        )
+        progress = {
+            row.taskID: row
+            for row in TaskProgress.objects.filter(
+                user=user,
+                taskType=cls.__name__,
+                taskID__in=[task.id for task in tasks],
+            ).annotate(_stale=models.Exists(annotated))
+        }
+
+        task_ids = set()
+        for task in tasks:
+            row = progress.get(task.id)
+            trusted_user = task.campaign_id in trusted_ids
+            if (
+                row
+                and row.trusted == trusted_user
+                and row.nextItemID is not None
+                and not row._stale
+            ):
+                task_ids.add(task.id)
+            elif task.next_item_for_user(user) is not None:
+                task_ids.add(task.id)
+
+        return task_ids
+
+    @classmethod
+    def get_task_for_user(cls, user):
+        """
+        Returns the most recent active task assigned to the user which still
+        has items for the user, or None.
+        """
+        tasks = list(
+            cls.objects.filter(assignedTo=user, activated=True, completed=False)
+        )
+        task_ids = cls.get_tasks_with_work_for_user(tasks, user)
+        for task in sorted(tasks, key=lambda x: x.id, reverse=True):
+            if task.id in task_ids:
+                return task
+
+        return None
+
+    @classmethod
+    def may_assign_tasks_to_user(cls, campaign, user):
+        """
+        Returns False if the user must not be assigned further tasks.
+        """
+        return True
+
+    @classmethod
+    def get_free_tasks_for_language(cls, code, campaign=None, user=None):
+        """
+        Returns active tasks for the given target language which have
+        remaining capacity and are not yet assigned to the given user.
+        """
+        free_tasks = cls.objects.filter(
+            activated=True, completed=False, targetLanguageCode=code
+        )
+        if campaign:
+            free_tasks = free_tasks.filter(campaign=campaign)
+        if user:
+            free_tasks = free_tasks.exclude(assignedTo=user)
+
+        return (
+            free_tasks.annotate(_assigned=models.Count('assignedTo', distinct=True))
+            .filter(_assigned__lt=models.F('requiredAnnotations'))
+            .order_by('id')
+        )
+
+    @classmethod
+    def get_next_free_task_for_language(cls, code, campaign=None, user=None):
+        """
+        Returns the first free task for the given language and user.
+
+        Returns None if no user is given, or if the user must not be
+        assigned further tasks in the campaign.
+        """
+        if user is None:
+            return None
+
+        if campaign and not cls.may_assign_tasks_to_user(campaign, user):
+            return None
+
+        return cls.get_free_tasks_for_language(code, campaign, user).first()
+
+    @classmethod
+    def get_next_free_task_for_language_and_campaign(cls, code, campaign):
+        return cls.get_next_free_task_for_language(code, campaign)
+
+    @classmethod
+    def assign_next_free_task_for_language(cls, code, campaign, user):
+        """
+        Assigns the next free task for the given language to the user.
+
+        Candidate tasks are locked and their capacity is checked again
+        before the assignment, so concurrent sign-ins cannot overbook a
+        task. Returns the assigned task, or None.
+
+        Note that select_for_update() is a no-op on SQLite, which serialises
+        write transactions with a database-wide lock instead. There, a
+        concurrent sign-in fails with a "database is locked" error rather
+        than overbooking the task.
+        """
+        if campaign and not cls.may_assign_tasks_to_user(campaign, user):
+            return None
+
+        free_tasks = cls.get_free_tasks_for_language(code, campaign, user)
+
+        # Concurrent sign-ins may fill up candidates before we lock them, so
+        # candidates are read in batches until one can be assigned
+        last_task_id = 0
+        while True:
+            candidates = free_tasks.filter(id__gt=last_task_id)
+            free_task_ids = list(
+                candidates.values_list('id', flat=True)[:MAX_FREE_TASK_CANDIDATES]
+            )
+            if not free_task_ids:
+                return None
+
+            for task_id in free_task_ids:
+                with transaction.atomic():
+                    task = cls.objects.select_for_update().get(id=task_id)
+                    if task.assignedTo.filter(id=user.id).exists():
+                        continue
+                    if task.assignedTo.count() >= task.requiredAnnotations:
+                        continue
+
+                    task.assignedTo.add(user)
+                    return task
+
+            last_task_id = free_task_ids[-1]
+
+
+class BaseDocumentAnnotationTask(BaseAnnotationTask):
+    """
+    Abstract base class for document-level annotation tasks.
+
+    Task items need documentID and isCompleteDocument fields. Document
+    state is loaded with a constant number of queries, independent of the
+    number of items in the current document.
+    """
+
+    class Meta(BaseAnnotationTask.Meta):
+        abstract = True
+
+    def next_document_for_user(self, user, return_statistics=True):
+        """Returns the next item and all items from its document."""
+        # Find the next not annotated item
+        (
+            next_item,
+            completed_items,
+        ) = self.next_item_for_user(user, return_completed_items=True)
+
+        if not next_item:
+            if not return_statistics:
+                return (next_item, [], [])
+            return (next_item, completed_items, 0, 0, [], [], 0)
+
+        # Retrieve all items from the document which next_item belongs to
+        _items = self.items.filter(
+            documentID=next_item.documentID,
+        ).order_by('id')
+
+        block_items = []
+        current_block = False
+        for item in _items:
+            block_items.append(item)
+            if item.id == next_item.id:
+                current_block = True
+            if item.isCompleteDocument:
+                if current_block:
+                    break
+                block_items.clear()
+
+        # Get results for completed items in this block
+        block_results = self.get_results_for_each_item(block_items, user)
+
+        if not return_statistics:
+            return (next_item, block_items, block_results)
+
+        # Collect statistics
+        completed_items_in_block = len(
+            [res for res in block_results if res is not None]
+        )
+        completed_blocks, total_blocks = self._get_block_statistics(user)
+
+        LOGGER.debug(
+            'Completed %s/%s documents, %s/%s items in the current document, '
+            'completed %s items in total',
+            completed_blocks,
+            total_blocks,
+            completed_items_in_block,
+            len(block_items),
+            completed_items,
+        )
+
+        return (
+            next_item,  # the first unannotated item for the user
+            completed_items,  # the number of completed items in the task
+            completed_blocks,  # the number of completed documents in the task
+            completed_items_in_block,  # the number of completed items in the current document
+            block_items,  # all items from the current document
+            block_results,  # all score results from the current document
+            total_blocks,  # the total number of documents in the task
+        )
+
+    def _get_block_statistics(self, user):
+        """
+        Returns tuple (completed_blocks, total_blocks) for the given user,
+        using a single query.
+        """
+        completed_blocks = (
+            self.get_result_model()
+            .objects.filter(
+                task=models.OuterRef('pk'),
+                item__isCompleteDocument=True,
+                completed=True,
+                createdBy=user,
+            )
+            .values('task')
+            .annotate(_count=models.Count('id'))
+            .values('_count')
+        )
+        total_blocks = (
+            self.items.through.objects.filter(
+                **{
+                    self.items.source_field_name: models.OuterRef('pk'),
+                    self.items.target_field_name + '__isCompleteDocument': True,
+                }
+            )
+            .values(self.items.source_field_name)
+            .annotate(_count=models.Count('id'))
+            .values('_count')
+        )
+        statistics = (
+            self.__class__.objects.filter(id=self.id)
+            .annotate(
+                _completed_blocks=Coalesce(models.Subquery(completed_blocks), 0),
+                _total_blocks=Coalesce(models.Subquery(total_blocks), 0),
+            )
+            .values_list('_completed_blocks', '_total_blocks')
+            .get()
+        )
+        return statistics
+
+    def get_results_for_each_item(self, block_items, user):
+        """
+        Returns the earliest modified result object for each item or None,
+        using a single query.
+        """
+        results = (
+            self.get_result_model()
+            .objects.filter(
+                item_id__in=[item.id for item in block_items],
+                completed=True,
+                createdBy=user,
+                task=self,
+            )
+            .select_related('item')
+            .order_by('item_id', 'dateModified', 'id')
+        )
+
+        results_by_item = {}
+        for result in results:
+            results_by_item.setdefault(result.item_id, result)
+
+        return [results_by_item.get(item.id) for item in block_items]
+
+
 class EvalItem(BaseMetadata):
     """
     Abstract base class for evaluation data items.
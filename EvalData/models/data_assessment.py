@@ -15,14 +15,16 @@ from django.db import models
 from django.utils.text import format_lazy as f
 from django.utils.translation import gettext_lazy as _
 
-from Appraise.utils import _get_logger, _compute_user_total_annotation_time
+from Appraise.utils import _get_logger
 from Dashboard.models import LANGUAGE_CODES_AND_NAMES
 from EvalData.models.base_models import AnnotationTaskRegistry
-from EvalData.models.base_models import BaseMetadata
+from EvalData.models.base_models import BaseAnnotationResult
+from EvalData.models.base_models import BaseAnnotationTask
 from EvalData.models.base_models import MAX_REQUIREDANNOTATIONS_VALUE
 from EvalData.models.base_models import MAX_SEGMENTID_LENGTH
 from EvalData.models.base_models import MAX_SEGMENTTEXT_LENGTH
-from EvalData.models.base_models import seconds_to_timedelta
+from EvalData.models.base_models import RESULT_CSV_FIELDS
+from EvalData.models.base_models import RESULT_EXPORT_COLUMNS
 from EvalData.models.base_models import TextPair
 
 # TODO: Unclear if these are needed?
@@ -101,11 +103,13 @@ class TextPairWithDomain(TextPair):
 
 
 @AnnotationTaskRegistry.register
-class DataAssessmentTask(BaseMetadata):
+class DataAssessmentTask(BaseAnnotationTask):
     """
     Models a direct data assessment evaluation task.
     """
 
+    RESULT_MODEL_NAME = 'DataAssessmentResult'
+
     campaign = models.ForeignKey(
         'Campaign.Campaign',
         db_index=True,
@@ -157,36 +161,6 @@ class DataAssessmentTask(BaseMetadata):
         verbose_name=_('Batch data'),
     )
 
-    def dataName(self):
-        return str(self.batchData)
-
-    def marketName(self):
-        return str(self.items.first().metadata.market)
-
-    def marketSourceLanguage(self):
-        tokens = str(self.items.first().metadata.market).split('_')
-        if len(tokens) == 3 and tokens[0] in LANGUAGE_CODES_AND_NAMES.keys():
-            return LANGUAGE_CODES_AND_NAMES[tokens[0]]
-        return None
-
-    def marketSourceLanguageCode(self):
-        tokens = str(self.items.first().metadata.market).split('_')
-        if len(tokens) == 3 and tokens[0] in LANGUAGE_CODES_AND_NAMES.keys():
-            return tokens[0]
-        return None
-
-    def marketTargetLanguage(self):
-        tokens = str(self.items.first().metadata.market).split('_')
-        if len(tokens) == 3 and tokens[1] in LANGUAGE_CODES_AND_NAMES.keys():
-            return LANGUAGE_CODES_AND_NAMES[tokens[1]]
-        return None
-
-    def marketTargetLanguageCode(self):
-        tokens = str(self.items.first().metadata.market).split('_')
-        if len(tokens) == 3 and tokens[1] in LANGUAGE_CODES_AND_NAMES.keys():
-            return tokens[1]
-        return None
-
     def completed_items_for_user(self, user):
         results = DataAssessmentResult.objects.filter(
             task=self, activated=False, completed=True, createdBy=user
@@ -194,156 +168,52 @@ class DataAssessmentTask(BaseMetadata):
 
         return len(set(results))
 
-    def is_trusted_user(self, user):
+    @classmethod
+    def get_trusted_campaign_ids(cls, user, campaign_ids):
         # Appen crowd users are never trusted!
         if user.groups.filter(name='Appen').exists():
-            return False
-
-        from Campaign.models import TrustedUser
-
-        trusted_user = TrustedUser.objects.filter(user=user, campaign=self.campaign)
-        return trusted_user.exists()
+            return set()
 
-    def next_item_for_user(self, user, return_completed_items=False):
-        trusted_user = self.is_trusted_user(user)
+        return super(DataAssessmentTask, cls).get_trusted_campaign_ids(
+            user, campaign_ids
+        )
 
-        next_item = None
-        completed_items = 0
-        for item in self.items.all().order_by('id'):
-            result = DataAssessmentResult.objects.filter(
-                item=item, activated=False, completed=True, createdBy=user
-            )
+    @classmethod
+    def may_assign_tasks_to_user(cls, campaign, user):
+        # Appen crowd users may only contribute three HITs per campaign.
+        if not user.groups.filter(name='Appen').exists():
+            return True
 
-            if not result.exists():
-                print(
-                    'identified next item: {0}/{1} for trusted={2}'.format(
-                        item.id, item.itemType, trusted_user
-                    )
+        completed_items = DataAssessmentResult.objects.filter(
+            activated=False,
+            completed=True,
+            createdBy=user,
+            task__campaign=campaign,
+        ).values_list('item_id', 'task_id')
+
+        completed_tasks = defaultdict(list)
+        for item in completed_items:
+            completed_tasks[item[1]].append(item[0])
+
+        validated_tasks = 0
+        for task_id in completed_tasks:
+            if len(completed_tasks[task_id]) >= 100:
+                validated_tasks += 1
+
+        if validated_tasks >= 3:
+            _msg = (
+                'User {0} has already completed {1} tasks and '
+                'created {2} results for campaign {3}'.format(
+                    user.username,
+                    validated_tasks,
+                    len(completed_items),
+                    campaign.campaignName,
                 )
-                if not trusted_user or item.itemType == 'TGT':
-                    next_item = item
-                    break
-
-            completed_items += 1
-
-        if not next_item:
-            LOGGER.info('No next item found for task {0}'.format(self.id))
-            annotations = DataAssessmentResult.objects.filter(
-                task=self, activated=False, completed=True
-            ).values_list('item_id', flat=True)
-            uniqueAnnotations = len(set(annotations))
-
-            required_user_results = 100
-            if trusted_user:
-                required_user_results = 70
-
-            _total_required = self.requiredAnnotations * required_user_results
-            LOGGER.info(
-                'Unique annotations={0}/{1}'.format(uniqueAnnotations, _total_required)
             )
-            if uniqueAnnotations >= _total_required:
-                LOGGER.info('Completing task {0}'.format(self.id))
-                self.complete()
-                self.save()
-
-                # Not sure why I would complete the batch here?
-                # self.batchData.complete()
-                # self.batchData.save()
-
-        if return_completed_items:
-            return (next_item, completed_items)
-
-        return next_item
-
-    @classmethod
-    def get_task_for_user(cls, user):
-        for active_task in cls.objects.filter(
-            assignedTo=user, activated=True, completed=False
-        ).order_by('-id'):
-            next_item = active_task.next_item_for_user(user)
-            if next_item is not None:
-                return active_task
-
-        return None
-
-    @classmethod
-    def get_next_free_task_for_language(cls, code, campaign=None, user=None):
-        active_tasks = cls.objects.filter(
-            activated=True,
-            completed=False,
-            items__metadata__market__targetLanguageCode=code,
-        )
-
-        if campaign:
-            active_tasks = active_tasks.filter(campaign=campaign)
-
-            # Appen crowd users may only contribute three HITs per campaign.
-            if user.groups.filter(name='Appen').exists():
-                completed_items = DataAssessmentResult.objects.filter(
-                    activated=False,
-                    completed=True,
-                    createdBy=user,
-                    task__campaign=campaign,
-                ).values_list('item_id', 'task_id')
-
-                completed_tasks = defaultdict(list)
-                for item in completed_items:
-                    completed_tasks[item[1]].append(item[0])
-
-                validated_tasks = 0
-                for task_id in completed_tasks:
-                    if len(completed_tasks[task_id]) >= 100:
-                        validated_tasks += 1
-
-                if validated_tasks >= 3:
-                    _msg = (
-                        'User {0} has already completed {1} tasks and '
-                        'created {2} results for campaign {3}'.format(
-                            user.username,
-                            validated_tasks,
-                            len(completed_items),
-                            campaign.campaignName,
-                        )
-                    )
-                    LOGGER.info(_msg)
-                    return None
-
-        for active_task in active_tasks.order_by('id'):
-            active_users = active_task.assignedTo.count()
-            if active_users < active_task.requiredAnnotations:
-                if user and not user in active_task.assignedTo.all():
-                    return active_task
-
-        return None
-
-        # It seems that assignedTo is converted to an integer count.
-        active_tasks = active_tasks.order_by('id').values_list(
-            'id', 'requiredAnnotations', 'assignedTo'
-        )
-
-        for active_task in active_tasks:
-            print(active_task)
-            active_users = active_task[2] or 0
-            if active_users < active_task[1]:
-                return cls.objects.get(pk=active_task[0])
-
-        return None
-
-        # TODO: this needs to be removed.
-        for active_task in active_tasks:
-            market = active_task.items.first().metadata.market
-            if not market.targetLanguageCode == code:
-                continue
-
-            active_users = active_task.assignedTo.count()
-            if active_users < active_task.requiredAnnotations:
-                return active_task
-
-        return None
+            LOGGER.info(_msg)
+            return False
 
-    @classmethod
-    def get_next_free_task_for_language_and_campaign(cls, code, campaign):
-        return cls.get_next_free_task_for_language(code, campaign)
+        return True
 
     @classmethod
     def import_from_json(cls, campaign, batch_user, batch_data, max_count):
@@ -446,6 +316,7 @@ class DataAssessmentTask(BaseMetadata):
                 requiredAnnotations=batch_task['task']['requiredAnnotations'],
                 batchNo=batch_task['task']['batchNo'],
                 batchData=batch_data,
+                market=batch_meta.market,
                 createdBy=batch_user,
             )
             new_task.save()
@@ -489,11 +360,17 @@ class DataAssessmentTask(BaseMetadata):
         return '{0}.{1}[{2}]'.format(self.__class__.__name__, self.campaign, self.id)
 
 
-class DataAssessmentResult(BaseMetadata):
+class DataAssessmentResult(BaseAnnotationResult):
     """
     Models a direct data assessment evaluation result.
     """
 
+    EXPORT_COLUMNS = (
+        RESULT_EXPORT_COLUMNS[:7] + (('rank', 'rank'),) + RESULT_EXPORT_COLUMNS[7:]
+    )
+    CSV_FIELDS = RESULT_CSV_FIELDS[:5] + ('rank',) + RESULT_CSV_FIELDS[5:]
+    CSV_HEADER = 'username,email,segmentID,score,rank,durationInSeconds,itemType'
+
     score = models.PositiveSmallIntegerField(
         verbose_name=_('Score'), help_text=_('(value in range=[1,100])')
     )
@@ -568,16 +445,6 @@ class DataAssessmentResult(BaseMetadata):
 
         return (completed_hits, total_hits)
 
-    @classmethod
-    def get_time_for_user(cls, user):
-        results = cls.objects.filter(createdBy=user, activated=False, completed=True)
-
-        timestamps = []
-        for result in results:
-            timestamps.append((result.start_time, result.end_time))
-
-        return seconds_to_timedelta(_compute_user_total_annotation_time(timestamps))
-
     @classmethod
     def get_system_annotations(cls):
         system_scores = defaultdict(list)
@@ -648,177 +515,6 @@ class DataAssessmentResult(BaseMetadata):
 
         return group_hits
 
-    @classmethod
-    def dump_all_results_to_csv_file(cls, csv_file):
-        from Dashboard.models import LANGUAGE_CODES_AND_NAMES
-
-        system_scores = defaultdict(list)
-        user_data = {}
-        qs = cls.objects.filter(completed=True)
-
-        value_names = (
-            'item__targetID',
-            'score',
-            'rank',
-            'start_time',
-            'end_time',
-            'createdBy',
-            'item__itemID',
-            'item__metadata__market__sourceLanguageCode',
-            'item__metadata__market__targetLanguageCode',
-            'item__metadata__market__domainName',
-            'item__itemType',
-            'task__id',
-            'task__campaign__campaignName',
-        )
-        for result in qs.values_list(*value_names):
-            systemID = result[0]
-            score = result[1]
-            rank = result[2]
-            start_time = result[3]
-            end_time = result[4]
-            duration = round(float(end_time) - float(start_time), 1)
-            annotatorID = result[5]
-            segmentID = result[6]
-            marketID = '{0}-{1}'.format(result[7], result[8])
-            domainName = result[9]
-            itemType = result[10]
-            taskID = result[11]
-            campaignName = result[12]
-
-            if annotatorID in user_data:
-                username = user_data[annotatorID][0]
-                useremail = user_data[annotatorID][1]
-                usergroups = user_data[annotatorID][2]
-
-            else:
-                user = User.objects.get(pk=annotatorID)
-                username = user.username
-                useremail = user.email
-                usergroups = ';'.join(
-                    [
-                        x.name
-                        for x in user.groups.all()
-                        if not x.name in LANGUAGE_CODES_AND_NAMES.keys()
-                    ]
-                )
-                if not usergroups:
-                    usergroups = 'NoGroupInfo'
-
-                user_data[annotatorID] = (username, useremail, usergroups)
-
-            system_scores[marketID + '-' + domainName].append(
-                (
-                    taskID,
-                    systemID,
-                    username,
-                    useremail,
-                    usergroups,
-                    segmentID,
-                    score,
-                    rank,
-                    start_time,
-                    end_time,
-                    duration,
-                    itemType,
-                    campaignName,
-                )
-            )
-
-        # TODO: this is very intransparent... and needs to be fixed!
-        x = system_scores
-        s = [
-            'taskID,systemID,username,email,groups,segmentID,score,rank,startTime,endTime,durationInSeconds,itemType,campaignName'
-        ]
-        for l in x:
-            for i in x[l]:
-                s.append(','.join([str(a) for a in i]))
-
-        from os.path import join
-        from Appraise.settings import BASE_DIR
-
-        media_file_path = join(BASE_DIR, 'media', csv_file)
-        with open(media_file_path, 'w') as outfile:
-            for c in s:
-                outfile.write(c)
-                outfile.write('\n')
-
-    @classmethod
-    def get_csv(cls, srcCode, tgtCode, domain):
-        system_scores = defaultdict(list)
-        qs = cls.objects.filter(completed=True)
-
-        value_names = (
-            'item__targetID',
-            'score',
-            'rank',
-            'start_time',
-            'end_time',
-            'createdBy',
-            'item__itemID',
-            'item__metadata__market__sourceLanguageCode',
-            'item__metadata__market__targetLanguageCode',
-            'item__metadata__market__domainName',
-            'item__itemType',
-        )
-        for result in qs.values_list(*value_names):
-            if (
-                not domain == result[9]
-                or not srcCode == result[7]
-                or not tgtCode == result[8]
-            ):
-                continue
-
-            systemID = result[0]
-            score = result[1]
-            rank = result[2]
-            start_time = result[3]
-            end_time = result[4]
-            duration = round(float(end_time) - float(start_time), 1)
-            annotatorID = result[5]
-            segmentID = result[6]
-            marketID = '{0}-{1}'.format(result[7], result[8])
-            domainName = result[9]
-            itemType = result[10]
-            user = User.objects.get(pk=annotatorID)
-            username = user.username
-            useremail = user.email
-            system_scores[marketID + '-' + domainName].append(
-                (
-                    systemID,
-                    username,
-                    useremail,
-                    segmentID,
-                    score,
-                    rank,
-                    duration,
-                    itemType,
-                )
-            )
-
-        return system_scores
-
-    @classmethod
-    def write_csv(cls, srcCode, tgtCode, domain, csvFile, allData=False):
-        x = cls.get_csv(srcCode, tgtCode, domain)
-        s = ['username,email,segmentID,score,rank,durationInSeconds,itemType']
-        if allData:
-            s[0] = 'systemID,' + s[0]
-
-        for l in x:
-            for i in x[l]:
-                e = i[1:] if not allData else i
-                s.append(','.join([str(a) for a in e]))
-
-        from os.path import join
-        from Appraise.settings import BASE_DIR
-
-        media_file_path = join(BASE_DIR, 'media', csvFile)
-        with open(media_file_path, 'w') as outfile:
-            for c in s:
-                outfile.write(c)
-                outfile.write('\n')
-
     @classmethod
     def get_system_scores(cls, campaign_id):
         system_scores = defaultdict(list)
@@ -852,6 +548,8 @@ class DataAssessmentResult(BaseMetadata):
         expand_multi_sys=True,
         include_inactive=False,
         add_batch_info=False,
+        add_result_id=False,
+        subset=None,
     ):
         system_data = []
 
@@ -861,6 +559,10 @@ class DataAssessmentResult(BaseMetadata):
 
         qs = cls.objects.filter(completed=True, item__itemType__in=item_types)
 
+        # If subset of results is given, only return data for these results.
+        if subset is not None:
+            qs = qs.filter(id__in=subset.values('id'))
+
         # If campaign ID is given, only return results for this campaign.
         if campaign_id:
             qs = qs.filter(task__campaign__id=campaign_id)
@@ -887,6 +589,9 @@ class DataAssessmentResult(BaseMetadata):
                 'end_time',  # End time
             )
 
+        if add_result_id:
+            attributes_to_extract = attributes_to_extract + ('id',)  # Result ID
+
         if add_batch_info:
             attributes_to_extract = attributes_to_extract + (
                 'task__batchNo',  # Batch number
@@ -17,12 +17,19 @@ from django.db import models
 from django.utils.text import format_lazy as f
 from django.utils.translation import gettext_lazy as _
 
-from Appraise.utils import _get_logger, _compute_user_total_annotation_time
+from Appraise.utils import _compute_total_annotation_times
+from Appraise.utils import _get_logger
 from Dashboard.models import LANGUAGE_CODES_AND_NAMES
 from EvalData.models.base_models import AnnotationTaskRegistry
 from EvalData.models.base_models import BaseAssessmentResult
-from EvalData.models.base_models import BaseMetadata
+from EvalData.models.base_models import BaseDocumentAnnotationTask
+from EvalData.models.base_models import DOCUMENT_CSV_FIELDS
+from EvalData.models.base_models import DOCUMENT_CSV_HEADER
+from EvalData.models.base_models import DOCUMENT_EXPORT_COLUMNS
 from EvalData.models.base_models import MAX_REQUIREDANNOTATIONS_VALUE
+from EvalData.models.base_models import RESULT_CSV_FIELDS
+from EvalData.models.base_models import RESULT_CSV_HEADER
+from EvalData.models.base_models import RESULT_EXPORT_COLUMNS
 from EvalData.models.base_models import seconds_to_timedelta
 from EvalData.models.direct_assessment_context import TextPairWithContext
 
@@ -30,7 +37,7 @@ LOGGER = _get_logger(name=__name__)
 
 
 @AnnotationTaskRegistry.register
-class DirectAssessmentDocumentTask(BaseMetadata):
+class DirectAssessmentDocumentTask(BaseDocumentAnnotationTask):
     """
     Models a direct assessment document evaluation task.
 
@@ -42,6 +49,8 @@ class DirectAssessmentDocumentTask(BaseMetadata):
     DirectAssessmentContextTask.
     """
 
+    RESULT_MODEL_NAME = 'DirectAssessmentDocumentResult'
+
     campaign = models.ForeignKey(
         'Campaign.Campaign',
         db_index=True,
@@ -93,36 +102,6 @@ class DirectAssessmentDocumentTask(BaseMetadata):
         verbose_name=_('Batch data'),
     )
 
-    def dataName(self):
-        return str(self.batchData)
-
-    def marketName(self):
-        return str(self.items.first().metadata.market)
-
-    def marketSourceLanguage(self):
-        tokens = str(self.items.first().metadata.market).split('_')
-        if len(tokens) == 3 and tokens[0] in LANGUAGE_CODES_AND_NAMES.keys():
-            return LANGUAGE_CODES_AND_NAMES[tokens[0]]
-        return None
-
-    def marketSourceLanguageCode(self):
-        tokens = str(self.items.first().metadata.market).split('_')
-        if len(tokens) == 3 and tokens[0] in LANGUAGE_CODES_AND_NAMES.keys():
-            return tokens[0]
-        return None
-
-    def marketTargetLanguage(self):
-        tokens = str(self.items.first().metadata.market).split('_')
-        if len(tokens) == 3 and tokens[1] in LANGUAGE_CODES_AND_NAMES.keys():
-            return LANGUAGE_CODES_AND_NAMES[tokens[1]]
-        return None
-
-    def marketTargetLanguageCode(self):
-        tokens = str(self.items.first().metadata.market).split('_')
-        if len(tokens) == 3 and tokens[1] in LANGUAGE_CODES_AND_NAMES.keys():
-            return tokens[1]
-        return None
-
     def completed_items_for_user(self, user):
         results = DirectAssessmentDocumentResult.objects.filter(
             task=self, activated=False, completed=True, createdBy=user
@@ -130,125 +109,6 @@ class DirectAssessmentDocumentTask(BaseMetadata):
 
         return len(set(results))
 
-    def is_trusted_user(self, user):
-        from Campaign.models import TrustedUser
-
-        trusted_user = TrustedUser.objects.filter(user=user, campaign=self.campaign)
-        return trusted_user.exists()
-
-    def next_item_for_user(self, user, return_completed_items=False):
-        trusted_user = self.is_trusted_user(user)
-
-        next_item = None
-        completed_items = 0
-        for item in self.items.all().order_by('id'):
-            result = DirectAssessmentDocumentResult.objects.filter(
-                item=item, activated=False, completed=True, createdBy=user
-            )
-
-            if not result.exists():
-                print(
-                    'Identified next item: {}/{} (itemID={}) for trusted={}'.format(
-                        item.id, item.itemType, item.itemID, trusted_user
-                    )
-                )
-                if not trusted_user or item.itemType == 'TGT':
-                    next_item = item
-                    break
-
-            completed_items += 1
-
-        if not next_item:
-            LOGGER.info('No next item found for task {0}'.format(self.id))
-            annotations = DirectAssessmentDocumentResult.objects.filter(
-                task=self, activated=False, completed=True
-            ).values_list('item_id', flat=True)
-            uniqueAnnotations = len(set(annotations))
-
-            required_user_results = 100
-            if trusted_user:
-                required_user_results = 70
-
-            _total_required = self.requiredAnnotations * required_user_results
-            LOGGER.info(
-                'Unique annotations={0}/{1}'.format(uniqueAnnotations, _total_required)
-            )
-            if uniqueAnnotations >= _total_required:
-                LOGGER.info('Completing task {0}'.format(self.id))
-                self.complete()
-                self.save()
-
-                # Not sure why I would complete the batch here?
-                # self.batchData.complete()
-                # self.batchData.save()
-
-        if return_completed_items:
-            return (next_item, completed_items)
-
-        return next_item
-
-    def next_document_for_user(self, user, return_statistics=True):
-        """Returns the next item and all items from its document."""
-        # Find the next not annotated item
-        (
-            next_item,
-            completed_items,
-        ) = self.next_item_for_user(user, return_completed_items=True)
-
-        if not next_item:
-            if not return_statistics:
-                return (next_item, [], [])
-            else:
-                return (next_item, completed_items, 0, 0, [], [], 0)
-
-        # Retrieve all items from the document which next_item belongs to
-        _items = self.items.filter(
-            documentID=next_item.documentID,
-        ).order_by('id')
-
-        block_items = []
-        current_block = False
-        for item in _items:
-            block_items.append(item)
-            if item.id == next_item.id:
-                current_block = True
-            if item.isCompleteDocument:
-                if current_block:
-                    break
-                block_items.clear()
-
-        # Get results for completed items in this block
-        block_results = self.get_results_for_each_item(block_items, user)
-
-        if not return_statistics:
-            return (next_item, block_items, block_results)
-
-        # Collect statistics
-        completed_items_in_block = len(
-            [res for res in block_results if res is not None]
-        )
-        completed_blocks = DirectAssessmentDocumentResult.objects.filter(
-            task=self,
-            item__isCompleteDocument=True,
-            completed=True,
-            createdBy=user,
-        ).count()
-        total_blocks = self.items.filter(isCompleteDocument=True).count()
-
-        print(
-            f'Completed {completed_blocks}/{total_blocks} documents, {completed_items_in_block}/{len(block_items)} items in the current document, completed {completed_items} items in total'
-        )
-
-        return (
-            next_item,  # the first unannotated item for the user
-            completed_items,  # the number of completed items in the task
-            completed_blocks,  # the number of completed documents in the task
-            completed_items_in_block,  # the number of completed items in the current document
-            block_items,  # all items from the current document
-            block_results,  # all score results from the current document
-            total_blocks,  # the total number of documents in the task
-        )
-
     def next_document_for_user_mqmesa(self, user):
         """
         Returns the next item and all items from its document.
@@ -262,26 +122,34 @@ class DirectAssessmentDocumentTask(BaseMetadata):
             total_docs,
         """
 
-        # get all items (100) and try to find resul
-        all_items = [
-            (
-                item, 
-                DirectAssessmentDocumentResult.objects.filter(
-                    item=item, activated=False, completed=True, createdBy=user
-                ).last()
+        # get all items (100) and their latest results with a single query
+        items = list(self.items.all().order_by('id'))
+        latest_results = (
+            DirectAssessmentDocumentResult.objects.filter(
+                item_id__in=[item.id for item in items],
+                activated=False,
+                completed=True,
+                createdBy=user,
             )
-            for item in self.items.all().order_by('id')
-        ]
+            .values('item_id')
+            .annotate(latest_id=models.Max('id'))
+            .values('latest_id')
+        )
+        results = {
+            result.item_id: result
+            for result in DirectAssessmentDocumentResult.objects.filter(
+                id__in=models.Subquery(latest_results)
+            )
+        }
+        all_items = [(item, results.get(item.id)) for item in items]
         unfinished_items = [i for i, r in all_items if not r]
-        
+
         docs_total = len({i.documentID for i, r in all_items})
-        items_completed = len([
-            i for i, r in all_items if r and r.completed
-        ])
-        docs_completed = docs_total - len({
-            i.documentID for i, r in all_items if r is None or not r.completed
-        })
-        
+        items_completed = len([i for i, r in all_items if r and r.completed])
+        docs_completed = docs_total - len(
+            {i.documentID for i, r in all_items if r is None or not r.completed}
+        )
+
         if not unfinished_items:
             return (
                 None,
@@ -295,88 +163,30 @@ class DirectAssessmentDocumentTask(BaseMetadata):
         # things are ordered with batch order
         next_item = unfinished_items[0]
         doc_items_all = [
-            (i, r) for i, r in all_items
+            (i, r)
+            for i, r in all_items
             # match document name and system
             if i.documentID == next_item.documentID and i.targetID == next_item.targetID
         ]
         doc_items = [i for i, r in doc_items_all]
         doc_items_results = [r for i, r in doc_items_all]
 
-        print(
-            f'Completed {docs_completed}/{docs_total} documents, '
-            f'completed {items_completed} items in total'
+        LOGGER.debug(
+            'Completed %s/%s documents, completed %s items in total',
+            docs_completed,
+            docs_total,
+            items_completed,
         )
 
         return (
-            next_item,         # the first unannotated item for the user
-            items_completed,   # the number of completed items in the task
-            docs_completed,    # the number of completed documents in the task
-            doc_items,         # all items from the current document
-            doc_items_results, # all score results from the current document
-            docs_total,        # the total number of documents in the task
-        )
-
-    def get_results_for_each_item(self, block_items, user):
-        """Returns the latest result object for each item or none."""
-        # TODO: optimize, this possibly makes too many individual queries
-        block_results = []
-
-        for item in block_items:
-            result = (
-                DirectAssessmentDocumentResult.objects.filter(
-                    item__id=item.id,
-                    completed=True,
-                    createdBy=user,
-                    task=self,
-                )
-                .order_by('item__id', 'dateModified')
-                .first()
-            )
-            block_results.append(result)
-
-        # Sanity checks for items and results
-        if len(block_items) != len(block_results):
-            print('Warning: incorrect number of retrieved results!')
-        for item, result in zip(block_items, block_results):
-            if result and item.id != result.item.id:
-                print('Warning: incorrect order of items and results!')
-
-        return block_results
-
-    @classmethod
-    def get_task_for_user(cls, user):
-        for active_task in cls.objects.filter(
-            assignedTo=user, activated=True, completed=False
-        ).order_by('-id'):
-            next_item = active_task.next_item_for_user(user)
-            if next_item is not None:
-                return active_task
-
-        return None
-
-    @classmethod
-    def get_next_free_task_for_language(cls, code, campaign=None, user=None):
-        active_tasks = cls.objects.filter(
-            activated=True,
-            completed=False,
-            items__metadata__market__targetLanguageCode=code,
+            next_item,  # the first unannotated item for the user
+            items_completed,  # the number of completed items in the task
+            docs_completed,  # the number of completed documents in the task
+            doc_items,  # all items from the current document
+            doc_items_results,  # all score results from the current document
+            docs_total,  # the total number of documents in the task
         )
 
-        if campaign:
-            active_tasks = active_tasks.filter(campaign=campaign)
-
-        for active_task in active_tasks.order_by('id'):
-            active_users = active_task.assignedTo.count()
-            if active_users < active_task.requiredAnnotations:
-                if user and not user in active_task.assignedTo.all():
-                    return active_task
-
-        return None
-
-    @classmethod
-    def get_next_free_task_for_language_and_campaign(cls, code, campaign):
-        return cls.get_next_free_task_for_language(code, campaign)
-
     @classmethod
     def import_from_json(cls, campaign, batch_user, batch_data, max_count):
         """
@@ -478,6 +288,7 @@ class DirectAssessmentDocumentTask(BaseMetadata):
                 requiredAnnotations=batch_task['task']['requiredAnnotations'],
                 batchNo=batch_task['task']['batchNo'],
                 batchData=batch_data,
+                market=batch_meta.market,
                 createdBy=batch_user,
             )
             new_task.save()
@@ -524,6 +335,15 @@ class DirectAssessmentDocumentResult(BaseAssessmentResult):
     Models a direct assessment document evaluation result.
     """
 
+    EXPORT_COLUMNS = (
+        RESULT_EXPORT_COLUMNS + DOCUMENT_EXPORT_COLUMNS + (('mqm', 'mqm'),)
+    )
+    CSV_FIELDS = RESULT_CSV_FIELDS + DOCUMENT_CSV_FIELDS + ('mqm',)
+    CSV_HEADER = RESULT_CSV_HEADER + DOCUMENT_CSV_HEADER
+
+    # Annotation time is computed per document for MQM/ESA campaigns
+    INCREMENTAL_ANNOTATION_TIME = False
+
     score = models.PositiveSmallIntegerField(
         verbose_name=_('Score'), help_text=_('(value in range=[1,100])')
     )
@@ -596,33 +416,57 @@ class DirectAssessmentDocumentResult(BaseAssessmentResult):
         return (completed_hits, total_hits)
 
     @classmethod
-    def get_time_for_user(cls, user):
-        results = cls.objects.filter(createdBy=user, activated=False, completed=True)
-        is_esa_or_mqm = any([
-            "esa" in result.task.campaign.campaignOptions.lower().split(";") or
-            "mqm" in result.task.campaign.campaignOptions.lower().split(";")
-            for result in results
-        ])
-
-        if is_esa_or_mqm:
-            # for ESA or MQM, do minimum and maximum from each doc
-            import collections
-            timestamps = collections.defaultdict(list)
-            for result in results:
-                timestamps[result.item.documentID+" ||| "+result.item.targetID].append((result.start_time, result.end_time))
-
-            # timestamps are document-level now, but that does not change anything later on
-            timestamps = [
-                (min([x[0] for x in doc_v]), max([x[1] for x in doc_v]))
-                for doc, doc_v in timestamps.items()
-            ]
-        else:
-            timestamps = []
-            for result in results:
-                timestamps.append((result.start_time, result.end_time))
+    def get_times_for_users(cls, users):
+        """
+        Returns dict mapping IDs of the given users to their total
+        annotation time, computed from a single query.
+
+        For users with ESA or MQM results, the minimum start and maximum
+        end timestamps of each document are used instead.
+        """
+        user_ids = [user.id for user in users]
+        results = cls.objects.filter(
+            createdBy__in=user_ids, activated=False, completed=True
+        ).values_list(
+            'createdBy',
+            'start_time',
+            'end_time',
+            'task__campaign__campaignOptions',
+            'item__documentID',
+            'item__targetID',
+        )
 
+        timestamps = defaultdict(list)
+        esa_or_mqm_user_ids = set()
+        for user_id, start_time, end_time, options, document_id, target_id in results:
+            timestamps[user_id].append((start_time, end_time, document_id, target_id))
+            options = options.lower().split(";")
+            if "esa" in options or "mqm" in options:
+                esa_or_mqm_user_ids.add(user_id)
+
+        keys, start_times, end_times = [], [], []
+        for user_id, user_timestamps in timestamps.items():
+            if user_id in esa_or_mqm_user_ids:
+                # for ESA or MQM, do minimum and maximum from each doc
+                documents = defaultdict(list)
+                for start_time, end_time, document_id, target_id in user_timestamps:
+                    documents[document_id + " ||| " + target_id].append(
+                        (start_time, end_time)
+                    )
+                user_timestamps = [
+                    (min([x[0] for x in doc_v]), max([x[1] for x in doc_v]))
+                    for doc_v in documents.values()
+                ]
 
-        return seconds_to_timedelta(_compute_user_total_annotation_time(timestamps))
+            for timestamp in user_timestamps:
+                keys.append(user_id)
+                start_times.append(timestamp[0])
+                end_times.append(timestamp[1])
+
+        times = _compute_total_annotation_times(keys, start_times, end_times)
+        return {
+            user_id: seconds_to_timedelta(times.get(user_id, 0)) for user_id in user_ids
+        }
 
     @classmethod
     def get_system_annotations(cls):
@@ -696,193 +540,6 @@ class DirectAssessmentDocumentResult(BaseAssessmentResult):
 
         return group_hits
 
-    @classmethod
-    def dump_all_results_to_csv_file(cls, csv_file):
-        from Dashboard.models import LANGUAGE_CODES_AND_NAMES
-
-        system_scores = defaultdict(list)
-        user_data = {}
-        qs = cls.objects.filter(completed=True)
-
-        value_names = (
-            'item__targetID',
-            'score',
-            'start_time',
-            'end_time',
-            'createdBy',
-            'item__itemID',
-            'item__metadata__market__sourceLanguageCode',
-            'item__metadata__market__targetLanguageCode',
-            'item__metadata__market__domainName',
-            'item__itemType',
-            'task__id',
-            'task__campaign__campaignName',
-            'item__documentID',
-            'item__isCompleteDocument',
-            'mqm',
-        )
-        for result in qs.values_list(*value_names):
-
-            systemID = result[0]
-            score = result[1]
-            start_time = result[2]
-            end_time = result[3]
-            duration = round(float(end_time) - float(start_time), 1)
-            annotatorID = result[4]
-            segmentID = result[5]
-            marketID = '{0}-{1}'.format(result[6], result[7])
-            domainName = result[8]
-            itemType = result[9]
-            taskID = result[10]
-            campaignName = result[11]
-            documentID = result[12]
-            isCompleteDocument = result[13]
-            mqm = result[14]
-
-            if annotatorID in user_data:
-                username = user_data[annotatorID][0]
-                useremail = user_data[annotatorID][1]
-                usergroups = user_data[annotatorID][2]
-
-            else:
-                user = User.objects.get(pk=annotatorID)
-                username = user.username
-                useremail = user.email
-                usergroups = ';'.join(
-                    [
-                        x.name
-                        for x in user.groups.all()
-                        if not x.name in LANGUAGE_CODES_AND_NAMES.keys()
-                    ]
-                )
-                if not usergroups:
-                    usergroups = 'NoGroupInfo'
-
-                user_data[annotatorID] = (username, useremail, usergroups)
-
-            system_scores[marketID + '-' + domainName].append(
-                (
-                    taskID,
-                    systemID,
-                    username,
-                    useremail,
-                    usergroups,
-                    segmentID,
-                    score,
-                    start_time,
-                    end_time,
-                    duration,
-                    itemType,
-                    campaignName,
-                    documentID,
-                    isCompleteDocument,
-                    mqm,
-                )
-            )
-
-        # TODO: this is very intransparent... and needs to be fixed!
-        x = system_scores
-        s = [
-            'taskID,systemID,username,email,groups,segmentID,score,startTime,endTime,durationInSeconds,itemType,campaignName,documentID,isCompleteDocument,mqm'
-        ]
-        for l in x:
-            for i in x[l]:
-                s.append(','.join([str(a) for a in i]))
-
-        from os.path import join
-        from Appraise.settings import BASE_DIR
-
-        media_file_path = join(BASE_DIR, 'media', csv_file)
-        with open(media_file_path, 'w') as outfile:
-            for c in s:
-                outfile.write(c)
-                outfile.write('\n')
-
-    @classmethod
-    def get_csv(cls, srcCode, tgtCode, domain):
-        system_scores = defaultdict(list)
-        qs = cls.objects.filter(completed=True)
-
-        value_names = (
-            'item__targetID',
-            'score',
-            'start_time',
-            'end_time',
-            'createdBy',
-            'item__itemID',
-            'item__metadata__market__sourceLanguageCode',
-            'item__metadata__market__targetLanguageCode',
-            'item__metadata__market__domainName',
-            'item__itemType',
-            'item__documentID',
-            'item__isCompleteDocument',
-            'mqm',
-        )
-        for result in qs.values_list(*value_names):
-
-            if (
-                not domain == result[8]
-                or not srcCode == result[6]
-                or not tgtCode == result[7]
-            ):
-                continue
-
-            systemID = result[0]
-            score = result[1]
-            start_time = result[2]
-            end_time = result[3]
-            duration = round(float(end_time) - float(start_time), 1)
-            annotatorID = result[4]
-            segmentID = result[5]
-            marketID = '{0}-{1}'.format(result[6], result[7])
-            domainName = result[8]
-            itemType = result[9]
-            documentID = result[10]
-            isCompleteDocument = result[11]
-            mqm = result[12]
-            user = User.objects.get(pk=annotatorID)
-            username = user.username
-            useremail = user.email
-            system_scores[marketID + '-' + domainName].append(
-                (
-                    systemID,
-                    username,
-                    useremail,
-                    segmentID,
-                    score,
-                    duration,
-                    itemType,
-                    documentID,
-                    isCompleteDocument,
-                    mqm,
-                )
-            )
-
-        return system_scores
-
-    @classmethod
-    def write_csv(cls, srcCode, tgtCode, domain, csvFile, allData=False):
-        x = cls.get_csv(srcCode, tgtCode, domain)
-        s = [
-            'username,email,segmentID,score,durationInSeconds,itemType,documentID,isCompleteDocument'
-        ]
-        if allData:
-            s[0] = 'systemID,' + s[0]
-
-        for l in x:
-            for i in x[l]:
-                e = i[1:] if not allData else i
-                s.append(','.join([str(a) for a in e]))
-
-        from os.path import join
-        from Appraise.settings import BASE_DIR
-
-        media_file_path = join(BASE_DIR, 'media', csvFile)
-        with open(media_file_path, 'w') as outfile:
-            for c in s:
-                outfile.write(c)
-                outfile.write('\n')
-
     @classmethod
     def get_system_scores(cls, campaign_id):
         system_scores = defaultdict(list)
@@ -926,6 +583,8 @@ class DirectAssessmentDocumentResult(BaseAssessmentResult):
         expand_multi_sys=True,
         include_inactive=False,
         add_batch_info=False,
+        add_result_id=False,
+        subset=None,
     ):
         system_data = []
 
@@ -935,11 +594,18 @@ class DirectAssessmentDocumentResult(BaseAssessmentResult):
 
         qs = cls.objects.filter(completed=True, item__itemType__in=item_types)
 
+        # If subset of results is given, only return data for these results.
+        if subset is not None:
+            qs = qs.filter(id__in=subset.values('id'))
+
         # If campaign ID is given, only return results for this campaign.
         campaign_name = None
+        campaign_opts = None
         if campaign_id:
             qs = qs.filter(task__campaign__id=campaign_id)
-            campaign_opts = str(qs.first().task.campaign.campaignOptions)
+            campaign_opts = qs.values_list(
+                'task__campaign__campaignOptions', flat=True
+            ).first()
 
         if not include_inactive:
             qs = qs.filter(createdBy__is_active=True)
@@ -974,6 +640,9 @@ class DirectAssessmentDocumentResult(BaseAssessmentResult):
                 'end_time',  # End time
             )
 
+        if add_result_id:
+            attributes_to_extract = attributes_to_extract + ('id',)  # Result ID
+
         if add_batch_info:
             attributes_to_extract = attributes_to_extract + (
                 'task__batchNo',  # Batch number
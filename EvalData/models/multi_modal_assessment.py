@@ -15,15 +15,15 @@ from django.db import models
 from django.utils.text import format_lazy as f
 from django.utils.translation import gettext_lazy as _
 
-from Appraise.utils import _get_logger, _compute_user_total_annotation_time
+from Appraise.utils import _get_logger
 from Dashboard.models import LANGUAGE_CODES_AND_NAMES
 from EvalData.models.base_models import AnnotationTaskRegistry
-from EvalData.models.base_models import BaseMetadata
+from EvalData.models.base_models import BaseAnnotationResult
+from EvalData.models.base_models import BaseAnnotationTask
 from EvalData.models.base_models import EvalItem
 from EvalData.models.base_models import MAX_REQUIREDANNOTATIONS_VALUE
 from EvalData.models.base_models import MAX_SEGMENTID_LENGTH
 from EvalData.models.base_models import MAX_SEGMENTTEXT_LENGTH
-from EvalData.models.base_models import seconds_to_timedelta
 
 # TODO: Unclear if these are needed?
 # from Appraise.settings import STATIC_URL, BASE_CONTEXT
@@ -87,11 +87,13 @@ class TextPairWithImage(EvalItem):
 
 
 @AnnotationTaskRegistry.register
-class MultiModalAssessmentTask(BaseMetadata):
+class MultiModalAssessmentTask(BaseAnnotationTask):
     """
     Models a multimodal assessment evaluation task.
     """
 
+    RESULT_MODEL_NAME = 'MultiModalAssessmentResult'
+
     campaign = models.ForeignKey(
         'Campaign.Campaign',
         db_index=True,
@@ -143,36 +145,6 @@ class MultiModalAssessmentTask(BaseMetadata):
         verbose_name=_('Batch data'),
     )
 
-    def dataName(self):
-        return str(self.batchData)
-
-    def marketName(self):
-        return str(self.items.first().metadata.market)
-
-    def marketSourceLanguage(self):
-        tokens = str(self.items.first().metadata.market).split('_')
-        if len(tokens) == 3 and tokens[0] in LANGUAGE_CODES_AND_NAMES.keys():
-            return LANGUAGE_CODES_AND_NAMES[tokens[0]]
-        return None
-
-    def marketSourceLanguageCode(self):
-        tokens = str(self.items.first().metadata.market).split('_')
-        if len(tokens) == 3 and tokens[0] in LANGUAGE_CODES_AND_NAMES.keys():
-            return tokens[0]
-        return None
-
-    def marketTargetLanguage(self):
-        tokens = str(self.items.first().metadata.market).split('_')
-        if len(tokens) == 3 and tokens[1] in LANGUAGE_CODES_AND_NAMES.keys():
-            return LANGUAGE_CODES_AND_NAMES[tokens[1]]
-        return None
-
-    def marketTargetLanguageCode(self):
-        tokens = str(self.items.first().metadata.market).split('_')
-        if len(tokens) == 3 and tokens[1] in LANGUAGE_CODES_AND_NAMES.keys():
-            return tokens[1]
-        return None
-
     def completed_items_for_user(self, user):
         results = MultiModalAssessmentResult.objects.filter(
             task=self, activated=False, completed=True, createdBy=user
@@ -180,98 +152,6 @@ class MultiModalAssessmentTask(BaseMetadata):
 
         return len(set(results))
 
-    def is_trusted_user(self, user):
-        from Campaign.models import TrustedUser
-
-        trusted_user = TrustedUser.objects.filter(user=user, campaign=self.campaign)
-        return trusted_user.exists()
-
-    def next_item_for_user(self, user, return_completed_items=False):
-        trusted_user = self.is_trusted_user(user)
-
-        next_item = None
-        completed_items = 0
-        for item in self.items.all().order_by('id'):
-            result = MultiModalAssessmentResult.objects.filter(
-                item=item, activated=False, completed=True, createdBy=user
-            )
-
-            if not result.exists():
-                print(
-                    'identified next item: {0}/{1} for trusted={2}'.format(
-                        item.id, item.itemType, trusted_user
-                    )
-                )
-                if not trusted_user or item.itemType == 'TGT':
-                    next_item = item
-                    break
-
-            completed_items += 1
-
-        if not next_item:
-            LOGGER.info('No next item found for task {0}'.format(self.id))
-            annotations = MultiModalAssessmentResult.objects.filter(
-                task=self, activated=False, completed=True
-            ).values_list('item_id', flat=True)
-            uniqueAnnotations = len(set(annotations))
-
-            required_user_results = 100
-            if trusted_user:
-                required_user_results = 70
-
-            _total_required = self.requiredAnnotations * required_user_results
-            LOGGER.info(
-                'Unique annotations={0}/{1}'.format(uniqueAnnotations, _total_required)
-            )
-            if uniqueAnnotations >= _total_required:
-                LOGGER.info('Completing task {0}'.format(self.id))
-                self.complete()
-                self.save()
-
-                # Not sure why I would complete the batch here?
-                # self.batchData.complete()
-                # self.batchData.save()
-
-        if return_completed_items:
-            return (next_item, completed_items)
-
-        return next_item
-
-    @classmethod
-    def get_task_for_user(cls, user):
-        for active_task in cls.objects.filter(
-            assignedTo=user, activated=True, completed=False
-        ).order_by('-id'):
-            next_item = active_task.next_item_for_user(user)
-            if next_item is not None:
-                return active_task
-
-        return None
-
-    @classmethod
-    def get_next_free_task_for_language(cls, code, campaign=None, user=None):
-        active_tasks = cls.objects.filter(
-            activated=True,
-            completed=False,
-            items__metadata__market__targetLanguageCode=code,
-        )
-
-        if campaign:
-            active_tasks = active_tasks.filter(campaign=campaign)
-
-        for active_task in active_tasks.order_by('id'):
-            active_users = active_task.assignedTo.count()
-            print(active_users, active_task.requiredAnnotations)
-            if active_users < active_task.requiredAnnotations:
-                if user and not user in active_task.assignedTo.all():
-                    return active_task
-
-        return None
-
-    @classmethod
-    def get_next_free_task_for_language_and_campaign(cls, code, campaign):
-        return cls.get_next_free_task_for_language(code, campaign)
-
     @classmethod
     def import_from_json(cls, campaign, batch_user, batch_data, max_count):
         """
@@ -364,6 +244,7 @@ class MultiModalAssessmentTask(BaseMetadata):
                 requiredAnnotations=batch_task['task']['requiredAnnotations'],
                 batchNo=batch_task['task']['batchNo'],
                 batchData=batch_data,
+                market=batch_meta.market,
                 createdBy=batch_user,
             )
             new_task.save()
@@ -408,7 +289,7 @@ class MultiModalAssessmentTask(BaseMetadata):
         )
 
 
-class MultiModalAssessmentResult(BaseMetadata):
+class MultiModalAssessmentResult(BaseAnnotationResult):
     """
     Models a multimodal assessment evaluation result.
     """
@@ -480,16 +361,6 @@ class MultiModalAssessmentResult(BaseMetadata):
 
         return (completed_hits, total_hits)
 
-    @classmethod
-    def get_time_for_user(cls, user):
-        results = cls.objects.filter(createdBy=user, activated=False, completed=True)
-
-        timestamps = []
-        for result in results:
-            timestamps.append((result.start_time, result.end_time))
-
-        return seconds_to_timedelta(_compute_user_total_annotation_time(timestamps))
-
     @classmethod
     def compute_accurate_group_status(cls):
         from Dashboard.models import LANGUAGE_CODES_AND_NAMES
@@ -531,96 +402,6 @@ class MultiModalAssessmentResult(BaseMetadata):
 
         return group_hits
 
-    @classmethod
-    def dump_all_results_to_csv_file(cls, csv_file):
-        from Dashboard.models import LANGUAGE_CODES_AND_NAMES
-
-        system_scores = defaultdict(list)
-        user_data = {}
-        qs = cls.objects.filter(completed=True)
-        for result in qs.values_list(
-            'item__targetID',
-            'score',
-            'start_time',
-            'end_time',
-            'createdBy',
-            'item__itemID',
-            'item__metadata__market__sourceLanguageCode',
-            'item__metadata__market__targetLanguageCode',
-            'item__metadata__market__domainName',
-            'item__itemType',
-            'task__id',
-            'task__campaign__campaignName',
-        ):
-
-            systemID = result[0]
-            score = result[1]
-            start_time = result[2]
-            end_time = result[3]
-            duration = round(float(end_time) - float(start_time), 1)
-            annotatorID = result[4]
-            segmentID = result[5]
-            marketID = '{0}-{1}'.format(result[6], result[7])
-            domainName = result[8]
-            itemType = result[9]
-            taskID = result[10]
-            campaignName = result[11]
-
-            if annotatorID in user_data:
-                username = user_data[annotatorID][0]
-                useremail = user_data[annotatorID][1]
-                usergroups = user_data[annotatorID][2]
-
-            else:
-                user = User.objects.get(pk=annotatorID)
-                username = user.username
-                useremail = user.email
-                usergroups = ';'.join(
-                    [
-                        x.name
-                        for x in user.groups.all()
-                        if not x.name in LANGUAGE_CODES_AND_NAMES.keys()
-                    ]
-                )
-                if not usergroups:
-                    usergroups = 'NoGroupInfo'
-
-                user_data[annotatorID] = (username, useremail, usergroups)
-
-            system_scores[marketID + '-' + domainName].append(
-                (
-                    taskID,
-                    systemID,
-                    username,
-                    useremail,
-                    usergroups,
-                    segmentID,
-                    score,
-                    start_time,
-                    end_time,
-                    duration,
-                    itemType,
-                    campaignName,
-                )
-            )
-
-        x = system_scores
-        s = [
-            'taskID,systemID,username,email,groups,segmentID,score,startTime,endTime,durationInSeconds,itemType,campaignName'
-        ]
-        for l in x:
-            for i in x[l]:
-                s.append(','.join([str(a) for a in i]))
-
-        from os.path import join
-        from Appraise.settings import BASE_DIR
-
-        media_file_path = join(BASE_DIR, 'media', csv_file)
-        with open(media_file_path, 'w') as outfile:
-            for c in s:
-                outfile.write(c)
-                outfile.write('\n')
-
     @classmethod
     def get_system_annotations(cls):
         system_scores = defaultdict(list)
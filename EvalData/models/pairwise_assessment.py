@@ -21,7 +21,7 @@ from django.db import models
 from django.utils.text import format_lazy as f
 from django.utils.translation import gettext_lazy as _
 
-from Appraise.utils import _get_logger, _compute_user_total_annotation_time
+from Appraise.utils import _get_logger
 from Dashboard.models import LANGUAGE_CODES_AND_NAMES
 from EvalData.models.base_models import *
 
@@ -32,11 +32,14 @@ LOGGER = _get_logger(name=__name__)
 
 
 @AnnotationTaskRegistry.register
-class PairwiseAssessmentTask(BaseMetadata):
+class PairwiseAssessmentTask(BaseAnnotationTask):
     """
     Models a direct assessment evaluation task.
     """
 
+    RESULT_MODEL_NAME = 'PairwiseAssessmentResult'
+    TRUSTED_ITEM_FILTER = models.Q(itemType__startswith='TGT')
+
     campaign = models.ForeignKey(
         'Campaign.Campaign',
         db_index=True,
@@ -88,36 +91,6 @@ class PairwiseAssessmentTask(BaseMetadata):
         verbose_name=_('Batch data'),
     )
 
-    def dataName(self):
-        return str(self.batchData)
-
-    def marketName(self):
-        return str(self.items.first().metadata.market)
-
-    def marketSourceLanguage(self):
-        tokens = str(self.items.first().metadata.market).split('_')
-        if len(tokens) == 3 and tokens[0] in LANGUAGE_CODES_AND_NAMES.keys():
-            return LANGUAGE_CODES_AND_NAMES[tokens[0]]
-        return None
-
-    def marketSourceLanguageCode(self):
-        tokens = str(self.items.first().metadata.market).split('_')
-        if len(tokens) == 3 and tokens[0] in LANGUAGE_CODES_AND_NAMES.keys():
-            return tokens[0]
-        return None
-
-    def marketTargetLanguage(self):
-        tokens = str(self.items.first().metadata.market).split('_')
-        if len(tokens) == 3 and tokens[1] in LANGUAGE_CODES_AND_NAMES.keys():
-            return LANGUAGE_CODES_AND_NAMES[tokens[1]]
-        return None
-
-    def marketTargetLanguageCode(self):
-        tokens = str(self.items.first().metadata.market).split('_')
-        if len(tokens) == 3 and tokens[1] in LANGUAGE_CODES_AND_NAMES.keys():
-            return tokens[1]
-        return None
-
     def completed_items_for_user(self, user):
         results = PairwiseAssessmentResult.objects.filter(
             task=self, activated=False, completed=True, createdBy=user
@@ -125,129 +98,6 @@ class PairwiseAssessmentTask(BaseMetadata):
 
         return len(set(results))
 
-    def is_trusted_user(self, user):
-        from Campaign.models import TrustedUser
-
-        trusted_user = TrustedUser.objects.filter(user=user, campaign=self.campaign)
-        return trusted_user.exists()
-
-    def next_item_for_user(self, user, return_completed_items=False):
-        trusted_user = self.is_trusted_user(user)
-
-        next_item = None
-        completed_items = 0
-        for item in self.items.all().order_by('id'):
-            result = PairwiseAssessmentResult.objects.filter(
-                item=item, activated=False, completed=True, createdBy=user
-            )
-
-            if not result.exists():
-                print(
-                    'identified next item: {0}/{1} for trusted={2}'.format(
-                        item.id, item.itemType, trusted_user
-                    )
-                )
-                if not trusted_user or item.itemType.startswith('TGT'):
-                    next_item = item
-                    break
-
-            completed_items += 1
-
-        if not next_item:
-            LOGGER.info('No next item found for task {0}'.format(self.id))
-            annotations = PairwiseAssessmentResult.objects.filter(
-                task=self, activated=False, completed=True
-            ).values_list('item_id', flat=True)
-            uniqueAnnotations = len(set(annotations))
-
-            required_user_results = 100
-            if trusted_user:
-                required_user_results = 70
-
-            _total_required = self.requiredAnnotations * required_user_results
-            LOGGER.info(
-                'Unique annotations={0}/{1}'.format(uniqueAnnotations, _total_required)
-            )
-            if uniqueAnnotations >= _total_required:
-                LOGGER.info('Completing task {0}'.format(self.id))
-                self.complete()
-                self.save()
-
-                # Not sure why I would complete the batch here?
-                # self.batchData.complete()
-                # self.batchData.save()
-
-        if return_completed_items:
-            return (next_item, completed_items)
-
-        return next_item
-
-    @classmethod
-    def get_task_for_user(cls, user):
-        for active_task in cls.objects.filter(
-            assignedTo=user, activated=True, completed=False
-        ).order_by('-id'):
-            next_item = active_task.next_item_for_user(user)
-            if next_item is not None:
-                return active_task
-
-        return None
-
-    @classmethod
-    def get_next_free_task_for_language(cls, code, campaign=None, user=None):
-        print('  Looking for next free task for language: {0}'.format(code))
-        print('  Campaign: {0}'.format(campaign))
-        print('  User: {0}'.format(user))
-
-        active_tasks = cls.objects.filter(
-            activated=True,
-            completed=False,
-            items__metadata__market__targetLanguageCode=code,
-        )
-
-        print('    Number of active tasks: ({0})'.format(len(active_tasks)))
-
-        if campaign:
-            active_tasks = active_tasks.filter(campaign=campaign)
-
-        for active_task in active_tasks.order_by('id'):
-            active_users = active_task.assignedTo.count()
-            if active_users < active_task.requiredAnnotations:
-                if user and not user in active_task.assignedTo.all():
-                    return active_task
-
-        print('    No next free task available')
-        return None
-
-        # It seems that assignedTo is converted to an integer count.
-        active_tasks = active_tasks.order_by('id').values_list(
-            'id', 'requiredAnnotations', 'assignedTo'
-        )
-
-        for active_task in active_tasks:
-            print(active_task)
-            active_users = active_task[2] or 0
-            if active_users < active_task[1]:
-                return cls.objects.get(pk=active_task[0])
-
-        return None
-
-        # TODO: this needs to be removed.
-        for active_task in active_tasks:
-            market = active_task.items.first().metadata.market
-            if not market.targetLanguageCode == code:
-                continue
-
-            active_users = active_task.assignedTo.count()
-            if active_users < active_task.requiredAnnotations:
-                return active_task
-
-        return None
-
-    @classmethod
-    def get_next_free_task_for_language_and_campaign(cls, code, campaign):
-        return cls.get_next_free_task_for_language(code, campaign)
-
     @classmethod
     def import_from_json(cls, campaign, batch_user, batch_data, max_count):
         """
@@ -360,6 +210,7 @@ class PairwiseAssessmentTask(BaseMetadata):
                 requiredAnnotations=batch_task['task']['requiredAnnotations'],
                 batchNo=batch_task['task']['batchNo'],
                 batchData=batch_data,
+                market=batch_meta.market,
                 createdBy=batch_user,
             )
             new_task.save()
@@ -406,6 +257,10 @@ class PairwiseAssessmentResult(BasePairwiseAssessmentResult):
     Models a contrastive direct assessment evaluation result.
     """
 
+    EXPORT_COLUMNS = PAIRWISE_EXPORT_COLUMNS
+    CSV_FIELDS = PAIRWISE_CSV_FIELDS
+    CSV_HEADER = PAIRWISE_CSV_HEADER
+
     score1 = models.PositiveSmallIntegerField(
         verbose_name=_('Score (1)'),
         help_text=_('(value in range=[1,100])'),
@@ -486,16 +341,6 @@ class PairwiseAssessmentResult(BasePairwiseAssessmentResult):
 
         return (completed_hits, total_hits)
 
-    @classmethod
-    def get_time_for_user(cls, user):
-        results = cls.objects.filter(createdBy=user, activated=False, completed=True)
-
-        timestamps = []
-        for result in results:
-            timestamps.append((result.start_time, result.end_time))
-
-        return seconds_to_timedelta(_compute_user_total_annotation_time(timestamps))
-
     @classmethod
     def get_system_annotations(cls):
         system_scores = defaultdict(list)
@@ -569,184 +414,6 @@ class PairwiseAssessmentResult(BasePairwiseAssessmentResult):
 
         return group_hits
 
-    @classmethod
-    def dump_all_results_to_csv_file(cls, csv_file):
-        from Dashboard.models import LANGUAGE_CODES_AND_NAMES
-
-        system_scores = defaultdict(list)
-        user_data = {}
-        qs = cls.objects.filter(completed=True)
-
-        value_names = (
-            'item__target1ID',
-            'score1',
-            'item__target2ID',
-            'score2',
-            'start_time',
-            'end_time',
-            'createdBy',
-            'item__itemID',
-            'item__metadata__market__sourceLanguageCode',
-            'item__metadata__market__targetLanguageCode',
-            'item__metadata__market__domainName',
-            'item__itemType',
-            'task__id',
-            'task__campaign__campaignName',
-        )
-        for result in qs.values_list(*value_names):
-            system1ID = result[0]
-            score1 = result[1]
-            system2ID = result[2]
-            score2 = result[3]
-            start_time = result[4]
-            end_time = result[5]
-            duration = round(float(end_time) - float(start_time), 1)
-            annotatorID = result[6]
-            segmentID = result[7]
-            marketID = '{0}-{1}'.format(result[8], result[9])
-            domainName = result[10]
-            itemType = result[11]
-            taskID = result[12]
-            campaignName = result[13]
-
-            if annotatorID in user_data:
-                username = user_data[annotatorID][0]
-                useremail = user_data[annotatorID][1]
-                usergroups = user_data[annotatorID][2]
-
-            else:
-                user = User.objects.get(pk=annotatorID)
-                username = user.username
-                useremail = user.email
-                usergroups = ';'.join(
-                    [
-                        x.name
-                        for x in user.groups.all()
-                        if not x.name in LANGUAGE_CODES_AND_NAMES.keys()
-                    ]
-                )
-                if not usergroups:
-                    usergroups = 'NoGroupInfo'
-
-                user_data[annotatorID] = (username, useremail, usergroups)
-
-            system_scores[marketID + '-' + domainName].append(
-                (
-                    taskID,
-                    segmentID,
-                    username,
-                    useremail,
-                    usergroups,
-                    system1ID,
-                    score1,
-                    system2ID,
-                    score2,
-                    start_time,
-                    end_time,
-                    duration,
-                    itemType,
-                    campaignName,
-                )
-            )
-
-        # TODO: this is very intransparent... and needs to be fixed!
-        x = system_scores
-        s = [
-            'taskID,segmentID,username,email,groups,system1ID,score1,system2ID,score2,startTime,endTime,durationInSeconds,itemType,campaignName'
-        ]
-        for l in x:
-            for i in x[l]:
-                s.append(','.join([str(a) for a in i]))
-
-        from os.path import join
-        from Appraise.settings import BASE_DIR
-
-        media_file_path = join(BASE_DIR, 'media', csv_file)
-        with open(media_file_path, 'w') as outfile:
-            for c in s:
-                outfile.write(c)
-                outfile.write('\n')
-
-    @classmethod
-    def get_csv(cls, srcCode, tgtCode, domain):
-        system_scores = defaultdict(list)
-        qs = cls.objects.filter(completed=True)
-
-        value_names = (
-            'item__target1ID',
-            'score1',
-            'item__target2ID',
-            'score2',
-            'start_time',
-            'end_time',
-            'createdBy',
-            'item__itemID',
-            'item__metadata__market__sourceLanguageCode',
-            'item__metadata__market__targetLanguageCode',
-            'item__metadata__market__domainName',
-            'item__itemType',
-        )
-
-        for result in qs.values_list(*value_names):
-            if (
-                not domain == result[10]
-                or not srcCode == result[8]
-                or not tgtCode == result[9]
-            ):
-                continue
-
-            system1ID = result[0]
-            score1 = result[1]
-            system2ID = result[2]
-            score2 = result[3]
-            start_time = result[4]
-            end_time = result[5]
-            duration = round(float(end_time) - float(start_time), 1)
-            annotatorID = result[6]
-            segmentID = result[7]
-            marketID = '{0}-{1}'.format(result[8], result[9])
-            domainName = result[10]
-            itemType = result[11]
-            user = User.objects.get(pk=annotatorID)
-            username = user.username
-            useremail = user.email
-            system_scores[marketID + '-' + domainName].append(
-                (
-                    segmentID,
-                    username,
-                    useremail,
-                    system1ID,
-                    score1,
-                    system2ID,
-                    score2,
-                    duration,
-                    itemType,
-                )
-            )
-
-        return system_scores
-
-    @classmethod
-    def write_csv(cls, srcCode, tgtCode, domain, csvFile, allData=False):
-        x = cls.get_csv(srcCode, tgtCode, domain)
-        s = ['username,email,segmentID,score1,score2,durationInSeconds,itemType']
-        if allData:
-            s[0] = 'systemID,' + s[0]
-
-        for l in x:
-            for i in x[l]:
-                e = i[1:] if not allData else i
-                s.append(','.join([str(a) for a in e]))
-
-        from os.path import join
-        from Appraise.settings import BASE_DIR
-
-        media_file_path = join(BASE_DIR, 'media', csvFile)
-        with open(media_file_path, 'w') as outfile:
-            for c in s:
-                outfile.write(c)
-                outfile.write('\n')
-
     @classmethod
     def get_system_scores(cls, campaign_id):
         system_scores = defaultdict(list)
@@ -790,6 +457,8 @@ class PairwiseAssessmentResult(BasePairwiseAssessmentResult):
         expand_multi_sys=True,
         include_inactive=False,
         add_batch_info=False,
+        add_result_id=False,
+        subset=None,
     ):
         system_data = []
 
@@ -800,6 +469,10 @@ class PairwiseAssessmentResult(BasePairwiseAssessmentResult):
         qs = cls.objects.filter(completed=True, item__itemType__in=item_types)
         #        print('Found completed items: {0}'.format(len(qs)))
 
+        # If subset of results is given, only return data for these results.
+        if subset is not None:
+            qs = qs.filter(id__in=subset.values('id'))
+
         # If campaign ID is given, only return results for this campaign.
         if campaign_id:
             qs = qs.filter(task__campaign__id=campaign_id)
@@ -828,6 +501,9 @@ class PairwiseAssessmentResult(BasePairwiseAssessmentResult):
                 'end_time',  # End time
             )
 
+        if add_result_id:
+            attributes_to_extract = attributes_to_extract + ('id',)  # Result ID
+
         if add_batch_info:
             attributes_to_extract = attributes_to_extract + (
                 'task__batchNo',  # Batch number
@@ -15,12 +15,18 @@ from django.db import models
 from django.utils.text import format_lazy as f
 from django.utils.translation import gettext_lazy as _
 
-from Appraise.utils import _get_logger, _compute_user_total_annotation_time
+from Appraise.utils import _get_logger
 from Dashboard.models import LANGUAGE_CODES_AND_NAMES
 from EvalData.models.base_models import AnnotationTaskRegistry
-from EvalData.models.base_models import BaseMetadata
+from EvalData.models.base_models import BaseAnnotationResult
+from EvalData.models.base_models import BaseDocumentAnnotationTask
+from EvalData.models.base_models import DOCUMENT_CSV_FIELDS
+from EvalData.models.base_models import DOCUMENT_CSV_HEADER
+from EvalData.models.base_models import DOCUMENT_EXPORT_COLUMNS
 from EvalData.models.base_models import MAX_REQUIREDANNOTATIONS_VALUE
-from EvalData.models.base_models import seconds_to_timedelta
+from EvalData.models.base_models import PAIRWISE_CSV_FIELDS
+from EvalData.models.base_models import PAIRWISE_CSV_HEADER
+from EvalData.models.base_models import PAIRWISE_EXPORT_COLUMNS
 from EvalData.models.base_models import TextSegmentWithTwoTargets
 
 # TODO: Unclear if these are needed?
@@ -58,7 +64,7 @@ class TextSegmentWithTwoTargetsWithContext(TextSegmentWithTwoTargets):
 
 
 @AnnotationTaskRegistry.register
-class PairwiseAssessmentDocumentTask(BaseMetadata):
+class PairwiseAssessmentDocumentTask(BaseDocumentAnnotationTask):
     """
     Models a pairwise assessment document evaluation task.
 
@@ -70,6 +76,8 @@ class PairwiseAssessmentDocumentTask(BaseMetadata):
     DirectAssessmentContextTask.
     """
 
+    RESULT_MODEL_NAME = 'PairwiseAssessmentDocumentResult'
+
     campaign = models.ForeignKey(
         'Campaign.Campaign',
         db_index=True,
@@ -121,36 +129,6 @@ class PairwiseAssessmentDocumentTask(BaseMetadata):
         verbose_name=_('Batch data'),
     )
 
-    def dataName(self):
-        return str(self.batchData)
-
-    def marketName(self):
-        return str(self.items.first().metadata.market)
-
-    def marketSourceLanguage(self):
-        tokens = str(self.items.first().metadata.market).split('_')
-        if len(tokens) == 3 and tokens[0] in LANGUAGE_CODES_AND_NAMES.keys():
-            return LANGUAGE_CODES_AND_NAMES[tokens[0]]
-        return None
-
-    def marketSourceLanguageCode(self):
-        tokens = str(self.items.first().metadata.market).split('_')
-        if len(tokens) == 3 and tokens[0] in LANGUAGE_CODES_AND_NAMES.keys():
-            return tokens[0]
-        return None
-
-    def marketTargetLanguage(self):
-        tokens = str(self.items.first().metadata.market).split('_')
-        if len(tokens) == 3 and tokens[1] in LANGUAGE_CODES_AND_NAMES.keys():
-            return LANGUAGE_CODES_AND_NAMES[tokens[1]]
-        return None
-
-    def marketTargetLanguageCode(self):
-        tokens = str(self.items.first().metadata.market).split('_')
-        if len(tokens) == 3 and tokens[1] in LANGUAGE_CODES_AND_NAMES.keys():
-            return tokens[1]
-        return None
-
     def completed_items_for_user(self, user):
         results = PairwiseAssessmentDocumentResult.objects.filter(
             task=self, activated=False, completed=True, createdBy=user
@@ -158,217 +136,6 @@ class PairwiseAssessmentDocumentTask(BaseMetadata):
 
         return len(set(results))
 
-    def is_trusted_user(self, user):
-        from Campaign.models import TrustedUser
-
-        trusted_user = TrustedUser.objects.filter(user=user, campaign=self.campaign)
-        return trusted_user.exists()
-
-    def next_item_for_user(self, user, return_completed_items=False):
-        trusted_user = self.is_trusted_user(user)
-
-        next_item = None
-        completed_items = 0
-        for item in self.items.all().order_by('id'):
-            result = PairwiseAssessmentDocumentResult.objects.filter(
-                item=item, activated=False, completed=True, createdBy=user
-            )
-
-            if not result.exists():
-                print(
-                    'Identified next item: {}/{} (itemID={}) for trusted={}'.format(
-                        item.id, item.itemType, item.itemID, trusted_user
-                    )
-                )
-                if not trusted_user or item.itemType == 'TGT':
-                    next_item = item
-                    break
-
-            completed_items += 1
-
-        if not next_item:
-            LOGGER.info('No next item found for task {0}'.format(self.id))
-            annotations = PairwiseAssessmentDocumentResult.objects.filter(
-                task=self, activated=False, completed=True
-            ).values_list('item_id', flat=True)
-            uniqueAnnotations = len(set(annotations))
-
-            required_user_results = 100
-            if trusted_user:
-                required_user_results = 70
-
-            _total_required = self.requiredAnnotations * required_user_results
-            LOGGER.info(
-                'Unique annotations={0}/{1}'.format(uniqueAnnotations, _total_required)
-            )
-            if uniqueAnnotations >= _total_required:
-                LOGGER.info('Completing task {0}'.format(self.id))
-                self.complete()
-                self.save()
-
-                # Not sure why I would complete the batch here?
-                # self.batchData.complete()
-                # self.batchData.save()
-
-        if return_completed_items:
-            return (next_item, completed_items)
-
-        return next_item
-
-    def next_document_for_user(self, user, return_statistics=True):
-        """Returns the next item and all items from its document."""
-        # Find the next not annotated item
-        (
-            next_item,
-            completed_items,
-        ) = self.next_item_for_user(user, return_completed_items=True)
-
-        if not next_item:
-            if not return_statistics:
-                return (next_item, [], [])
-            return (next_item, completed_items, 0, 0, [], [], 0)
-
-        # Retrieve all items from the document which next_item belongs to
-        _items = self.items.filter(
-            documentID=next_item.documentID,
-        ).order_by('id')
-
-        block_items = []
-        current_block = False
-        for item in _items:
-            block_items.append(item)
-            if item.id == next_item.id:
-                current_block = True
-            if item.isCompleteDocument:
-                if current_block:
-                    break
-                block_items.clear()
-
-        # Get results for completed items in this block
-        block_results = self.get_results_for_each_item(block_items, user)
-
-        if not return_statistics:
-            return (next_item, block_items, block_results)
-
-        # Collect statistics
-        completed_items_in_block = len(
-            [res for res in block_results if res is not None]
-        )
-        completed_blocks = PairwiseAssessmentDocumentResult.objects.filter(
-            task=self,
-            item__isCompleteDocument=True,
-            completed=True,
-            createdBy=user,
-        ).count()
-        total_blocks = self.items.filter(isCompleteDocument=True).count()
-
-        print(
-            'Completed {}/{} documents, {}/{} items in the current document, completed {} items in total'.format(
-                completed_blocks,
-                total_blocks,
-                completed_items_in_block,
-                len(block_items),
-                completed_items,
-            )
-        )
-
-        return (
-            next_item,  # the first unannotated item for the user
-            completed_items,  # the number of completed items in the task
-            completed_blocks,  # the number of completed documents in the task
-            completed_items_in_block,  # the number of completed items in the current document
-            block_items,  # all items from the current document
-            block_results,  # all score results from the current document
-            total_blocks,  # the total number of documents in the task
-        )
-
-    def get_results_for_each_item(self, block_items, user):
-        """Returns the latest result object for each item or none."""
-        # TODO: optimize, this possibly makes too many individual queries
-        block_results = []
-
-        for item in block_items:
-            result = (
-                PairwiseAssessmentDocumentResult.objects.filter(
-                    item__id=item.id,
-                    completed=True,
-                    createdBy=user,  # TODO: is passing user as an argument needed?
-                    task=self,
-                )
-                .order_by('item__id', 'dateModified')
-                .first()
-            )
-            block_results.append(result)
-
-        # Sanity checks for items and results
-        if len(block_items) != len(block_results):
-            print('Warning: incorrect number of retrieved results!')
-        for item, result in zip(block_items, block_results):
-            # print(f'  >> item={item} result={result}')
-            if result and item.id != result.item.id:
-                print('Warning: incorrect order of items and results!')
-
-        return block_results
-
-    @classmethod
-    def get_task_for_user(cls, user):
-        for active_task in cls.objects.filter(
-            assignedTo=user, activated=True, completed=False
-        ).order_by('-id'):
-            next_item = active_task.next_item_for_user(user)
-            if next_item is not None:
-                return active_task
-
-        return None
-
-    @classmethod
-    def get_next_free_task_for_language(cls, code, campaign=None, user=None):
-        active_tasks = cls.objects.filter(
-            activated=True,
-            completed=False,
-            items__metadata__market__targetLanguageCode=code,
-        )
-
-        if campaign:
-            active_tasks = active_tasks.filter(campaign=campaign)
-
-        for active_task in active_tasks.order_by('id'):
-            active_users = active_task.assignedTo.count()
-            if active_users < active_task.requiredAnnotations:
-                if user and not user in active_task.assignedTo.all():
-                    return active_task
-
-        return None
-
-        # It seems that assignedTo is converted to an integer count.
-        active_tasks = active_tasks.order_by('id').values_list(
-            'id', 'requiredAnnotations', 'assignedTo'
-        )
-
-        for active_task in active_tasks:
-            print(active_task)
-            active_users = active_task[2] or 0
-            if active_users < active_task[1]:
-                return cls.objects.get(pk=active_task[0])
-
-        return None
-
-        # TODO: this needs to be removed.
-        for active_task in active_tasks:
-            market = active_task.items.first().metadata.market
-            if not market.targetLanguageCode == code:
-                continue
-
-            active_users = active_task.assignedTo.count()
-            if active_users < active_task.requiredAnnotations:
-                return active_task
-
-        return None
-
-    @classmethod
-    def get_next_free_task_for_language_and_campaign(cls, code, campaign):
-        return cls.get_next_free_task_for_language(code, campaign)
-
     @classmethod
     def import_from_json(cls, campaign, batch_user, batch_data, max_count):
         """
@@ -491,6 +258,7 @@ class PairwiseAssessmentDocumentTask(BaseMetadata):
                 requiredAnnotations=batch_task['task']['requiredAnnotations'],
                 batchNo=batch_task['task']['batchNo'],
                 batchData=batch_data,
+                market=batch_meta.market,
                 createdBy=batch_user,
             )
             new_task.save()
@@ -532,11 +300,15 @@ class PairwiseAssessmentDocumentTask(BaseMetadata):
         return '{0}.{1}[{2}]'.format(self.__class__.__name__, self.campaign, self.id)
 
 
-class PairwiseAssessmentDocumentResult(BaseMetadata):
+class PairwiseAssessmentDocumentResult(BaseAnnotationResult):
     """
     Models a direct assessment document evaluation result.
     """
 
+    EXPORT_COLUMNS = PAIRWISE_EXPORT_COLUMNS + DOCUMENT_EXPORT_COLUMNS
+    CSV_FIELDS = PAIRWISE_CSV_FIELDS + DOCUMENT_CSV_FIELDS
+    CSV_HEADER = PAIRWISE_CSV_HEADER + DOCUMENT_CSV_HEADER
+
     score1 = models.PositiveSmallIntegerField(
         verbose_name=_('Score (1)'),
         help_text=_('(value in range=[1,100])'),
@@ -617,16 +389,6 @@ class PairwiseAssessmentDocumentResult(BaseMetadata):
 
         return (completed_hits, total_hits)
 
-    @classmethod
-    def get_time_for_user(cls, user):
-        results = cls.objects.filter(createdBy=user, activated=False, completed=True)
-
-        timestamps = []
-        for result in results:
-            timestamps.append((result.start_time, result.end_time))
-
-        return seconds_to_timedelta(_compute_user_total_annotation_time(timestamps))
-
     @classmethod
     def get_system_annotations(cls):
         system_scores = defaultdict(list)
@@ -700,198 +462,6 @@ class PairwiseAssessmentDocumentResult(BaseMetadata):
 
         return group_hits
 
-    @classmethod
-    def dump_all_results_to_csv_file(cls, csv_file):
-        from Dashboard.models import LANGUAGE_CODES_AND_NAMES
-
-        system_scores = defaultdict(list)
-        user_data = {}
-        qs = cls.objects.filter(completed=True)
-
-        value_names = (
-            'item__targetID',
-            'score1',
-            'item__target2ID',
-            'score2',
-            'start_time',
-            'end_time',
-            'createdBy',
-            'item__itemID',
-            'item__metadata__market__sourceLanguageCode',
-            'item__metadata__market__targetLanguageCode',
-            'item__metadata__market__domainName',
-            'item__itemType',
-            'task__id',
-            'task__campaign__campaignName',
-            'item__documentID',
-            'item__isCompleteDocument',
-        )
-        for result in qs.values_list(*value_names):
-            system1ID = result[0]
-            score1 = result[1]
-            system2ID = result[2]
-            score2 = result[3]
-            start_time = result[4]
-            end_time = result[5]
-            duration = round(float(end_time) - float(start_time), 1)
-            annotatorID = result[6]
-            segmentID = result[7]
-            marketID = '{0}-{1}'.format(result[8], result[9])
-            domainName = result[10]
-            itemType = result[11]
-            taskID = result[12]
-            campaignName = result[13]
-            documentID = result[14]
-            isCompleteDocument = result[15]
-
-            if annotatorID in user_data:
-                username = user_data[annotatorID][0]
-                useremail = user_data[annotatorID][1]
-                usergroups = user_data[annotatorID][2]
-
-            else:
-                user = User.objects.get(pk=annotatorID)
-                username = user.username
-                useremail = user.email
-                usergroups = ';'.join(
-                    [
-                        x.name
-                        for x in user.groups.all()
-                        if not x.name in LANGUAGE_CODES_AND_NAMES.keys()
-                    ]
-                )
-                if not usergroups:
-                    usergroups = 'NoGroupInfo'
-
-                user_data[annotatorID] = (username, useremail, usergroups)
-
-            system_scores[marketID + '-' + domainName].append(
-                (
-                    taskID,
-                    segmentID,
-                    username,
-                    useremail,
-                    usergroups,
-                    system1ID,
-                    score1,
-                    system2ID,
-                    score2,
-                    start_time,
-                    end_time,
-                    duration,
-                    itemType,
-                    campaignName,
-                    documentID,
-                    isCompleteDocument,
-                )
-            )
-
-        # TODO: this is very intransparent... and needs to be fixed!
-        x = system_scores
-        s = [
-            'taskID,segmentID,username,email,groups,system1ID,score1,system2ID,score2,startTime,endTime,durationInSeconds,itemType,campaignName,documentID,isCompleteDocument'
-        ]
-        for l in x:
-            for i in x[l]:
-                s.append(','.join([str(a) for a in i]))
-
-        from os.path import join
-        from Appraise.settings import BASE_DIR
-
-        media_file_path = join(BASE_DIR, 'media', csv_file)
-        with open(media_file_path, 'w') as outfile:
-            for c in s:
-                outfile.write(c)
-                outfile.write('\n')
-
-    @classmethod
-    def get_csv(cls, srcCode, tgtCode, domain):
-        system_scores = defaultdict(list)
-        qs = cls.objects.filter(completed=True)
-
-        value_names = (
-            'item__target1ID',
-            'score1',
-            'item__target2ID',
-            'score2',
-            'start_time',
-            'end_time',
-            'createdBy',
-            'item__itemID',
-            'item__metadata__market__sourceLanguageCode',
-            'item__metadata__market__targetLanguageCode',
-            'item__metadata__market__domainName',
-            'item__itemType',
-            'item__documentID',
-            'item__isCompleteDocument',
-        )
-        for result in qs.values_list(*value_names):
-
-            if (
-                not domain == result[10]
-                or not srcCode == result[8]
-                or not tgtCode == result[9]
-            ):
-                continue
-
-            system1ID = result[0]
-            score1 = result[1]
-            system2ID = result[2]
-            score2 = result[3]
-            start_time = result[4]
-            end_time = result[5]
-            duration = round(float(end_time) - float(start_time), 1)
-            annotatorID = result[6]
-            segmentID = result[7]
-            marketID = '{0}-{1}'.format(result[8], result[9])
-            domainName = result[10]
-            itemType = result[11]
-            documentID = result[12]
-            isCompleteDocument = result[13]
-            user = User.objects.get(pk=annotatorID)
-            username = user.username
-            useremail = user.email
-            system_scores[marketID + '-' + domainName].append(
-                (
-                    segmentID,
-                    username,
-                    useremail,
-                    system1ID,
-                    score1,
-                    system2ID,
-                    score2,
-                    duration,
-                    itemType,
-                    documentID,
-                    isCompleteDocument,
-                )
-            )
-
-        return system_scores
-
-    @classmethod
-    def write_csv(cls, srcCode, tgtCode, domain, csvFile, allData=False):
-        x = cls.get_csv(srcCode, tgtCode, domain)
-        s = [
-            'username,email,segmentID,score1,score2,durationInSeconds,itemType,documentID,isCompleteDocument'
-        ]
-        if allData:
-            s[0] = 'systemID,' + s[0]
-
-        for l in x:
-            for i in x[l]:
-                e = i[1:] if not allData else i
-                s.append(','.join([str(a) for a in e]))
-
-        from os.path import join
-        from Appraise.settings import BASE_DIR
-
-        media_file_path = join(BASE_DIR, 'media', csvFile)
-        with open(media_file_path, 'w') as outfile:
-            for c in s:
-                outfile.write(c)
-                outfile.write('\n')
-
     @classmethod
     def get_system_scores(cls, campaign_id):
         system_scores = defaultdict(list)
@@ -944,6 +514,8 @@ class PairwiseAssessmentDocumentResult(BaseMetadata):
         expand_multi_sys=True,
         include_inactive=False,
         add_batch_info=False,
+        add_result_id=False,
+        subset=None,
     ):
         system_data = []
 
@@ -953,6 +525,10 @@ class PairwiseAssessmentDocumentResult(BaseMetadata):
 
         qs = cls.objects.filter(completed=True, item__itemType__in=item_types)
 
+        # If subset of results is given, only return data for these results.
+        if subset is not None:
+            qs = qs.filter(id__in=subset.values('id'))
+
         # If campaign ID is given, only return results for this campaign.
         if campaign_id:
             qs = qs.filter(task__campaign__id=campaign_id)
@@ -980,6 +556,9 @@ class PairwiseAssessmentDocumentResult(BaseMetadata):
                 'end_time',  # End time
             )
 
+        if add_result_id:
+            attributes_to_extract = attributes_to_extract + ('id',)  # Result ID
+
         if add_batch_info:
             attributes_to_extract = attributes_to_extract + (
                 'task__batchNo',  # Batch number
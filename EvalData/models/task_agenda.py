@@ -4,6 +4,7 @@ Appraise evaluation framework
 See LICENSE for usage details
 """
 # pylint: disable=C0103,C0330,no-member
+from collections import defaultdict
 from inspect import currentframe
 from inspect import getframeinfo
 from re import compile as re_compile
@@ -13,7 +14,10 @@ from django.contrib.auth.models import User
 from django.db import models
 from django.utils.translation import gettext_lazy as _
 
+from Appraise.utils import _get_logger
+from Dashboard.cache import invalidate_dashboards
 from deprecated import add_deprecated_method
+from EvalData.models.base_models import AnnotationTaskRegistry
 from EvalData.models.base_models import ObjectID
 from EvalData.models.data_assessment import DataAssessmentResult
 from EvalData.models.direct_assessment import DirectAssessmentResult
@@ -31,10 +35,13 @@ from EvalData.models.pairwise_assessment import PairwiseAssessmentResult
 from EvalData.models.pairwise_assessment_document import (
     PairwiseAssessmentDocumentResult,
 )
+from EvalData.models.task_progress import TaskProgress
 
 # TODO: Unclear if these are needed?
 # from Appraise.settings import STATIC_URL, BASE_CONTEXT
 
+LOGGER = _get_logger(name=__name__)
+
 
 class TaskAgenda(models.Model):
     user = models.ForeignKey(User, models.PROTECT, verbose_name=_('User'))
@@ -66,13 +73,96 @@ class TaskAgenda(models.Model):
         return self._open_tasks.count() == 0
 
     def open_tasks(self):
-        return (x.get_object_instance() for x in self._open_tasks.all())
+        return (x for x in ObjectID.resolve_many(self._open_tasks.all()) if x)
 
     def serialized_open_tasks(self):
         return list(self._open_tasks.all())
 
     def completed_tasks(self):
-        return (x.get_object_instance() for x in self._completed_tasks.all())
+        return (x for x in ObjectID.resolve_many(self._completed_tasks.all()) if x)
+
+    @staticmethod
+    def _serialized_ids(tasks):
+        """
+        Returns set of ObjectID ids for given ObjectID instances or ids.
+        """
+        return {task.id if isinstance(task, ObjectID) else task for task in tasks}
+
+    def _filter_tasks(self, relation, ids):
+        """
+        Returns set of given ObjectID ids which are part of relation.
+        """
+        return set(
+            relation.through.objects.filter(
+                taskagenda=self, objectid_id__in=ids
+            ).values_list('objectid_id', flat=True)
+        )
+
+    def _move_tasks(self, source, target, ids):
+        """
+        Moves ObjectID ids from source to target relation.
+        """
+        source.through.objects.filter(taskagenda=self, objectid_id__in=ids).delete()
+        target.through.objects.bulk_create(
+            [target.through(taskagenda=self, objectid_id=_id) for _id in ids],
+            ignore_conflicts=True,
+        )
+        invalidate_dashboards([self.user_id])
+
+    def save(self, *args, **kwargs):
+        super(TaskAgenda, self).save(*args, **kwargs)
+        invalidate_dashboards([self.user_id])
+
+    def delete(self, *args, **kwargs):
+        user_id = self.user_id
+        result = super(TaskAgenda, self).delete(*args, **kwargs)
+        invalidate_dashboards([user_id])
+        return result
+
+    def activate_tasks(self, ids, only_completed=False):
+        """
+        Moves given tasks to open tasks, using set-based queries.
+
+        Accepts ObjectID instances or ids. If only_completed is set, only
+        tasks which are currently completed are activated. Returns set of
+        activated ObjectID ids.
+        """
+        ids = self._serialized_ids(ids)
+        if only_completed:
+            ids = self._filter_tasks(self._completed_tasks, ids)
+
+        if ids:
+            self._move_tasks(self._completed_tasks, self._open_tasks, ids)
+        return ids
+
+    def complete_tasks(self, ids, only_open=False):
+        """
+        Moves given tasks to completed tasks, using set-based queries.
+
+        Accepts ObjectID instances or ids. If only_open is set, only tasks
+        which are currently open are completed. Returns set of completed
+        ObjectID ids.
+        """
+        ids = self._serialized_ids(ids)
+        if only_open:
+            ids = self._filter_tasks(self._open_tasks, ids)
+
+        if ids:
+            self._move_tasks(self._open_tasks, self._completed_tasks, ids)
+        return ids
+
+    def contains_tasks(self, ids):
+        """
+        Returns set of given ObjectID ids which are assigned in this
+        TaskAgenda, either as open or as completed tasks.
+        """
+        ids = self._serialized_ids(ids)
+        if not ids:
+            return set()
+
+        return self._filter_tasks(self._open_tasks, ids) | self._filter_tasks(
+            self._completed_tasks, ids
+        )
 
     def activate_task(self, task):
         return self.activate_completed_task(task, only_completed=False)
@@ -81,15 +171,7 @@ class TaskAgenda(models.Model):
         if not isinstance(task, ObjectID):
             raise ValueError('Invalid task {0!r} not ObjectID ' 'instance'.format(task))
 
-        if only_completed and not task in self._completed_tasks.all():
-            return False
-
-        self._completed_tasks.remove(task)
-
-        if not task in self._open_tasks.all():
-            self._open_tasks.add(task)
-
-        return True
+        return bool(self.activate_tasks([task], only_completed=only_completed))
 
     def complete_task(self, task):
         return self.complete_open_task(task, only_open=False)
@@ -98,27 +180,73 @@ class TaskAgenda(models.Model):
         if not isinstance(task, ObjectID):
             raise ValueError('Invalid task {0!r} not ObjectID ' 'instance'.format(task))
 
-        if only_open and not task in self._open_tasks.all():
-            return False
-
-        self._open_tasks.remove(task)
-
-        if not task in self._completed_tasks.all():
-            self._completed_tasks.add(task)
-
-        return True
+        return bool(self.complete_tasks([task], only_open=only_open))
 
     def contains_task(self, task):
         """
         Returns True if task is assigned in this TaskAgenda, False otherwise.
         """
-        if task in self._open_tasks.all():
-            return True
+        return bool(self.contains_tasks([task]))
 
-        if task in self._completed_tasks.all():
-            return True
+    @classmethod
+    def resolve_open_tasks(cls, agendas, user):
+        """
+        Identifies the current task for the given user from open tasks in
+        the given agendas, using a bounded number of queries.
 
-        return False
+        Open tasks without remaining work for the user are completed in
+        their agenda. Returns a tuple (current_task, tasks_to_complete),
+        where the latter maps agendas to the completed ObjectID instances.
+        """
+        open_tasks = list(
+            cls._open_tasks.through.objects.filter(taskagenda__in=agendas)
+            .select_related('taskagenda', 'objectid')
+            .order_by('taskagenda_id', 'id')
+        )
+
+        # Fetch task instances with a single query per task type
+        task_types = set(
+            AnnotationTaskRegistry.get_type(x)
+            for x in AnnotationTaskRegistry.get_types()
+        )
+        serialized_tasks = [
+            open_task.objectid
+            for open_task in open_tasks
+            if open_task.objectid.get_model_and_id()[0] in task_types
+        ]
+        instances = {}
+        tasks_by_type = defaultdict(list)
+        for serialized, task in zip(
+            serialized_tasks, ObjectID.resolve_many(serialized_tasks)
+        ):
+            if task is not None:
+                instances[serialized.id] = task
+                tasks_by_type[task.__class__].append(task)
+
+        tasks_with_work = set()
+        for task_cls, tasks in tasks_by_type.items():
+            for task_id in task_cls.get_tasks_with_work_for_user(tasks, user):
+                tasks_with_work.add((task_cls, task_id))
+
+        current_task = None
+        tasks_to_complete = defaultdict(list)
+        for open_task in open_tasks:
+            # Skip tasks which are not available anymore
+            task = instances.get(open_task.objectid_id)
+            if task is None:
+                continue
+
+            if (task.__class__, task.id) in tasks_with_work:
+                current_task = task
+            else:
+                tasks_to_complete[open_task.taskagenda].append(open_task.objectid)
+
+        for agenda, serialized_tasks in tasks_to_complete.items():
+            LOGGER.info('Completing %s task(s) in %s', len(serialized_tasks), agenda)
+            if agenda.complete_tasks(serialized_tasks):
+                agenda.save()
+
+        return (current_task, tasks_to_complete)
 
     # TODO: decide whether this needs to be optimized.
     def __str__(self):
@@ -155,13 +283,12 @@ class TaskAgenda(models.Model):
             'PairwiseAssessmentTask': PairwiseAssessmentResult,
         }
 
-        result_class = type_to_result_class_mapping.get(
-            self.campaign.get_campaign_type(), None
-        )
+        campaign_type = self.campaign.get_campaign_type()
+        result_class = type_to_result_class_mapping.get(campaign_type, None)
 
         if not result_class:
             _msg = 'Unknown annotation type {0} for user {1}'.format(
-                self.campaign.get_campaign_type(), self.user
+                campaign_type, self.user
             )
             _lvl = messages.ERROR
             return (False, _msg, _lvl)
@@ -200,10 +327,15 @@ class TaskAgenda(models.Model):
             annotation_result.modifiedBy = _shadow_copy
             annotation_result.retire()  # Implictly calls save()
 
+        # Progress cursors are rebuilt from the remaining results
+        TaskProgress.objects.filter(user=self.user, campaign=self.campaign).delete()
+
         # pylint: disable=protected-access
-        for task in self._completed_tasks.all():
-            self._open_tasks.add(task)
-            self._completed_tasks.remove(task)
+        self.activate_tasks(
+            self._completed_tasks.through.objects.filter(taskagenda=self).values_list(
+                'objectid_id', flat=True
+            )
+        )
 
         _msg = (
             'Succesfully reset task agenda for user {0}, creating '
@@ -0,0 +1,340 @@
+"""
+Appraise evaluation framework
+
+See LICENSE for usage details
+"""
+# pylint: disable=C0103,C0330,no-member
+from collections import Counter
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+
+from django.db import models
+from django.db.models.signals import m2m_changed
+from django.utils.timezone import utc
+from django.utils.translation import gettext_lazy as _
+
+from EvalData.models.base_models import AnnotationTaskRegistry
+from EvalData.models.base_models import BaseAnnotationTask
+from EvalData.models.base_models import MAX_LANGUAGECODE_LENGTH
+from EvalData.models.base_models import MAX_TYPENAME_LENGTH
+
+# Collects IDs of campaigns whose capacity is rebuilt at the end of the
+# current deferred_capacity() scope, or None outside of such a scope
+_DEFERRED_CAMPAIGN_IDS = ContextVar('deferred_campaign_ids', default=None)
+
+
+@contextmanager
+def deferred_capacity():
+    """
+    Context manager suspending capacity updates within its scope, e.g.,
+    while importing tasks. Capacity of all affected campaigns is rebuilt
+    once at the end of the scope.
+    """
+    campaign_ids = set()
+    token = _DEFERRED_CAMPAIGN_IDS.set(campaign_ids)
+    try:
+        yield
+    finally:
+        _DEFERRED_CAMPAIGN_IDS.reset(token)
+
+    for campaign_id in sorted(campaign_ids):
+        TaskCapacity.rebuild(campaign_id)
+
+
+class TaskCapacity(models.Model):
+    """
+    Open annotation capacity per campaign, task type and target language.
+
+    Counts active, not completed tasks which can still be assigned to
+    annotators. Rows are refreshed whenever tasks change state or users
+    are (un)assigned, so that eligible languages for new tasks can be
+    looked up without scanning tasks of all campaigns.
+
+    Rows are updated by the difference in open capacity of changed tasks
+    using F() expressions, so changes do not recount tasks of a campaign.
+    """
+
+    campaign = models.ForeignKey(
+        'Campaign.Campaign', models.CASCADE, verbose_name=_('Campaign')
+    )
+
+    taskType = models.CharField(
+        max_length=MAX_TYPENAME_LENGTH, verbose_name=_('Task type')
+    )
+
+    targetLanguageCode = models.CharField(
+        db_index=True,
+        max_length=MAX_LANGUAGECODE_LENGTH,
+        verbose_name=_('Target language'),
+    )
+
+    openTasks = models.PositiveIntegerField(default=0, verbose_name=_('Open tasks'))
+
+    openSlots = models.PositiveIntegerField(default=0, verbose_name=_('Open slots'))
+
+    dateModified = models.DateTimeField(auto_now=True, verbose_name=_('Date modified'))
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['campaign', 'taskType', 'targetLanguageCode'],
+                name='unique_task_capacity',
+            )
+        ]
+        verbose_name_plural = 'Task capacities'
+
+    @staticmethod
+    def _get_open_tasks(task_cls):
+        """
+        Returns active tasks with remaining capacity, annotated with the
+        number of assigned users.
+        """
+        return (
+            task_cls.objects.filter(activated=True, completed=False)
+            .annotate(_assigned=models.Count('assignedTo', distinct=True))
+            .filter(_assigned__lt=models.F('requiredAnnotations'))
+        )
+
+    @classmethod
+    def get_open_capacities(cls, task_cls, task_ids):
+        """
+        Returns list of ((campaign ID, language code), open slots) tuples
+        for given tasks with open capacity.
+        """
+        open_tasks = (
+            cls._get_open_tasks(task_cls)
+            .filter(id__in=task_ids)
+            .order_by()
+            .values_list(
+                'campaign_id', 'targetLanguageCode', 'requiredAnnotations', '_assigned'
+            )
+        )
+        return [
+            ((campaign_id, code), required - assigned)
+            for campaign_id, code, required, assigned in open_tasks
+        ]
+
+    @classmethod
+    def apply_changes(cls, task_cls, before, after):
+        """
+        Updates capacity by the difference of open capacities of tasks
+        before and after a change, as returned by get_open_capacities().
+
+        Rows which do not exist yet are recomputed instead.
+        """
+        deltas = defaultdict(lambda: [0, 0])
+        for sign, open_capacities in ((-1, before), (1, after)):
+            for key, open_slots in open_capacities:
+                deltas[key][0] += sign
+                deltas[key][1] += sign * open_slots
+
+        deferred_ids = _DEFERRED_CAMPAIGN_IDS.get()
+        utc_now = datetime.utcnow().replace(tzinfo=utc)
+        for (campaign_id, code), (open_tasks, open_slots) in deltas.items():
+            if campaign_id is None or (open_tasks, open_slots) == (0, 0):
+                continue
+
+            if deferred_ids is not None:
+                deferred_ids.add(campaign_id)
+                continue
+
+            updated = cls.objects.filter(
+                campaign_id=campaign_id,
+                taskType=task_cls.__name__,
+                targetLanguageCode=code,
+            ).update(
+                openTasks=models.F('openTasks') + open_tasks,
+                openSlots=models.F('openSlots') + open_slots,
+                dateModified=utc_now,
+            )
+            if not updated:
+                cls.refresh(task_cls, campaign_id, code)
+
+    @classmethod
+    def refresh(cls, task_cls, campaign_id, code):
+        """
+        Recomputes capacity for the given task type, campaign and language.
+        """
+        if campaign_id is None:
+            return
+
+        deferred_ids = _DEFERRED_CAMPAIGN_IDS.get()
+        if deferred_ids is not None:
+            deferred_ids.add(campaign_id)
+            return
+
+        open_tasks = cls._get_open_tasks(task_cls).filter(
+            campaign_id=campaign_id, targetLanguageCode=code
+        )
+        open_slots = [
+            required - assigned
+            for required, assigned in open_tasks.values_list(
+                'requiredAnnotations', '_assigned'
+            )
+        ]
+
+        cls.objects.update_or_create(
+            campaign_id=campaign_id,
+            taskType=task_cls.__name__,
+            targetLanguageCode=code,
+            defaults={
+                'openTasks': len(open_slots),
+                'openSlots': sum(open_slots),
+            },
+        )
+
+    @classmethod
+    def rebuild(cls, campaign=None):
+        """
+        Recomputes capacity for all tasks, or only those in given campaign.
+
+        Returns the number of capacity rows created.
+        """
+        from EvalData.models import CAMPAIGN_TASK_TYPES
+
+        capacities = cls.objects.all()
+        if campaign:
+            capacities = capacities.filter(campaign=campaign)
+        capacities.delete()
+
+        new_capacities = []
+        for task_cls in CAMPAIGN_TASK_TYPES.values():
+            open_tasks = cls._get_open_tasks(task_cls)
+            if campaign:
+                open_tasks = open_tasks.filter(campaign=campaign)
+
+            open_slots = defaultdict(list)
+            for campaign_id, code, required, assigned in open_tasks.values_list(
+                'campaign_id', 'targetLanguageCode', 'requiredAnnotations', '_assigned'
+            ):
+                open_slots[(campaign_id, code)].append(required - assigned)
+
+            for (campaign_id, code), slots in open_slots.items():
+                new_capacities.append(
+                    cls(
+                        campaign_id=campaign_id,
+                        taskType=task_cls.__name__,
+                        targetLanguageCode=code,
+                        openTasks=len(slots),
+                        openSlots=sum(slots),
+                    )
+                )
+
+        cls.objects.bulk_create(new_capacities)
+        return len(new_capacities)
+
+    @classmethod
+    def get_languages_for_user(cls, user, codes):
+        """
+        Returns dict mapping task classes to dicts mapping campaign names
+        to the given language codes with free tasks for the user.
+
+        Open tasks already assigned to the user are not available to them.
+        These are counted with one query per task type with open capacity.
+        """
+        capacities = (
+            cls.objects.filter(targetLanguageCode__in=codes, openTasks__gt=0)
+            .select_related('campaign')
+            .order_by('campaign___str_name', 'campaign_id')
+        )
+
+        capacities_by_type = defaultdict(list)
+        for capacity in capacities:
+            capacities_by_type[capacity.taskType].append(capacity)
+
+        languages_map = {}
+        for task_type, _capacities in capacities_by_type.items():
+            task_cls = AnnotationTaskRegistry.get_type(task_type)
+            if task_cls is None:
+                continue
+
+            campaign_ids = {x.campaign_id for x in _capacities}
+            assigned = Counter(
+                cls._get_open_tasks(task_cls)
+                .filter(
+                    id__in=task_cls.objects.filter(assignedTo=user).values('id'),
+                    campaign_id__in=campaign_ids,
+                )
+                .values_list('campaign_id', 'targetLanguageCode')
+            )
+
+            may_assign = {}
+            for capacity in _capacities:
+                key = (capacity.campaign_id, capacity.targetLanguageCode)
+                if capacity.openTasks <= assigned[key]:
+                    continue
+
+                if capacity.campaign_id not in may_assign:
+                    may_assign[capacity.campaign_id] = (
+                        task_cls.may_assign_tasks_to_user(capacity.campaign, user)
+                    )
+                if not may_assign[capacity.campaign_id]:
+                    continue
+
+                campaign_languages = languages_map.setdefault(task_cls, {})
+                campaign_languages.setdefault(
+                    capacity.campaign.campaignName, []
+                ).append(capacity.targetLanguageCode)
+
+        # Keep languages in the order given by the caller
+        for campaign_languages in languages_map.values():
+            for _codes in campaign_languages.values():
+                _codes.sort(key=list(codes).index)
+
+        return languages_map
+
+    def __str__(self):
+        return '{0}/{1}/{2}:{3}'.format(
+            self.campaign_id, self.taskType, self.targetLanguageCode, self.openTasks
+        )
+
+
+# pylint: disable=unused-argument
+def _update_capacity_for_assignments(
+    sender, instance, action, reverse, model, pk_set, **kwargs
+):
+    """
+    Updates task capacity when users are (un)assigned to tasks.
+
+    Open capacities of affected tasks are read before and after the
+    change, and only their difference is applied.
+    """
+    if reverse:
+        task_cls = model
+        if not issubclass(task_cls, BaseAnnotationTask):
+            return
+        if sender is not task_cls.assignedTo.through:
+            return
+
+        if action == 'pre_clear':
+            # Assigned tasks are unknown once the relation has been cleared
+            tasks = task_cls.objects.filter(assignedTo=instance)
+            task_ids = set(tasks.values_list('id', flat=True))
+        else:
+            task_ids = pk_set
+
+    else:
+        task_cls = instance.__class__
+        if not isinstance(instance, BaseAnnotationTask):
+            return
+        if sender is not task_cls.assignedTo.through:
+            return
+
+        task_ids = (instance.id,)
+
+    if action in ('pre_add', 'pre_remove', 'pre_clear'):
+        instance._capacity_before = (
+            task_ids,
+            TaskCapacity.get_open_capacities(task_cls, task_ids),
+        )
+    elif action in ('post_add', 'post_remove', 'post_clear'):
+        task_ids, before = instance.__dict__.pop('_capacity_before', ((), ()))
+        after = TaskCapacity.get_open_capacities(task_cls, task_ids)
+        TaskCapacity.apply_changes(task_cls, before, after)
+
+
+m2m_changed.connect(
+    _update_capacity_for_assignments, dispatch_uid='refresh_task_capacity'
+)
@@ -0,0 +1,157 @@
+"""
+Appraise evaluation framework
+
+See LICENSE for usage details
+"""
+# pylint: disable=C0103,C0330,no-member
+from collections import defaultdict
+
+from django.contrib.auth.models import User
+from django.db import models
+from django.utils.translation import gettext_lazy as _
+
+from EvalData.models.base_models import MAX_TYPENAME_LENGTH
+
+
+class TaskProgress(models.Model):
+    """
+    Progress cursor for a user working on an annotation task.
+
+    Stores the next item to be annotated and the number of items before
+    it, so that next item lookups do not need to scan task results.
+    """
+
+    user = models.ForeignKey(User, models.CASCADE, verbose_name=_('User'))
+
+    campaign = models.ForeignKey(
+        'Campaign.Campaign', models.CASCADE, verbose_name=_('Campaign')
+    )
+
+    taskType = models.CharField(
+        max_length=MAX_TYPENAME_LENGTH, verbose_name=_('Task type')
+    )
+
+    taskID = models.PositiveIntegerField(verbose_name=_('Task ID'))
+
+    nextItemID = models.PositiveIntegerField(
+        blank=True, null=True, verbose_name=_('Next item ID')
+    )
+
+    completedItems = models.PositiveIntegerField(
+        default=0, verbose_name=_('Completed items')
+    )
+
+    trusted = models.BooleanField(default=False, verbose_name=_('Trusted user?'))
+
+    dateModified = models.DateTimeField(auto_now=True, verbose_name=_('Date modified'))
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'taskType', 'taskID'],
+                name='unique_task_progress_for_user',
+            )
+        ]
+
+    @classmethod
+    def rebuild_for_campaign(cls, campaign):
+        """
+        Rebuilds progress cursors for all tasks in the given campaign.
+
+        Task items, assigned users and results are loaded with one query
+        each per task type, instead of rebuilding each cursor separately.
+        Returns the number of progress cursors created.
+        """
+        from Campaign.models import TrustedUser
+        from EvalData.models import CAMPAIGN_TASK_TYPES
+
+        cls.objects.filter(campaign=campaign).delete()
+
+        trusted_user_ids = TrustedUser.get_trusted_user_ids([campaign.id])
+        trusted_user_ids = trusted_user_ids[campaign.id]
+
+        cursors = []
+        for task_cls in CAMPAIGN_TASK_TYPES.values():
+            tasks = task_cls.objects.filter(campaign=campaign)
+            item_cls = task_cls._meta.get_field('items').related_model
+            trusted_item_ids = set(
+                item_cls.objects.filter(task_cls.TRUSTED_ITEM_FILTER)
+                .filter(id__in=tasks.values('items'))
+                .values_list('id', flat=True)
+                .order_by()
+            )
+
+            task_items = defaultdict(list)
+            items = tasks.values_list('id', 'items__id').order_by('items__id')
+            for task_id, item_id in items:
+                if item_id is not None:
+                    task_items[task_id].append(item_id)
+
+            task_users = defaultdict(set)
+            for task_id, user_id in tasks.values_list('id', 'assignedTo').order_by():
+                if user_id is not None:
+                    task_users[task_id].add(user_id)
+
+            # Items annotated by each user, for all results in the campaign
+            annotated_items = defaultdict(set)
+            results = task_cls.get_result_model().objects.filter(
+                task__campaign=campaign
+            )
+            for task_id, user_id, item_id, activated, completed in (
+                results.values_list(
+                    'task_id', 'createdBy_id', 'item_id', 'activated', 'completed'
+                )
+                .order_by()
+                .distinct()
+            ):
+                task_users[task_id].add(user_id)
+                if not activated and completed:
+                    annotated_items[(task_id, user_id)].add(item_id)
+
+            for task_id, user_ids in task_users.items():
+                items = task_items[task_id]
+                for user_id in user_ids:
+                    trusted = user_id in trusted_user_ids
+                    annotated = annotated_items[(task_id, user_id)]
+
+                    # Items skipped on the way to the next item count as completed
+                    next_item_id, completed_items = None, len(items)
+                    for index, item_id in enumerate(items):
+                        if item_id in annotated:
+                            continue
+                        if trusted and item_id not in trusted_item_ids:
+                            continue
+                        next_item_id, completed_items = item_id, index
+                        break
+
+                    cursors.append(
+                        cls(
+                            user_id=user_id,
+                            campaign=campaign,
+                            taskType=task_cls.__name__,
+                            taskID=task_id,
+                            nextItemID=next_item_id,
+                            completedItems=completed_items,
+                            trusted=trusted,
+                        )
+                    )
+
+        cls.objects.bulk_create(cursors)
+        return len(cursors)
+
+    @classmethod
+    def invalidate(cls, task_cls, user_ids, task_ids):
+        """
+        Drops progress cursors of the given users for the given tasks, so
+        that they are rebuilt from results on next access.
+        """
+        cls.objects.filter(
+            user_id__in=[x for x in user_ids if x],
+            taskType=task_cls.__name__,
+            taskID__in=task_ids,
+        ).delete()
+
+    def __str__(self):
+        return '{0}/{1}[{2}]:{3}'.format(
+            self.user.username, self.taskType, self.taskID, self.nextItemID
+        )
@@ -0,0 +1,184 @@
+"""
+Appraise evaluation framework
+
+See LICENSE for usage details
+"""
+import csv
+from datetime import timedelta
+from io import StringIO
+import json
+from os.path import join
+from tempfile import TemporaryDirectory
+from unittest.mock import patch
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db.models import F
+from django.test import TestCase
+
+from Campaign.models import Campaign
+from EvalData.models import DirectAssessmentResult
+from EvalData.models import DirectAssessmentTask
+from EvalData.models import Market
+from EvalData.models import Metadata
+from EvalData.models import TextPair
+
+
+class DeltaExportTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        """
+        Create a DirectAssessmentTask with two items to export results for.
+        """
+        super(DeltaExportTests, cls).setUpClass()
+
+        cls.valid_user = User.objects.create(username='dummy-user')
+
+        cls.valid_campaign = Campaign(campaignName='delta')
+        cls.valid_campaign.createdBy = cls.valid_user
+        cls.valid_campaign.save()
+
+        market = Market.objects.create(
+            sourceLanguageCode='eng',
+            targetLanguageCode='deu',
+            domainName='TEST',
+            createdBy=cls.valid_user,
+        )
+        metadata = Metadata.objects.create(
+            market=market,
+            corpusName='TEST',
+            versionInfo='1.0',
+            source='MANUAL',
+            createdBy=cls.valid_user,
+        )
+
+        cls.task = DirectAssessmentTask.objects.create(
+            campaign=cls.valid_campaign,
+            requiredAnnotations=1,
+            batchNo=1,
+            market=market,
+            createdBy=cls.valid_user,
+        )
+        cls.task_items = []
+        for item_id in (1, 2):
+            item = TextPair.objects.create(
+                itemID=item_id,
+                itemType='TGT',
+                metadata=metadata,
+                sourceID='doc1',
+                sourceText='Source {0}'.format(item_id),
+                targetID='sys1',
+                targetText='Target {0}'.format(item_id),
+                createdBy=cls.valid_user,
+            )
+            cls.task.items.add(item)
+            cls.task_items.append(item)
+
+    def _read_manifest(self, path, target):
+        with open(join(path, 'manifest.json')) as manifest_file:
+            manifest = json.load(manifest_file)
+        return manifest['targets'][target]['deltas']
+
+    def _compact(self, path, deltas, result_type='DirectAssessmentResult'):
+        """
+        Returns result IDs of last rows per result ID, without removed IDs.
+        """
+        rows = {}
+        for delta in deltas:
+            with open(join(path, delta['file'])) as delta_file:
+                for row in csv.reader(delta_file):
+                    rows[row[-1]] = row
+            for result_id in delta['removedIds'].get(result_type, []):
+                rows.pop(str(result_id), None)
+        rows.pop('resultID', None)
+        return sorted(int(x) for x in rows)
+
+    def _dump_all_results(self, path):
+        call_command('DumpAllResults', delta_folder=path, stdout=StringIO())
+        return self._read_manifest(path, 'DirectAssessmentResults')
+
+    def _create_result(self, user, item, score=50):
+        return DirectAssessmentResult.objects.create(
+            score=score,
+            start_time=0,
+            end_time=10,
+            item=item,
+            task=self.task,
+            createdBy=user,
+            activated=False,
+            completed=True,
+        )
+
+    def test_delta_export(self):
+        """
+        Delta exports contain results changed since the watermark of the
+        previous export and record removed results in the manifest.
+        """
+        user = User.objects.create(username='delta')
+        first = self._create_result(user, self.task_items[0])
+
+        with TemporaryDirectory() as path:
+            deltas = self._dump_all_results(path)
+            self.assertEqual(self._compact(path, deltas), [first.id])
+
+            # The watermark is the latest change read, not the export time
+            until = deltas[0]['until']
+            self.assertEqual(until['ids'], {'DirectAssessmentResult': first.id})
+            first.refresh_from_db()
+            latest = max(
+                x
+                for x in (first.dateCreated, first.dateCompleted, first.dateModified)
+                if x is not None
+            )
+            self.assertEqual(
+                until['dateModified'], {'DirectAssessmentResult': latest.isoformat()}
+            )
+
+            # Changes within the watermark margin are exported again
+            deltas = self._dump_all_results(path)
+            self.assertEqual(deltas[1]['since'], deltas[0]['until'])
+            self.assertEqual(deltas[1]['rows'], 1)
+
+            second = self._create_result(user, self.task_items[1], 70)
+            first.retire()
+            deltas = self._dump_all_results(path)
+            self.assertEqual(
+                deltas[2]['removedIds'], {'DirectAssessmentResult': [first.id]}
+            )
+            self.assertEqual(self._compact(path, deltas), [second.id])
+
+            # Results changed before the margin are not exported again
+            with patch('EvalData.exports.WATERMARK_MARGIN', timedelta(0)):
+                DirectAssessmentResult.objects.update(
+                    dateCreated=F('dateCreated') - timedelta(hours=1),
+                    dateModified=F('dateModified') - timedelta(hours=1),
+                    dateCompleted=None,
+                    dateRetired=None,
+                )
+                deltas = self._dump_all_results(path)
+            self.assertEqual(deltas[3]['rows'], 0)
+            self.assertEqual(self._compact(path, deltas), [second.id])
+
+    def test_delta_export_inactive_users(self):
+        """
+        Results of inactive users are reported as removed from system data.
+        """
+        user = User.objects.create(username='inactive')
+        result = self._create_result(user, self.task_items[0])
+
+        with TemporaryDirectory() as path:
+            for _ in range(2):
+                call_command(
+                    'ExportSystemScoresToCSV',
+                    self.valid_campaign.campaignName,
+                    delta_folder=path,
+                    stdout=StringIO(),
+                )
+                deltas = self._read_manifest(path, self.valid_campaign.campaignName)
+                user.is_active = False
+                user.save()
+
+            self.assertEqual([x['rows'] for x in deltas], [1, 0])
+            self.assertEqual(
+                deltas[1]['removedIds'], {'DirectAssessmentResult': [result.id]}
+            )
@@ -1,13 +1,36 @@
+from contextlib import redirect_stdout
+from importlib import import_module
+from io import StringIO
+from unittest.mock import patch
+
+from django.apps import apps as django_apps
 from django.contrib.auth.models import User
+from django.contrib.contenttypes.models import ContentType
+from django.core.cache import cache
 from django.core.exceptions import ValidationError
 from django.test import TestCase
 
 from Campaign.models import Campaign
+from Campaign.models import TrustedUser
+from Dashboard.utils import run_quality_control
+from EvalData.models import AnnotationStatistics
+from EvalData.models import AnnotatorReliability
+from EvalData.models import CAMPAIGN_TASK_TYPES
+from EvalData.models import deferred_capacity
+from EvalData.models import DirectAssessmentDocumentResult
+from EvalData.models import DirectAssessmentDocumentTask
+from EvalData.models import DirectAssessmentResult
+from EvalData.models import DirectAssessmentTask
 from EvalData.models import Market
 from EvalData.models import Metadata
 from EvalData.models import ObjectID
 from EvalData.models import TaskAgenda
+from EvalData.models import TaskCapacity
+from EvalData.models import TaskProgress
+from EvalData.models import TextPair
+from EvalData.models import TextPairWithContext
 from EvalData.models import TextSegment
+from EvalData.models.base_models import object_identity_map
 
 
 class TaskAgendaTests(TestCase):
@@ -55,6 +78,104 @@ class TaskAgendaTests(TestCase):
         self.assertFalse(dummy_task in agenda._open_tasks.all())
         self.assertTrue(dummy_task in agenda._completed_tasks.all())
 
+    def test_bulk_task_mutations(self):
+        """
+        Bulk methods move many tasks between open and completed tasks.
+        """
+        agenda = TaskAgenda.objects.create(
+            user=self.valid_user, campaign=self.valid_campaign
+        )
+
+        tasks = [
+            ObjectID.objects.create(typeName='DirectAssessmentTask', primaryID=x)
+            for x in ('1', '2', '3')
+        ]
+        ids = {task.id for task in tasks}
+        self.assertEqual(agenda.contains_tasks(ids), set())
+
+        with self.assertNumQueries(2):
+            self.assertEqual(agenda.activate_tasks(tasks), ids)
+        self.assertEqual(set(agenda._open_tasks.all()), set(tasks))
+
+        completed = agenda.complete_tasks(tasks[:2], only_open=True)
+        self.assertEqual(completed, {tasks[0].id, tasks[1].id})
+        self.assertEqual(set(agenda._open_tasks.all()), {tasks[2]})
+        self.assertEqual(set(agenda._completed_tasks.all()), set(tasks[:2]))
+        self.assertEqual(agenda.contains_tasks(ids), ids)
+
+        self.assertEqual(agenda.activate_tasks(ids, only_completed=True), completed)
+        self.assertEqual(set(agenda._open_tasks.all()), set(tasks))
+        self.assertFalse(agenda._completed_tasks.exists())
+
+
+class ObjectIDTests(TestCase):
+    def test_object_type_and_id_derived_from_strings(self):
+        """
+        Creating an ObjectID from strings sets integer object type and ID.
+        """
+        serialized = ObjectID.objects.create(
+            typeName='DirectAssessmentTask', primaryID='123'
+        )
+        content_type = ContentType.objects.get_for_model(DirectAssessmentTask)
+        self.assertEqual(serialized.objectType, content_type)
+        self.assertEqual(serialized.objectID, 123)
+
+    def test_get_or_create_for_instance(self):
+        """
+        Saving metadata creates a single ObjectID binding for the instance.
+        """
+        user = User.objects.create(username='serialized')
+        market = Market.objects.create(
+            sourceLanguageCode='eng',
+            targetLanguageCode='deu',
+            domainName='TEST',
+            createdBy=user,
+        )
+        market.save()
+
+        serialized = ObjectID.get_or_create_for_instance(market)
+        self.assertEqual(serialized.typeName, 'Market')
+        self.assertEqual(serialized.primaryID, str(market.id))
+        self.assertEqual(serialized.get_object_instance(), market)
+        self.assertEqual(
+            ObjectID.objects.filter(typeName='Market', primaryID=market.id).count(), 1
+        )
+
+
+    def test_merge_duplicate_objectids(self):
+        """
+        Legacy duplicates without integer object type and ID are merged.
+        """
+        merge_duplicate_objectids = import_module(
+            'EvalData.migrations.0064_merge_duplicate_objectids'
+        ).merge_duplicate_objectids
+
+        user = User.objects.create(username='duplicates')
+        campaign = Campaign.objects.create(createdBy=user)
+        survivor = ObjectID.objects.create(
+            typeName='DirectAssessmentTask', primaryID='123'
+        )
+        duplicate, legacy = ObjectID.objects.bulk_create(
+            [
+                ObjectID(typeName='DirectAssessmentTask', primaryID='123'),
+                ObjectID(typeName='DirectAssessmentTask', primaryID='456'),
+            ]
+        )
+        open_agenda = TaskAgenda.objects.create(user=user, campaign=campaign)
+        open_agenda._open_tasks.add(duplicate)
+        completed_agenda = TaskAgenda.objects.create(user=user, campaign=campaign)
+        completed_agenda._completed_tasks.add(survivor, duplicate)
+
+        merge_duplicate_objectids(django_apps, None)
+
+        self.assertFalse(ObjectID.objects.filter(id=duplicate.id).exists())
+        self.assertEqual(list(open_agenda._open_tasks.all()), [survivor])
+        self.assertEqual(list(completed_agenda._completed_tasks.all()), [survivor])
+
+        legacy.refresh_from_db()
+        self.assertEqual(legacy.get_model_and_id(), (DirectAssessmentTask, 456))
+        self.assertIsNotNone(legacy.objectType_id)
+
 
 class MarketTests(TestCase):
     def test_cannot_exceed_max_length_for_source_language_code(self):
@@ -306,3 +427,846 @@ class TextSegmentTests(TestCase):
         for itemtype in SET_ITEMTYPE_CHOICES:
             test_obj.itemType = itemtype[0]
             self.assertEqual(test_obj.is_valid(), True)
+
+
+class DirectAssessmentTaskTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        """
+        Create a DirectAssessmentTask with items of mixed types.
+        """
+        super(DirectAssessmentTaskTests, cls).setUpClass()
+
+        cls.valid_user = User.objects.create(username='dummy-user')
+
+        cls.valid_campaign = Campaign()
+        cls.valid_campaign.createdBy = cls.valid_user
+        cls.valid_campaign.save()
+
+        cls.valid_market = Market.objects.create(
+            sourceLanguageCode='eng',
+            targetLanguageCode='deu',
+            domainName='TEST',
+            createdBy=cls.valid_user,
+        )
+        cls.valid_metadata = Metadata.objects.create(
+            market=cls.valid_market,
+            corpusName='TEST',
+            versionInfo='1.0',
+            source='MANUAL',
+            createdBy=cls.valid_user,
+        )
+
+        cls.task = DirectAssessmentTask.objects.create(
+            campaign=cls.valid_campaign,
+            requiredAnnotations=1,
+            batchNo=1,
+            market=cls.valid_market,
+            createdBy=cls.valid_user,
+        )
+        cls.task_items = []
+        for item_id, item_type in enumerate(('TGT', 'BAD', 'TGT', 'REF'), 1):
+            item = TextPair.objects.create(
+                itemID=item_id,
+                itemType=item_type,
+                metadata=cls.valid_metadata,
+                sourceID='doc1',
+                sourceText='Source {0}'.format(item_id),
+                targetID='sys1',
+                targetText='Target {0}'.format(item_id),
+                createdBy=cls.valid_user,
+            )
+            cls.task.items.add(item)
+            cls.task_items.append(item)
+
+    def _annotate(self, user, item, start_time=0, end_time=1):
+        return DirectAssessmentResult.objects.create(
+            score=50,
+            start_time=start_time,
+            end_time=end_time,
+            item=item,
+            task=self.task,
+            createdBy=user,
+            activated=False,
+            completed=True,
+        )
+
+    def test_next_item_for_new_user(self):
+        """
+        Users without annotations start at the first item.
+        """
+        user = User.objects.create(username='new-user')
+        self.assertEqual(
+            self.task.next_item_for_user(user, return_completed_items=True),
+            (self.task_items[0], 0),
+        )
+
+    def test_next_item_skips_annotated_items(self):
+        """
+        The next item is the first item not annotated by the user.
+        """
+        user = User.objects.create(username='annotator')
+        self._annotate(user, self.task_items[0])
+        self._annotate(user, self.task_items[2])
+
+        self.assertEqual(
+            self.task.next_item_for_user(user, return_completed_items=True),
+            (self.task_items[1], 1),
+        )
+
+    def test_next_item_for_trusted_user(self):
+        """
+        Trusted users only see TGT items, skipped items count as completed.
+        """
+        user = User.objects.create(username='trusted')
+        TrustedUser.objects.create(user=user, campaign=self.valid_campaign)
+        self.addCleanup(cache.clear)
+        self._annotate(user, self.task_items[0])
+
+        self.assertEqual(
+            self.task.next_item_for_user(user, return_completed_items=True),
+            (self.task_items[2], 2),
+        )
+
+    def test_next_item_for_finished_user(self):
+        """
+        Once all items are annotated, no next item is returned.
+        """
+        user = User.objects.create(username='finished')
+        for item in self.task_items:
+            self._annotate(user, item)
+
+        self.assertEqual(
+            self.task.next_item_for_user(user, return_completed_items=True),
+            (None, len(self.task_items)),
+        )
+
+    def test_next_item_advances_progress(self):
+        """
+        Annotating the next item advances the user's progress cursor.
+        """
+        user = User.objects.create(username='progress')
+        self.assertEqual(self.task.next_item_for_user(user), self.task_items[0])
+
+        self._annotate(user, self.task_items[0])
+
+        progress = TaskProgress.objects.get(
+            user=user, taskType='DirectAssessmentTask', taskID=self.task.id
+        )
+        self.assertEqual(progress.nextItemID, self.task_items[1].id)
+        self.assertEqual(progress.completedItems, 1)
+        self.assertEqual(
+            self.task.next_item_for_user(user, return_completed_items=True),
+            (self.task_items[1], 1),
+        )
+
+    def test_rebuild_progress_for_campaign(self):
+        """
+        Rebuilding progress picks up results created outside of the views.
+        """
+        user = User.objects.create(username='rebuilt')
+        other_user = User.objects.create(username='other')
+        self.task.assignedTo.add(user, other_user)
+        self.task.next_item_for_user(user)
+
+        # Completing results in bulk does not advance cursors
+        result = self._annotate(user, self.task_items[0])
+        result.retire()
+        DirectAssessmentResult.objects.filter(id=result.id).update(
+            activated=False, completed=True
+        )
+
+        # Deleted cursors, four queries per task type and created cursors
+        with self.assertNumQueries(4 * len(CAMPAIGN_TASK_TYPES) + 2):
+            self.assertEqual(TaskProgress.rebuild_for_campaign(self.valid_campaign), 2)
+        self.assertEqual(
+            self.task.next_item_for_user(user, return_completed_items=True),
+            (self.task_items[1], 1),
+        )
+        self.assertEqual(
+            self.task.next_item_for_user(other_user, return_completed_items=True),
+            (self.task_items[0], 0),
+        )
+
+    def test_next_item_skips_stale_progress(self):
+        """
+        Cursors pointing to items annotated in bulk are rebuilt.
+        """
+        user = User.objects.create(username='stale')
+        self.task.assignedTo.add(user)
+        self.task.activate()
+        self.assertEqual(self.task.next_item_for_user(user), self.task_items[0])
+
+        result = self._annotate(user, self.task_items[0])
+        result.retire()
+        self.assertFalse(self.task._get_progress(user).exists())
+        self.assertEqual(self.task.next_item_for_user(user), self.task_items[0])
+
+        DirectAssessmentResult.objects.filter(id=result.id).update(
+            activated=False, completed=True
+        )
+        self.assertEqual(DirectAssessmentTask.get_task_for_user(user), self.task)
+        self.assertEqual(
+            self.task.next_item_for_user(user, return_completed_items=True),
+            (self.task_items[1], 1),
+        )
+
+    def test_next_item_query_count(self):
+        """
+        Resolving the next item does not scale with the number of items.
+        """
+        user = User.objects.create(username='counted')
+        self._annotate(user, self.task_items[0])
+        self.task.next_item_for_user(user)
+
+        # Progress cursor and next item, trusted users are cached
+        with self.assertNumQueries(2):
+            self.task.next_item_for_user(user)
+
+    def test_assign_next_free_task_tries_all_candidates(self):
+        """
+        Candidates filled up by concurrent sign-ins are skipped in batches.
+        """
+        self.task.activate()
+        self.task.assignedTo.add(User.objects.create(username='first'))
+        second_task = DirectAssessmentTask.objects.create(
+            campaign=self.valid_campaign,
+            requiredAnnotations=1,
+            batchNo=2,
+            market=self.task.market,
+            createdBy=self.task.createdBy,
+        )
+        second_task.activate()
+
+        # Candidates are read before the first task has been filled up
+        candidates = DirectAssessmentTask.objects.filter(activated=True).order_by('id')
+        user = User.objects.create(username='second')
+        with patch('EvalData.models.base_models.MAX_FREE_TASK_CANDIDATES', 1):
+            with patch.object(
+                DirectAssessmentTask,
+                'get_free_tasks_for_language',
+                return_value=candidates,
+            ):
+                next_task = DirectAssessmentTask.assign_next_free_task_for_language(
+                    'deu', self.valid_campaign, user
+                )
+        self.assertEqual(next_task, second_task)
+
+    def test_assign_next_free_task_respects_capacity(self):
+        """
+        Free tasks are assigned until requiredAnnotations users work on them.
+        """
+        self.task.activate()
+        first_user = User.objects.create(username='first')
+        second_user = User.objects.create(username='second')
+
+        self.assertEqual(
+            DirectAssessmentTask.assign_next_free_task_for_language(
+                'deu', self.valid_campaign, first_user
+            ),
+            self.task,
+        )
+        self.assertTrue(self.task.assignedTo.filter(id=first_user.id).exists())
+
+        # The task requires a single annotator and is now fully booked
+        self.assertIsNone(
+            DirectAssessmentTask.assign_next_free_task_for_language(
+                'deu', self.valid_campaign, second_user
+            )
+        )
+        self.assertIsNone(
+            DirectAssessmentTask.get_next_free_task_for_language(
+                'deu', self.valid_campaign, second_user
+            )
+        )
+
+        # Free tasks are only returned for a given user
+        self.task.assignedTo.remove(first_user)
+        self.assertEqual(
+            DirectAssessmentTask.get_next_free_task_for_language(
+                'deu', self.valid_campaign, second_user
+            ),
+            self.task,
+        )
+        self.assertIsNone(
+            DirectAssessmentTask.get_next_free_task_for_language(
+                'deu', self.valid_campaign
+            )
+        )
+
+    def test_market_fields_set_from_market(self):
+        """
+        Language codes are copied from the task market on save.
+        """
+        self.assertEqual(self.task.sourceLanguageCode, 'eng')
+        self.assertEqual(self.task.targetLanguageCode, 'deu')
+        self.assertEqual(self.task.marketTargetLanguageCode(), 'deu')
+        self.assertEqual(self.task.marketName(), 'eng_deu_TEST')
+
+    def test_backfill_market_fields(self):
+        """
+        Tasks without market information are backfilled from their items.
+        """
+        DirectAssessmentTask.objects.filter(id=self.task.id).update(
+            market=None, sourceLanguageCode='', targetLanguageCode=''
+        )
+
+        self.assertEqual(
+            DirectAssessmentTask.backfill_market_fields(self.valid_campaign), 1
+        )
+        self.task.refresh_from_db()
+        self.assertEqual(self.task.market, self.valid_market)
+        self.assertEqual(self.task.sourceLanguageCode, 'eng')
+        self.assertEqual(self.task.targetLanguageCode, 'deu')
+
+    def test_unique_annotations_counter(self):
+        """
+        Unique annotation counter follows result creation and retirement.
+        """
+        task = DirectAssessmentTask.objects.get(id=self.task.id)
+        first_user = User.objects.create(username='first')
+        second_user = User.objects.create(username='second')
+
+        first_result = self._annotate(first_user, self.task_items[0])
+        second_result = self._annotate(second_user, self.task_items[0])
+        self._annotate(first_user, self.task_items[1])
+
+        # Saving a stale task instance does not overwrite the counter
+        task.save()
+        task.refresh_from_db()
+        self.assertEqual(task.uniqueAnnotations, 2)
+
+        first_result.retire()
+        task.refresh_from_db()
+        self.assertEqual(task.uniqueAnnotations, 2)
+
+        DirectAssessmentResult.objects.get(id=second_result.id).retire()
+        task.refresh_from_db()
+        self.assertEqual(task.uniqueAnnotations, 1)
+
+    def test_reconcile_unique_annotations(self):
+        """
+        Reconciling fixes tasks with inconsistent unique annotation counters.
+        """
+        user = User.objects.create(username='reconcile')
+        self._annotate(user, self.task_items[0])
+        DirectAssessmentTask.objects.filter(id=self.task.id).update(
+            uniqueAnnotations=7
+        )
+
+        self.assertEqual(
+            DirectAssessmentTask.reconcile_unique_annotations(self.valid_campaign), 1
+        )
+        self.assertEqual(DirectAssessmentTask.reconcile_unique_annotations(), 0)
+        self.assertEqual(
+            DirectAssessmentTask.objects.get(id=self.task.id).uniqueAnnotations, 1
+        )
+
+    def _assert_statistics_match_results(self, user):
+        statistics = AnnotationStatistics.get_for_user(user)['DirectAssessmentResult']
+        self.assertEqual(
+            statistics.completedItems,
+            DirectAssessmentResult.get_completed_for_user(user),
+        )
+        self.assertEqual(
+            (statistics.hits, statistics.totalHits),
+            DirectAssessmentResult.get_hit_status_for_user(user),
+        )
+        self.assertAlmostEqual(
+            statistics.annotationSeconds,
+            DirectAssessmentResult.get_time_for_user(user).total_seconds(),
+        )
+        return statistics
+
+    def test_annotation_statistics(self):
+        """
+        Annotation statistics are maintained incrementally from results.
+        """
+        user = User.objects.create(username='statistics')
+        AnnotationStatistics.get_for_user(user)
+
+        # Statistics are updated once results have been committed
+        with self.captureOnCommitCallbacks(execute=True):
+            self._annotate(user, self.task_items[0], 10, 20)
+            self._annotate(user, self.task_items[1], 15, 30)
+            result = self._annotate(user, self.task_items[2], 40, 50)
+            self._annotate(user, self.task_items[2], 60, 70)
+
+        with self.assertNumQueries(1):
+            AnnotationStatistics.get_for_user(user)
+
+        statistics = self._assert_statistics_match_results(user)
+        self.assertEqual(
+            (statistics.completedItems, statistics.totalHits, statistics.stale),
+            (3, 1, False),
+        )
+
+        # Retired results make annotation time stale until next access
+        with self.captureOnCommitCallbacks(execute=True):
+            result.retire()
+        statistics = AnnotationStatistics.objects.get(
+            user=user, resultType='DirectAssessmentResult'
+        )
+        self.assertTrue(statistics.stale)
+        self._assert_statistics_match_results(user)
+
+    def _get_capacity(self):
+        return list(
+            TaskCapacity.objects.values_list('openTasks', 'openSlots').order_by('id')
+        )
+
+    def test_task_capacity(self):
+        """
+        Open capacity is maintained when tasks change state or assignees.
+        """
+        task = DirectAssessmentTask.objects.get(id=self.task.id)
+        user = User.objects.create(username='capacity')
+        other_user = User.objects.create(username='capacity-other')
+        languages = {DirectAssessmentTask: {self.valid_campaign.campaignName: ['deu']}}
+
+        self.assertEqual(TaskCapacity.get_languages_for_user(user, ['deu']), {})
+
+        task.requiredAnnotations = 2
+        task.activate()
+        self.assertEqual(self._get_capacity(), [(1, 2)])
+        self.assertEqual(
+            TaskCapacity.get_languages_for_user(user, ['eng', 'deu']), languages
+        )
+
+        task.assignedTo.add(user)
+        self.assertEqual(self._get_capacity(), [(1, 1)])
+        self.assertEqual(TaskCapacity.get_languages_for_user(user, ['deu']), {})
+        self.assertEqual(
+            TaskCapacity.get_languages_for_user(other_user, ['deu']), languages
+        )
+
+        other_user.evaldata_directassessmenttask_assignedTo.add(task)
+        self.assertEqual(self._get_capacity(), [(0, 0)])
+        self.assertEqual(TaskCapacity.get_languages_for_user(other_user, ['deu']), {})
+
+        other_user.evaldata_directassessmenttask_assignedTo.clear()
+        self.assertEqual(self._get_capacity(), [(1, 1)])
+
+        self.assertEqual(TaskCapacity.rebuild(), 1)
+        self.assertEqual(self._get_capacity(), [(1, 1)])
+
+        task.complete()
+        self.assertEqual(self._get_capacity(), [(0, 0)])
+
+    def test_task_capacity_updates(self):
+        """
+        Capacity changes are applied as deltas, or rebuilt once if deferred.
+        """
+        task = DirectAssessmentTask.objects.get(id=self.task.id)
+        user = User.objects.create(username='capacity')
+
+        with deferred_capacity():
+            task.requiredAnnotations = 2
+            task.activate()
+            task.assignedTo.add(user)
+            self.assertEqual(self._get_capacity(), [])
+        self.assertEqual(self._get_capacity(), [(1, 1)])
+
+        # Other tasks are not recounted, so deltas apply to stored counts
+        TaskCapacity.objects.update(openTasks=5, openSlots=10)
+        task.assignedTo.remove(user)
+        self.assertEqual(self._get_capacity(), [(5, 11)])
+        task.complete()
+        self.assertEqual(self._get_capacity(), [(4, 9)])
+
+    def test_get_csv_filters_market(self):
+        """
+        CSV rows are filtered by market and read with a single query.
+        """
+        user = User.objects.create(username='annotator', email='a@example.com')
+        DirectAssessmentResult.objects.create(
+            score=60,
+            start_time=2,
+            end_time=5,
+            item=self.task_items[0],
+            task=self.task,
+            createdBy=user,
+            activated=False,
+            completed=True,
+        )
+
+        market = self.valid_market
+        with self.assertNumQueries(1):
+            rows = DirectAssessmentResult.get_csv(
+                market.sourceLanguageCode, market.targetLanguageCode, market.domainName
+            )
+        item = self.task_items[0]
+        self.assertEqual(
+            list(rows.values()),
+            [
+                [
+                    (
+                        item.targetID,
+                        'annotator',
+                        'a@example.com',
+                        item.itemID,
+                        60,
+                        3.0,
+                        item.itemType,
+                    )
+                ]
+            ],
+        )
+
+        with self.assertNumQueries(1):
+            rows = DirectAssessmentResult.get_csv(
+                market.sourceLanguageCode, market.targetLanguageCode, 'other'
+            )
+        self.assertEqual(rows, {})
+
+    def test_campaign_type_is_stored(self):
+        """
+        Campaign type is identified from tasks once and then read from field.
+        """
+        campaign = Campaign.objects.get(id=self.valid_campaign.id)
+        self.assertEqual(campaign.campaignType, '')
+        self.assertEqual(campaign.get_campaign_type(), 'DirectAssessmentTask')
+
+        campaign = Campaign.objects.get(id=self.valid_campaign.id)
+        with self.assertNumQueries(0):
+            self.assertEqual(campaign.get_campaign_type(), 'DirectAssessmentTask')
+
+    def test_resolve_open_tasks(self):
+        """
+        Agenda resolution returns open tasks with work and completes others.
+        """
+        self.task.activate()
+        user = User.objects.create(username='agenda')
+        agenda = TaskAgenda.objects.create(user=user, campaign=self.valid_campaign)
+        serialized_task = ObjectID.objects.get(
+            typeName='DirectAssessmentTask', primaryID=self.task.id
+        )
+        agenda._open_tasks.add(serialized_task)
+        agendas = TaskAgenda.objects.filter(user=user)
+
+        current_task, tasks_to_complete = TaskAgenda.resolve_open_tasks(
+            agendas, user
+        )
+        self.assertEqual(current_task, self.task)
+        self.assertEqual(len(tasks_to_complete), 0)
+
+        for item in self.task_items:
+            self._annotate(user, item)
+        TaskProgress.objects.filter(user=user).delete()
+
+        current_task, tasks_to_complete = TaskAgenda.resolve_open_tasks(
+            agendas, user
+        )
+        self.assertIsNone(current_task)
+        self.assertEqual(tasks_to_complete, {agenda: [serialized_task]})
+        self.assertTrue(serialized_task in agenda._completed_tasks.all())
+
+    def test_resolve_many_object_ids(self):
+        """
+        ObjectID resolution keeps input order and handles unknown objects.
+        """
+        serialized_task = ObjectID(
+            typeName='DirectAssessmentTask', primaryID=str(self.task.id)
+        )
+        unknown_type = ObjectID(typeName='UnknownTask', primaryID='1')
+        unknown_id = ObjectID(typeName='DirectAssessmentTask', primaryID='0')
+
+        with self.assertNumQueries(1):
+            instances = ObjectID.resolve_many(
+                [unknown_type, serialized_task, unknown_id]
+            )
+        self.assertEqual(instances, [None, self.task, None])
+        self.assertEqual(serialized_task.get_object_instance(), self.task)
+
+    def test_object_identity_map(self):
+        """
+        ObjectID instances are only fetched once within an identity map.
+        """
+        serialized_task = ObjectID(
+            typeName='DirectAssessmentTask', primaryID=str(self.task.id)
+        )
+
+        with object_identity_map():
+            task = serialized_task.get_object_instance()
+            with self.assertNumQueries(0):
+                self.assertIs(serialized_task.get_object_instance(), task)
+                self.assertEqual(task.campaign, self.valid_campaign)
+
+        with self.assertNumQueries(1):
+            self.assertEqual(serialized_task.get_object_instance(), self.task)
+
+
+class DirectAssessmentDocumentTaskTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        """
+        Create a DirectAssessmentDocumentTask with items from two documents.
+        """
+        super(DirectAssessmentDocumentTaskTests, cls).setUpClass()
+
+        cls.valid_user = User.objects.create(username='dummy-user')
+
+        cls.valid_campaign = Campaign()
+        cls.valid_campaign.createdBy = cls.valid_user
+        cls.valid_campaign.save()
+
+        cls.valid_market = Market.objects.create(
+            sourceLanguageCode='eng',
+            targetLanguageCode='deu',
+            domainName='TEST',
+            createdBy=cls.valid_user,
+        )
+        cls.valid_metadata = Metadata.objects.create(
+            market=cls.valid_market,
+            corpusName='TEST',
+            versionInfo='1.0',
+            source='MANUAL',
+            createdBy=cls.valid_user,
+        )
+
+        cls.task = DirectAssessmentDocumentTask.objects.create(
+            campaign=cls.valid_campaign,
+            requiredAnnotations=1,
+            batchNo=1,
+            market=cls.valid_market,
+            createdBy=cls.valid_user,
+        )
+        cls.task_items = []
+        for item_id, document_id in enumerate(('doc1', 'doc1', 'doc2', 'doc2'), 1):
+            item = TextPairWithContext.objects.create(
+                itemID=item_id,
+                itemType='TGT',
+                metadata=cls.valid_metadata,
+                sourceID=document_id,
+                sourceText='Source {0}'.format(item_id),
+                targetID='sys1',
+                targetText='Target {0}'.format(item_id),
+                documentID=document_id,
+                isCompleteDocument=item_id % 2 == 0,
+                createdBy=cls.valid_user,
+            )
+            cls.task.items.add(item)
+            cls.task_items.append(item)
+
+    def _annotate(self, user, item, score=50):
+        return DirectAssessmentDocumentResult.objects.create(
+            score=score,
+            mqm='[]',
+            start_time=0,
+            end_time=1,
+            item=item,
+            task=self.task,
+            createdBy=user,
+            activated=False,
+            completed=True,
+        )
+
+    def test_next_document_for_user(self):
+        """
+        Document state is loaded with a constant number of queries.
+        """
+        user = User.objects.create(username='document')
+        earliest = self._annotate(user, self.task_items[0], score=10)
+        self._annotate(user, self.task_items[0], score=20)
+        self.task.next_item_for_user(user)
+
+        # Progress cursor, next item, block items, results and statistics
+        with self.assertNumQueries(5):
+            state = self.task.next_document_for_user(user)
+
+        self.assertEqual(
+            state,
+            (
+                self.task_items[1],
+                1,
+                0,
+                1,
+                self.task_items[:2],
+                [earliest, None],
+                2,
+            ),
+        )
+        self.assertEqual(
+            self.task.next_document_for_user(user, return_statistics=False),
+            (self.task_items[1], self.task_items[:2], [earliest, None]),
+        )
+
+        self._annotate(user, self.task_items[1])
+        self.assertEqual(
+            self.task.next_document_for_user(user),
+            (self.task_items[2], 2, 1, 0, self.task_items[2:], [None, None], 2),
+        )
+
+    def test_next_document_for_user_mqmesa(self):
+        """
+        Document state uses the latest result for each item.
+        """
+        user = User.objects.create(username='esa')
+        self._annotate(user, self.task_items[0], score=10)
+        latest = self._annotate(user, self.task_items[0], score=20)
+        self._annotate(user, self.task_items[3])
+
+        with self.assertNumQueries(2):
+            state = self.task.next_document_for_user_mqmesa(user)
+
+        self.assertEqual(
+            state, (self.task_items[1], 2, 0, self.task_items[:2], [latest, None], 2)
+        )
+        self.assertEqual(state[4][0].score, 20)
+
+    def test_next_document_for_finished_user_mqmesa(self):
+        """
+        Finished users get no next item and all documents completed.
+        """
+        user = User.objects.create(username='finished')
+        for item in self.task_items:
+            self._annotate(user, item)
+
+        self.assertEqual(
+            self.task.next_document_for_user_mqmesa(user), (None, 4, 2, [], [], 2)
+        )
+
+
+class AnnotatorReliabilityTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        """
+        Create a DirectAssessmentTask to add results to.
+        """
+        super(AnnotatorReliabilityTests, cls).setUpClass()
+
+        cls.valid_user = User.objects.create(username='dummy-user')
+
+        cls.valid_campaign = Campaign()
+        cls.valid_campaign.createdBy = cls.valid_user
+        cls.valid_campaign.save()
+
+        market = Market.objects.create(
+            sourceLanguageCode='eng',
+            targetLanguageCode='deu',
+            domainName='TEST',
+            createdBy=cls.valid_user,
+        )
+        cls.valid_metadata = Metadata.objects.create(
+            market=market,
+            corpusName='TEST',
+            versionInfo='1.0',
+            source='MANUAL',
+            createdBy=cls.valid_user,
+        )
+
+        cls.task = DirectAssessmentTask.objects.create(
+            campaign=cls.valid_campaign,
+            requiredAnnotations=1,
+            batchNo=1,
+            market=market,
+            createdBy=cls.valid_user,
+        )
+
+    def _annotate(self, user, scores, first_item_id=11, bad_suffix=''):
+        """
+        Annotates TGT and BAD items with the given pairs of scores.
+        """
+        results = []
+        for item_id, pair in enumerate(scores, first_item_id):
+            for item_type, score in zip(('TGT', 'BAD'), pair):
+                item = TextPair.objects.create(
+                    itemID=item_id,
+                    itemType=item_type,
+                    metadata=self.valid_metadata,
+                    sourceID='doc1',
+                    sourceText='Source',
+                    targetID='sys1' + (bad_suffix if item_type == 'BAD' else ''),
+                    targetText='Target',
+                    createdBy=self.valid_user,
+                )
+                with self.captureOnCommitCallbacks(execute=True):
+                    result = DirectAssessmentResult.objects.create(
+                        score=score,
+                        start_time=0,
+                        end_time=10,
+                        item=item,
+                        task=self.task,
+                        createdBy=user,
+                        activated=False,
+                        completed=True,
+                    )
+                results.append(result)
+        return results
+
+    def _get_reliability(self, user):
+        return AnnotatorReliability.get_reliabilities(
+            DirectAssessmentResult, [user.id], [self.valid_campaign]
+        )[(user.id, self.valid_campaign.id)]
+
+    def test_annotator_reliability(self):
+        """
+        Reliability statistics are extended by new results and rebuilt after
+        existing results change.
+        """
+        user = User.objects.create(username='reliability')
+        results = self._annotate(user, [(90, 10)])
+        reliability = self._get_reliability(user)
+        self.assertEqual(reliability.results, 2)
+
+        results += self._annotate(user, [(80, 30), (70, 20)], first_item_id=12)
+        reliability = AnnotatorReliability.objects.get(id=reliability.id)
+        self.assertFalse(reliability.stale)
+        self.assertEqual((reliability.results, reliability.items), (6, 6))
+        self.assertEqual(reliability.scoreSum, 300)
+        self.assertEqual(reliability.annotationSeconds, 60)
+        self.assertEqual(reliability.get_key_scores()['12-sys1'], [80, 1, 30, 1])
+        self.assertAlmostEqual(reliability.get_pvalue(), 0.05)
+        self.assertFalse(reliability.dirty)
+
+        # Repeated annotations of an item are counted once as items
+        with self.captureOnCommitCallbacks(execute=True):
+            DirectAssessmentResult.objects.create(
+                score=60,
+                start_time=0,
+                end_time=10,
+                item=results[0].item,
+                task=self.task,
+                createdBy=user,
+                activated=False,
+                completed=True,
+            )
+        reliability = AnnotatorReliability.objects.get(id=reliability.id)
+        self.assertEqual((reliability.results, reliability.items), (7, 6))
+        self.assertEqual((reliability.qcResults, reliability.qcItems), (7, 6))
+
+        rebuilt = AnnotatorReliability.rebuild_for_user(
+            user.id, self.valid_campaign, DirectAssessmentResult
+        )
+        self.assertEqual(rebuilt.get_key_scores(), reliability.get_key_scores())
+        self.assertEqual(rebuilt.qcKeyScores, reliability.qcKeyScores)
+        self.assertEqual(rebuilt.items, reliability.items)
+        self.assertEqual(rebuilt.scoreSquaresSum, reliability.scoreSquaresSum)
+
+        results[1].score = 95
+        with self.captureOnCommitCallbacks(execute=True):
+            results[1].save()
+        reliability = self._get_reliability(user)
+        self.assertFalse(reliability.stale)
+        self.assertEqual(reliability.get_key_scores()['11-sys1'], [150, 2, 95, 1])
+        self.assertAlmostEqual(reliability.get_pvalue(), 0.35)
+
+    def test_quality_control_keys(self):
+        """
+        Quality control keeps #bad in keys of ESA campaigns, unlike the
+        campaign status page.
+        """
+        Campaign.objects.filter(id=self.valid_campaign.id).update(
+            campaignOptions='ESA'
+        )
+        self.valid_campaign.refresh_from_db()
+        user = User.objects.create(username='esa')
+        self._annotate(user, [(90, 10), (80, 30), (70, 20)], bad_suffix='#bad')
+
+        reliability = self._get_reliability(user)
+        self.assertAlmostEqual(reliability.get_pvalue(), 0.05)
+        self.assertEqual(
+            AnnotatorReliability.get_quality_control_pvalue([reliability]), (None, 0)
+        )
+        with redirect_stdout(StringIO()):
+            self.assertFalse(run_quality_control('esa'))
@@ -3,7 +3,211 @@ Appraise evaluation framework
 
 See LICENSE for usage details
 """
-# pylint: disable=unused-import
+from django.contrib.auth.models import User
 from django.test import TestCase
+from django.urls import reverse
 
-# Deliberately left empty.
+from Appraise.testing import QueryBudgetMixin
+from Campaign.models import Campaign
+from EvalData.models import AnnotationStatistics
+from EvalData.models import DataAssessmentTask
+from EvalData.models import DirectAssessmentContextTask
+from EvalData.models import DirectAssessmentDocumentTask
+from EvalData.models import DirectAssessmentResult
+from EvalData.models import DirectAssessmentTask
+from EvalData.models import Market
+from EvalData.models import Metadata
+from EvalData.models import MultiModalAssessmentTask
+from EvalData.models import ObjectID
+from EvalData.models import PairwiseAssessmentDocumentTask
+from EvalData.models import PairwiseAssessmentTask
+from EvalData.models import TaskAgenda
+from EvalData.models import TextPair
+from EvalData.models import TextPairWithContext
+from EvalData.models import TextPairWithDomain
+from EvalData.models import TextPairWithImage
+from EvalData.models import TextSegmentWithTwoTargets
+from EvalData.models import TextSegmentWithTwoTargetsWithContext
+
+TEXT_PAIR_FIELDS = {
+    'sourceID': 'doc1',
+    'sourceText': 'Source',
+    'targetID': 'sys1',
+    'targetText': 'Target',
+}
+
+TEXT_SEGMENT_WITH_TWO_TARGETS_FIELDS = {
+    'segmentID': 'doc1',
+    'segmentText': 'Source',
+    'target1ID': 'sys1',
+    'target1Text': 'Target 1',
+    'target2ID': 'sys2',
+    'target2Text': 'Target 2',
+}
+
+DOCUMENT_FIELDS = {'documentID': 'doc1', 'isCompleteDocument': False}
+
+
+class AnnotationViewQueryBudgetTests(QueryBudgetMixin, TestCase):
+    """
+    Annotation views stay within a fixed SQL query budget.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create(username='owner')
+        cls.campaign = Campaign.objects.create(
+            campaignName='budget', createdBy=cls.owner
+        )
+        cls.market = Market.objects.create(
+            sourceLanguageCode='eng',
+            targetLanguageCode='deu',
+            domainName='TEST',
+            createdBy=cls.owner,
+        )
+        cls.metadata = Metadata.objects.create(
+            market=cls.market,
+            corpusName='TEST',
+            versionInfo='1.0',
+            source='MANUAL',
+            createdBy=cls.owner,
+        )
+
+    def _create_task(self, task_cls, item_cls, **item_fields):
+        """
+        Creates an active task with four items on the agenda of a new user
+        and logs in as that user. Returns the task items and the user.
+        """
+        task = task_cls.objects.create(
+            campaign=self.campaign,
+            requiredAnnotations=1,
+            batchNo=1,
+            market=self.market,
+            createdBy=self.owner,
+        )
+        items = []
+        for item_id in range(1, 5):
+            item = item_cls.objects.create(
+                itemID=item_id,
+                itemType='TGT',
+                metadata=self.metadata,
+                createdBy=self.owner,
+                **item_fields,
+            )
+            task.items.add(item)
+            items.append(item)
+        task.activate()
+
+        user = User.objects.create(username='annotator')
+        agenda = TaskAgenda.objects.create(user=user, campaign=self.campaign)
+        agenda.activate_tasks([ObjectID.get_or_create_for_instance(task)])
+        self.client.force_login(user)
+        return items, user
+
+    def _assert_next_item_budget(self, budget, url_name):
+        """
+        Asserts that showing the first item of the task stays within budget
+        once progress cursors have been built.
+        """
+        self.client.get(reverse(url_name))
+        response = self.assertQueryBudget(budget, reverse(url_name))
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_direct_assessment_query_budget(self):
+        """
+        Showing the next item of an assigned task stays within query budget.
+        """
+        items, _ = self._create_task(
+            DirectAssessmentTask, TextPair, **TEXT_PAIR_FIELDS
+        )
+        response = self._assert_next_item_budget(7, 'direct-assessment')
+        self.assertEqual(response.context['item_id'], items[0].itemID)
+
+    def test_direct_assessment_context_query_budget(self):
+        items, _ = self._create_task(
+            DirectAssessmentContextTask,
+            TextPairWithContext,
+            **TEXT_PAIR_FIELDS,
+            **DOCUMENT_FIELDS,
+        )
+        response = self._assert_next_item_budget(7, 'direct-assessment-context')
+        self.assertEqual(response.context['item_id'], items[0].itemID)
+
+    def test_direct_assessment_document_query_budget(self):
+        items, _ = self._create_task(
+            DirectAssessmentDocumentTask,
+            TextPairWithContext,
+            **TEXT_PAIR_FIELDS,
+            **DOCUMENT_FIELDS,
+        )
+        response = self._assert_next_item_budget(10, 'direct-assessment-document')
+        self.assertEqual(response.context['item_id'], items[0].itemID)
+
+    def test_multimodal_assessment_query_budget(self):
+        items, _ = self._create_task(
+            MultiModalAssessmentTask,
+            TextPairWithImage,
+            imageURL='http://example.com/image.png',
+            **TEXT_PAIR_FIELDS,
+        )
+        response = self._assert_next_item_budget(7, 'multimodal-assessment')
+        self.assertEqual(response.context['item_id'], items[0].itemID)
+
+    def test_pairwise_assessment_query_budget(self):
+        items, _ = self._create_task(
+            PairwiseAssessmentTask,
+            TextSegmentWithTwoTargets,
+            **TEXT_SEGMENT_WITH_TWO_TARGETS_FIELDS,
+        )
+        response = self._assert_next_item_budget(7, 'pairwise-assessment')
+        self.assertEqual(response.context['item_id'], items[0].itemID)
+
+    def test_data_assessment_query_budget(self):
+        items, _ = self._create_task(
+            DataAssessmentTask,
+            TextPairWithDomain,
+            documentDomain='TEST',
+            **TEXT_PAIR_FIELDS,
+        )
+        response = self._assert_next_item_budget(10, 'data-assessment')
+        self.assertEqual(response.context['item_id'], items[0].itemID)
+
+    def test_pairwise_assessment_document_query_budget(self):
+        items, _ = self._create_task(
+            PairwiseAssessmentDocumentTask,
+            TextSegmentWithTwoTargetsWithContext,
+            **TEXT_SEGMENT_WITH_TWO_TARGETS_FIELDS,
+            **DOCUMENT_FIELDS,
+        )
+        response = self._assert_next_item_budget(10, 'pairwise-assessment-document')
+        self.assertEqual(response.context['item_id'], items[0].itemID)
+
+    def test_direct_assessment_post_query_budget(self):
+        """
+        Submitting a result stays within query budget. Statistics are
+        updated after the result has been committed.
+        """
+        items, user = self._create_task(
+            DirectAssessmentTask, TextPair, **TEXT_PAIR_FIELDS
+        )
+        AnnotationStatistics.get_for_user(user)
+        url = reverse('direct-assessment')
+        self.client.get(url)
+
+        data = {
+            'score': 70,
+            'item_id': items[0].itemID,
+            'task_id': items[0].id,
+            'start_timestamp': 1,
+            'end_timestamp': 2,
+        }
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            response = self.assertQueryBudget(25, url, data, method='post')
+        self.assertEqual(len(callbacks), 1)
+        self.assertEqual(response.context['item_id'], items[1].itemID)
+
+        result = DirectAssessmentResult.objects.get(createdBy=user)
+        self.assertEqual((result.item, result.score), (items[0], 70))
+        statistics = AnnotationStatistics.get_for_user(user)
+        self.assertEqual(statistics['DirectAssessmentResult'].completedItems, 1)
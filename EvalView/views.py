@@ -15,6 +15,7 @@ from django.shortcuts import render
 from django.utils.html import escape
 
 from Appraise.settings import BASE_CONTEXT
+from Appraise.timing import get_phase_timer
 from Appraise.utils import _get_logger
 from Campaign.models import Campaign
 from Dashboard.models import SIGN_LANGUAGE_CODES
@@ -46,7 +47,7 @@ def direct_assessment(request, code=None, campaign_name=None):
     """
     Direct assessment annotation view.
     """
-    t1 = datetime.now()
+    timer = get_phase_timer(request)
 
     campaign = None
     if campaign_name:
@@ -63,38 +64,13 @@ def direct_assessment(request, code=None, campaign_name=None):
         request.user.username or "Anonymous",
     )
 
-    current_task = None
-
     # Try to identify TaskAgenda for current user.
     agendas = TaskAgenda.objects.filter(user=request.user)
 
     if campaign:
         agendas = agendas.filter(campaign=campaign)
 
-    for agenda in agendas:
-        LOGGER.info('Identified work agenda %s', agenda)
-
-        tasks_to_complete = []
-        for serialized_open_task in agenda.serialized_open_tasks():
-            open_task = serialized_open_task.get_object_instance()
-
-            # Skip tasks which are not available anymore
-            if open_task is None:
-                continue
-
-            if open_task.next_item_for_user(request.user) is not None:
-                current_task = open_task
-                if not campaign:
-                    campaign = agenda.campaign
-            else:
-                tasks_to_complete.append(serialized_open_task)
-
-        modified = False
-        for task in tasks_to_complete:
-            modified = agenda.complete_open_task(task) or modified
-
-        if modified:
-            agenda.save()
+    current_task, _ = TaskAgenda.resolve_open_tasks(agendas, request.user)
 
     if not current_task and agendas.count() > 0:
         LOGGER.info('Work agendas completed, redirecting to dashboard')
@@ -116,7 +92,7 @@ def direct_assessment(request, code=None, campaign_name=None):
             code,
             campaign,
         )
-        next_task = DirectAssessmentTask.get_next_free_task_for_language(
+        next_task = DirectAssessmentTask.assign_next_free_task_for_language(
             code, campaign, request.user
         )
 
@@ -124,9 +100,6 @@ def direct_assessment(request, code=None, campaign_name=None):
             LOGGER.info('No next task detected, redirecting to dashboard')
             return redirect('dashboard')
 
-        next_task.assignedTo.add(request.user)
-        next_task.save()
-
         current_task = next_task
 
     if current_task:
@@ -138,7 +111,7 @@ def direct_assessment(request, code=None, campaign_name=None):
             LOGGER.info(_msg)
             campaign = current_task.campaign
 
-    t2 = datetime.now()
+    timer.mark('task')
     if request.method == "POST":
         score = request.POST.get('score', None)
         item_id = request.POST.get('item_id', None)
@@ -178,7 +151,7 @@ def direct_assessment(request, code=None, campaign_name=None):
                     dateCompleted=utc_now,
                 )
 
-    t3 = datetime.now()
+    timer.mark('post')
 
     current_item, completed_items = current_task.next_item_for_user(
         request.user, return_completed_items=True
@@ -196,7 +169,7 @@ def direct_assessment(request, code=None, campaign_name=None):
     source_language = current_task.marketSourceLanguage()
     target_language = current_task.marketTargetLanguage()
 
-    t4 = datetime.now()
+    timer.mark('item')
 
     # Define priming question
     #
@@ -274,7 +247,7 @@ def direct_assessment(request, code=None, campaign_name=None):
         'items_left_in_block': 10 - (completed_items - completed_blocks * 10),
         'source_language': source_language,
         'target_language': target_language,
-        'debug_times': (t2 - t1, t3 - t2, t4 - t3, t4 - t1),
+        'debug_times': timer.debug_times(),
         'template_debug': 'debug' in request.GET,
         'campaign': campaign.campaignName,
         'datask_id': current_task.id,
@@ -291,7 +264,7 @@ def direct_assessment_context(request, code=None, campaign_name=None):
     """
     Direct assessment context annotation view.
     """
-    t1 = datetime.now()
+    timer = get_phase_timer(request)
 
     campaign = None
     if campaign_name:
@@ -308,38 +281,13 @@ def direct_assessment_context(request, code=None, campaign_name=None):
         request.user.username or "Anonymous",
     )
 
-    current_task = None
-
     # Try to identify TaskAgenda for current user.
     agendas = TaskAgenda.objects.filter(user=request.user)
 
     if campaign:
         agendas = agendas.filter(campaign=campaign)
 
-    for agenda in agendas:
-        LOGGER.info('Identified work agenda %s', agenda)
-
-        tasks_to_complete = []
-        for serialized_open_task in agenda.serialized_open_tasks():
-            open_task = serialized_open_task.get_object_instance()
-
-            # Skip tasks which are not available anymore
-            if open_task is None:
-                continue
-
-            if open_task.next_item_for_user(request.user) is not None:
-                current_task = open_task
-                if not campaign:
-                    campaign = agenda.campaign
-            else:
-                tasks_to_complete.append(serialized_open_task)
-
-        modified = False
-        for task in tasks_to_complete:
-            modified = agenda.complete_open_task(task) or modified
-
-        if modified:
-            agenda.save()
+    current_task, _ = TaskAgenda.resolve_open_tasks(agendas, request.user)
 
     if not current_task and agendas.count() > 0:
         LOGGER.info('Work agendas completed, redirecting to dashboard')
@@ -361,7 +309,7 @@ def direct_assessment_context(request, code=None, campaign_name=None):
             code,
             campaign,
         )
-        next_task = DirectAssessmentContextTask.get_next_free_task_for_language(
+        next_task = DirectAssessmentContextTask.assign_next_free_task_for_language(
             code, campaign, request.user
         )
 
@@ -369,9 +317,6 @@ def direct_assessment_context(request, code=None, campaign_name=None):
             LOGGER.info('No next task detected, redirecting to dashboard')
             return redirect('dashboard')
 
-        next_task.assignedTo.add(request.user)
-        next_task.save()
-
         current_task = next_task
 
     if current_task:
@@ -383,7 +328,7 @@ def direct_assessment_context(request, code=None, campaign_name=None):
             LOGGER.info(_msg)
             campaign = current_task.campaign
 
-    t2 = datetime.now()
+    timer.mark('task')
     if request.method == "POST":
         score = request.POST.get('score', None)
         item_id = request.POST.get('item_id', None)
@@ -426,7 +371,7 @@ def direct_assessment_context(request, code=None, campaign_name=None):
                     dateCompleted=utc_now,
                 )
 
-    t3 = datetime.now()
+    timer.mark('post')
 
     current_item, completed_items = current_task.next_item_for_user(
         request.user, return_completed_items=True
@@ -444,7 +389,7 @@ def direct_assessment_context(request, code=None, campaign_name=None):
     source_language = current_task.marketSourceLanguage()
     target_language = current_task.marketTargetLanguage()
 
-    t4 = datetime.now()
+    timer.mark('item')
 
     # Define priming question
     #
@@ -520,7 +465,7 @@ def direct_assessment_context(request, code=None, campaign_name=None):
         'items_left_in_block': 10 - (completed_items - completed_blocks * 10),
         'source_language': source_language,
         'target_language': target_language,
-        'debug_times': (t2 - t1, t3 - t2, t4 - t3, t4 - t1),
+        'debug_times': timer.debug_times(),
         'template_debug': 'debug' in request.GET,
         'campaign': campaign.campaignName,
         'datask_id': current_task.id,
@@ -538,7 +483,7 @@ def direct_assessment_document(request, code=None, campaign_name=None):
     Direct assessment document annotation view.
     """
 
-    t1 = datetime.now()
+    timer = get_phase_timer(request)
 
     campaign = None
     if campaign_name:
@@ -555,38 +500,13 @@ def direct_assessment_document(request, code=None, campaign_name=None):
         request.user.username or "Anonymous",
     )
 
-    current_task = None
-
     # Try to identify TaskAgenda for current user.
     agendas = TaskAgenda.objects.filter(user=request.user)
 
     if campaign:
         agendas = agendas.filter(campaign=campaign)
 
-    for agenda in agendas:
-        LOGGER.info('Identified work agenda %s', agenda)
-
-        tasks_to_complete = []
-        for serialized_open_task in agenda.serialized_open_tasks():
-            open_task = serialized_open_task.get_object_instance()
-
-            # Skip tasks which are not available anymore
-            if open_task is None:
-                continue
-
-            if open_task.next_item_for_user(request.user) is not None:
-                current_task = open_task
-                if not campaign:
-                    campaign = agenda.campaign
-            else:
-                tasks_to_complete.append(serialized_open_task)
-
-        modified = False
-        for task in tasks_to_complete:
-            modified = agenda.complete_open_task(task) or modified
-
-        if modified:
-            agenda.save()
+    current_task, _ = TaskAgenda.resolve_open_tasks(agendas, request.user)
 
     if not current_task and agendas.count() > 0:
         LOGGER.info('Work agendas completed, redirecting to dashboard')
@@ -608,7 +528,7 @@ def direct_assessment_document(request, code=None, campaign_name=None):
             code,
             campaign,
         )
-        next_task = DirectAssessmentDocumentTask.get_next_free_task_for_language(
+        next_task = DirectAssessmentDocumentTask.assign_next_free_task_for_language(
             code, campaign, request.user
         )
 
@@ -616,9 +536,6 @@ def direct_assessment_document(request, code=None, campaign_name=None):
             LOGGER.info('No next task detected, redirecting to dashboard')
             return redirect('dashboard')
 
-        next_task.assignedTo.add(request.user)
-        next_task.save()
-
         current_task = next_task
 
     if current_task:
@@ -638,7 +555,7 @@ def direct_assessment_document(request, code=None, campaign_name=None):
     # Handling POST requests differs from the original direct_assessment/
     # direct_assessment_context view, but the input is the same: a score for the
     # single submitted item
-    t2 = datetime.now()
+    timer.mark('task')
     ajax = False
     item_saved = False
     error_msg = ''
@@ -795,7 +712,7 @@ def direct_assessment_document(request, code=None, campaign_name=None):
                     'please reload the page and try again.'
                 )
 
-    t3 = datetime.now()
+    timer.mark('post')
 
     # Get all items from the document that the first unannotated item in the
     # task belongs to, and collect some additional statistics
@@ -850,7 +767,7 @@ def direct_assessment_document(request, code=None, campaign_name=None):
     source_language = current_task.marketSourceLanguage()
     target_language = current_task.marketTargetLanguage()
 
-    t4 = datetime.now()
+    timer.mark('item')
 
     # By default, source and target items are text segments
     source_item_type = 'text'
@@ -1038,7 +955,7 @@ def direct_assessment_document(request, code=None, campaign_name=None):
         'target_language': target_language,
         'source_item_type': source_item_type,
         'target_item_type': target_item_type,
-        'debug_times': (t2 - t1, t3 - t2, t4 - t3, t4 - t1),
+        'debug_times': timer.debug_times(),
         'template_debug': 'debug' in request.GET,
         'campaign': campaign.campaignName,
         'datask_id': current_task.id,
@@ -1110,12 +1027,13 @@ def direct_assessment_document_mqmesa(campaign, current_task, request):
             LOGGER.error(error_msg)
             item_saved = False
         else:
+            current_item = list(db_item)[0]
             DirectAssessmentDocumentResult.objects.create(
                 score=score,
                 mqm=mqm,
                 start_time=float(start_timestamp),
                 end_time=float(end_timestamp),
-                item=list(db_item)[0],
+                item=current_item,
                 task=current_task,
                 createdBy=request.user,
                 activated=False,
@@ -1239,7 +1157,7 @@ def multimodal_assessment(request, code=None, campaign_name=None):
     """
     Multi modal assessment annotation view.
     """
-    t1 = datetime.now()
+    timer = get_phase_timer(request)
 
     campaign = None
     if campaign_name:
@@ -1256,38 +1174,13 @@ def multimodal_assessment(request, code=None, campaign_name=None):
         request.user.username or "Anonymous",
     )
 
-    current_task = None
-
     # Try to identify TaskAgenda for current user.
     agendas = TaskAgenda.objects.filter(user=request.user)
 
     if campaign:
         agendas = agendas.filter(campaign=campaign)
 
-    for agenda in agendas:
-        modified = False
-        LOGGER.info('Identified work agenda %s', agenda)
-
-        tasks_to_complete = []
-        for serialized_open_task in agenda.serialized_open_tasks():
-            open_task = serialized_open_task.get_object_instance()
-
-            # Skip tasks which are not available anymore
-            if open_task is None:
-                continue
-
-            if open_task.next_item_for_user(request.user) is not None:
-                current_task = open_task
-                if not campaign:
-                    campaign = agenda.campaign
-            else:
-                tasks_to_complete.append(serialized_open_task)
-
-        for task in tasks_to_complete:
-            modified = agenda.complete_open_task(task) or modified
-
-        if modified:
-            agenda.save()
+    current_task, _ = TaskAgenda.resolve_open_tasks(agendas, request.user)
 
     if not current_task and agendas.count() > 0:
         LOGGER.info('Work agendas completed, redirecting to dashboard')
@@ -1306,7 +1199,7 @@ def multimodal_assessment(request, code=None, campaign_name=None):
 
         _msg = 'Identifying next task for code "%s", campaign="%s"'
         LOGGER.info(_msg, code, campaign)
-        next_task = MultiModalAssessmentTask.get_next_free_task_for_language(
+        next_task = MultiModalAssessmentTask.assign_next_free_task_for_language(
             code, campaign, request.user
         )
 
@@ -1314,9 +1207,6 @@ def multimodal_assessment(request, code=None, campaign_name=None):
             LOGGER.info('No next task detected, redirecting to dashboard')
             return redirect('dashboard')
 
-        next_task.assignedTo.add(request.user)
-        next_task.save()
-
         current_task = next_task
 
     if current_task:
@@ -1328,7 +1218,7 @@ def multimodal_assessment(request, code=None, campaign_name=None):
             LOGGER.info(_msg)
             campaign = current_task.campaign
 
-    t2 = datetime.now()
+    timer.mark('task')
     if request.method == "POST":
         score = request.POST.get('score', None)
         item_id = request.POST.get('item_id', None)
@@ -1368,7 +1258,7 @@ def multimodal_assessment(request, code=None, campaign_name=None):
                     dateCompleted=utc_now,
                 )
 
-    t3 = datetime.now()
+    timer.mark('post')
 
     current_item, completed_items = current_task.next_item_for_user(
         request.user, return_completed_items=True
@@ -1386,7 +1276,7 @@ def multimodal_assessment(request, code=None, campaign_name=None):
     source_language = current_task.marketSourceLanguage()
     target_language = current_task.marketTargetLanguage()
 
-    t4 = datetime.now()
+    timer.mark('item')
 
     context = {
         'active_page': 'multimodal-assessment',
@@ -1399,7 +1289,7 @@ def multimodal_assessment(request, code=None, campaign_name=None):
         'items_left_in_block': 10 - (completed_items - completed_blocks * 10),
         'source_language': source_language,
         'target_language': target_language,
-        'debug_times': (t2 - t1, t3 - t2, t4 - t3, t4 - t1),
+        'debug_times': timer.debug_times(),
         'template_debug': 'debug' in request.GET,
         'campaign': campaign.campaignName,
         'datask_id': current_task.id,
@@ -1416,7 +1306,7 @@ def pairwise_assessment(request, code=None, campaign_name=None):
     """
     Pairwise direct assessment annotation view.
     """
-    t1 = datetime.now()
+    timer = get_phase_timer(request)
 
     campaign = None
     if campaign_name:
@@ -1433,38 +1323,13 @@ def pairwise_assessment(request, code=None, campaign_name=None):
         request.user.username or "Anonymous",
     )
 
-    current_task = None
-
     # Try to identify TaskAgenda for current user.
     agendas = TaskAgenda.objects.filter(user=request.user)
 
     if campaign:
         agendas = agendas.filter(campaign=campaign)
 
-    for agenda in agendas:
-        LOGGER.info('Identified work agenda %s', agenda)
-
-        tasks_to_complete = []
-        for serialized_open_task in agenda.serialized_open_tasks():
-            open_task = serialized_open_task.get_object_instance()
-
-            # Skip tasks which are not available anymore
-            if open_task is None:
-                continue
-
-            if open_task.next_item_for_user(request.user) is not None:
-                current_task = open_task
-                if not campaign:
-                    campaign = agenda.campaign
-            else:
-                tasks_to_complete.append(serialized_open_task)
-
-        modified = False
-        for task in tasks_to_complete:
-            modified = agenda.complete_open_task(task) or modified
-
-        if modified:
-            agenda.save()
+    current_task, _ = TaskAgenda.resolve_open_tasks(agendas, request.user)
 
     if not current_task and agendas.count() > 0:
         LOGGER.info('Work agendas completed, redirecting to dashboard')
@@ -1486,7 +1351,7 @@ def pairwise_assessment(request, code=None, campaign_name=None):
             code,
             campaign,
         )
-        next_task = PairwiseAssessmentTask.get_next_free_task_for_language(
+        next_task = PairwiseAssessmentTask.assign_next_free_task_for_language(
             code, campaign, request.user
         )
 
@@ -1494,9 +1359,6 @@ def pairwise_assessment(request, code=None, campaign_name=None):
             LOGGER.info('No next task detected, redirecting to dashboard')
             return redirect('dashboard')
 
-        next_task.assignedTo.add(request.user)
-        next_task.save()
-
         current_task = next_task
 
     if current_task:
@@ -1508,7 +1370,7 @@ def pairwise_assessment(request, code=None, campaign_name=None):
             LOGGER.info(_msg)
             campaign = current_task.campaign
 
-    t2 = datetime.now()
+    timer.mark('task')
     if request.method == "POST":
         score1 = request.POST.get('score', None)  # TODO: score -> score1
         score2 = request.POST.get('score2', None)
@@ -1564,7 +1426,7 @@ def pairwise_assessment(request, code=None, campaign_name=None):
                     errors2=error2,
                 )
 
-    t3 = datetime.now()
+    timer.mark('post')
 
     current_item, completed_items = current_task.next_item_for_user(
         request.user, return_completed_items=True
@@ -1582,7 +1444,7 @@ def pairwise_assessment(request, code=None, campaign_name=None):
     source_language = current_task.marketSourceLanguage()
     target_language = current_task.marketTargetLanguage()
 
-    t4 = datetime.now()
+    timer.mark('item')
 
     # Define priming question
     #
@@ -1732,7 +1594,7 @@ def pairwise_assessment(request, code=None, campaign_name=None):
         'items_left_in_block': 10 - (completed_items - completed_blocks * 10),
         'source_language': source_language,
         'target_language': target_language,
-        'debug_times': (t2 - t1, t3 - t2, t4 - t3, t4 - t1),
+        'debug_times': timer.debug_times(),
         'template_debug': 'debug' in request.GET,
         'campaign': campaign.campaignName,
         'datask_id': current_task.id,
@@ -1754,7 +1616,7 @@ def data_assessment(request, code=None, campaign_name=None):
     """
     Direct data assessment annotation view.
     """
-    t1 = datetime.now()
+    timer = get_phase_timer(request)
 
     campaign = None
     if campaign_name:
@@ -1771,38 +1633,13 @@ def data_assessment(request, code=None, campaign_name=None):
         request.user.username or "Anonymous",
     )
 
-    current_task = None
-
     # Try to identify TaskAgenda for current user.
     agendas = TaskAgenda.objects.filter(user=request.user)
 
     if campaign:
         agendas = agendas.filter(campaign=campaign)
 
-    for agenda in agendas:
-        LOGGER.info('Identified work agenda %s', agenda)
-
-        tasks_to_complete = []
-        for serialized_open_task in agenda.serialized_open_tasks():
-            open_task = serialized_open_task.get_object_instance()
-
-            # Skip tasks which are not available anymore
-            if open_task is None:
-                continue
-
-            if open_task.next_item_for_user(request.user) is not None:
-                current_task = open_task
-                if not campaign:
-                    campaign = agenda.campaign
-            else:
-                tasks_to_complete.append(serialized_open_task)
-
-        modified = False
-        for task in tasks_to_complete:
-            modified = agenda.complete_open_task(task) or modified
-
-        if modified:
-            agenda.save()
+    current_task, _ = TaskAgenda.resolve_open_tasks(agendas, request.user)
 
     if not current_task and agendas.count() > 0:
         LOGGER.info('Work agendas completed, redirecting to dashboard')
@@ -1824,7 +1661,7 @@ def data_assessment(request, code=None, campaign_name=None):
             code,
             campaign,
         )
-        next_task = DataAssessmentTask.get_next_free_task_for_language(
+        next_task = DataAssessmentTask.assign_next_free_task_for_language(
             code, campaign, request.user
         )
 
@@ -1832,9 +1669,6 @@ def data_assessment(request, code=None, campaign_name=None):
             LOGGER.info('No next task detected, redirecting to dashboard')
             return redirect('dashboard')
 
-        next_task.assignedTo.add(request.user)
-        next_task.save()
-
         current_task = next_task
 
     if current_task:
@@ -1846,7 +1680,7 @@ def data_assessment(request, code=None, campaign_name=None):
             LOGGER.info(_msg)
             campaign = current_task.campaign
 
-    t2 = datetime.now()
+    timer.mark('task')
     if request.method == "POST":
         score = request.POST.get('score', None)
         rank = request.POST.get('rank', None)
@@ -1894,7 +1728,7 @@ def data_assessment(request, code=None, campaign_name=None):
                     dateCompleted=utc_now,
                 )
 
-    t3 = datetime.now()
+    timer.mark('post')
 
     current_item, completed_items = current_task.next_item_for_user(
         request.user, return_completed_items=True
@@ -1910,7 +1744,7 @@ def data_assessment(request, code=None, campaign_name=None):
     source_language = current_task.marketSourceLanguage()
     target_language = current_task.marketTargetLanguage()
 
-    t4 = datetime.now()
+    timer.mark('item')
 
     source_label = 'Source text'
     target_label = 'Translation'
@@ -1979,7 +1813,7 @@ def data_assessment(request, code=None, campaign_name=None):
         'items_left_in_block': 10 - (completed_items - completed_blocks * 10),
         'source_language': source_language,
         'target_language': target_language,
-        'debug_times': (t2 - t1, t3 - t2, t4 - t3, t4 - t1),
+        'debug_times': timer.debug_times(),
         'show_debug': 'debug' in request.GET,
         'campaign': campaign.campaignName,
         'datask_id': current_task.id,
@@ -1996,7 +1830,7 @@ def pairwise_assessment_document(request, code=None, campaign_name=None):
     """
     Pairwise direct assessment document annotation view.
     """
-    t1 = datetime.now()
+    timer = get_phase_timer(request)
 
     campaign = None
     if campaign_name:
@@ -2013,38 +1847,13 @@ def pairwise_assessment_document(request, code=None, campaign_name=None):
         request.user.username or "Anonymous",
     )
 
-    current_task = None
-
     # Try to identify TaskAgenda for current user.
     agendas = TaskAgenda.objects.filter(user=request.user)
 
     if campaign:
         agendas = agendas.filter(campaign=campaign)
 
-    for agenda in agendas:
-        LOGGER.info('Identified work agenda %s', agenda)
-
-        tasks_to_complete = []
-        for serialized_open_task in agenda.serialized_open_tasks():
-            open_task = serialized_open_task.get_object_instance()
-
-            # Skip tasks which are not available anymore
-            if open_task is None:
-                continue
-
-            if open_task.next_item_for_user(request.user) is not None:
-                current_task = open_task
-                if not campaign:
-                    campaign = agenda.campaign
-            else:
-                tasks_to_complete.append(serialized_open_task)
-
-        modified = False
-        for task in tasks_to_complete:
-            modified = agenda.complete_open_task(task) or modified
-
-        if modified:
-            agenda.save()
+    current_task, _ = TaskAgenda.resolve_open_tasks(agendas, request.user)
 
     if not current_task and agendas.count() > 0:
         LOGGER.info('Work agendas completed, redirecting to dashboard')
@@ -2068,7 +1877,7 @@ def pairwise_assessment_document(request, code=None, campaign_name=None):
             code,
             campaign,
         )
-        next_task = PairwiseAssessmentDocumentTask.get_next_free_task_for_language(
+        next_task = PairwiseAssessmentDocumentTask.assign_next_free_task_for_language(
             code, campaign, request.user
         )
 
@@ -2076,9 +1885,6 @@ def pairwise_assessment_document(request, code=None, campaign_name=None):
             LOGGER.info('No next task detected, redirecting to dashboard')
             return redirect('dashboard')
 
-        next_task.assignedTo.add(request.user)
-        next_task.save()
-
         current_task = next_task
 
     if current_task:
@@ -2092,7 +1898,7 @@ def pairwise_assessment_document(request, code=None, campaign_name=None):
 
     # Handling POST requests differs from the original direct_assessment/
     # direct_assessment_context view
-    t2 = datetime.now()
+    timer.mark('task')
     ajax = False
     item_saved = False
     error_msg = ''
@@ -2259,7 +2065,7 @@ def pairwise_assessment_document(request, code=None, campaign_name=None):
                     'please reload the page and try again.'
                 )
 
-    t3 = datetime.now()
+    timer.mark('post')
 
     # Get all items from the document that the first unannotated item in the
     # task belongs to, and collect some additional statistics
@@ -2336,7 +2142,7 @@ def pairwise_assessment_document(request, code=None, campaign_name=None):
     source_language = current_task.marketSourceLanguage()
     target_language = current_task.marketTargetLanguage()
 
-    t4 = datetime.now()
+    timer.mark('item')
 
     reference_label = 'Source text'
     candidate1_label = 'Translation A'
@@ -2429,7 +2235,7 @@ def pairwise_assessment_document(request, code=None, campaign_name=None):
         'items_left_in_block': len(block_items) - completed_items_in_block,
         'source_language': source_language,
         'target_language': target_language,
-        'debug_times': (t2 - t1, t3 - t2, t4 - t3, t4 - t1),
+        'debug_times': timer.debug_times(),
         'template_debug': 'debug' in request.GET,
         'campaign': campaign.campaignName,
         'datask_id': current_task.id,